@@ -1,23 +1,9 @@
 from __future__ import annotations
 
-import hashlib
-import io
 import re
+from .image_features import dhash64 as _fast_dhash64, sha1k  # noqa: F401
 from typing import List, Optional
 
-try:
-
-
-
-    from PIL import Image
-
-
-
-except Exception:
-
-
-
-    Image = None
 
 
 
@@ -182,95 +168,8 @@ def tokenize_text(s: str) -> List[str]:
 
 
 def dhash64(b: bytes) -> Optional[str]:
-
-
-
-    if Image is None:
-
-
-
-        return None
-
-
-
-    try:
-
-
-
-        with Image.open(io.BytesIO(b)) as im:
-
-
-
-            im = im.convert("L").resize((9, 8))
-
-
-
-            px = list(im.getdata())
-
-
-
-            rows = [px[i * 9 : (i + 1) * 9] for i in range(8)]
-
-
-
-            bits = 0
-
-
-
-            for r in range(8):
-
-
-
-                for c in range(8):
-
-
-
-                    left = rows[r][c]
-
-
-
-                    right = rows[r][c + 1]
-
-
-
-                    bits = (bits << 1) | (1 if left > right else 0)
-
-
-
-            return f"{bits:016x}"
-
-
-
-    except Exception:
-
-
-
-        return None
-
-
-
-
-
-
-
-
-
-
-
-def sha1k(b: bytes, k: int = 12288) -> str:
-
-
-
-    return hashlib.sha1(b[:k]).hexdigest()
-
-
-
-
-
-
-
-
-
+    """64-bit dHash hex (one reduced-scale decode, NumPy bit packing; see image_features)."""
+    return _fast_dhash64(b)
 
 
 def extract_tokens(message_content: str, ocr_text: Optional[str] = None) -> List[str]:
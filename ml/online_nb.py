@@ -1,327 +1,228 @@
 from __future__ import annotations
 
-import math
-from collections import defaultdict
-from typing import Dict, Iterable
+"""
+online_nb.py
+- Multinomial Naive Bayes phish/safe dengan fitur hashed (crc32 -> 2**NB_HASH_BITS bucket):
+  count disimpan di array NumPy (2 x F), bukan dict per token.
+- Tabel log(count + alpha) di-cache dan di-update inkremental hanya untuk bucket yang
+  disentuh learn(); penyebut per kelas log(total + alpha*V) dihitung O(1) saat predict,
+  jadi biaya scoring = O(jumlah token), tidak tumbuh dengan ukuran vocab.
+- predict_proba_batch(docs): banyak pesan sekaligus (satu gather + bincount per kelas).
+- Format biner "SNB1": header JSON + array sparse (idx, pos, neg) uint32 little-endian,
+  offset 8-byte aligned -> bisa np.memmap langsung dari file (load(path, mmap=True)).
+- Delta: bucket yang berubah sejak mark_clean() ditandai; delta_bytes() = layout SNB1 yang sama
+  tapi hanya bucket itu (nilai absolut), apply_bytes() menerapkannya ke model dasar.
+- from_dict() tetap membaca snapshot JSON lama (dict count per token).
+"""
+import os, json, zlib, struct
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+NB_HASH_BITS = int(os.getenv("NB_HASH_BITS", "18"))
+_MAGIC = b"SNB1"
+_LABELS = ("phish", "safe")
+
+
+def _cls(label: str) -> int:
+    return 0 if label == "phish" else 1
 
 
 class OnlineNB:
-
-
-
-    def __init__(self, alpha: float = 1.0):
-
-
-
-        self.alpha = alpha
-
-
-
-        self.pos_counts = defaultdict(int)
-
-
-
-        self.neg_counts = defaultdict(int)
-
-
-
-        self.pos_total = 0
-
-
-
-        self.neg_total = 0
-
-
-
-        self.pos_docs = 0
-
-
-
-        self.neg_docs = 0
-
-
-
-        self.vocab = set()
-
-
-
-
-
-
-
-    def _update_vocab(self, tokens: Iterable[str]):
-
-
-
-        for t in tokens:
-
-
-
-            if t:
-
-
-
-                self.vocab.add(t)
-
-
-
-
-
-
-
+    def __init__(self, alpha: float = 1.0, bits: int = NB_HASH_BITS):
+        self.alpha = float(alpha)
+        self.bits = int(bits)
+        self._mask = (1 << self.bits) - 1
+        self.counts = np.zeros((2, 1 << self.bits), dtype=np.uint32)
+        self._log_num = np.full(self.counts.shape, np.log(self.alpha), dtype=np.float64)
+        self.totals = [0, 0]
+        self.docs = [0, 0]
+        self.nnz = 0  # bucket terpakai (pengganti len(vocab))
+        self._dirty = np.zeros(1 << self.bits, dtype=bool)
+
+    # ---------- legacy attribute names ----------
+    pos_total = property(lambda self: self.totals[0])
+    neg_total = property(lambda self: self.totals[1])
+    pos_docs = property(lambda self: self.docs[0])
+    neg_docs = property(lambda self: self.docs[1])
+
+    @property
+    def vocab_size(self) -> int:
+        return self.nnz
+
+    # ---------- features ----------
+    def _ids(self, tokens: Iterable[str]) -> np.ndarray:
+        toks = [t for t in tokens if t]
+        if not toks:
+            return np.empty(0, dtype=np.intp)
+        h = np.fromiter((zlib.crc32(str(t).encode("utf-8")) for t in toks), dtype=np.uint32, count=len(toks))
+        return (h & self._mask).astype(np.intp)
+
+    def _add(self, c: int, ids: np.ndarray, n: Optional[np.ndarray] = None) -> None:
+        if n is None:
+            ids, n = np.unique(ids, return_counts=True)
+        fresh = (self.counts[0, ids] == 0) & (self.counts[1, ids] == 0)
+        self.nnz += int(fresh.sum())
+        self.counts[c, ids] += n.astype(np.uint32)
+        self._dirty[ids] = True
+        self._log_num[c, ids] = np.log(self.counts[c, ids] + self.alpha)
+        self.totals[c] += int(n.sum())
+
+    # ---------- learn / predict ----------
     def learn(self, tokens: Iterable[str], label: str):
-
-
-
-        tokens = [t for t in tokens if t]
-
-
-
-        if not tokens:
-
-
-
+        ids = self._ids(tokens)
+        if not ids.size:
             return
-
-
-
-        self._update_vocab(tokens)
-
-
-
-        if label == "phish":
-
-
-
-            for t in tokens:
-
-
-
-                self.pos_counts[t] += 1
-
-
-
-                self.pos_total += 1
-
-
-
-            self.pos_docs += 1
-
-
-
-        else:
-
-
-
-            for t in tokens:
-
-
-
-                self.neg_counts[t] += 1
-
-
-
-                self.neg_total += 1
-
-
-
-            self.neg_docs += 1
-
-
-
-
-
-
-
-    def _log_prob(self, tokens: Iterable[str], label: str) -> float:
-
-
-
-        total_docs = self.pos_docs + self.neg_docs
-
-
-
-        prior = 0.5 if total_docs == 0 else ((self.pos_docs if label == "phish" else self.neg_docs) / total_docs)
-
-
-
-        counts, total = (self.pos_counts, self.pos_total) if label == "phish" else (self.neg_counts, self.neg_total)
-
-
-
-        V = max(1, len(self.vocab))
-
-
-
-        a = self.alpha
-
-
-
-        logp = math.log(prior if prior > 0 else 1e-9)
-
-
-
-        for t in tokens:
-
-
-
-            c = counts.get(t, 0)
-
-
-
-            logp += math.log((c + a) / (total + a * V))
-
-
-
-        return logp
-
-
-
-
-
-
+        c = _cls(label)
+        self._add(c, ids)
+        self.docs[c] += 1
+
+    def _log_prior(self, c: int) -> float:
+        total_docs = self.docs[0] + self.docs[1]
+        prior = 0.5 if total_docs == 0 else self.docs[c] / total_docs
+        return float(np.log(prior if prior > 0 else 1e-9))
+
+    def _log_den(self, c: int) -> float:
+        return float(np.log(self.totals[c] + self.alpha * max(1, self.nnz)))
+
+    def predict_proba_batch(self, docs: Sequence[Iterable[str]]) -> np.ndarray:
+        """P(phish) for every token list in `docs` (0.5 for empty ones)."""
+        ids_list = [self._ids(d) for d in docs]
+        n = len(ids_list)
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+        lens = np.fromiter((x.size for x in ids_list), dtype=np.int64, count=n)
+        out = np.full(n, 0.5, dtype=np.float64)
+        if not lens.any():
+            return out
+        ids = np.concatenate(ids_list)
+        doc = np.repeat(np.arange(n), lens)
+        lp = np.empty((2, n), dtype=np.float64)
+        for c in (0, 1):
+            s = np.bincount(doc, weights=self._log_num[c, ids], minlength=n)
+            lp[c] = self._log_prior(c) + s - lens * self._log_den(c)
+        p = 1.0 / (1.0 + np.exp(np.clip(lp[1] - lp[0], -700, 700)))
+        return np.where(lens > 0, p, out)
 
     def predict_proba(self, tokens: Iterable[str]) -> Dict[str, float]:
+        p = float(self.predict_proba_batch([list(tokens)])[0])
+        return {"phish": p, "safe": 1.0 - p}
+
+    # ---------- binary snapshot ----------
+    def _meta(self) -> Dict:
+        return {"alpha": self.alpha, "bits": self.bits, "totals": list(self.totals),
+                "docs": list(self.docs), "nnz": self.nnz}
+
+    def _pack(self, idx: np.ndarray, **extra) -> bytes:
+        idx = idx.astype("<u4")
+        head = json.dumps(dict(self._meta(), **extra), separators=(",", ":")).encode("utf-8")
+        head += b" " * (-(len(_MAGIC) + 4 + len(head)) % 8)
+        return b"".join((_MAGIC, struct.pack("<I", len(head)), head, idx.tobytes(),
+                         self.counts[0, idx].astype("<u4").tobytes(), self.counts[1, idx].astype("<u4").tobytes()))
+
+    def to_bytes(self) -> bytes:
+        return self._pack(np.flatnonzero(self.counts[0] | self.counts[1]))
+
+    @property
+    def dirty_count(self) -> int:
+        return int(self._dirty.sum())
+
+    def delta_bytes(self) -> bytes:
+        """Buckets changed since the last mark_clean(), with absolute counts."""
+        return self._pack(np.flatnonzero(self._dirty), delta=True)
+
+    def mark_clean(self) -> np.ndarray:
+        """Reset the changed-bucket mask; returns the previous mask (for mark_dirty on failure)."""
+        prev = self._dirty
+        self._dirty = np.zeros_like(prev)
+        return prev
+
+    def mark_dirty(self, mask: np.ndarray) -> None:
+        self._dirty |= mask
+
+    def apply_bytes(self, b: bytes) -> None:
+        """Apply a delta_bytes() chunk (same alpha/bits) on top of this model."""
+        meta, n_head = self._read_head(b)
+        if int(meta.get("bits", self.bits)) != self.bits:
+            raise ValueError("delta built for a different hash size")
+        idx, pos, neg = self._split(b, n_head, (len(b) - 8 - n_head) // 12)
+        idx = idx.astype(np.intp)
+        self.counts[0, idx] = pos
+        self.counts[1, idx] = neg
+        self._log_num[:, idx] = np.log(self.counts[:, idx] + self.alpha)
+        self.totals = [int(x) for x in meta.get("totals", self.totals)]
+        self.docs = [int(x) for x in meta.get("docs", self.docs)]
+        self.nnz = int(meta.get("nnz", self.nnz))
+
+    @staticmethod
+    def _split(buf, n_head: int, nnz: int):
+        off = len(_MAGIC) + 4 + n_head
+        step = nnz * 4
+        return [np.frombuffer(buf, dtype="<u4", count=nnz, offset=off + i * step) for i in range(3)]
 
+    @classmethod
+    def _from_arrays(cls, meta: Dict, idx, pos, neg) -> "OnlineNB":
+        m = cls(alpha=meta.get("alpha", 1.0), bits=meta.get("bits", NB_HASH_BITS))
+        idx = np.asarray(idx, dtype=np.intp)
+        m.counts[0, idx] = pos
+        m.counts[1, idx] = neg
+        m._log_num = np.log(m.counts + m.alpha)
+        m.totals = [int(x) for x in meta.get("totals", [0, 0])]
+        m.docs = [int(x) for x in meta.get("docs", [0, 0])]
+        m.nnz = int(idx.size)
+        return m
 
+    @classmethod
+    def _read_head(cls, buf) -> tuple:
+        if bytes(buf[:4]) != _MAGIC:
+            raise ValueError("not an SNB1 model")
+        (n_head,) = struct.unpack("<I", bytes(buf[4:8]))
+        meta = json.loads(bytes(buf[8:8 + n_head]).decode("utf-8"))
+        return meta, n_head
 
-        tokens = [t for t in tokens if t]
-
-
-
-        if not tokens:
-
-
-
-            return {"phish": 0.5, "safe": 0.5}
-
-
-
-        lp_pos = self._log_prob(tokens, "phish")
-
-
-
-        lp_neg = self._log_prob(tokens, "safe")
-
-
-
-        m = max(lp_pos, lp_neg)
-
-
-
-        p_pos = math.exp(lp_pos - m)
-
-
-
-        p_neg = math.exp(lp_neg - m)
-
-
-
-        Z = p_pos + p_neg
-
-
-
-        return {"phish": p_pos / Z, "safe": p_neg / Z}
-
-
-
-
-
-
-
-    # --- snapshot helpers ---
-
-
+    @classmethod
+    def from_bytes(cls, b: bytes) -> "OnlineNB":
+        meta, n_head = cls._read_head(b)
+        if meta.get("delta"):
+            raise ValueError("delta chunk, apply it with apply_bytes()")
+        nnz = (len(b) - 8 - n_head) // 12
+        return cls._from_arrays(meta, *cls._split(b, n_head, nnz))
+
+    def save(self, path: str) -> None:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
 
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "OnlineNB":
+        if not mmap:
+            with open(path, "rb") as f:
+                return cls.from_bytes(f.read())
+        buf = np.memmap(path, dtype=np.uint8, mode="r")
+        meta, n_head = cls._read_head(buf)
+        nnz = (buf.size - 8 - n_head) // 12
+        return cls._from_arrays(meta, *cls._split(buf, n_head, nnz))
+
+    # ---------- legacy JSON snapshot ----------
     def to_dict(self) -> Dict:
-
-
-
-        return {
-
-
-
-            "alpha": self.alpha,
-
-
-
-            "pos_counts": dict(self.pos_counts),
-
-
-
-            "neg_counts": dict(self.neg_counts),
-
-
-
-            "pos_total": self.pos_total,
-
-
-
-            "neg_total": self.neg_total,
-
-
-
-            "pos_docs": self.pos_docs,
-
-
-
-            "neg_docs": self.neg_docs,
-
-
-
-            "vocab": list(self.vocab),
-
-
-
-        }
-
-
-
-
-
-
+        return {"format": "snb1", **self._meta()}
 
     @classmethod
-
-
-
     def from_dict(cls, d: Dict) -> "OnlineNB":
-
-
-
+        """Rebuild from an old per-token JSON snapshot (tokens are re-hashed)."""
         m = cls(alpha=d.get("alpha", 1.0))
-
-
-
-        m.pos_counts.update(d.get("pos_counts", {}))
-
-
-
-        m.neg_counts.update(d.get("neg_counts", {}))
-
-
-
-        m.pos_total = d.get("pos_total", 0)
-
-
-
-        m.neg_total = d.get("neg_total", 0)
-
-
-
-        m.pos_docs = d.get("pos_docs", 0)
-
-
-
-        m.neg_docs = d.get("neg_docs", 0)
-
-
-
-        m.vocab = set(d.get("vocab", []))
-
-
-
+        for c, key in ((0, "pos_counts"), (1, "neg_counts")):
+            counts = d.get(key) or {}
+            if counts:
+                ids = m._ids(counts.keys())
+                n = np.fromiter((int(v) for v in counts.values()), dtype=np.int64, count=len(counts))
+                order = np.argsort(ids, kind="stable")
+                u, start = np.unique(ids[order], return_index=True)
+                m._add(c, u, np.add.reduceat(n[order], start))
+        m.totals = [int(d.get("pos_total", m.totals[0])), int(d.get("neg_total", m.totals[1]))]
+        m.docs = [int(d.get("pos_docs", 0)), int(d.get("neg_docs", 0))]
         return m
-
-
-
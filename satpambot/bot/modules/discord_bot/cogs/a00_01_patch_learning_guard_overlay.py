@@ -28,7 +28,7 @@ class PatchLearningGuardOverlay(commands.Cog):
             # Read pinned stage once
             from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
             kv = PinnedJSONKV(self.bot)
-            m = self.bot.loop.run_until_complete(kv.get_map())
+            m = kv.peek_map() or {}
             label = str(m.get("xp:stage:label") or "")
             cur   = _to_int(m.get("xp:stage:current", 0), 0)
             req   = _to_int(m.get("xp:stage:required", 1), 1)
@@ -82,7 +82,7 @@ class PatchLearningGuardOverlay(commands.Cog):
                     try: return int(float(v))
                     except Exception: return d
             kv = PinnedJSONKV(bot)
-            m = bot.loop.run_until_complete(kv.get_map())
+            m = kv.peek_map() or {}
             label = str(m.get("xp:stage:label") or "")
             if not label.startswith(("KULIAH-","MAGANG")):
                 return cmds
@@ -2,10 +2,7 @@ from discord.ext import commands
 import os, logging, asyncio, time
 import discord
 
-try:
-    import httpx
-except Exception:
-    httpx = None
+from ..helpers.upstash_pool import get_upstash
 
 log = logging.getLogger(__name__)
 
@@ -13,30 +10,13 @@ log = logging.getLogger(__name__)
 ENABLE = os.getenv("GATE_ENABLE", "1") == "1"
 MOD_CHANNELS = {int(x) for x in (os.getenv("GATE_MOD_CHANNEL_IDS","").split(",") if os.getenv("GATE_MOD_CHANNEL_IDS") else []) if x.strip().isdigit()}
 ALLOW_USER_IDS = {int(x) for x in (os.getenv("GATE_ALLOW_USER_IDS","").split(",") if os.getenv("GATE_ALLOW_USER_IDS") else []) if x.strip().isdigit()}
-UPSTASH_URL = os.getenv("UPSTASH_REDIS_REST_URL")
-UPSTASH_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN")
 GATE_KEY = os.getenv("QNA_PUBLIC_GATE_KEY", "qna:public:enable")
 
 async def _upstash_set(key, val):
-    if not (UPSTASH_URL and UPSTASH_TOKEN and httpx):
-        return False
-    try:
-        async with httpx.AsyncClient() as client:
-            r = await client.post(f"{UPSTASH_URL}/set/{key}/{val}", headers={"Authorization": f"Bearer {UPSTASH_TOKEN}"}, timeout=6.0)
-            return r.status_code == 200
-    except Exception:
-        return False
+    return await get_upstash().set(key, val)
 
 async def _upstash_get(key):
-    if not (UPSTASH_URL and UPSTASH_TOKEN and httpx):
-        return None
-    try:
-        async with httpx.AsyncClient() as client:
-            r = await client.get(f"{UPSTASH_URL}/get/{key}", headers={"Authorization": f"Bearer {UPSTASH_TOKEN}"}, timeout=6.0)
-            if r.status_code == 200:
-                return (r.json() or {}).get("result")
-    except Exception:
-        return None
+    return await get_upstash().get(key)
 
 def _is_mod_ctx(ctx: commands.Context) -> bool:
     if ctx.guild is None:
@@ -24,9 +24,11 @@ ENV:
   GOVERNOR_SENIOR_THRESHOLD default: 80000
   ADMIN_USER_IDS        comma separated Discord user IDs
   KV_BACKEND=upstash_rest, UPSTASH_REDIS_REST_URL, UPSTASH_REDIS_REST_TOKEN
+  GOVERNOR_GATE_TTL_SEC     default: 30  (local gate-state cache; stale copy served if Upstash is down)
+  GOVERNOR_GATE_REFRESH_SEC default: 15  (background refresh interval)
 """
 from discord.ext import commands
-import os, asyncio, logging, re, json
+import os, time, asyncio, logging, re, json
 from typing import Optional, List
 
 log = logging.getLogger(__name__)
@@ -36,33 +38,28 @@ class _Upstash:
         self.base = os.getenv("UPSTASH_REDIS_REST_URL", "").rstrip("/")
         self.token = os.getenv("UPSTASH_REDIS_REST_TOKEN", "")
         self.enabled = bool(self.base and self.token and os.getenv("KV_BACKEND", "upstash_rest") == "upstash_rest")
-        try:
-            import aiohttp
-            self._aiohttp = aiohttp
-        except Exception as e:
-            self._aiohttp = None
-            log.warning("[governor] aiohttp not available: %r", e)
+        from ..helpers.upstash_pool import get_upstash
+        self._pool = get_upstash()
     async def get(self, key: str):
-        if not self.enabled or not self._aiohttp: return None
-        url = f"{self.base}/get/{key}"
-        headers = {"Authorization": f"Bearer {self.token}"}
+        if not self.enabled: return None
         try:
-            async with self._aiohttp.ClientSession() as s:
-                async with s.get(url, headers=headers, timeout=8) as r:
-                    data = await r.json(content_type=None)
-                    return data.get("result")
+            return await self._pool.call("GET", key, timeout=8)
         except Exception as e:
             log.warning("[governor] Upstash GET %s failed: %r", key, e)
             return None
+    async def mget(self, keys: List[str]) -> Optional[list]:
+        """All keys in one round trip; None if Upstash is unreachable (caller keeps its stale copy)."""
+        if not self.enabled: return None
+        try:
+            res = await self._pool.call("MGET", *keys, timeout=8)
+            return res if isinstance(res, list) and len(res) == len(keys) else None
+        except Exception as e:
+            log.warning("[governor] Upstash MGET failed: %r", e)
+            return None
     async def set(self, key: str, value: str) -> bool:
-        if not self.enabled or not self._aiohttp: return False
-        url = f"{self.base}/set/{key}/{value}"
-        headers = {"Authorization": f"Bearer {self.token}"}
+        if not self.enabled: return False
         try:
-            async with self._aiohttp.ClientSession() as s:
-                async with s.post(url, headers=headers, timeout=8) as r:
-                    data = await r.json(content_type=None)
-                    return data.get("result") == "OK"
+            return await self._pool.call("SET", key, value, timeout=8) == "OK"
         except Exception as e:
             log.warning("[governor] Upstash SET %s failed: %r", key, e)
             return False
@@ -78,6 +75,29 @@ def _env_ids(name: str):
         if part.isdigit(): out.append(int(part))
     return out
 
+def _parse_bool(v, default: bool) -> bool:
+    if v is None: return default
+    vv = str(v).strip().lower()
+    if vv in ("1","true","on","yes"): return True
+    if vv in ("0","false","off","no",""): return False
+    try: return bool(int(v))
+    except Exception: return default
+def _parse_id_list(raw) -> List[int]:
+    if not raw:
+        return []
+    try:
+        out = []
+        for x in json.loads(raw):
+            try: out.append(int(x))
+            except Exception: continue
+        return out
+    except Exception:
+        return []
+
+_STATE_KEYS = ["governor:gate_locked", "governor:interview_required", "governor:interview_passed",
+               "governor:public_enabled", "governor:public_channels_json"]
+_STATE_DEFAULTS = (True, True, False, False)
+
 _QNA_HEUR = re.compile(r"^\s*q\s*[:\-]", re.I)
 _LEINA_HEUR = re.compile(r"(@?leina|<@!?\d+>)", re.I)
 
@@ -90,57 +110,97 @@ class GovernorGate(commands.Cog):
         self.senior_threshold = _env_int("GOVERNOR_SENIOR_THRESHOLD", 80000)
         self.admin_ids = set(_env_ids("ADMIN_USER_IDS"))
         self._patch_done = False
+        # local read-through cache of gate state: {key: value}, refreshed in background
+        self.cache_ttl = float(os.getenv("GOVERNOR_GATE_TTL_SEC", "30"))
+        self.refresh_every = float(os.getenv("GOVERNOR_GATE_REFRESH_SEC", "15"))
+        self._state: Optional[dict] = None
+        self._pubs_set: frozenset = frozenset()
+        self._fetched_at = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+    def cog_unload(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+    # ---------- gate-state cache ----------
+    def _cache_put(self, key: str, value):
+        if self._state is None:
+            self._state = dict(zip(_STATE_KEYS, _STATE_DEFAULTS))
+            self._state["governor:public_channels_json"] = [self.public_ch_default]
+        self._state[key] = value
+        self._pubs_set = frozenset(self._state["governor:public_channels_json"])
+    def invalidate(self):
+        """Force the next lookup to refetch (called by !gate/!go)."""
+        self._fetched_at = 0.0
+    async def refresh(self) -> bool:
+        """Reload gate state from Upstash in one MGET; on failure keep serving the stale copy."""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            vals = await self.us.mget(_STATE_KEYS)
+            if vals is None:
+                if self._state is None:
+                    self._cache_put("governor:gate_locked", _STATE_DEFAULTS[0])  # cold + down: defaults (locked)
+                return False
+            for key, v, d in zip(_STATE_KEYS, vals, _STATE_DEFAULTS):
+                self._cache_put(key, _parse_bool(v, d))
+            pubs = _parse_id_list(vals[4])
+            if not pubs:
+                pubs = [self.public_ch_default]
+                await self.us.set("governor:public_channels_json", json.dumps(pubs))
+            self._cache_put("governor:public_channels_json", pubs)
+            self._fetched_at = time.monotonic()
+            return True
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.debug("[governor] refresh error: %r", e)
+            await asyncio.sleep(self.refresh_every)
+    def _ensure_refresher(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+            except RuntimeError:
+                pass
     async def _kv_bool(self, key: str, default: bool) -> bool:
-        v = await self.us.get(key)
-        if v is None: return default
-        vv = str(v).strip().lower()
-        if vv in ("1","true","on","yes"): return True
-        if vv in ("0","false","off","no",""): return False
-        try: return bool(int(v))
-        except Exception: return default
+        return _parse_bool(await self.us.get(key), default)
     async def _set_bool(self, key: str, val: bool) -> bool:
+        self._cache_put(key, val)  # write-through: local decision applies even if Upstash is down
+        self.invalidate()
         return await self.us.set(key, "1" if val else "0")
     async def _kv_json_list(self, key: str):
-        raw = await self.us.get(key)
-        if not raw:
-            return []
-        try:
-            arr = json.loads(raw)
-            out = []
-            for x in arr:
-                try: out.append(int(x))
-                except Exception: continue
-            return out
-        except Exception:
-            return []
+        return _parse_id_list(await self.us.get(key))
     async def _kv_set_json_list(self, key: str, lst):
         try:
-            s = json.dumps(sorted(list(set(int(x) for x in lst))))
+            vals = sorted(list(set(int(x) for x in lst)))
         except Exception:
-            s = "[]"
-        return await self.us.set(key, s)
-    async def get_state(self):
-        locked   = await self._kv_bool("governor:gate_locked", True)
-        req      = await self._kv_bool("governor:interview_required", True)
-        ok       = await self._kv_bool("governor:interview_passed", False)
-        public   = await self._kv_bool("governor:public_enabled", False)
-        pubs     = await self._kv_json_list("governor:public_channels_json")
-        if not pubs:
-            pubs = [self.public_ch_default]
-            await self._kv_set_json_list("governor:public_channels_json", pubs)
-        return locked, req, ok, public, pubs
+            vals = []
+        if key == "governor:public_channels_json":
+            self._cache_put(key, vals)
+            self.invalidate()
+        return await self.us.set(key, json.dumps(vals))
+    async def get_state(self, fresh: bool = False):
+        self._ensure_refresher()
+        if fresh or self._state is None or time.monotonic() - self._fetched_at > self.cache_ttl:
+            await self.refresh()
+        st = self._state
+        return (st["governor:gate_locked"], st["governor:interview_required"], st["governor:interview_passed"],
+                st["governor:public_enabled"], list(st["governor:public_channels_json"]))
     async def set_public_enabled(self, on: bool): await self._set_bool("governor:public_enabled", on)
     async def set_gate_locked(self, on: bool):    await self._set_bool("governor:gate_locked", on)
     async def set_interview(self, required=None, passed=None):
         if required is not None: await self._set_bool("governor:interview_required", required)
         if passed is not None:   await self._set_bool("governor:interview_passed", passed)
     async def add_public_channel(self, ch_id: int):
-        pubs = await self._kv_json_list("governor:public_channels_json")
+        pubs = (await self.get_state(fresh=True))[4]
         if ch_id not in pubs:
             pubs.append(ch_id)
             await self._kv_set_json_list("governor:public_channels_json", pubs)
     async def remove_public_channel(self, ch_id: int):
-        pubs = await self._kv_json_list("governor:public_channels_json")
+        pubs = (await self.get_state(fresh=True))[4]
         pubs = [x for x in pubs if x != ch_id]
         await self._kv_set_json_list("governor:public_channels_json", pubs)
     async def _get_senior_total(self) -> int:
@@ -165,12 +225,15 @@ class GovernorGate(commands.Cog):
         if _LEINA_HEUR.search(content): return True
         return True
     async def _send_guard(self, channel_id: int, content: str) -> bool:
-        locked, req, ok, public, pubs = await self.get_state()
         if channel_id == self.learn_ch:
             return True
-        if locked:
+        if self._state is None:
+            await self.get_state()  # cold start only; afterwards the background task keeps it warm
+        else:
+            self._ensure_refresher()
+        if self._state["governor:gate_locked"]:
             return False
-        return channel_id in set(pubs)
+        return channel_id in self._pubs_set
     def _install_patch(self):
         if self._patch_done: return
         try:
@@ -206,7 +269,7 @@ class GovernorGate(commands.Cog):
         if not self._is_admin(ctx):
             return await ctx.reply("❌ kamu tidak punya izin.", mention_author=False)
         self._install_patch()
-        locked, req, ok, public, pubs = await self.get_state()
+        locked, req, ok, public, pubs = await self.get_state(fresh=True)
         st = f"🔐 locked={locked} | interview_required={req} | interview_passed={ok} | public={public} | learn_ch={self.learn_ch} | pub_ch={pubs}"
         await ctx.reply(st, mention_author=False)
     @gate_group.command(name="status")
@@ -224,7 +287,7 @@ class GovernorGate(commands.Cog):
     async def gate_unlock(self, ctx):
         if not self._is_admin(ctx):
             return await ctx.reply("❌", mention_author=False)
-        locked, req, ok, public, pubs = await self.get_state()
+        locked, req, ok, public, pubs = await self.get_state(fresh=True)
         if req and not ok:
             return await ctx.reply("⚠️ Interview belum lulus.", mention_author=False)
         senior = await self._get_senior_total()
@@ -270,7 +333,7 @@ class GovernorGate(commands.Cog):
     async def go_list(self, ctx):
         if not self._is_admin(ctx):
             return await ctx.reply("❌", mention_author=False)
-        _,_,_, public, pubs = await self.get_state()
+        _,_,_, public, pubs = await self.get_state(fresh=True)
         await ctx.reply(f"📜 Public channels: {pubs}", mention_author=False)
 async def setup(bot):
     cog = GovernorGate(bot)
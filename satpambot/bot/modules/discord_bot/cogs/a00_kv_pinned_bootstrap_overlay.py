@@ -11,9 +11,25 @@ class KVPinnedBootstrap(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
-        # make sure message exists & pinned
+        # make sure message exists & pinned (also loads the shared in-memory map)
         mid = await self.kv.ensure_ready()
         log.info("[kv-json] ready (msg_id=%s)", mid)
 
+    async def cog_unload(self):
+        try:
+            await self.kv.flush()
+        except Exception as e:
+            log.warning("[kv-json] final flush failed: %r", e)
+
+    @commands.command(name="kvstats")
+    @commands.is_owner()
+    async def kv_stats(self, ctx: commands.Context):
+        r = self.kv.report()
+        await ctx.send(
+            f"kv-json msg={r['msg_id']} degraded={r['degraded']} dirty={r['dirty']} lag={r['lag_ms']:.0f}ms\n"
+            f"sets={r['sets']} coalesced={r['coalesced']} flushes={r['flushes']} failed={r['flush_failures']} "
+            f"cas_conflicts={r['cas_conflicts']} last_lag={r['last_lag_ms']:.0f}ms max_lag={r['max_lag_ms']:.0f}ms"
+        )
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(KVPinnedBootstrap(bot))
@@ -9,9 +9,9 @@ def __kuliah_payload_from_pinned(__bot):
     try:
         from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
         kv = PinnedJSONKV(__bot)
-        m = kv.get_map()
-        # If async, ignore
-        if hasattr(m, "__await__"): 
+        m = kv.peek_map()
+        # shared map not loaded yet (no I/O from sync code), ignore
+        if m is None:
             return None
         def _to_int(v, d=0):
             try: return int(v)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import logging
+from discord.ext import commands
+
+from ..helpers.message_pipeline import get_pipeline
+from ..helpers.mod_actions import get_mod_executor
+
+log = logging.getLogger(__name__)
+
+class MessagePipelineOverlay(commands.Cog):
+    """Installs the shared on_message pipeline early and exposes per-stage timings."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.pipeline = get_pipeline(bot)
+
+    @commands.command(name="pipeline")
+    @commands.is_owner()
+    async def pipeline_stats(self, ctx: commands.Context):
+        p = self.pipeline
+        n = max(1, int(p.stats["messages"]))
+        lines = [f"messages={int(p.stats['messages'])} stopped={int(p.stats['stopped'])} "
+                 f"build_avg={p.stats['build_ms'] / n:.3f}ms"]
+        for name, st in p.report():
+            calls = max(1, int(st["calls"]))
+            lines.append(f"{name}: calls={int(st['calls'])} skip={int(st['skipped'])} stop={int(st['stops'])} "
+                         f"err={int(st['errors'])} avg={st['total_ms'] / calls:.2f}ms max={st['max_ms']:.1f}ms")
+        for kind, m in get_mod_executor().report().items():
+            lines.append(f"mod.{kind}: req={int(m['requested'])} done={int(m['done'])} fail={int(m['failed'])} "
+                         f"dedup={int(m['dedup'])} batches={int(m['batches'])}/{int(m['batched'])} "
+                         f"avg={m['avg_ms']:.1f}ms max={m['max_ms']:.1f}ms")
+        await ctx.reply("```\n" + "\n".join(lines)[:1900] + "\n```", mention_author=False)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MessagePipelineOverlay(bot))
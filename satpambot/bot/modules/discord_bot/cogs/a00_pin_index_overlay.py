@@ -0,0 +1,58 @@
+from __future__ import annotations
+import logging
+import discord
+from discord.ext import commands
+
+from ..helpers.pin_index import get_pin_index
+from ..helpers.modlog import LOG_CHANNEL_ID, LOG_THREAD_ID
+
+log = logging.getLogger(__name__)
+
+class PinIndexOverlay(commands.Cog):
+    """Keeps helpers/pin_index in sync with gateway events; warms known keeper channels on ready."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.index = get_pin_index()
+        self._warmed = False
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self._warmed:
+            return
+        self._warmed = True
+        ids = self.index.warm_channel_ids() | {i for i in (LOG_CHANNEL_ID, LOG_THREAD_ID) if i}
+        n = 0
+        for cid in ids:
+            ch = self.bot.get_channel(cid)
+            if ch is None or not hasattr(ch, "pins"):
+                continue
+            try:
+                await self.index.pins(ch)
+                n += 1
+            except Exception as e:
+                log.debug("[pin_index] warm %s failed: %r", cid, e)
+        log.info("[pin_index] warmed %d channel(s)", n)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_pins_update(self, channel, last_pin):
+        self.index.on_pins_update(channel.id)
+
+    @commands.Cog.listener()
+    async def on_private_channel_pins_update(self, channel, last_pin):
+        self.index.on_pins_update(channel.id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        self.index.on_message_edit(payload.channel_id, payload.message_id,
+                                   message=getattr(payload, "message", None), data=payload.data)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        self.index.on_message_delete(payload.channel_id, (payload.message_id,))
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        self.index.on_message_delete(payload.channel_id, payload.message_ids)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PinIndexOverlay(bot))
@@ -4,15 +4,16 @@ import asyncio, logging, time
 from typing import Optional
 from discord.ext import commands
 from satpambot.config.auto_defaults import cfg_str, cfg_int
+from satpambot.bot.modules.discord_bot.helpers.upstash_pool import UpstashError, get_upstash
 
 # === injected helper: KULIAH/MAGANG payload from pinned ===
 def __kuliah_payload_from_pinned(__bot):
     try:
         from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
         kv = PinnedJSONKV(__bot)
-        m = kv.get_map()
-        if hasattr(m, "__await__"):
-            # async version: caller must build asynchronously; skip here
+        m = kv.peek_map()
+        if m is None:
+            # shared map not loaded yet (no I/O from sync code); skip here
             return None
         def _to_int(v, d=0):
             try: return int(v)
@@ -155,21 +156,13 @@ class UpstashFailoverAndResync(commands.Cog):
         if not self.url or not self.token:
             return False
         try:
-            import aiohttp
-            async with aiohttp.ClientSession() as s:
-                u = f"{self.url}/get/{self.total_key}"
-                async with s.get(u, headers={"Authorization": f"Bearer {self.token}"} ) as r:
-                    if r.status != 200:
-                        return False
-                    _ = await r.json()
-                    return True
+            await get_upstash().call("GET", self.total_key)
+            return True
         except Exception:
             return False
 
     async def _resync_from_pinned(self):
         try:
-            import aiohttp
-            from urllib.parse import quote
             from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
             kv = PinnedJSONKV(self.bot)
             m = await kv.get_map()
@@ -178,15 +171,11 @@ class UpstashFailoverAndResync(commands.Cog):
                 "xp:stage:label", "xp:stage:current", "xp:stage:required", "xp:stage:percent",
                 "learning:status", "learning:status_json",
             ]
-            async with aiohttp.ClientSession() as s:
-                for k in keys:
-                    if k in m and m[k] is not None:
-                        val = str(m[k])
-                        u = f"{self.url}/set/{quote(str(k), safe='')}/{quote(val, safe='')}"
-                        async with s.get(u, headers={"Authorization": f"Bearer {self.token}"} ) as r:
-                            if r.status != 200:
-                                txt = await r.text()
-                                raise RuntimeError(f"HTTP {r.status}: {txt}")
+            cmds = [["SET", k, str(m[k])] for k in keys if k in m and m[k] is not None]
+            # satu /pipeline lewat pool bersama, bukan session + GET per key
+            for r in await get_upstash().pipeline(cmds):
+                if isinstance(r, UpstashError):
+                    raise r
             await kv.set_multi({"upstash:degraded": 0})
             log.info("[upstash-failover] resynced %d keys from pinned JSON to Upstash", len(keys))
         except Exception as e:
@@ -31,7 +31,7 @@ class XPBridgeKVInitEarly(commands.Cog):
     def _pinned_total(self):
         try:
             from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
-            kv = PinnedJSONKV(self.bot).get_map()
+            kv = PinnedJSONKV(self.bot).peek_map() or {}
             n = _to_int(kv.get("xp:bot:senior_total"), -1)
             return n if n>=0 else None
         except Exception: return None
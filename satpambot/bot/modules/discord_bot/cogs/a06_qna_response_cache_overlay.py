@@ -2,7 +2,8 @@
 from discord.ext import commands
 """a06_qna_response_cache_overlay.py (v8.2)"""
 import os, json, hashlib, logging
-import httpx
+
+from ..helpers.upstash_pool import get_upstash
 
 log = logging.getLogger(__name__)
 
@@ -12,20 +13,17 @@ class UpstashClient:
         self.token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
         self.enabled = bool(self.url and self.token)
         self.ttl = int(os.getenv("QNA_CACHE_TTL_SEC", "300"))
-        self._client = httpx.AsyncClient(timeout=8.0)
+        self._pool = get_upstash()
     async def get(self, key):
         if not self.enabled: return None
         try:
-            r = await self._client.get(f"{self.url}/get/{key}", headers={"Authorization": f"Bearer {self.token}"})
-            if r.status_code==200:
-                return r.json().get("result")
+            return await self._pool.call("GET", key, timeout=8.0)
         except Exception as e: log.debug("[qna-cache] get failed: %r", e)
         return None
     async def setex(self, key, ttl, value):
         if not self.enabled: return False
         try:
-            r = await self._client.get(f"{self.url}/setex/{key}/{ttl}/{value}", headers={"Authorization": f"Bearer {self.token}"})
-            return r.status_code==200
+            return await self._pool.call("SETEX", key, int(ttl), value, timeout=8.0) == "OK"
         except Exception as e: log.debug("[qna-cache] setex failed: %r", e)
         return False
 
@@ -1,26 +1,19 @@
 from __future__ import annotations
 
-import logging, json, time
-from pathlib import Path
-from typing import Any, Dict, Optional
+import logging
+from typing import Optional
 
 import discord
 from satpambot.config.local_cfg import cfg, cfg_int
+from satpambot.bot.modules.discord_bot.helpers.route_limiter import priority, PRIO_LOW
+from satpambot.bot.modules.discord_bot.helpers.status_registry import get_registry
 
 log = logging.getLogger(__name__)
 
-STATE_FILE = Path("data/status_coalesce/state.json")
 WINDOW = int(cfg_int("STATUS_EDIT_WINDOW_SEC", 600) or 600)  # default 10 minutes
 raw_titles = cfg("STATUS_COALESCE_TITLES", "") or "Periodic Status"
 TITLES = {t.strip() for t in raw_titles.split(",") if t.strip()}
 
-def _load_state() -> Dict[str, Any]:
-    try: return json.loads(STATE_FILE.read_text(encoding="utf-8"))
-    except Exception: return {}
-def _save_state(st: Dict[str, Any]) -> None:
-    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    STATE_FILE.write_text(json.dumps(st, ensure_ascii=False, indent=2), encoding="utf-8")
-
 def _pick_embed(kwargs) -> Optional[discord.Embed]:
     emb = kwargs.get("embed")
     if isinstance(emb, discord.Embed):
@@ -34,36 +27,21 @@ async def _edit_or_send(original_send, self, *args, **kwargs):
     emb = _pick_embed(kwargs)
     if not emb or not getattr(emb, "title", None) or str(emb.title) not in TITLES:
         return await original_send(self, *args, **kwargs)
-
-    content = kwargs.get("content", None)
+    with priority(PRIO_LOW):  # status embeds never compete with moderation/replies
+        return await _coalesce(original_send, self, emb, *args, **kwargs)
+
+async def _coalesce(original_send, self, emb, *args, **kwargs):
+    if args and "content" not in kwargs:
+        kwargs["content"] = args[0]
+        args = args[1:]
+    if args:  # bentuk pemanggilan tak dikenal -> kirim apa adanya
+        return await original_send(self, *args, **kwargs)
     key = f"{getattr(self, 'id', 0)}::{emb.title}"
-    st = _load_state()
-    slot = st.get(key, {})
-    last_id = int(slot.get("id", 0) or 0)
-    ts = int(slot.get("ts", 0) or 0)
-    now = int(time.time())
-
-    # Try edit if within window
-    if last_id and (now - ts) < WINDOW:
-        try:
-            msg = await self.fetch_message(last_id)  # works for TextChannel/Thread
-            await msg.edit(content=content, embed=emb)
-            slot = {"id": last_id, "ts": now}
-            st[key] = slot
-            _save_state(st)
-            return msg
-        except Exception:
-            pass
-
-    # send new
-    msg = await original_send(self, *args, **kwargs)
-    try:
-        slot = {"id": msg.id, "ts": now}
-        st[key] = slot
-        _save_state(st)
-    except Exception:
-        pass
-    return msg
+    edit_kw = {"content": kwargs.get("content"), "embed": emb}
+    # edit dalam WINDOW (tanpa fetch_message), selebihnya kirim baru; update beruntun digabung
+    return await get_registry().upsert(
+        self, key, max_age=WINDOW,
+        send=lambda ch, **_: original_send(ch, **kwargs), **edit_kw)
 
 def _install():
     try:
@@ -6,6 +6,7 @@ from typing import Optional
 import discord
 
 from satpambot.config.local_cfg import cfg, cfg_int
+from satpambot.bot.modules.discord_bot.helpers import pin_index
 
 log = logging.getLogger(__name__)
 TITLES = {t.strip() for t in str(cfg("STATUS_COALESCE_TITLES","") or "Periodic Status").split(",") if t.strip()}
@@ -26,13 +27,16 @@ async def _enforce_pin(msg: discord.Message, title: str):
         # pin new message
         await asyncio.sleep(PIN_DELAY/1000.0)
         await msg.pin(reason=f"pin:{title}")
+        pin_index.get_pin_index().note_pinned(msg)
         # unpin older status messages in the same channel
-        pins = await msg.channel.pins()
+        pins = await pin_index.pins(msg.channel)
         for p in pins:
             if p.id == msg.id: 
                 continue
             if _find_title(p) == title:
-                try: await p.unpin(reason="rotate status pin")
+                try:
+                    await p.unpin(reason="rotate status pin")
+                    pin_index.get_pin_index().note_unpinned(p)
                 except Exception: pass
         log.info("[status_pin] ensured pin for '%s' in #%s", title, getattr(msg.channel, 'name', '?'))
     except Exception as e:
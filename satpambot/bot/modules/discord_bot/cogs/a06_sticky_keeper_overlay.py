@@ -12,26 +12,16 @@ import asyncio
 import logging
 import inspect
 
-from discord import NotFound
 from discord import Embed
 
 from satpambot.bot.modules.discord_bot.helpers import log_utils as _log_utils
 from satpambot.bot.utils import embed_scribe as _scribe
 from satpambot.bot.modules.discord_bot.helpers import sticky_keeper as _keeper
+from satpambot.bot.modules.discord_bot.helpers.status_registry import get_registry
+from satpambot.bot.modules.discord_bot.helpers.pin_index import get_pin_index
 
 _logger = logging.getLogger(__name__)
 
-def _embed_hash(embed: Embed) -> str:
-    try:
-        import hashlib, json
-        d = embed.to_dict()
-        # normalize dynamic fields that change on every push if any
-        d.get('timestamp') and d.__setitem__('timestamp', None)
-        raw = json.dumps(d, sort_keys=True, separators=(',',':')).encode('utf-8')
-        return hashlib.sha1(raw).hexdigest()
-    except Exception:
-        return None
-
 async def _sticky_upsert_bridge(channel, *, title: str, embed: Embed,
                                 pin: bool = True, edit_only: bool = False,
                                 marker: str = None):
@@ -48,49 +38,31 @@ async def _sticky_upsert_bridge(channel, *, title: str, embed: Embed,
     except Exception:
         pass
 
-    # fast path: id-index
-    keeper = await _keeper.fetch_indexed(channel, marker)
-    if keeper is None:
-        # slow path: search pins/history
-        keeper = await _keeper.find_existing(channel, title=title, marker=marker)
+    # id-index (status_registry) dulu; scan pins/history hanya kalau belum pernah ter-index
+    reg = get_registry()
+    key = _keeper.key(channel, marker)
+    if reg.message_id(key) is None:
+        found = await _keeper.find_existing(channel, title=title, marker=marker)
+        if found is not None:
+            reg.remember(key, found)
 
-    if keeper is not None:
-        try:
-            # skip identical payloads
-            new_h = _embed_hash(embed)
-            old_h = _keeper.get_cached_hash(channel, marker)
-            if new_h and old_h and new_h == old_h:
-                return keeper
-            await keeper.edit(embed=embed)
-            await _keeper.index(channel, marker, keeper)
-            _keeper.set_cached_hash(channel, marker, new_h)
-            if pin:
-                try:
-                    await keeper.pin(reason="sticky")
-                except Exception:
-                    pass
-            return keeper
-        except NotFound:
-            keeper = None
-        except Exception:
-            _logger.exception("[sticky] edit failed; will create new if allowed")
+    async def _on_new(msg):
+        if pin:
+            try:
+                await msg.pin(reason="sticky")
+                get_pin_index().note_pinned(msg)
+            except Exception:
+                pass
+        # cleanup dupes best-effort (older bot messages with same marker)
+        asyncio.create_task(_keeper.gc_dupes(channel, title=title, marker=marker, keep=msg.id))
 
-    if edit_only:
+    # payload identik di-skip, update beruntun digabung, edit tanpa fetch_message
+    try:
+        return await reg.upsert(channel, key, edit_only=edit_only, on_new=_on_new, embed=embed)
+    except Exception:
+        _logger.exception("[sticky] upsert failed")
         return None
 
-    # create new
-    msg = await channel.send(embed=embed)
-    await _keeper.index(channel, marker, msg)
-    _keeper.set_cached_hash(channel, marker, _embed_hash(embed))
-    if pin:
-        try:
-            await msg.pin(reason="sticky")
-        except Exception:
-            pass
-    # cleanup dupes best-effort (older bot messages with same marker)
-    asyncio.create_task(_keeper.gc_dupes(channel, title=title, marker=marker, keep=msg.id))
-    return msg
-
 # ---- Monkey patches -------------------------------------------------------
 
 _original_scribe_upsert = _scribe.upsert
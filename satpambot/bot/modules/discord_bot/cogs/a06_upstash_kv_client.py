@@ -3,10 +3,7 @@ import json
 import asyncio
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-try:
-    import httpx
-except ImportError:  # pragma: no cover
-    httpx = None  # type: ignore
+from ..helpers.upstash_pool import UpstashError, UpstashPool, UpstashUnavailable, get_upstash
 
 
 class UpstashClient:
@@ -15,58 +12,34 @@ class UpstashClient:
     - Uses /pipeline for safe writes.
     - GET/SET helpers for single keys.
     - Does NOT create keys unintentionally: you control that in callers.
+    - Transport: pool Upstash bersama (keep-alive); url/token eksplisit -> pool sendiri.
     """
 
     def __init__(self, url: Optional[str] = None, token: Optional[str] = None, timeout: float = 8.0):
-        self.url = (url or os.getenv("UPSTASH_REDIS_REST_URL", "")).rstrip("/")
-        self.token = token or os.getenv("UPSTASH_REDIS_REST_TOKEN", "")
+        self._pool = UpstashPool(url, token) if (url or token) else get_upstash()
+        self.url = self._pool.url
+        self.token = self._pool.token
         self.timeout = timeout
 
     def ready(self) -> bool:
-        return bool(self.url and self.token and httpx is not None)
-
-    async def _client(self) -> "httpx.AsyncClient":
-        timeout = httpx.Timeout(self.timeout)
-        headers = {"Authorization": f"Bearer {self.token}"}
-        return httpx.AsyncClient(timeout=timeout, headers=headers)
+        return self._pool.enabled
 
     async def get_raw(self, key: str) -> Optional[str]:
         if not self.ready():
             return None
-        async with await self._client() as ac:
-            try:
-                # Safe GET using path endpoint to avoid query encoding issues
-                r = await ac.get(f"{self.url}/get/{httpx.utils.quote(key, safe='')}")
-                r.raise_for_status()
-                data = r.json()
-                res = data.get("result")
-                return res
-            except Exception:
-                return None
+        return await self._pool.try_call("GET", key, timeout=self.timeout)
 
     async def set_raw(self, key: str, value: str) -> bool:
-        if not self.ready():
-            return False
-        async with await self._client() as ac:
-            try:
-                # Use pipeline for set to be consistent
-                payload = [["SET", key, value]]
-                r = await ac.post(f"{self.url}/pipeline", json=payload)
-                r.raise_for_status()
-                return True
-            except Exception:
-                return False
+        return await self.pipeline([["SET", key, value]])
 
     async def pipeline(self, commands: List[List[str]]) -> bool:
         if not self.ready():
             return False
-        async with await self._client() as ac:
-            try:
-                r = await ac.post(f"{self.url}/pipeline", json=commands)
-                r.raise_for_status()
-                return True
-            except Exception:
-                return False
+        try:
+            res = await self._pool.pipeline(commands, timeout=self.timeout)
+        except (UpstashError, UpstashUnavailable):
+            return False
+        return not any(isinstance(r, UpstashError) for r in res)
 
 
 def json_loads_maybe_twice(s: Optional[str]) -> Optional[Any]:
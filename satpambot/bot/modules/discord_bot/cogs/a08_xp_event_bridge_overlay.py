@@ -26,7 +26,7 @@ class XPEventBridgeOverlay(commands.Cog):
         if n is None:
             try:
                 from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
-                pin = PinnedJSONKV(self.bot).get_map()
+                pin = await PinnedJSONKV(self.bot).get_map()
                 n = _to_int(pin.get("xp:bot:senior_total"), 0)
             except Exception:
                 n = 0
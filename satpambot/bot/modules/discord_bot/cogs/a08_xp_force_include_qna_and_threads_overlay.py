@@ -26,6 +26,8 @@ import os
 import time
 from typing import Optional, Dict, Any, Type, cast, Protocol, TypedDict, runtime_checkable, Final
 
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_XP
+
 log = logging.getLogger(__name__)
 
 class UserData(TypedDict):
@@ -62,6 +64,7 @@ class XPForceIncludeOverlay(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._last: dict[int, float] = {}  # author_id -> ts
+        get_pipeline(bot).register("xp_force_include", self.on_message_ctx, order=ORDER_XP, scope="any")
 
     def _allowed(self, message: Message) -> bool:
         # Always include threads
@@ -82,11 +85,12 @@ class XPForceIncludeOverlay(commands.Cog):
             return True
         return False
 
-    @commands.Cog.listener("on_message")
-    async def on_message(self, message: Message) -> None:
+    def cog_unload(self) -> None:
+        get_pipeline(self.bot).unregister("xp_force_include")
+
+    async def on_message_ctx(self, ctx: MessageContext) -> None:
+        message = ctx.message
         try:
-            if message.author.bot:
-                return
             if not self._allowed(message):
                 return
             if not self._cool(message.author.id):
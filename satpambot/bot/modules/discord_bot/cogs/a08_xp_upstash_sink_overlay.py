@@ -2,38 +2,21 @@ from discord.ext import commands
 
 import os, json, logging
 
+from ..helpers.upstash_pool import get_upstash
+
 log = logging.getLogger(__name__)
 
-async def _get_json(url, token, key):
-    if not (url and token): return None
+async def _get_json(key):
+    raw = await get_upstash().get(key)
+    if not raw:
+        return None
     try:
-        import aiohttp
-        async with aiohttp.ClientSession() as sess:
-            r = await sess.get(f"{url}/get/{key}", headers={"Authorization": f"Bearer {token}"}, timeout=8)
-            if r.status == 200:
-                j = await r.json()
-                raw = (j or {}).get("result")
-                if not raw:
-                    return None
-                try:
-                    return json.loads(raw)
-                except Exception:
-                    return None
-    except Exception as e:
-        log.debug("[xp-upstash-sink] get_json fail: %r", e)
-    return None
+        return json.loads(raw)
+    except Exception:
+        return None
 
-async def _set_json(url, token, key, obj):
-    if not (url and token): return False
-    try:
-        import aiohttp
-        data = json.dumps(obj, ensure_ascii=False)
-        async with aiohttp.ClientSession() as sess:
-            r = await sess.post(f"{url}/set/{key}/{data}", headers={"Authorization": f"Bearer {token}"}, timeout=8)
-            return r.status == 200
-    except Exception as e:
-        log.debug("[xp-upstash-sink] set_json fail: %r", e)
-        return False
+async def _set_json(key, obj):
+    return await get_upstash().set(key, json.dumps(obj, ensure_ascii=False))
 
 class XpUpstashSinkOverlay(commands.Cog):
     """
@@ -43,10 +26,8 @@ class XpUpstashSinkOverlay(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
-        self.url = (os.getenv("UPSTASH_REDIS_REST_URL","") or "").rstrip("/") or None
-        self.token = os.getenv("UPSTASH_REDIS_REST_TOKEN") or None
         self.key = os.getenv("UPSTASH_XP_STORE_KEY","xp:bot:users_total")
-        log.info("[xp-upstash-sink] ready key=%s url=%s", self.key, "set" if self.url else "none")
+        log.info("[xp-upstash-sink] ready key=%s url=%s", self.key, "set" if get_upstash().enabled else "none")
 
     async def _apply_award(self, uid, amt, why=""):
         try:
@@ -54,13 +35,13 @@ class XpUpstashSinkOverlay(commands.Cog):
             amt = int(amt or 0)
         except Exception:
             return
-        if not (self.url and self.token):
+        if not get_upstash().enabled:
             return
-        data = await _get_json(self.url, self.token, self.key) or {}
+        data = await _get_json(self.key) or {}
         users = data.get("users") or {}
         users[uid] = int(users.get(uid, 0)) + amt
         data["users"] = users
-        ok = await _set_json(self.url, self.token, self.key, data)
+        ok = await _set_json(self.key, data)
         if not ok:
             log.debug("[xp-upstash-sink] write failed")
 
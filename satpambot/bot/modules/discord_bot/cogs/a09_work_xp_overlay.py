@@ -3,44 +3,23 @@ from typing import Optional
 import discord
 from discord.ext import commands
 
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_XP
+from ..helpers.upstash_pool import get_upstash
+
 class _Upstash:
-    def __init__(self):
-        self.base = os.getenv("UPSTASH_REDIS_REST_URL","").rstrip("/")
-        self.token = os.getenv("UPSTASH_REDIS_REST_TOKEN","")
-        self.headers = {"Authorization": f"Bearer {self.token}"} if self.token else None
-        self.enabled = bool(self.base and self.token)
+    """Tipis di atas pool Upstash bersama (keep-alive), bukan AsyncClient baru per call."""
+    @property
+    def enabled(self) -> bool:
+        return get_upstash().enabled
 
     async def _get(self, key: str) -> Optional[str]:
-        if not self.enabled: return None
-        import httpx
-        try:
-            async with httpx.AsyncClient(timeout=10) as cx:
-                r = await cx.get(f"{self.base}/get/{key}", headers=self.headers)
-                return r.json().get("result")
-        except Exception:
-            return None
-
-    async def _post(self, path: str) -> Optional[str]:
-        if not self.enabled: return None
-        import httpx
-        try:
-            async with httpx.AsyncClient(timeout=10) as cx:
-                r = await cx.post(f"{self.base}/{path}", headers=self.headers)
-                try:
-                    return r.json().get("result")
-                except Exception:
-                    return r.text
-        except Exception:
-            return None
+        return await get_upstash().get(key)
 
     async def incr(self, key: str, delta: int) -> Optional[str]:
-        return await self._post(f"incr/{key}/{int(delta)}")
+        return await get_upstash().try_call("INCRBY", key, int(delta))
 
     async def set_json(self, key: str, obj) -> Optional[str]:
-        import urllib.parse
-        payload = json.dumps(obj, ensure_ascii=False)
-        enc = urllib.parse.quote(payload, safe="")
-        return await self._post(f"set/{key}/{enc}")
+        return await get_upstash().try_call("SET", key, json.dumps(obj, ensure_ascii=False))
 
 class WorkXP(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -51,6 +30,8 @@ class WorkXP(commands.Cog):
         self.levels_path = os.getenv("WORK_XP_LEVELS_PATH","data/config/xp_work_ladder.json")
         self.award_per_answer = int(os.getenv("WORK_XP_AWARD_PER_QNA_ANSWER","1000"))
         self._up = _Upstash()
+        if self.enable:
+            get_pipeline(bot).register("work_xp", self.on_message_ctx, order=ORDER_XP, bots="only", scope="any")
 
     async def _ensure_ladder(self):
         try:
@@ -64,10 +45,12 @@ class WorkXP(commands.Cog):
         if not self.enable or not self._up.enabled: return
         await self._up.incr(self.key, max(0, int(delta)))
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: discord.Message):
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister("work_xp")
+
+    async def on_message_ctx(self, ctx: MessageContext):
         if not self.enable: return
-        if not msg.author.bot: return
+        msg = ctx.message
         for emb in msg.embeds or []:
             if (emb.title or "").strip().lower() == "answer by leina":
                 await self._ensure_ladder()
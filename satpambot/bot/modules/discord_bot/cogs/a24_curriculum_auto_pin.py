@@ -3,6 +3,7 @@ import os, logging, asyncio
 from typing import Optional, Tuple
 import discord
 from discord.ext import commands
+from ..helpers import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -58,7 +59,7 @@ class CurriculumAutoPin(commands.Cog):
 
             # Try find by markers in pinned messages
             try:
-                pins = await ch.pins()  # type: ignore
+                pins = await pin_index.pins(ch)  # type: ignore
                 for m in pins:
                     if self._is_candidate(m):
                         await self._pin(m)
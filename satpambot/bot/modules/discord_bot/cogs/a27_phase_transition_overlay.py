@@ -9,9 +9,9 @@ def __kuliah_payload_from_pinned(__bot):
     try:
         from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
         kv = PinnedJSONKV(__bot)
-        m = kv.get_map()
-        if hasattr(m, "__await__"):
-            # async version: caller must build asynchronously; skip here
+        m = kv.peek_map()
+        if m is None:
+            # shared map not loaded yet (no I/O from sync code); skip here
             return None
         def _to_int(v, d=0):
             try: return int(v)
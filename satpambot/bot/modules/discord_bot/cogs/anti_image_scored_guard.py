@@ -10,6 +10,10 @@ from typing import Optional, Dict
 import discord
 
 from ..helpers.score_utils import extract_text_ocr, extract_urls, is_bad_url, simple_bytes_hash, contains_phish_keywords
+from ..helpers.hash_pool import get_hash_service
+from ..helpers.attachment_cache import AttachmentEntry, get_attachment_cache
+from ..helpers.attachment_fetch import FetchRejected, IMAGE_MAX_BYTES, read_image_bounded
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_GUARD
 
 try:
     from PIL import Image
@@ -36,6 +40,23 @@ DEFAULT_CFG = {
     "protected_thread_names": ["imagephising","whitelist","blacklist","ban log","ban-log","banlog"]
 }
 
+CURSOR_FILE = DATA_DIR / "backfill_cursor.json"  # {thread_id: last_seen_message_id}
+WL_BATCH_MSGS = 100  # commit whitelist + cursor tiap N pesan backfill
+
+def load_cursors() -> Dict[str, int]:
+    try:
+        return {str(k): int(v) for k, v in json.loads(CURSOR_FILE.read_text(encoding="utf-8")).items()}
+    except Exception:
+        return {}
+
+def save_cursors(d: Dict[str, int]) -> None:
+    try:
+        tmp = CURSOR_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(d), encoding="utf-8")
+        tmp.replace(CURSOR_FILE)
+    except Exception:
+        pass
+
 def load_wl() -> dict:
     try:
         return json.loads(WL_FILE.read_text(encoding="utf-8"))
@@ -56,9 +77,16 @@ class AntiImageScoredGuard(commands.Cog):
         self.bot = bot
         self.cfg = DEFAULT_CFG.copy()
         self.wl = load_wl()
+        self._wl_images: set[str] = set(self.wl.get("images", []))
+        self._cursors: Dict[str, int] = load_cursors()
         self._recent_msgs: Dict[int, list[float]] = {}
         self._fp_thread_id_by_guild: Dict[int, int] = {}
         self._booted = False  # ensure one-time bootstrap
+        get_pipeline(bot).register("anti_image_scored_guard", self.on_message_ctx, order=ORDER_GUARD + 5,
+                                   threads=False, gated=True, needs=("images",), detach=True)
+
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister("anti_image_scored_guard")
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -88,24 +116,54 @@ class AntiImageScoredGuard(commands.Cog):
         except Exception:
             pass
 
+    def _commit_wl(self) -> None:
+        """Write the in-memory whitelist set once (batch), not once per image."""
+        self.wl["images"] = sorted(self._wl_images)
+        save_wl(self.wl)
+
     async def _scan_thread_to_whitelist(self, thread: discord.Thread):
+        """Incremental backfill: only messages after the persisted cursor for this thread.
+        Cursor hanya maju sampai pesan terakhir yang sukses berurutan; pesan dengan download gagal
+        (error transient, termasuk FetchFailed 429/5xx) menahan cursor supaya di-scan ulang pada boot
+        berikutnya. FetchRejected (bukan gambar, 404 dsb.) permanen, jadi tidak menahan cursor.
+        """
         limit = int(self.cfg["read_backfill_limit"])
+        key = str(thread.id)
+        cursor = self._cursors.get(key)
+        after = discord.Object(id=cursor) if cursor else None
         added = 0
+        seen = 0
+        last_id = cursor or 0
+        held = False
         try:
-            async for msg in thread.history(limit=limit, oldest_first=True):
+            async for msg in thread.history(limit=limit, after=after, oldest_first=True):
+                ok = True
                 for a in getattr(msg, "attachments", []) or []:
                     if (a.content_type or "").startswith("image/"):
                         try:
-                            b = await a.read()
+                            b = await read_image_bounded(a, IMAGE_MAX_BYTES)
+                        except FetchRejected:
+                            continue
                         except Exception:
+                            ok = False
                             continue
                         sha1 = simple_bytes_hash(b)
-                        d = self.wl
-                        imgs = set(d.get("images", []))
-                        if sha1 not in imgs:
-                            imgs.add(sha1); d["images"] = sorted(imgs); save_wl(d); self.wl = d; added += 1
+                        if sha1 not in self._wl_images:
+                            self._wl_images.add(sha1); added += 1
+                held = held or not ok
+                if not held:
+                    last_id = max(last_id, int(msg.id))
+                seen += 1
+                if seen % WL_BATCH_MSGS == 0:
+                    if added:
+                        self._commit_wl()
+                    self._cursors[key] = last_id; save_cursors(self._cursors)
         except Exception:
             pass
+        if added:
+            self._commit_wl()
+        if last_id and last_id != cursor:
+            self._cursors[key] = last_id; save_cursors(self._cursors)
         # No posting to this thread.
 
     async def _ensure_fp_thread(self, guild: discord.Guild):
@@ -144,15 +202,28 @@ class AntiImageScoredGuard(commands.Cog):
         names = {r.name for r in getattr(member, "roles", [])}
         return any(s in names for s in self.cfg["skip_roles"])
 
-    def _signals(self, b: bytes, message: discord.Message) -> Dict[str, bool]:
+    async def _ocr_text(self, ent: AttachmentEntry) -> str:
+        # OCR sekali per konten (cache bareng ocr_guard), decode di process pool
+        if ent.ocr_text is None:
+            try:
+                ent.ocr_text = await get_hash_service().ocr_text(ent.data or b"")
+            except Exception:
+                return ""
+        return ent.ocr_text
+
+    async def _signals(self, ent: AttachmentEntry, message: discord.Message) -> Dict[str, bool]:
         sig = {"kw": False, "url": False, "burst": False, "young": False, "wl_img": False, "wl_chan_protected": False}
-        sha1 = simple_bytes_hash(b)
-        if sha1 in set(self.wl.get("images", [])):
+        if ent.sha1 in self._wl_images:
             sig["wl_img"] = True
 
-        txt = extract_text_ocr(b)
-        if txt and contains_phish_keywords(txt):
-            sig["kw"] = True
+        # sinyal konten (kw) di-cache per gambar: repost tidak OCR / scan keyword ulang
+        prev = ent.verdicts.get("anti_image")
+        if prev is not None:
+            sig["kw"] = bool(prev.get("kw"))
+        else:
+            txt = await self._ocr_text(ent)
+            if txt and contains_phish_keywords(txt):
+                sig["kw"] = True
 
         urls = extract_urls(message.content or "")
         if urls and any(is_bad_url(u) for u in urls):
@@ -200,56 +271,21 @@ class AntiImageScoredGuard(commands.Cog):
                 except Exception: pass
                 return
 
-    @commands.Cog.listener("on_message")
-    async def on_message(self, message: discord.Message):
-        # --- PublicChatGate pre-send guard (auto-injected) ---
-        gate = None
-        try:
-            gate = self.bot.get_cog("PublicChatGate")
-        except Exception:
-            pass
-        try:
-            if message.guild and gate and hasattr(gate, "should_allow_public_reply") and not gate.should_allow_public_reply(message):
-                return
-        except Exception:
-            pass
-        # --- end guard ---
-
-        # THREAD/FORUM EXEMPTION — auto-inserted
-        ch = getattr(message, "channel", None)
-        if ch is not None:
-            try:
-                import discord
-                # Exempt true Thread objects
-                if isinstance(ch, getattr(discord, "Thread", tuple())):
-                    return
-                # Exempt thread-like channel types (public/private/news threads)
-                ctype = getattr(ch, "type", None)
-                if ctype in {
-                    getattr(discord.ChannelType, "public_thread", None),
-                    getattr(discord.ChannelType, "private_thread", None),
-                    getattr(discord.ChannelType, "news_thread", None),
-                }:
-                    return
-            except Exception:
-                # If discord import/type checks fail, do not block normal flow
-                pass
-        if message.author.bot or not message.attachments:
-            return
+    async def on_message_ctx(self, ctx: MessageContext):
+        message = ctx.message
         if not isinstance(message.channel, (discord.TextChannel, discord.Thread)):
             return
         if isinstance(message.author, discord.Member) and self._skipped_role(message.author):
             return
 
-        img_attachments = [a for a in message.attachments if (a.content_type or "").startswith("image/")]
-        if not img_attachments: return
+        img_attachments = ctx.images
 
-        try:
-            b = await img_attachments[0].read()
-        except Exception:
+        ent = await get_attachment_cache().fetch(img_attachments[0], max_bytes=IMAGE_MAX_BYTES)
+        if ent is None:
             return
+        b = ent.data or b""
 
-        sig = self._signals(b, message)
+        sig = await self._signals(ent, message)
 
         desc = f"signals: `kw={int(sig['kw'])}, url={int(sig['url'])}, burst={int(sig['burst'])}, young={int(sig['young'])}`"
         if sig["wl_chan_protected"]:
@@ -269,6 +305,8 @@ class AntiImageScoredGuard(commands.Cog):
         high_conf = (sig["url"] and sig["kw"]) or (sig["url"] and (sig["burst"] or sig["young"])) or (sig["kw"] and (sig["burst"] or sig["young"]))
         medium = (sig["url"] or sig["kw"]) and not high_conf
 
+        if ent.ocr_text is not None:  # OCR gagal -> jangan cache kw=False
+            ent.verdicts["anti_image"] = {"kw": sig["kw"], "action": "ban" if high_conf else "quarantine" if medium else "log"}
         if high_conf:
             await self._do_ban(message, e, self._make_view(b, message))
         elif medium:
@@ -289,7 +327,8 @@ class AntiImageScoredGuard(commands.Cog):
             async def approve(self, it: discord.Interaction, _):
                 if not await self._allowed(it):
                     await it.response.send_message("Moderator only.", ephemeral=True); return
-                d = outer.wl; arr = set(d.get("images", [])); arr.add(sha1); d["images"] = sorted(arr); save_wl(d); outer.wl = d
+                if sha1 not in outer._wl_images:
+                    outer._wl_images.add(sha1); outer._commit_wl()
                 await it.response.send_message("Ditambahkan ke whitelist.", ephemeral=True)
             @discord.ui.button(label="Ban + delete 7d", style=discord.ButtonStyle.danger)
             async def ban(self, it: discord.Interaction, _):
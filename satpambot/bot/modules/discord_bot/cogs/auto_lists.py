@@ -31,7 +31,7 @@ from typing import List, Set, Optional, Dict
 
 import discord
 
-from ..helpers import lists_loader
+from ..helpers import lists_loader, list_snapshot
 from ..helpers import memory_wb
 
 try:
@@ -109,17 +109,22 @@ async def read_domains_from_attachments(attachments: List[discord.Attachment]) -
     return out
 
 def _write_local_all_formats(wl: Set[str], bl: Set[str]) -> None:
+    # JSON (list + legacy) sudah ditulis lists_loader.save_lists -> di sini cukup TXT mirror,
+    # dan hanya kalau isinya berubah
     ensure_data_dir()
     wl_sorted = sorted(wl); bl_sorted = sorted(bl)
-    # JSON list
-    WL_FILE.write_text(json.dumps(wl_sorted, ensure_ascii=False, indent=2), encoding="utf-8")
-    BL_FILE.write_text(json.dumps(bl_sorted, ensure_ascii=False, indent=2), encoding="utf-8")
-    # JSON legacy
-    URL_WL_JSON.write_text(json.dumps({"allow": wl_sorted}, ensure_ascii=False, indent=2), encoding="utf-8")
-    URL_BL_JSON.write_text(json.dumps({"domains": bl_sorted}, ensure_ascii=False, indent=2), encoding="utf-8")
-    # TXT mirror
-    WL_TXT.write_text("\\n".join(wl_sorted) + ("\\n" if wl_sorted else ""), encoding="utf-8")
-    BL_TXT.write_text("\\n".join(bl_sorted) + ("\\n" if bl_sorted else ""), encoding="utf-8")
+    for path, items in ((WL_TXT, wl_sorted), (BL_TXT, bl_sorted)):
+        text = "\\n".join(items) + ("\\n" if items else "")
+        try:
+            if path.exists() and path.read_text(encoding="utf-8") == text:
+                continue
+        except Exception:
+            pass
+        path.write_text(text, encoding="utf-8")
+
+def _persist(wl: Set[str], bl: Set[str]) -> None:
+    _ = lists_loader.save_lists(wl, set(), bl, set())
+    _write_local_all_formats(wl, bl)
 
 def _github_sync(wl: Set[str], bl: Set[str]) -> None:
     if not (AUTO_GH_SYNC and github_sync is not None):
@@ -146,16 +151,18 @@ class AutoLists(commands.Cog):
         self._bl: Set[str] = set()
         self._ready = asyncio.Event()
 
+    def _apply_lists(self, lists: Dict[str, Set[str]]):
+        """Called by ListsSync when the list snapshot changes."""
+        self._wl = set(lists.get("wl_domains", set()))
+        self._bl = set(lists.get("bl_domains", set()))
+
     @commands.Cog.listener()
     async def on_ready(self):
-        data = lists_loader.load_whitelist_blacklist()
-        self._wl = set(data.get("wl_domains", set()))
-        self._bl = set(data.get("bl_domains", set()))
+        self._apply_lists(list_snapshot.current().as_lists())
         self._ready.set()
         # Pastikan file lokal ada & update thread memory
         try:
-            _ = lists_loader.save_lists(self._wl, set(), self._bl, set())
-            _write_local_all_formats(self._wl, self._bl)
+            await asyncio.to_thread(_persist, set(self._wl), set(self._bl))
             await memory_wb.update_memory_wb(self.bot, self._wl, self._bl)
         except Exception:
             pass
@@ -233,10 +240,8 @@ class AutoLists(commands.Cog):
 
         if changed:
             try:
-                # Simpan untuk kompatibilitas modul lain
-                _ = lists_loader.save_lists(self._wl, set(), self._bl, set())
-                # Tulis semua format lokal
-                _write_local_all_formats(self._wl, self._bl)
+                # Simpan (JSON via lists_loader -> snapshot baru) + TXT mirror, off the loop
+                await asyncio.to_thread(_persist, set(self._wl), set(self._bl))
                 # Opsional commit ke GitHub
                 _github_sync(self._wl, self._bl)
                 # Update thread memory
@@ -10,6 +10,7 @@ from collections import defaultdict
 import discord
 
 from discord import app_commands
+from ..helpers import pin_index
 
 CFG_PATH = Path("config") / "auto_role_anywhere.json"
 STATE_PATH = Path("data") / "autorole_state.json"
@@ -153,7 +154,7 @@ class AutoRoleAnywhere(commands.Cog):
         # 2a) cek pinned dulu
         deploy_epoch = None
         try:
-            pins = await ch.pins()
+            pins = await pin_index.pins(ch)
             for m in pins:
                 if m.author.bot and m.content.startswith(MARKER_PREFIX):
                     try:
@@ -91,7 +91,7 @@ class Automaton(commands.Cog):
     @tasks.loop(minutes=30.0)
     async def pulse(self):
         if not self._enabled: return
-        automaton_store.state_set("last_pulse", "ok")
+        await automaton_store.astate_set("last_pulse", "ok")
         # ensure learning cogs are present
         for need in ("ChatNeuroLite", "StickerFeedback", "StickerTextFeedback", "LearningProgress"):
             if need not in self.bot.cogs:
@@ -106,7 +106,7 @@ class Automaton(commands.Cog):
 
     async def _propose(self, kind: str, module: str, reason: str, critical: Optional[bool]=None):
         crit = _is_critical(module) if critical is None else critical
-        tid = automaton_store.create_ticket(kind, module, reason, crit)
+        tid = await automaton_store.acreate_ticket(kind, module, reason, crit)
         emb = discord.Embed(title=f"Proposal: {kind} → {module}", description=reason, color=0x37B37E if not crit else 0xD1453B)
         emb.add_field(name="Ticket", value=f"#{tid} (critical={crit})", inline=False)
         emb.set_footer(text="Balas YA / TIDAK atau !auto approve/deny <id>")
@@ -115,7 +115,7 @@ class Automaton(commands.Cog):
             await self._apply_ticket(tid, auto=True)
 
     async def _apply_ticket(self, ticket_id: int, auto: bool=False):
-        t = automaton_store.get_ticket(ticket_id)
+        t = await automaton_store.aget_ticket(ticket_id)
         if not t: return
         kind = t["kind"]; module = t["module"]
         ok = False
@@ -134,7 +134,7 @@ class Automaton(commands.Cog):
                 ok = await self._reload_ext(module)
         except Exception:
             ok = False
-        automaton_store.update_ticket_status(ticket_id, "applied" if ok else "failed")
+        await automaton_store.aupdate_ticket_status(ticket_id, "applied" if ok else "failed")
         await self._dm_owner(f"Ticket #{ticket_id} ({kind} {module}) status: {'APPLIED ✅' if ok else 'FAILED ❌'}")
 
     async def _enable_cog(self, cog_name: str) -> bool:
@@ -174,7 +174,7 @@ class Automaton(commands.Cog):
     @cmd_auto.command(name="status")
     async def cmd_auto_status(self, ctx: commands.Context):
         if ctx.author.id != _owner_id(): return
-        pend = automaton_store.list_pending(10)
+        pend = await automaton_store.alist_pending(10)
         lines = [f"#{p['id']} {p['kind']} {p['module']} critical={p['critical']}" for p in pend] or ["(no pending)"]
         await ctx.reply("Pending:\n" + "\n".join(lines), mention_author=False)
 
@@ -186,7 +186,7 @@ class Automaton(commands.Cog):
     @cmd_auto.command(name="deny")
     async def cmd_auto_deny(self, ctx: commands.Context, ticket_id: int):
         if ctx.author.id != _owner_id(): return
-        automaton_store.update_ticket_status(ticket_id, "denied")
+        await automaton_store.aupdate_ticket_status(ticket_id, "denied")
         await ctx.reply(f"Ticket #{ticket_id} DENIED.", mention_author=False)
 
     @commands.Cog.listener()
@@ -196,15 +196,15 @@ class Automaton(commands.Cog):
         if msg.author.id != _owner_id(): return
         text = (msg.content or "").strip().lower()
         if text in YES:
-            p = automaton_store.latest_pending()
+            p = await automaton_store.alatest_pending()
             if not p:
                 await msg.reply("Tidak ada tiket pending."); return
             await self._apply_ticket(p["id"]); return
         if text in NO:
-            p = automaton_store.latest_pending()
+            p = await automaton_store.alatest_pending()
             if not p:
                 await msg.reply("Tidak ada tiket pending."); return
-            automaton_store.update_ticket_status(p["id"], "denied")
+            await automaton_store.aupdate_ticket_status(p["id"], "denied")
             await msg.reply(f"Ticket #{p['id']} DENIED."); return
 async def setup(bot: commands.Bot):
     await bot.add_cog(Automaton(bot))
\ No newline at end of file
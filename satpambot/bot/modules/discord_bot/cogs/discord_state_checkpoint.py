@@ -8,6 +8,8 @@ import discord
 from discord.ext import tasks
 
 from ..helpers import discord_state_io as dsio
+from ..helpers import pin_index
+from ..helpers.memory_db import get_memory_db, register_schema
 
 log = logging.getLogger(__name__)
 
@@ -25,33 +27,24 @@ def _db_path() -> str:
     return os.getenv("NEUROLITE_MEMORY_DB",
         os.path.join(os.path.dirname(__file__), "..","..","..","..","data","memory.sqlite3"))
 
-def _open_db():
-    path = _db_path()
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        try: os.makedirs(d, exist_ok=True)
-        except Exception: pass
-    con = sqlite3.connect(path)
-    con.row_factory = sqlite3.Row
-    return con
-
-def _ensure_meta(con: sqlite3.Connection):
-    con.execute("""CREATE TABLE IF NOT EXISTS learning_progress_meta(
+register_schema("learning_progress_meta", [
+    """CREATE TABLE IF NOT EXISTS learning_progress_meta(
         key TEXT PRIMARY KEY,
         value TEXT
-    )""")
-    con.commit()
+    )""",
+])
+
+def _db():
+    return get_memory_db(_db_path())
 
 def _meta_get(con: sqlite3.Connection, key: str) -> Optional[str]:
-    _ensure_meta(con)
     cur = con.execute("SELECT value FROM learning_progress_meta WHERE key=?", (key,))
     r = cur.fetchone()
     return r["value"] if r else None
 
 def _meta_set(con: sqlite3.Connection, key: str, value: str):
-    _ensure_meta(con)
+    # dipanggil di dalam transaksi writer memory_db (transact/arun), commit di sana
     con.execute("INSERT INTO learning_progress_meta(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, value))
-    con.commit()
 
 def _read_core_counters(con: sqlite3.Connection):
     # totals
@@ -110,6 +103,23 @@ def _remember_checkpoint(con: sqlite3.Connection, now_ts: int):
     _meta_set(con, "state_last_succ", str(int(succ)))
     _meta_set(con, "state_last_lex",  str(int(lex)))
 
+def _consume_force_flag(con: sqlite3.Connection, now_ts: int) -> bool:
+    flag = _meta_get(con, "force_checkpoint")
+    if not flag:
+        return False
+    # consume flag if not too recent
+    try:
+        ts = int(flag)
+    except Exception:
+        ts = now_ts
+    # Prevent abuse: only honor if older than 30s but newer than 2h
+    if now_ts - ts < 30 or now_ts - ts > 7200:
+        _meta_set(con, "force_checkpoint", "")
+        return False
+    # Clear the flag now to avoid double-run
+    _meta_set(con, "force_checkpoint", "")
+    return True
+
 async def _find_log_channel(bot: commands.Bot) -> Optional[discord.TextChannel]:
     # reuse helper if available
     try:
@@ -141,18 +151,15 @@ async def _ensure_progress_thread(bot: commands.Bot) -> Optional[discord.Thread]
         return None
     # Try saved thread id from meta
     try:
-        con = _open_db()
-        with con:
-            _ensure_meta(con)
-            saved = _meta_get(con, "progress_thread_id")
-            if saved:
-                tid = int(saved)
-                try:
-                    fetched = await bot.fetch_channel(tid)
-                    if isinstance(fetched, discord.Thread):
-                        return fetched
-                except Exception:
-                    pass
+        saved = await _db().aread(lambda con: _meta_get(con, "progress_thread_id"))
+        if saved:
+            tid = int(saved)
+            try:
+                fetched = await bot.fetch_channel(tid)
+                if isinstance(fetched, discord.Thread):
+                    return fetched
+            except Exception:
+                pass
     except Exception:
         pass
 
@@ -170,9 +177,8 @@ async def _ensure_progress_thread(bot: commands.Bot) -> Optional[discord.Thread]
             th = await ch.create_thread(name="neuro-lite progress", auto_archive_duration=10080)
             # Save to meta for next time
             try:
-                con = _open_db()
-                with con:
-                    _meta_set(con, "progress_thread_id", str(int(th.id)))
+                tid = str(int(th.id))
+                _db().transact(lambda con: _meta_set(con, "progress_thread_id", tid))
             except Exception:
                 pass
             return th
@@ -181,9 +187,8 @@ async def _ensure_progress_thread(bot: commands.Bot) -> Optional[discord.Thread]
             if hasattr(msg, "create_thread"):
                 th = await msg.create_thread(name="neuro-lite progress", auto_archive_duration=10080)
                 try:
-                    con = _open_db()
-                    with con:
-                        _meta_set(con, "progress_thread_id", str(int(th.id)))
+                    tid = str(int(th.id))
+                    _db().transact(lambda con: _meta_set(con, "progress_thread_id", tid))
                 except Exception:
                     pass
                 return th
@@ -193,7 +198,7 @@ async def _ensure_progress_thread(bot: commands.Bot) -> Optional[discord.Thread]
 
 async def _load_checkpoint_from_pins(th: discord.Thread) -> Optional[bytes]:
     try:
-        pins = await th.pins()
+        pins = await pin_index.pins(th)
         for m in pins:
             if MARKER in (m.content or "") and m.attachments:
                 att = m.attachments[0]
@@ -207,7 +212,7 @@ async def _load_checkpoint_from_pins(th: discord.Thread) -> Optional[bytes]:
 async def _save_checkpoint_pin(th: discord.Thread, data: bytes) -> bool:
     try:
         # Unpin previous markers (keep timeline clean)
-        pins = await th.pins()
+        pins = await pin_index.pins(th)
         for m in pins:
             if MARKER in (m.content or ""):
                 try: await m.unpin()
@@ -241,18 +246,15 @@ class DiscordStateCheckpoint(commands.Cog):
     @tasks.loop(hours=2)
     async def sync_task(self):
         try:
-            con = _open_db()
             now_ts = int(time.time())
-            with con:
-                if not _should_checkpoint(con, now_ts):
-                    return
+            if not await _db().aread(lambda con: _should_checkpoint(con, now_ts)):
+                return
             th = await _ensure_progress_thread(self.bot)
             if not th:
                 return
             data = dsio.export_state(limit_tokens=800)
             if await _save_checkpoint_pin(th, data):
-                with con:
-                    _remember_checkpoint(con, now_ts)
+                await _db().arun(lambda con: _remember_checkpoint(con, now_ts))
                 log.info("[state] checkpoint saved to thread pin (%d bytes)", len(data))
         except Exception:
             log.exception("[state] periodic checkpoint failed")
@@ -269,9 +271,8 @@ class DiscordStateCheckpoint(commands.Cog):
             if data:
                 obj = dsio.import_state(data)
                 dsio.apply_state(obj)
-                con = _open_db()
-                with con:
-                    _remember_checkpoint(con, int(time.time()))
+                now_ts = int(time.time())
+                await _db().arun(lambda con: _remember_checkpoint(con, now_ts))
                 log.info("[state] restored from pinned checkpoint (ts=%s)", obj.get("ts"))
         except Exception:
             log.exception("[state] restore on boot failed")
@@ -280,30 +281,17 @@ class DiscordStateCheckpoint(commands.Cog):
     async def force_watch_task(self):
         """Lightweight watcher: if scripts/force_checkpoint.py sets meta flag, do one checkpoint immediately."""
         try:
-            con = _open_db()
+            if not await _db().aread(lambda con: _meta_get(con, "force_checkpoint")):
+                return
             now_ts = int(time.time())
-            with con:
-                flag = _meta_get(con, "force_checkpoint")
-                if not flag:
-                    return
-                # consume flag if not too recent
-                try:
-                    ts = int(flag)
-                except Exception:
-                    ts = now_ts
-                # Prevent abuse: only honor if older than 30s but newer than 2h
-                if now_ts - ts < 30 or now_ts - ts > 7200:
-                    _meta_set(con, "force_checkpoint", "")
-                    return
-                # Clear the flag now to avoid double-run
-                _meta_set(con, "force_checkpoint", "")
+            if not await _db().arun(lambda con: _consume_force_flag(con, now_ts)):
+                return
             th = await _ensure_progress_thread(self.bot)
             if not th:
                 return
             data = dsio.export_state(limit_tokens=800)
             if await _save_checkpoint_pin(th, data):
-                with con:
-                    _remember_checkpoint(con, now_ts)
+                await _db().arun(lambda con: _remember_checkpoint(con, now_ts))
                 log.info("[state] FORCE checkpoint saved to thread pin (%d bytes)", len(data))
         except Exception:
             log.exception("[state] force watcher error")
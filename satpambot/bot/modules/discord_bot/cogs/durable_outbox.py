@@ -16,7 +16,19 @@ class DurableOutbox(commands.Cog):
     async def cog_unload(self):
         await self.q.stop()
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        n = await self.q.replay()
+        if n:
+            log.info("[durable_outbox] replaying pending sends for %d channel(s)", n)
+
     async def send(self, channel_id: int, **kwargs):
-        await self.q.enqueue(channel_id, **kwargs)
+        return await self.q.enqueue(channel_id, **kwargs)
+
+    async def edit(self, channel_id: int, message_id: int, **kwargs):
+        return await self.q.edit(channel_id, message_id, **kwargs)
+
+    async def upsert(self, channel_id: int, marker: str, **kwargs):
+        return await self.q.upsert(channel_id, marker, **kwargs)
 async def setup(bot):
-    await bot.add_cog(DurableOutbox(bot))
\ No newline at end of file
+    await bot.add_cog(DurableOutbox(bot))
@@ -9,6 +9,8 @@ from typing import Optional, Tuple, List, Dict
 import discord
 from discord.ext import tasks
 
+from ..helpers.memory_db import get_memory_db, register_schema
+
 log = logging.getLogger(__name__)
 
 def _db_path() -> str:
@@ -23,53 +25,43 @@ def _day_bucket(ts: Optional[int]=None) -> int:
         ts = _now_ts()
     return int(ts - (ts % 86400))
 
-def _open_db():
-    path = _db_path()
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        try: os.makedirs(d, exist_ok=True)
-        except Exception: pass
-    con = sqlite3.connect(path)
-    con.row_factory = sqlite3.Row
-    return con
-
-def _ensure_meta(con: sqlite3.Connection):
-    con.execute("""CREATE TABLE IF NOT EXISTS learning_progress_meta(
+register_schema("learning_progress_meta", [
+    """CREATE TABLE IF NOT EXISTS learning_progress_meta(
         key TEXT PRIMARY KEY,
         value TEXT
-    )""")
-    con.commit()
+    )""",
+])
+register_schema("progress_snapshots", [
+    """CREATE TABLE IF NOT EXISTS progress_snapshots(
+        day_ts INTEGER PRIMARY KEY,
+        total_sent INTEGER,
+        total_success INTEGER,
+        lex_total INTEGER
+    )""",
+])
+
+def _db():
+    return get_memory_db(_db_path())
 
 def _meta_get(con: sqlite3.Connection, key: str) -> Optional[str]:
-    _ensure_meta(con)
     cur = con.execute("SELECT value FROM learning_progress_meta WHERE key=?", (key,))
     r = cur.fetchone()
     return r["value"] if r else None
 
-def _meta_set(con: sqlite3.Connection, key: str, value: str):
-    _ensure_meta(con)
-    con.execute("INSERT INTO learning_progress_meta(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, value))
-    con.commit()
+async def _ameta_get(key: str) -> Optional[str]:
+    return await _db().aread(lambda con: _meta_get(con, key))
 
-def _ensure_snapshots(con: sqlite3.Connection):
-    con.execute("""CREATE TABLE IF NOT EXISTS progress_snapshots(
-        day_ts INTEGER PRIMARY KEY,
-        total_sent INTEGER,
-        total_success INTEGER,
-        lex_total INTEGER
-    )""")
-    con.commit()
+def _meta_set(key: str, value: str):
+    return _db().execute("INSERT INTO learning_progress_meta(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, value))
 
-def _upsert_snapshot(con: sqlite3.Connection, day_ts: int, total_sent:int, total_success:int, lex_total:int):
-    _ensure_snapshots(con)
-    con.execute("""INSERT INTO progress_snapshots(day_ts,total_sent,total_success,lex_total)
+def _upsert_snapshot(day_ts: int, total_sent:int, total_success:int, lex_total:int):
+    return _db().execute("""INSERT INTO progress_snapshots(day_ts,total_sent,total_success,lex_total)
                    VALUES (?,?,?,?)
                    ON CONFLICT(day_ts) DO UPDATE SET
                     total_sent=excluded.total_sent,
                     total_success=excluded.total_success,
                     lex_total=excluded.lex_total""",
                 (int(day_ts), int(total_sent), int(total_success), int(lex_total)))
-    con.commit()
 
 def _read_sticker_stats(con: sqlite3.Connection) -> Tuple[int,int,Dict[str,Dict[str,int]]]:
     total_sent = total_success = 0
@@ -129,7 +121,6 @@ def _daily_sent_series(con: sqlite3.Connection, days:int=7) -> List[Tuple[int,in
     return sorted(series.items())
 
 def _weekly_deltas_from_snapshots(con: sqlite3.Connection, days:int=7):
-    _ensure_snapshots(con)
     now = _now_ts()
     start = _day_bucket(now - (days-1)*86400)
     cur = con.execute("""SELECT day_ts,total_sent,total_success,lex_total
@@ -219,18 +210,15 @@ class LearningProgress(commands.Cog):
             return None
         th = None
         try:
-            con = _open_db()
-            with con:
-                _ensure_meta(con)
-                saved = _meta_get(con, "progress_thread_id")
-                if saved:
-                    tid = int(saved)
-                    try:
-                        fetched = await self.bot.fetch_channel(tid)
-                        if isinstance(fetched, discord.Thread):
-                            th = fetched
-                    except Exception:
-                        th = None
+            saved = await _ameta_get("progress_thread_id")
+            if saved:
+                tid = int(saved)
+                try:
+                    fetched = await self.bot.fetch_channel(tid)
+                    if isinstance(fetched, discord.Thread):
+                        th = fetched
+                except Exception:
+                    th = None
         except Exception:
             th = None
         if th: return th
@@ -246,97 +234,99 @@ class LearningProgress(commands.Cog):
             th = None
         if th:
             try:
-                con = _open_db()
-                with con:
-                    _meta_set(con, "progress_thread_id", str(int(th.id)))
+                _meta_set("progress_thread_id", str(int(th.id)))
             except Exception:
                 pass
         return th
 
     async def _compose_daily(self):
-        con = _open_db()
-        with con:
-            now = _now_ts()
-            day = _day_bucket(now)
+        now = _now_ts()
+        day = _day_bucket(now)
+
+        def _read(con):
             total_sent, total_success, per = _read_sticker_stats(con)
             daily_sent = _count_sticker_sent_period(con, day)
             try:
                 t, p, n, new_today = _slang_counts(con, since_ts=day)
-                lex_total, lex_pos, lex_neg, lex_new = t, p, n, new_today
+                lex = (t, p, n, new_today)
             except TypeError:
                 t, p, n = _slang_counts(con, since_ts=None)
-                lex_total, lex_pos, lex_neg, lex_new = t, p, n, 0
+                lex = (t, p, n, 0)
+            return total_sent, total_success, per, daily_sent, lex, _daily_sent_series(con, days=7)
 
-            try:
-                _upsert_snapshot(con, day, total_sent, total_success, lex_total)
-            except Exception:
-                pass
+        total_sent, total_success, per, daily_sent, lex, series = await _db().aread(_read)
+        lex_total, lex_pos, lex_neg, lex_new = lex
+
+        try:
+            _upsert_snapshot(day, total_sent, total_success, lex_total)
+        except Exception:
+            pass
 
-            progress = _calc_progress(total_sent, total_success, daily_sent, lex_total, lex_new)
-            bar = _pct_bar(progress)
+        progress = _calc_progress(total_sent, total_success, daily_sent, lex_total, lex_new)
+        bar = _pct_bar(progress)
 
-            series = _daily_sent_series(con, days=7)
-            spark = _sparkline([c for _,c in series])
+        spark = _sparkline([c for _,c in series])
 
-            top_emos = sorted(per.items(), key=lambda kv: (kv[1]["success"], kv[1]["sent"]), reverse=True)[:4]
-            emos = ", ".join(f"{k}({v['success']}/{v['sent']})" for k,v in top_emos) if top_emos else "—"
+        top_emos = sorted(per.items(), key=lambda kv: (kv[1]["success"], kv[1]["sent"]), reverse=True)[:4]
+        emos = ", ".join(f"{k}({v['success']}/{v['sent']})" for k,v in top_emos) if top_emos else "—"
 
-            ts = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M")
-            text = (
-                f"**Daily Progress — {ts}**\n"
-                f"{bar}\n"
-                f"- Sticker total: sent={total_sent}, success={total_success}, *today* sent={daily_sent}\n"
-                f"- Slang lexicon: total={lex_total} (pos={lex_pos}, neg={lex_neg}), *today* new={lex_new}\n"
-                f"- Top emos: {emos}\n"
-                f"- 7d sent: {spark}  ({', '.join(str(c) for _,c in series)})\n"
-                f"_mode: Render Free • TK–SD learning_"
-            )
+        ts = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M")
+        text = (
+            f"**Daily Progress — {ts}**\n"
+            f"{bar}\n"
+            f"- Sticker total: sent={total_sent}, success={total_success}, *today* sent={daily_sent}\n"
+            f"- Slang lexicon: total={lex_total} (pos={lex_pos}, neg={lex_neg}), *today* new={lex_new}\n"
+            f"- Top emos: {emos}\n"
+            f"- 7d sent: {spark}  ({', '.join(str(c) for _,c in series)})\n"
+            f"_mode: Render Free • TK–SD learning_"
+        )
 
-            try:
-                emb = discord.Embed(title="Daily Progress", description=bar, color=0x42b983)
-                emb.add_field(name="Stickers",
-                              value=f"total sent **{total_sent}**, success **{total_success}**\nToday sent **{daily_sent}**",
-                              inline=False)
-                emb.add_field(name="Slang",
-                              value=f"lexicon **{lex_total}** (pos **{lex_pos}**, neg **{lex_neg}**)\nNew today **{lex_new}**",
-                              inline=False)
-                emb.add_field(name="Top Emos", value=emos, inline=False)
-                emb.add_field(name="7d sent", value=f"`{spark}`", inline=False)
-                emb.set_footer(text="Render Free • TK–SD learning")
-            except Exception:
-                emb = None
+        try:
+            emb = discord.Embed(title="Daily Progress", description=bar, color=0x42b983)
+            emb.add_field(name="Stickers",
+                          value=f"total sent **{total_sent}**, success **{total_success}**\nToday sent **{daily_sent}**",
+                          inline=False)
+            emb.add_field(name="Slang",
+                          value=f"lexicon **{lex_total}** (pos **{lex_pos}**, neg **{lex_neg}**)\nNew today **{lex_new}**",
+                          inline=False)
+            emb.add_field(name="Top Emos", value=emos, inline=False)
+            emb.add_field(name="7d sent", value=f"`{spark}`", inline=False)
+            emb.set_footer(text="Render Free • TK–SD learning")
+        except Exception:
+            emb = None
 
         return text, emb
 
     async def _compose_weekly(self):
-        con = _open_db()
-        with con:
-            day = _day_bucket()
-            d_sent, d_succ, d_lex, succ_series = _weekly_deltas_from_snapshots(con, days=7)
-            sent_series = _daily_sent_series(con, days=7)
-            spark_sent = _sparkline([c for _,c in sent_series])
-            spark_succ = _sparkline([c for _,c in succ_series]) if succ_series else "—"
-            total_sent, total_success, per = _read_sticker_stats(con)
-            t, p, n = _slang_counts(con, since_ts=None)
-            ts = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M")
-            text = (
-                f"**Weekly Progress — {ts}**\n"
-                f"- Δ sent **{d_sent}**, Δ success **{d_succ}**, Δ lexicon **{d_lex}**\n"
-                f"- 7d sent: {spark_sent}  ({', '.join(str(c) for _,c in sent_series)})\n"
-                f"- 7d success: {spark_succ}\n"
-                f"- Totals: sent **{total_sent}**, success **{total_success}**, lexicon **{t}**\n"
-                f"_mode: Render Free • TK–SD learning_"
-            )
-            try:
-                emb = discord.Embed(title="Weekly Progress", color=0x5865F2)
-                emb.add_field(name="Deltas (7d)",
-                              value=f"sent **{d_sent}**, success **{d_succ}**, lexicon **{d_lex}**", inline=False)
-                emb.add_field(name="7d sent", value=f"`{spark_sent}`", inline=True)
-                emb.add_field(name="7d success", value=f"`{spark_succ}`", inline=True)
-                emb.add_field(name="Totals", value=f"sent **{total_sent}**, success **{total_success}**, lexicon **{t}**", inline=False)
-                emb.set_footer(text="Render Free • TK–SD learning")
-            except Exception:
-                emb = None
+        def _read(con):
+            weekly = _weekly_deltas_from_snapshots(con, days=7)
+            total_sent, total_success, _per = _read_sticker_stats(con)
+            lex_total = _slang_counts(con, since_ts=None)[0]
+            return weekly, _daily_sent_series(con, days=7), total_sent, total_success, lex_total
+
+        weekly, sent_series, total_sent, total_success, t = await _db().aread(_read)
+        d_sent, d_succ, d_lex, succ_series = weekly
+        spark_sent = _sparkline([c for _,c in sent_series])
+        spark_succ = _sparkline([c for _,c in succ_series]) if succ_series else "—"
+        ts = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M")
+        text = (
+            f"**Weekly Progress — {ts}**\n"
+            f"- Δ sent **{d_sent}**, Δ success **{d_succ}**, Δ lexicon **{d_lex}**\n"
+            f"- 7d sent: {spark_sent}  ({', '.join(str(c) for _,c in sent_series)})\n"
+            f"- 7d success: {spark_succ}\n"
+            f"- Totals: sent **{total_sent}**, success **{total_success}**, lexicon **{t}**\n"
+            f"_mode: Render Free • TK–SD learning_"
+        )
+        try:
+            emb = discord.Embed(title="Weekly Progress", color=0x5865F2)
+            emb.add_field(name="Deltas (7d)",
+                          value=f"sent **{d_sent}**, success **{d_succ}**, lexicon **{d_lex}**", inline=False)
+            emb.add_field(name="7d sent", value=f"`{spark_sent}`", inline=True)
+            emb.add_field(name="7d success", value=f"`{spark_succ}`", inline=True)
+            emb.add_field(name="Totals", value=f"sent **{total_sent}**, success **{total_success}**, lexicon **{t}**", inline=False)
+            emb.set_footer(text="Render Free • TK–SD learning")
+        except Exception:
+            emb = None
         return text, emb
 
     async def post_summary(self):
@@ -349,9 +339,7 @@ class LearningProgress(commands.Cog):
                 await th.send(embed=emb)
             else:
                 await th.send(text)
-            con = _open_db()
-            with con:
-                _meta_set(con, "progress_last_day", str(_day_bucket()))
+            _meta_set("progress_last_day", str(_day_bucket()))
             return True
         except Exception:
             log.exception("[progress] failed to post daily")
@@ -367,9 +355,7 @@ class LearningProgress(commands.Cog):
                 await th.send(embed=emb)
             else:
                 await th.send(text)
-            con = _open_db()
-            with con:
-                _meta_set(con, "progress_last_week", str(_day_bucket()))
+            _meta_set("progress_last_week", str(_day_bucket()))
             return True
         except Exception:
             log.exception("[progress] failed to post weekly")
@@ -378,12 +364,10 @@ class LearningProgress(commands.Cog):
     @tasks.loop(minutes=30)
     async def daily_task(self):
         try:
-            con = _open_db()
-            with con:
-                last = _meta_get(con, "progress_last_day")
-                today = str(_day_bucket())
-                if last == today:
-                    return
+            last = await _ameta_get("progress_last_day")
+            today = str(_day_bucket())
+            if last == today:
+                return
             if datetime.now().hour < 8:
                 return
             await self.post_summary()
@@ -394,27 +378,23 @@ class LearningProgress(commands.Cog):
     async def before_daily(self):
         await self.bot.wait_until_ready()
         try:
-            con = _open_db()
-            with con:
-                last = _meta_get(con, "progress_last_day")
-                today = str(_day_bucket())
-                if datetime.now().hour >= 8 and last != today:
-                    await self.post_summary()
+            last = await _ameta_get("progress_last_day")
+            today = str(_day_bucket())
+            if datetime.now().hour >= 8 and last != today:
+                await self.post_summary()
         except Exception:
             pass
 
     @tasks.loop(hours=2)
     async def weekly_task(self):
         try:
-            con = _open_db()
-            with con:
-                last = _meta_get(con, "progress_last_week")
-                now = datetime.now()
-                if now.weekday() != 0 or now.hour < 9:
-                    return
-                today = str(_day_bucket())
-                if last == today:
-                    return
+            last = await _ameta_get("progress_last_week")
+            now = datetime.now()
+            if now.weekday() != 0 or now.hour < 9:
+                return
+            today = str(_day_bucket())
+            if last == today:
+                return
             await self.post_weekly()
         except Exception:
             log.exception("[progress] weekly scheduler error")
@@ -14,6 +14,9 @@ except Exception:
     aiohttp = None  # type: ignore
 
 from ..helpers.safety_utils import extract_urls, norm_domain, is_suspicious_domain, SHORTENERS
+from ..helpers.url_resolver import get_resolver
+from ..helpers.mod_actions import queue_delete
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_GUARD, STOP
 
 log = logging.getLogger(__name__)
 
@@ -37,72 +40,28 @@ MAX_REDIRECTS = int(os.getenv("MAX_REDIRECTS","2"))
 class LinkGuard(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        get_pipeline(bot).register("link_guard", self.on_message_ctx, order=ORDER_GUARD,
+                                   threads=False, gated=True, needs=("urls",))
+
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister("link_guard")
 
     async def _expand_once(self, url: str) -> str:
         if not RESOLVE or aiohttp is None:
             return url
-        host = norm_domain(urlparse(url).hostname or "")
-        if host not in SHORTENERS:
-            return url
-        try:
-            timeout = aiohttp.ClientTimeout(total=HEAD_TIMEOUT)
-            async with aiohttp.ClientSession(timeout=timeout) as sess:
-                async with sess.head(url, allow_redirects=False) as resp:
-                    loc = resp.headers.get("Location")
-                    if loc and loc.startswith("http"):
-                        return loc
-        except Exception:
-            return url
-        return url
+        # shared session + cache + coalescing + per-host rate limit (helpers/url_resolver)
+        return await get_resolver().hop(url)
 
     async def _expand(self, url: str) -> str:
-        out = url
-        for _ in range(MAX_REDIRECTS):
-            nxt = await self._expand_once(out)
-            if nxt == out:
-                break
-            out = nxt
-        return out
-
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        # --- PublicChatGate pre-send guard (auto-injected) ---
-        gate = None
-        try:
-            gate = self.bot.get_cog("PublicChatGate")
-        except Exception:
-            pass
-        try:
-            if message.guild and gate and hasattr(gate, "should_allow_public_reply") and not gate.should_allow_public_reply(message):
-                return
-        except Exception:
-            pass
-        # --- end guard ---
+        if not RESOLVE or aiohttp is None:
+            return url
+        return await get_resolver().expand(url, MAX_REDIRECTS)
 
-        # THREAD/FORUM EXEMPTION — auto-inserted
-        ch = getattr(message, "channel", None)
-        if ch is not None:
-            try:
-                import discord
-                # Exempt true Thread objects
-                if isinstance(ch, getattr(discord, "Thread", tuple())):
-                    return
-                # Exempt thread-like channel types (public/private/news threads)
-                ctype = getattr(ch, "type", None)
-                if ctype in {
-                    getattr(discord.ChannelType, "public_thread", None),
-                    getattr(discord.ChannelType, "private_thread", None),
-                    getattr(discord.ChannelType, "news_thread", None),
-                }:
-                    return
-            except Exception:
-                # If discord import/type checks fail, do not block normal flow
-                pass
-        if not ENABLED or message.author.bot or not message.guild:
-            return
-        urls = extract_urls(message.content or "")
-        if not urls:
+    async def on_message_ctx(self, ctx: MessageContext):
+        if not ENABLED:
             return
+        message = ctx.message
+        urls = ctx.urls
         allow = _allowlist()
         hits = []
         for u in urls:
@@ -111,13 +70,12 @@ class LinkGuard(commands.Cog):
             if is_suspicious_domain(host, allow):
                 hits.append((eu, host))
         if hits:
-            try:
-                if ACTION in {"delete","ban"}:
-                    await message.delete()
-            except Exception:
-                pass
+            if ACTION in {"delete","ban"}:
+                await queue_delete(message)
             if (ACTION == "ban" or AUTOBAN_CRITICAL) and hits:
                 # only ban if env requests it; otherwise delete/log only
                 from ..helpers.ban_utils import safe_ban_7d
                 await safe_ban_7d(message.guild, message.author, reason=f"Suspicious link: {hits[:3]}")
-            log.info("[link_guard] action=%s user=%s hits=%s", ACTION.upper(), message.author.id, hits[:5])
\ No newline at end of file
+            log.info("[link_guard] action=%s user=%s hits=%s", ACTION.upper(), message.author.id, hits[:5])
+            if ACTION in {"delete","ban"}:
+                return STOP
\ No newline at end of file
@@ -6,7 +6,7 @@ import asyncio, os, re, json, logging
 from typing import Optional, List, Tuple
 import discord
 
-from satpambot.bot.modules.discord_bot.helpers import lists_loader, modlog, github_sync
+from satpambot.bot.modules.discord_bot.helpers import lists_loader, list_snapshot, modlog, github_sync
 
 log = logging.getLogger(__name__)
 
@@ -49,6 +49,23 @@ class ListsSync(commands.Cog):
         self._wh_thread_id: Optional[int] = None
         self._bl_thread_id: Optional[int] = None
         self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        # rebuild snapshot saat file list berubah (edit manual, git pull, modul lain)
+        self._watch_task = asyncio.create_task(list_snapshot.watch(on_change=self._broadcast))
+
+    def cog_unload(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+
+    def _broadcast(self, snap: "list_snapshot.ListSnapshot"):
+        for cog in self.bot.cogs.values():
+            try:
+                if hasattr(cog, "_apply_lists"):
+                    cog._apply_lists(snap.as_lists())
+            except Exception:
+                pass
 
     async def _ensure_threads(self, guild: discord.Guild):
         ch = await modlog.resolve_log_channel(guild)
@@ -93,8 +110,8 @@ class ListsSync(commands.Cog):
         return out
 
     async def _update_and_broadcast(self, guild: discord.Guild, wl_domains, wl_patterns, bl_domains, bl_patterns, source: str):
-        # Save locally
-        ok = lists_loader.save_lists(wl_domains, wl_patterns, bl_domains, bl_patterns)
+        # Save locally (rebuilds the list snapshot; file IO off the loop)
+        ok = await asyncio.to_thread(lists_loader.save_lists, wl_domains, wl_patterns, bl_domains, bl_patterns)
         # GitHub sync
         if LISTS_GITHUB_ENABLED and LISTS_GITHUB_REPO:
             try:
@@ -107,13 +124,7 @@ class ListsSync(commands.Cog):
             except Exception as e:
                 await modlog.send_error(guild, content=f"GitHub sync gagal: {e}")
         # Reload to cogs
-        new_lists = lists_loader.load_whitelist_blacklist()
-        for cog in self.bot.cogs.values():
-            try:
-                if hasattr(cog, "_apply_lists"):
-                    cog._apply_lists(new_lists)
-            except Exception:
-                pass
+        self._broadcast(list_snapshot.current())
         # Log
         from discord import Embed, Colour
         emb = Embed(title="✅ Lists updated", colour=Colour.green(), description=f"Source: {source}")
@@ -12,6 +12,7 @@ except Exception:  # pragma: no cover
         def get_conf():
             return {}
 from satpambot.bot.utils import embed_scribe
+from satpambot.bot.modules.discord_bot.helpers.route_limiter import priority, PRIO_LOW
 
 def _uptime_str(start):
     delta = dt.datetime.utcnow() - start
@@ -44,7 +45,8 @@ class LiveMetricsPush(commands.Cog):
         e.add_field(name="Presence", value=pres, inline=True)
         e.add_field(name="Uptime", value=uptime, inline=True)
         e.set_footer(text=self.key)
-        await embed_scribe.upsert(ch, self.key, e, pin=False)
+        with priority(PRIO_LOW):
+            await embed_scribe.upsert(ch, self.key, e, pin=False)
 
     @task.before_loop
     async def _wait_ready(self):
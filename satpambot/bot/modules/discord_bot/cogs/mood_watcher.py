@@ -22,15 +22,6 @@ class MoodWatcher(commands.Cog):
     @tasks.loop(seconds=45)
     async def loop(self):
         await self.bot.wait_until_ready()
-        con = mood_state._open_db()
-        try:
-            sent, succ, lex = mood_state.counters(con)
-            changed = mood_state.update_from_counters(con, sent, succ, lex)
-            if not changed:
-                # decay: if no learning > 5 min set neutral
-                if not mood_state.is_learning_active(300, con):
-                    mood_state.set_mood("neutral", con)
-        finally:
-            con.close()
+        await mood_state._db().arun(mood_state.tick)
 async def setup(bot):
     await bot.add_cog(MoodWatcher(bot))
\ No newline at end of file
@@ -8,6 +8,7 @@ from discord.ext import commands
 
 import os, json, contextlib, logging, asyncio
 import discord
+from ..helpers import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -51,7 +52,7 @@ class NeuroPresenceUpserter(commands.Cog):
                 "thread": thread.name,
             }
             content = f"{PRESENCE_MARKER}\n```json\n{json.dumps(payload, ensure_ascii=False, indent=2)}\n```"
-            pinned = await thread.pins()
+            pinned = await pin_index.pins(thread)
             keeper = None
             for p in pinned:
                 if (p.author == thread.guild.me) and PRESENCE_MARKER in (p.content or ""):
@@ -6,10 +6,13 @@ import logging, os, asyncio, time, re
 from typing import Optional, Iterable, Tuple, Set
 import discord
 
-from ..helpers.hash_utils import sha256_bytes
+from ..helpers.attachment_cache import get_attachment_cache
+from ..helpers.attachment_fetch import MAX_BYTES
 from ..helpers.safety_utils import extract_urls, norm_domain, is_suspicious_domain
 from ..helpers.ban_utils import safe_ban_7d
+from ..helpers.mod_actions import queue_delete
 from ..helpers.ocr_clients import smart_ocr
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_GUARD
 
 log = logging.getLogger(__name__)
 
@@ -29,15 +32,18 @@ SOFT_THRESHOLD = float(os.getenv("NSFW_SOFT_THRESHOLD","0"))    # reserved / for
 INVITE_RE = re.compile(r'(?:discord(?:\.gg|\.com/invite)/)([a-zA-Z0-9-]+)', re.I)
 PHISH_WORDS = re.compile(r'(nitro|airdrop|bonus|free|verify|steam|robux|wallet|crypto)', re.I)
 
-CACHE_TTL = 86400
-MAX_BYTES = 1572864
 _last_user: dict[int, float] = {}
-_seen: dict[str, float] = {}
 
 class OCRGuard(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.enabled = OCR_ENABLED
+        # OCR lambat -> detached stage (tidak menahan stage lain)
+        get_pipeline(bot).register("ocr_guard", self.on_message_ctx, order=ORDER_GUARD + 5, scope="any",
+                                   threads=False, gated=True, needs=("images",), detach=True)
+
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister("ocr_guard")
 
     def _rate(self, uid: int) -> bool:
         now = time.time()
@@ -47,14 +53,6 @@ class OCRGuard(commands.Cog):
         _last_user[uid] = now
         return True
 
-    def _dedupe(self, h: str) -> bool:
-        now = time.time()
-        ts = _seen.get(h, 0.0)
-        if ts and (now - ts) < CACHE_TTL:
-            return True
-        _seen[h] = now
-        return False
-
     async def _handle_invites(self, message: discord.Message, text: str) -> bool:
         codes = [m.group(1) for m in INVITE_RE.finditer(text or "")]
         if not codes:
@@ -68,19 +66,16 @@ class OCRGuard(commands.Cog):
             if not inv or not inv.guild:
                 # strict handling -> delete only
                 if OCR_ACTION in {"delete","ban"}:
-                    try: await message.delete()
-                    except Exception: pass
+                    await queue_delete(message)
                 return True
             nsfw_level = getattr(inv.guild, "nsfw_level", -1) or -1
             if nsfw_level >= 2 and OCR_ACTION == "ban":
-                try: await message.delete()
-                except Exception: pass
+                await queue_delete(message)
                 await safe_ban_7d(message.guild, message.author, reason=f"OCR NSFW invite (nsfw_level={nsfw_level})")
                 return True
             else:
                 if OCR_ACTION in {"delete","ban"}:
-                    try: await message.delete()
-                    except Exception: pass
+                    await queue_delete(message)
                 return True
         return False
 
@@ -96,90 +91,80 @@ class OCRGuard(commands.Cog):
             return False
         return any(w in low for w in SOFT_WORDS)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        # --- PublicChatGate pre-send guard (auto-injected) ---
-        gate = None
-        try:
-            gate = self.bot.get_cog("PublicChatGate")
-        except Exception:
-            pass
-        try:
-            if message.guild and gate and hasattr(gate, "should_allow_public_reply") and not gate.should_allow_public_reply(message):
-                return
-        except Exception:
-            pass
-        # --- end guard ---
-
-        # THREAD/FORUM EXEMPTION — auto-inserted
-        ch = getattr(message, "channel", None)
-        if ch is not None:
+    def _classify(self, txt: str, allow: Set[str]) -> str:
+        """Final OCR verdict for an image's text: invite | soft | risky | clean."""
+        if not txt:
+            return "clean"
+        if INVITE_RE.search(txt):
+            return "invite"
+        if self._is_soft_only(txt):
+            return "soft"
+        if PHISH_WORDS.search(txt):
+            return "risky"
+        for u in extract_urls(txt):
             try:
-                import discord
-                # Exempt true Thread objects
-                if isinstance(ch, getattr(discord, "Thread", tuple())):
-                    return
-                # Exempt thread-like channel types (public/private/news threads)
-                ctype = getattr(ch, "type", None)
-                if ctype in {
-                    getattr(discord.ChannelType, "public_thread", None),
-                    getattr(discord.ChannelType, "private_thread", None),
-                    getattr(discord.ChannelType, "news_thread", None),
-                }:
-                    return
+                from urllib.parse import urlparse
+                host = norm_domain(urlparse(u).hostname or "")
             except Exception:
-                # If discord import/type checks fail, do not block normal flow
-                pass
-        if not self.enabled or message.author.bot or not message.attachments:
+                host = ""
+            if is_suspicious_domain(host, allow):
+                return "risky"
+        return "clean"
+
+    async def _verdict(self, ent, att, allow: Set[str]) -> str:
+        """OCR + classify once per content; copies of the same image reuse the cached verdict."""
+        v = ent.verdicts.get("ocr")
+        if isinstance(v, asyncio.Future):      # copy lain sedang di-OCR -> tunggu hasilnya
+            return await asyncio.shield(v)
+        if v is not None:
+            return v
+        fut = asyncio.get_running_loop().create_future()
+        ent.verdicts["ocr"] = fut
+        verdict = "clean"
+        try:
+            txt = await smart_ocr(ent.data, filename=att.filename or "image.jpg")
+            ent.ocr_text = txt or ""
+            verdict = self._classify(ent.ocr_text, allow)
+            ent.verdicts["ocr"] = verdict
+            return verdict
+        finally:
+            if ent.verdicts.get("ocr") is fut:   # OCR gagal/cancel -> boleh dicoba lagi
+                ent.verdicts.pop("ocr", None)
+            fut.set_result(verdict)
+
+    async def on_message_ctx(self, ctx: MessageContext):
+        if not self.enabled:
             return
+        message = ctx.message
         if not self._rate(message.author.id):
             return
         allow = {x.strip().lower() for x in (os.getenv("LINK_WHITELIST","").split(",")) if x.strip()}
 
-        for att in message.attachments:
-            if not getattr(att, "content_type","").startswith("image/"):
-                continue
+        for att in ctx.images:
             if att.size > MAX_BYTES:
                 continue
-            try:
-                b = await att.read()
-            except Exception:
-                continue
-            h = sha256_bytes(b)
-            if self._dedupe(h):
-                continue
-            txt = await smart_ocr(b, filename=att.filename or "image.jpg")
-            if not txt:
+            ent = await get_attachment_cache().fetch(att, max_bytes=MAX_BYTES)
+            if ent is None:
                 continue
+            # verdict final di-cache per konten: repost gambar yang sama (channel lain) langsung kena policy
+            verdict = await self._verdict(ent, att, allow)
 
             # 1) invites in image
-            if await self._handle_invites(message, txt):
-                return
+            if verdict == "invite":
+                if await self._handle_invites(message, ent.ocr_text or ""):
+                    return
 
             # 2) soft-NSFW policy
-            if self._is_soft_only(txt):
+            elif verdict == "soft":
                 if SOFT_POLICY == "delete":
-                    try: await message.delete()
-                    except Exception: pass
+                    await queue_delete(message)
                 # allow/log otherwise (never ban for soft)
                 return
 
             # 3) non-invite phishing indicators => apply OCR_ACTION but never ban for soft-only
-            risky = bool(PHISH_WORDS.search(txt))
-            if not risky:
-                urls = extract_urls(txt)
-                for u in urls:
-                    try:
-                        from urllib.parse import urlparse
-                        host = norm_domain(urlparse(u).hostname or "")
-                    except Exception:
-                        host = ""
-                    if is_suspicious_domain(host, allow):
-                        risky = True; break
-            if risky:
+            elif verdict == "risky":
                 if OCR_ACTION in {"delete","ban"}:
-                    try: await message.delete()
-                    except Exception: pass
+                    await queue_delete(message)
                 if OCR_ACTION == "ban" and OCR_SCAM_STRICT:
                     await safe_ban_7d(message.guild, message.author, reason="OCR suspicious content")
-                return
\ No newline at end of file
+                return
@@ -56,7 +56,7 @@ class OwnerConversationalApprovals(commands.Cog):
             text = message.content or ""
             self.em.update_from_text(message.author.id, text)
             if YES_PAT.search(text):
-                req = self.store.latest_pending()
+                req = await self.store.alatest_pending()
                 if req:
                     self.store.set_status(req["id"], "approved")
                     styled, gif = generate_reply(text, f"Disetujui: {req['module']} (ID {req['id']})", emotion="happy")
@@ -67,7 +67,7 @@ class OwnerConversationalApprovals(commands.Cog):
                     await message.channel.send(s); 
                     if g: await message.channel.send(g)
             elif NO_PAT.search(text):
-                req = self.store.latest_pending()
+                req = await self.store.alatest_pending()
                 if req:
                     self.store.set_status(req["id"], "denied")
                     styled, gif = generate_reply(text, f"Ditolak: {req['module']} (ID {req['id']})", emotion="sad")
@@ -92,7 +92,7 @@ class OwnerConversationalApprovals(commands.Cog):
         author = message.author
         reason = text
 
-        req_id = self.store.create(author.id, getattr(guild, "id", 0) or 0, getattr(channel, "id", 0) or 0, message.id, module, reason)
+        req_id = await self.store.acreate(author.id, getattr(guild, "id", 0) or 0, getattr(channel, "id", 0) or 0, message.id, module, reason)
 
         try: await message.add_reaction("🧠"); await message.add_reaction("🛠️")
         except Exception: pass
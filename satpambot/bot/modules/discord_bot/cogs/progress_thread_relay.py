@@ -7,6 +7,7 @@ import discord
 
 from discord.ext import tasks
 from satpambot.config.local_cfg import cfg, cfg_int
+from ..helpers import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -73,7 +74,7 @@ async def _find_or_create_thread(ch: discord.TextChannel) -> discord.Thread | No
 async def _find_keeper(thread: discord.Thread) -> discord.Message | None:
     marker = _keeper_marker()
     try:
-        pins = await thread.pins()
+        pins = await pin_index.pins(thread)
         for m in pins:
             if marker in (m.content or ""):
                 return m
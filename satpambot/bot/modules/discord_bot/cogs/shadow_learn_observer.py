@@ -2,6 +2,7 @@ from __future__ import annotations
 import os, time, logging
 import discord
 from discord.ext import commands
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_LEARN
 log = logging.getLogger(__name__)
 PER_EXPOSURE_XP = int(os.getenv("SHADOW_EXPOSURE_XP","15") or "15")
 USER_COOLDOWN_SEC = int(os.getenv("SHADOW_XP_COOLDOWN_SEC","180") or "180")
@@ -19,20 +20,20 @@ try:
     if _qna: SKIP_IDS.add(_qna)
 except: pass
 class ShadowLearnObserver(commands.Cog):
-    def __init__(self, bot): self.bot=bot; self._last={}
+    def __init__(self, bot):
+        self.bot=bot; self._last={}
+        get_pipeline(bot).register("shadow_learn_observer", self.on_message_ctx, order=ORDER_LEARN)
     def _ok(self, uid):
         now=time.time(); last=self._last.get(uid,0.0)
         if now-last<USER_COOLDOWN_SEC: return False
         self._last[uid]=now; return True
-    @commands.Cog.listener()
-    async def on_message(self, m: discord.Message):
+    def cog_unload(self): get_pipeline(self.bot).unregister("shadow_learn_observer")
+    async def on_message_ctx(self, ctx: MessageContext):
         try:
-            if m.guild is None or m.author.bot: return
-            ch_id = getattr(getattr(m, "channel", None), "id", None)
-            if ch_id and ch_id in SKIP_IDS: return
-            if PER_EXPOSURE_XP>0 and self._ok(m.author.id):
+            if ctx.channel_id and ctx.channel_id in SKIP_IDS: return
+            if PER_EXPOSURE_XP>0 and self._ok(ctx.author_id):
                 for evt in ("xp_add","satpam_xp","xp_award"):
-                    try: self.bot.dispatch(evt, m.author.id, PER_EXPOSURE_XP, "shadow_exposure")
+                    try: self.bot.dispatch(evt, ctx.author_id, PER_EXPOSURE_XP, "shadow_exposure")
                     except: pass
         except Exception:
             log.exception("[shadow_learn_observer] on_message error")
@@ -8,6 +8,7 @@ from discord import app_commands
 from typing import Tuple
 
 from satpambot.bot.modules.discord_bot.helpers import static_cfg
+from satpambot.bot.modules.discord_bot.helpers import pin_index
 
 MIRROR_TITLE = "Mirror daftar saat ini"
 MIRROR_MARK  = "[LIST_MIRROR_PIN]"   # marker in message content to find/edit
@@ -60,7 +61,7 @@ def _make_files(wl: str, bl: str) -> Tuple[discord.File, discord.File]:
 async def _find_existing_message(ch: discord.TextChannel, bot_user_id: int) -> discord.Message | None:
     # Prefer pinned message with our marker
     try:
-        pins = await ch.pins()
+        pins = await pin_index.pins(ch)
         for m in pins:
             if m.author.id == bot_user_id and MIRROR_MARK in (m.content or ""):
                 return m
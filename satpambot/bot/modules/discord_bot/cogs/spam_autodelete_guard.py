@@ -5,6 +5,9 @@ from discord.ext import commands
 import logging
 import re
 
+from ..helpers.mod_actions import queue_delete
+from ..helpers.message_pipeline import MessageContext, get_pipeline, ORDER_GUARD, STOP
+
 LOGGER = logging.getLogger(__name__)
 
 TARGET_CHANNEL_IDS = { 1400375184048787566, 1425400701982478408 }
@@ -28,19 +31,16 @@ def is_spam(content: str) -> bool:
 class SpamAutoDeleteGuard(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        get_pipeline(bot).register("spam_autodelete_guard", self.on_message_ctx, order=ORDER_GUARD,
+                                   channels=frozenset(TARGET_CHANNEL_IDS), needs=("content",))
+
+    def cog_unload(self):
+        get_pipeline(self.bot).unregister("spam_autodelete_guard")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        if not message.guild:
-            return
-        if message.channel.id not in TARGET_CHANNEL_IDS:
-            return
-        if is_spam(message.content or ""):
-            try:
-                await message.delete()
-            except Exception as e:
-                LOGGER.debug("Failed to delete spam: %s", e)
+    async def on_message_ctx(self, ctx: MessageContext):
+        if is_spam(ctx.content):
+            if not await queue_delete(ctx.message):
+                LOGGER.debug("Failed to delete spam: %s", ctx.message.id)
+            return STOP
 async def setup(bot):
     await bot.add_cog(SpamAutoDeleteGuard(bot))
\ No newline at end of file
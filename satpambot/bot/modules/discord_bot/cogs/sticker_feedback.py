@@ -30,7 +30,7 @@ class StickerFeedback(commands.Cog):
     async def _handle(self, payload: discord.RawReactionActionEvent, add: bool):
         msg_id = int(payload.message_id)
         emoji = payload.emoji
-        emo = self.learner.get_sent_emotion(msg_id)
+        emo = await self.learner.aget_sent_emotion(msg_id)
         if emo is None:
             return
         is_pos = _is_pos(getattr(emoji, "name", None) or str(emoji))
@@ -41,7 +41,7 @@ class StickerFeedback(commands.Cog):
         self.learner.record_reaction(msg_id, is_positive=is_pos, delta=delta)
         pos_th = envcfg.sticker_pos_threshold() if envcfg else 2
         neg_th = envcfg.sticker_neg_threshold() if envcfg else 1
-        credited = self.learner.maybe_credit_success_from_feedback(msg_id, pos_th, neg_th)
+        credited = await self.learner.amaybe_credit_success_from_feedback(msg_id, pos_th, neg_th)
         if credited:
             log.info("[sticker_feedback] credited success for message %s (emoji=%s)", msg_id, emoji)
 
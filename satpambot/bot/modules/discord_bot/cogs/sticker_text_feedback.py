@@ -2,9 +2,12 @@ from __future__ import annotations
 
 from discord.ext import commands
 
-import asyncio, time, re, sqlite3, logging, os
+import asyncio, time, re, logging, os
 from typing import Optional
 
+from ..helpers.memory_db import get_memory_db
+from ..helpers.sticker_learner import credit_success
+
 log = logging.getLogger(__name__)
 
 POS_PAT = re.compile(
@@ -24,38 +27,19 @@ def _db_path():
 
 WINDOW_SEC = int(os.getenv("STICKER_TEXT_WINDOW_SEC", "90"))
 
-def _find_latest_sticker_msg_id(channel_id: int, now_ts: int, window_sec: int) -> Optional[int]:
-    db = _db_path()
-    con = sqlite3.connect(db); con.row_factory = sqlite3.Row
-    try:
-        cur = con.cursor()
-        cur.execute("""SELECT msg_id FROM sticker_sent
-                       WHERE channel_id=? AND ts>=? 
-                       ORDER BY ts DESC LIMIT 1""", (int(channel_id), int(now_ts - window_sec)))
-        row = cur.fetchone()
-        return int(row["msg_id"]) if row else None
-    finally:
-        con.close()
-
-def _credit_success_for_msg(msg_id: int) -> bool:
-    db = _db_path()
-    con = sqlite3.connect(db); con.row_factory = sqlite3.Row
-    credited = False
-    try:
-        cur = con.cursor()
-        cur.execute("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),))
-        r = cur.fetchone()
+async def _find_latest_sticker_msg_id(channel_id: int, now_ts: int, window_sec: int) -> Optional[int]:
+    row = await get_memory_db(_db_path()).afetchone("""SELECT msg_id FROM sticker_sent
+                   WHERE channel_id=? AND ts>=?
+                   ORDER BY ts DESC LIMIT 1""", (int(channel_id), int(now_ts - window_sec)))
+    return int(row["msg_id"]) if row else None
+
+async def _credit_success_for_msg(msg_id: int) -> bool:
+    def _run(cur) -> bool:
+        r = cur.execute("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),)).fetchone()
         if not r: return False
-        emo = r["emotion"] or "neutral"
-        cur.execute("""INSERT INTO sticker_stats(emotion, sent_count, success_count)
-                       VALUES (?,0,1)
-                       ON CONFLICT(emotion) DO UPDATE SET
-                       success_count = success_count + 1""", (emo,))
-        con.commit()
-        credited = True
-    finally:
-        con.close()
-    return credited
+        credit_success(cur, r["emotion"] or "neutral")
+        return True
+    return bool(await get_memory_db(_db_path()).arun(_run))
 
 class StickerTextFeedback(commands.Cog):
     """Text-based feedback with Indonesian slang learning (Render Free safe)."""
@@ -86,7 +70,7 @@ class StickerTextFeedback(commands.Cog):
                 return
 
             now_ts = int(time.time())
-            sticker_msg_id = _find_latest_sticker_msg_id(int(channel_id), now_ts, WINDOW_SEC)
+            sticker_msg_id = await _find_latest_sticker_msg_id(int(channel_id), now_ts, WINDOW_SEC)
             if not sticker_msg_id:
                 return
 
@@ -100,7 +84,7 @@ class StickerTextFeedback(commands.Cog):
             if not is_pos and not is_neg:
                 try:
                     from ..helpers.slang_learner import score_text
-                    pos_hits, neg_hits = score_text(txt)
+                    pos_hits, neg_hits = await asyncio.to_thread(score_text, txt)
                     if pos_hits >= 2 and neg_hits == 0:
                         is_pos = True
                     elif neg_hits >= 2 and pos_hits == 0:
@@ -115,7 +99,7 @@ class StickerTextFeedback(commands.Cog):
                     is_pos = True
 
             if is_pos and not is_neg:
-                if _credit_success_for_msg(sticker_msg_id):
+                if await _credit_success_for_msg(sticker_msg_id):
                     log.info("[sticker-text] credited success for msg_id=%s via text=%r", sticker_msg_id, txt[:80])
 
             try:
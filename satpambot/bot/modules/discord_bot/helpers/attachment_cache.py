@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+"""
+attachment_cache.py
+- Satu cache per-process untuk attachment gambar, dipakai bareng oleh semua image guard.
+- Key: Discord attachment id -> content SHA-256 -> entry (bytes disimpan sekali).
+- Entry: bytes, frame PIL (decode lazy, sekali), hash (phash/dhash/tile/sha1), teks OCR, verdict per guard.
+- Eviction: LRU + TTL + byte budget (bytes + perkiraan ukuran frame ter-decode).
+"""
+import os, io, time, asyncio, hashlib, logging, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image, ImageSequence
+except Exception:
+    Image = None
+    ImageSequence = None
+
+from .attachment_fetch import IMAGE_MAX_BYTES
+
+log = logging.getLogger(__name__)
+
+ATT_CACHE_TTL_SEC = float(os.getenv("ATT_CACHE_TTL_SEC", "86400"))
+ATT_CACHE_MAX_BYTES = int(os.getenv("ATT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ATT_CACHE_MAX_ENTRIES = int(os.getenv("ATT_CACHE_MAX_ENTRIES", "4096"))
+ATT_CACHE_MAX_FRAMES = int(os.getenv("ATT_CACHE_MAX_FRAMES", "6"))
+
+
+class AttachmentEntry:
+    __slots__ = ("sha256", "data", "size", "created", "hashes", "ocr_text", "verdicts",
+                 "_frames", "_frames_bytes", "_lock", "__weakref__")
+
+    def __init__(self, sha256: str, data: bytes):
+        self.sha256 = sha256
+        self.data: Optional[bytes] = data
+        self.size = len(data)
+        self.created = time.time()
+        self.hashes: Dict[str, Any] = {}
+        self.ocr_text: Optional[str] = None
+        self.verdicts: Dict[str, Any] = {}
+        self._frames: Optional[List[Any]] = None
+        self._frames_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cost(self) -> int:
+        return self.size + self._frames_bytes
+
+    @property
+    def sha1(self) -> str:
+        v = self.hashes.get("sha1")
+        if v is None and self.data is not None:
+            v = self.hashes["sha1"] = hashlib.sha1(self.data).hexdigest()
+        return v or ""
+
+    def frames(self, max_frames: int = ATT_CACHE_MAX_FRAMES) -> List[Any]:
+        """Decoded RGB frames (decoded once, on first use)."""
+        if self._frames is not None:
+            return self._frames
+        with self._lock:
+            if self._frames is not None:
+                return self._frames
+            out: List[Any] = []
+            if Image is not None and self.data:
+                try:
+                    with Image.open(io.BytesIO(self.data)) as im:
+                        if getattr(im, "is_animated", False) and ImageSequence is not None:
+                            for i, fr in enumerate(ImageSequence.Iterator(im)):
+                                if i >= max_frames:
+                                    break
+                                out.append(fr.convert("RGB"))
+                        else:
+                            out.append(im.convert("RGB"))
+                except Exception:
+                    out = []
+            self._frames_bytes = sum(f.size[0] * f.size[1] * 3 for f in out)
+            self._frames = out
+            return out
+
+    def image(self):
+        fr = self.frames()
+        return fr[0] if fr else None
+
+    def drop_frames(self) -> None:
+        self._frames, self._frames_bytes = None, 0
+
+
+class AttachmentCache:
+    def __init__(self, max_bytes: int = ATT_CACHE_MAX_BYTES, ttl: float = ATT_CACHE_TTL_SEC,
+                 max_entries: int = ATT_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._by_sha: "OrderedDict[str, AttachmentEntry]" = OrderedDict()
+        self._by_att: Dict[int, str] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}   # (attachment id, cap)
+        self._lock = threading.RLock()
+        self.stats = {"hit": 0, "miss": 0, "download": 0, "evict": 0}
+
+    def __len__(self) -> int:
+        return len(self._by_sha)
+
+    def _used(self) -> int:
+        return sum(e.cost for e in self._by_sha.values())
+
+    def _evict(self) -> None:
+        now = time.time()
+        with self._lock:
+            for k in [k for k, e in self._by_sha.items() if now - e.created > self.ttl]:
+                self._drop(k)
+            used = self._used()
+            while self._by_sha and (used > self.max_bytes or len(self._by_sha) > self.max_entries):
+                k, e = next(iter(self._by_sha.items()))
+                used -= e.cost
+                self._drop(k)
+
+    def _drop(self, sha: str) -> None:
+        e = self._by_sha.pop(sha, None)
+        if e is None:
+            return
+        self.stats["evict"] += 1
+        for aid in [a for a, s in self._by_att.items() if s == sha]:
+            self._by_att.pop(aid, None)
+
+    def get(self, sha256: str) -> Optional[AttachmentEntry]:
+        with self._lock:
+            e = self._by_sha.get(sha256)
+            if e is None:
+                return None
+            if time.time() - e.created > self.ttl:
+                self._drop(sha256)
+                return None
+            self._by_sha.move_to_end(sha256)
+            return e
+
+    def get_by_attachment(self, attachment_id: int) -> Optional[AttachmentEntry]:
+        sha = self._by_att.get(int(attachment_id or 0))
+        return self.get(sha) if sha else None
+
+    def put_bytes(self, data: bytes, attachment_id: Optional[int] = None) -> AttachmentEntry:
+        sha = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            e = self.get(sha)
+            if e is None:
+                e = AttachmentEntry(sha, data)
+                self._by_sha[sha] = e
+            if attachment_id:
+                self._by_att[int(attachment_id)] = sha
+        self._evict()
+        return e
+
+    def touch(self, entry: AttachmentEntry) -> None:
+        """Re-check the byte budget after an entry grew (frames decoded)."""
+        self._evict()
+
+    async def fetch(self, attachment, reader=None,
+                    max_bytes: Optional[int] = IMAGE_MAX_BYTES) -> Optional[AttachmentEntry]:
+        """Entry for a discord.Attachment; downloads once per attachment id (concurrent callers share it).
+
+        Default reader streams with a magic-byte check and caps at IMAGE_MAX_BYTES; OCR passes the
+        tighter MAX_BYTES. Rejected payloads -> None.
+        """
+        aid = int(getattr(attachment, "id", 0) or 0)
+        e = self.get_by_attachment(aid) if aid else None
+        if e is not None:
+            self.stats["hit"] += 1
+            return None if max_bytes and e.size > max_bytes else e
+        key = (aid, max_bytes or 0)
+        fut = self._inflight.get(key) if aid else None
+        if fut is not None:
+            self.stats["hit"] += 1
+            return await asyncio.shield(fut)
+        self.stats["miss"] += 1
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        if aid:
+            self._inflight[key] = fut
+        try:
+            self.stats["download"] += 1
+            if reader is None:
+                from .attachment_fetch import read_image_bounded
+                data = await read_image_bounded(attachment, max_bytes)
+            else:
+                data = await reader(attachment)
+            e = self.put_bytes(data, aid) if data else None
+            fut.set_result(e)
+            return e
+        except BaseException as ex:
+            fut.set_result(None)
+            if isinstance(ex, asyncio.CancelledError):
+                raise
+            log.debug("[att-cache] fetch %s failed: %r", aid, ex)
+            return None
+        finally:
+            self._inflight.pop(key, None)
+
+    async def phash_list(self, entry: AttachmentEntry, **kw) -> List[str]:
+        """pHash list for an entry, computed once via the hashing pool."""
+        key = "phash:" + ",".join(f"{k}={v}" for k, v in sorted(kw.items()))
+        if key not in entry.hashes:
+            from .hash_pool import get_hash_service
+            entry.hashes[key] = await get_hash_service().phash_list(entry.data or b"", **kw)
+        return entry.hashes[key]
+
+
+_cache: Optional[AttachmentCache] = None
+
+def get_attachment_cache() -> AttachmentCache:
+    global _cache
+    if _cache is None:
+        _cache = AttachmentCache()
+    return _cache
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+"""
+attachment_fetch.py
+- Download attachment secara streaming; tidak pernah buffer lebih dari max_bytes.
+  Default IMAGE_MAX_BYTES (longgar, sama dengan batas hash pool) untuk image guard / backfill;
+  MAX_BYTES = cap OCR (lebih ketat), hanya dipakai oleh call site OCR.
+- Non-200: 429/5xx -> FetchFailed (transient), 4xx lain -> FetchRejected (permanen).
+- Early reject: size metadata / Content-Length kebesaran, chunk pertama bukan magic bytes gambar.
+- Satu aiohttp.ClientSession (keep-alive pool) dipakai bareng semua fetch attachment.
+"""
+import os, asyncio, logging
+from typing import Optional
+
+try:
+    import aiohttp
+except Exception:  # pragma: no cover
+    aiohttp = None  # type: ignore
+
+log = logging.getLogger(__name__)
+
+MAX_BYTES = int(os.getenv("ATT_FETCH_MAX_BYTES", "1572864"))   # cap OCR
+# cap non-OCR: gambar lebih besar dari ini toh ditolak hash pool
+IMAGE_MAX_BYTES = int(os.getenv("ATT_FETCH_IMAGE_MAX_BYTES", os.getenv("HASH_POOL_MAX_BYTES", str(8 * 1024 * 1024))))
+CHUNK_SIZE = int(os.getenv("ATT_FETCH_CHUNK", "65536"))
+FETCH_TIMEOUT_SEC = float(os.getenv("ATT_FETCH_TIMEOUT_SEC", "15"))
+POOL_LIMIT = int(os.getenv("ATT_FETCH_POOL_LIMIT", "16"))
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+def sniff_image(head: bytes) -> Optional[str]:
+    """Mime type from magic bytes, or None if the payload is not a known image format."""
+    if not head:
+        return None
+    for sig, mime in _MAGIC:
+        if head.startswith(sig):
+            return mime
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if len(head) >= 12 and head[4:8] == b"ftyp" and head[8:12] in {b"avif", b"avis", b"heic", b"heix", b"mif1"}:
+        return "image/avif" if head[8:11] == b"avi" else "image/heic"
+    return None
+
+
+class FetchRejected(Exception):
+    """Permanent: payload bukan gambar / kebesaran / 4xx (link hilang). Retry tidak akan menolong."""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class FetchFailed(Exception):
+    """Transient: 429 / 5xx dari CDN. Pemanggil boleh retry (backfill menahan cursor)."""
+    def __init__(self, status: int):
+        super().__init__(f"http {status}")
+        self.status = status
+
+
+_TRANSIENT_STATUS = {408, 425, 429}
+
+
+_session = None
+_session_loop = None
+
+async def get_session():
+    """Shared keep-alive session (recreated if closed or bound to another loop)."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=POOL_LIMIT, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT_SEC),
+        )
+        _session_loop = loop
+    return _session
+
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+def _over(n: int, max_bytes: Optional[int]) -> bool:
+    return bool(max_bytes) and n > max_bytes
+
+def _precheck(attachment, max_bytes: Optional[int]) -> None:
+    size = int(getattr(attachment, "size", 0) or 0)
+    if size and _over(size, max_bytes):
+        raise FetchRejected(f"size {size} > {max_bytes}")
+    ctype = (getattr(attachment, "content_type", None) or "").lower()
+    if ctype and not ctype.startswith("image/"):
+        raise FetchRejected(f"content_type {ctype}")
+
+async def fetch_url_bounded(url: str, max_bytes: Optional[int] = IMAGE_MAX_BYTES) -> bytes:
+    """Stream an image URL; abort as soon as it is oversized or the first chunk is not an image."""
+    sess = await get_session()
+    async with sess.get(url) as resp:
+        if resp.status != 200:
+            if resp.status in _TRANSIENT_STATUS or resp.status >= 500:
+                raise FetchFailed(resp.status)
+            raise FetchRejected(f"http {resp.status}")
+        clen = resp.content_length
+        if clen is not None and _over(clen, max_bytes):
+            raise FetchRejected(f"content-length {clen} > {max_bytes}")
+        buf = bytearray()
+        sniffed = False
+        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+            if _over(len(buf) + len(chunk), max_bytes):
+                raise FetchRejected(f"stream > {max_bytes}")
+            buf += chunk
+            if not sniffed and len(buf) >= 16:
+                if sniff_image(bytes(buf[:16])) is None:
+                    raise FetchRejected("not an image (magic bytes)")
+                sniffed = True
+        if not sniffed and sniff_image(bytes(buf)) is None:
+            raise FetchRejected("not an image (magic bytes)")
+        return bytes(buf)
+
+async def read_image_bounded(attachment, max_bytes: Optional[int] = IMAGE_MAX_BYTES) -> bytes:
+    """Image download for a discord.Attachment, capped at max_bytes (raises FetchRejected)."""
+    _precheck(attachment, max_bytes)
+    url = getattr(attachment, "url", None)
+    if aiohttp is not None and isinstance(url, str) and url.startswith("http"):
+        return await fetch_url_bounded(url, max_bytes)
+    # fallback (tanpa aiohttp / objek attachment non-standar)
+    data = await attachment.read()
+    if _over(len(data), max_bytes):
+        raise FetchRejected(f"size {len(data)} > {max_bytes}")
+    if sniff_image(data[:16]) is None:
+        raise FetchRejected("not an image (magic bytes)")
+    return data
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import os, time, sqlite3, pathlib
+import os, time, sqlite3, asyncio, pathlib
 from typing import Optional
 
 def _guess_db_path() -> str:
@@ -100,3 +100,22 @@ def state_set(key: str, value: str):
         con.commit()
     finally:
         con.close()
+
+# Async variants for cogs: connect + commit (fsync) run in a worker thread, not on the event loop.
+async def acreate_ticket(kind: str, module: str, reason: str, critical: bool=False) -> int:
+    return await asyncio.to_thread(create_ticket, kind, module, reason, critical)
+
+async def aupdate_ticket_status(ticket_id: int, status: str):
+    return await asyncio.to_thread(update_ticket_status, ticket_id, status)
+
+async def aget_ticket(ticket_id: int):
+    return await asyncio.to_thread(get_ticket, ticket_id)
+
+async def alatest_pending():
+    return await asyncio.to_thread(latest_pending)
+
+async def alist_pending(limit: int=10):
+    return await asyncio.to_thread(list_pending, limit)
+
+async def astate_set(key: str, value: str):
+    return await asyncio.to_thread(state_set, key, value)
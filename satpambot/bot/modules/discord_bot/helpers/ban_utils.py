@@ -5,6 +5,12 @@ import discord
 log = logging.getLogger(__name__)
 
 async def safe_ban_7d(guild: discord.Guild, user: discord.abc.Snowflake, reason: str = "SatpamBot: policy violation") -> bool:
+    """Ban + hapus 7 hari pesan, lewat antrian moderasi (dedupe, bulk_ban saat raid, concurrency terbatas)."""
+    from .mod_actions import get_mod_executor
+    return await get_mod_executor().ban(guild, user, reason=reason)
+
+async def ban_now(guild: discord.Guild, user: discord.abc.Snowflake, reason: str = "SatpamBot: policy violation") -> bool:
+    """Direct single ban (used by the moderation executor)."""
     try:
         await guild.ban(user, reason=reason, delete_message_days=7)  # type: ignore
         return True
@@ -1,5 +1,18 @@
-import os, json, asyncio, logging, inspect
+"""
+discord_pinned_kv.py
+- Map JSON (status XP/learning) disimpan di satu pesan pinned; dibaca sekali ke memory,
+  setelah itu map di memory yang authoritative untuk seluruh proses (semua PinnedJSONKV(bot)
+  berbagi satu _KVStore).
+- set_multi/incr/compare_and_swap hanya mengubah memory + menandai key dirty; flush debounced
+  (KV_JSON_FLUSH_SEC, minimal KV_JSON_MIN_EDIT_SEC antar edit) -> satu edit pesan untuk banyak set.
+  Edit via channel.get_partial_message(id), tanpa fetch_message.
+- Snapshot lokal (KV_JSON_SNAPSHOT_PATH) ditulis tiap flush; kalau Discord tidak bisa dibaca saat
+  load, map diambil dari snapshot (degraded) dan key dirty tetap dicoba di-flush dengan backoff.
+- Metrik: sets, coalesced, flushes, gagal, lag (umur perubahan tertua yang belum ter-flush).
+"""
+import os, json, time, atexit, asyncio, logging
 from typing import Optional, Dict, Any
+from . import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -9,6 +22,8 @@ _DEFAULTS = {
     "KV_JSON_MESSAGE_ID": "1432060859252998268",
     "KV_JSON_MARKER": "leina:xp_status",
     "KV_JSON_MIN_EDIT_SEC": "2",
+    "KV_JSON_FLUSH_SEC": "2",
+    "KV_JSON_SNAPSHOT_PATH": os.path.join("data", "runtime", "pinned_kv_snapshot.json"),
     "XP_SENIOR_KEY": "xp:bot:senior_total",
 }
 # ============================================================================
@@ -45,171 +60,359 @@ try:
     _min_edit = float(_getenv("KV_JSON_MIN_EDIT_SEC","KV_JSON_MIN_EDIT_SEC") or "2")
 except Exception:
     _min_edit = 2.0
+try:
+    _flush_sec = float(_getenv("KV_JSON_FLUSH_SEC","KV_JSON_FLUSH_SEC") or "2")
+except Exception:
+    _flush_sec = 2.0
+KV_SNAPSHOT_PATH = _env_str("KV_JSON_SNAPSHOT_PATH", "KV_JSON_SNAPSHOT_PATH")
+KV_FLUSH_BACKOFF_MAX = 60.0
+
 
 _CONTENT_TMPL = """{marker}
 ```json
 {payload}
 ```"""
 
-class PinnedJSONKV:
-    """
-    Minimal JSON KV store backed by a pinned Discord message.
-    Stores a single JSON object mapping string keys -> scalar/objects.
-    """
-    def __init__(self, bot):
-        self.bot = bot
-        self._msg_id = None
-        self._lock = asyncio.Lock()
-        self._last_edit_ts = 0.0
-        self._min_edit_interval = _min_edit
-        self._cache: Dict[str, Any] = {}
-
-    # ---- public ------------------------------------------------------------
-    async def ensure_ready(self) -> Optional[int]:
-        try:
-            mid = await self._resolve_message_id()
-            return mid
-        except Exception as e:
-            log.warning("[kv-json] ensure_ready failed: %r", e)
-            return None
+_MISSING = object()
 
-    async def get_map(self) -> Dict[str, Any]:
-        async with self._lock:
-            await self._ensure_message()
-            msg = await self._fetch_message()
-            data = self._parse_map(msg)
-            if isinstance(data, dict):
-                self._cache = data
-                return dict(data)
-            return {}
 
-    async def get(self, key: str, default=None):
-        m = await self.get_map()
-        return m.get(key, default)
+def _render(data: Dict[str, Any]) -> str:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",",":"))
+    return _CONTENT_TMPL.format(marker=KV_MARK or "", payload=payload)
 
-    async def set_multi(self, updates: Dict[str, Any]) -> bool:
-        async with self._lock:
-            await self._ensure_message()
-            msg = await self._fetch_message()
-            data = self._parse_map(msg) or {}
-            changed = False
-            for k, v in updates.items():
-                if data.get(k) != v:
-                    data[k] = v
-                    changed = True
-            if not changed:
-                return False
-            now = asyncio.get_running_loop().time()
-            if now - self._last_edit_ts < self._min_edit_interval:
-                await asyncio.sleep(self._min_edit_interval - (now - self._last_edit_ts))
-            payload = json.dumps(data, ensure_ascii=False, separators=(",",":"))
-            content = _CONTENT_TMPL.format(marker=KV_MARK or "", payload=payload)
-            await msg.edit(content=content)
-            try:
-                await msg.pin()
-            except Exception:
-                pass
-            self._cache = data
-            self._last_edit_ts = asyncio.get_running_loop().time()
-            return True
-
-    async def incr(self, key: str, delta: int) -> int:
-        async with self._lock:
-            await self._ensure_message()
-            msg = await self._fetch_message()
-            data = self._parse_map(msg) or {}
-            cur = 0
-            try:
-                cur = int(data.get(key, 0))
-            except Exception:
-                try:
-                    cur = int(float(data.get(key, 0)))
-                except Exception:
-                    cur = 0
-            newv = cur + int(delta)
-            data[key] = newv
-            payload = json.dumps(data, ensure_ascii=False, separators=(",",":"))
-            content = _CONTENT_TMPL.format(marker=KV_MARK or "", payload=payload)
-            await msg.edit(content=content)
-            try:
-                await msg.pin()
-            except Exception:
-                pass
-            self._cache = data
-            self._last_edit_ts = asyncio.get_running_loop().time()
-            return newv
+def _parse_content(content: Optional[str]) -> Dict[str, Any]:
+    try:
+        content = content or ""
+        start = content.find("```json")
+        if start == -1:
+            start = content.find("```")
+        if start == -1:
+            return {}
+        end = content.find("```", start+3)
+        if end == -1:
+            return {}
+        blob = content[start:].split("```",1)[1]
+        if "\n" in blob:
+            blob = blob.split("\n",1)[1]
+        blob = blob.strip()
+        if blob.endswith("```"):
+            blob = blob[:-3].strip()
+        data = json.loads(blob) if blob else {}
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
 
-    # ---- internals ---------------------------------------------------------
-    def _parse_map(self, msg) -> Optional[Dict[str, Any]]:
+def _to_int(v, d=0) -> int:
+    try:
+        return int(v)
+    except Exception:
         try:
-            content = msg.content or ""
-            start = content.find("```json")
-            if start == -1:
-                start = content.find("```")
-            if start == -1:
-                return {}
-            end = content.find("```", start+3)
-            if end == -1:
-                return {}
-            blob = content[start:].split("```",1)[1]
-            if "\n" in blob:
-                blob = blob.split("\n",1)[1]
-            blob = blob.strip()
-            if blob.endswith("```"):
-                blob = blob[:-3].strip()
-            return json.loads(blob) if blob else {}
+            return int(float(v))
         except Exception:
-            return {}
+            return d
 
-    async def _resolve_message_id(self) -> Optional[int]:
-        if self._msg_id:
-            return self._msg_id
-        chan_id = KV_CHAN
-        if not chan_id:
+
+class _KVStore:
+    """Process-wide authoritative map + dirty set behind every PinnedJSONKV handle."""
+    def __init__(self, bot=None, flush_sec: float = _flush_sec, min_edit_sec: float = _min_edit,
+                 snapshot_path: Optional[str] = KV_SNAPSHOT_PATH):
+        self.bot = bot
+        self.flush_sec = flush_sec
+        self.min_edit_sec = min_edit_sec
+        self.snapshot_path = snapshot_path
+        self._map: Dict[str, Any] = {}
+        self._dirty: set = set()
+        self._dirty_since = 0.0
+        self._loaded = False      # map terisi (Discord atau snapshot)
+        self._synced = False      # map sudah dibaca dari pesan Discord
+        self._msg_id: Optional[int] = None
+        self._load_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_edit = 0.0
+        self._fail_streak = 0
+        self.stats = {"loads": 0, "snapshot_loads": 0, "sets": 0, "coalesced": 0, "cas_conflicts": 0,
+                      "flushes": 0, "flush_failures": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0}
+
+    # ---------- Discord message ----------
+    async def _channel(self):
+        if not KV_CHAN or self.bot is None:
             return None
-        ch = self.bot.get_channel(chan_id)
+        ch = self.bot.get_channel(KV_CHAN)
         if ch is None:
             try:
-                ch = await self.bot.fetch_channel(chan_id)
+                ch = await self.bot.fetch_channel(KV_CHAN)
             except Exception:
                 return None
-        msg_id = KV_MSG
-        if msg_id:
+        return ch
+
+    async def _resolve(self):
+        """(message, created) for the KV message; finds it by id, then by marker, else creates it."""
+        ch = await self._channel()
+        if ch is None:
+            return None, False
+        for mid in dict.fromkeys((self._msg_id, KV_MSG)):
+            if not mid:
+                continue
             try:
-                msg = await ch.fetch_message(msg_id)
-                self._msg_id = int(msg.id)
-                return self._msg_id
+                msg = await ch.fetch_message(mid)
+                if getattr(msg, "pinned", True) is False:
+                    try:
+                        await msg.pin()
+                        pin_index.get_pin_index().note_pinned(msg)
+                    except Exception:
+                        pass
+                return msg, False
             except Exception:
-                pass
+                continue
         try:
-            pins = await ch.pins()
-            for m in pins:
+            for m in await pin_index.pins(ch):
                 if m.content and (KV_MARK or "") in m.content:
-                    self._msg_id = int(m.id)
-                    return self._msg_id
+                    return m, False
         except Exception:
             pass
         try:
-            content = _CONTENT_TMPL.format(marker=KV_MARK or "", payload="{}")
-            m = await ch.send(content)
+            m = await ch.send(_render({}))
             try:
                 await m.pin()
+                pin_index.get_pin_index().note_pinned(m)
             except Exception:
                 pass
-            self._msg_id = int(m.id)
-            return self._msg_id
+            return m, True
         except Exception as e:
             log.warning("[kv-json] create message failed: %r", e)
+            return None, False
+
+    # ---------- load ----------
+    async def load(self, force: bool = False) -> bool:
+        """Read the pinned map once; local keys still dirty win over the remote copy."""
+        async with self._load_lock:
+            if self._synced and not force:
+                return True
+            try:
+                msg, created = await self._resolve()
+            except Exception as e:
+                log.debug("[kv-json] resolve failed: %r", e)
+                msg, created = None, False
+            if msg is None:
+                if not self._loaded:
+                    self._map = self._read_snapshot()
+                    self._loaded = True
+                    self.stats["snapshot_loads"] += 1
+                    log.warning("[kv-json] Discord unavailable -> local snapshot (%d keys)", len(self._map))
+                return False
+            self._msg_id = int(msg.id)
+            if created:
+                local = self._map if self._loaded else self._read_snapshot()
+                self._map = dict(local)
+                if self._map:
+                    self._touch(self._map.keys())
+            else:
+                remote = _parse_content(getattr(msg, "content", None))
+                for k in self._dirty:
+                    if k in self._map:
+                        remote[k] = self._map[k]
+                self._map = remote
+            self._loaded = self._synced = True
+            self.stats["loads"] += 1
+            return True
+
+    async def ensure_loaded(self) -> None:
+        if not self._loaded:
+            await self.load()
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        """Copy of the in-memory map without any I/O; None before the first load."""
+        return dict(self._map) if self._loaded else None
+
+    @property
+    def message_id(self) -> Optional[int]:
+        return self._msg_id
+
+    # ---------- writes ----------
+    def _touch(self, keys) -> None:
+        if self._dirty:
+            self.stats["coalesced"] += 1
+        else:
+            self._dirty_since = time.monotonic()
+        self._dirty.update(keys)
+        self.stats["sets"] += 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later(), name="kv-json-flush")
+
+    async def get_map(self) -> Dict[str, Any]:
+        await self.ensure_loaded()
+        return dict(self._map)
+
+    async def set_multi(self, updates: Dict[str, Any]) -> bool:
+        await self.ensure_loaded()
+        changed = [k for k, v in updates.items() if self._map.get(k, _MISSING) != v]
+        if not changed:
+            return False
+        for k in changed:
+            self._map[k] = updates[k]
+        self._touch(changed)
+        return True
+
+    async def incr(self, key: str, delta: int) -> int:
+        await self.ensure_loaded()
+        newv = _to_int(self._map.get(key, 0), 0) + int(delta)
+        self._map[key] = newv
+        self._touch((key,))
+        return newv
+
+    async def compare_and_swap(self, key: str, expected: Any, new: Any) -> bool:
+        """Set `key` to `new` only if it currently equals `expected` (None = absent)."""
+        await self.ensure_loaded()
+        if self._map.get(key) != expected:
+            self.stats["cas_conflicts"] += 1
+            return False
+        if self._map.get(key, _MISSING) != new:
+            self._map[key] = new
+            self._touch((key,))
+        return True
+
+    # ---------- flush ----------
+    async def _flush_later(self) -> None:
+        delay = self.flush_sec
+        while self._dirty:
+            wait = max(delay, self._last_edit + self.min_edit_sec - time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if await self.flush():
+                delay = self.flush_sec
+            else:
+                delay = min(KV_FLUSH_BACKOFF_MAX, max(1.0, self.min_edit_sec) * (2 ** self._fail_streak))
+
+    async def flush(self) -> bool:
+        """Write all dirty keys in one message edit (and the local snapshot)."""
+        import discord
+        async with self._flush_lock:
+            if not self._dirty:
+                return True
+            if not self._synced:
+                await self.load()
+            keys, since = set(self._dirty), self._dirty_since
+            self._dirty.clear()
+            self._dirty_since = 0.0
+            data = dict(self._map)
+            self._write_snapshot(data)
+            ok = False
+            try:
+                ch = await self._channel() if self._synced and self._msg_id else None
+                if ch is not None:
+                    wait = self._last_edit + self.min_edit_sec - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    await ch.get_partial_message(self._msg_id).edit(content=_render(data))
+                    self._last_edit = time.monotonic()
+                    ok = True
+            except discord.NotFound:
+                log.warning("[kv-json] message %s gone, will recreate", self._msg_id)
+                self._msg_id = None
+                self._synced = False
+            except Exception as e:
+                log.debug("[kv-json] flush failed: %r", e)
+            if not ok:
+                self._dirty |= keys
+                self._dirty_since = min(since, self._dirty_since) if self._dirty_since else since
+                self._fail_streak += 1
+                self.stats["flush_failures"] += 1
+                return False
+            self._fail_streak = 0
+            lag = (time.monotonic() - since) * 1000.0 if since else 0.0
+            self.stats["flushes"] += 1
+            self.stats["last_lag_ms"] = lag
+            if lag > self.stats["max_lag_ms"]:
+                self.stats["max_lag_ms"] = lag
+            return True
+
+    # ---------- local snapshot ----------
+    def _read_snapshot(self) -> Dict[str, Any]:
+        if not self.snapshot_path:
+            return {}
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _write_snapshot(self, data: Optional[Dict[str, Any]] = None) -> None:
+        if not self.snapshot_path or not self._loaded:
+            return
+        try:
+            d = os.path.dirname(self.snapshot_path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._map if data is None else data, f, ensure_ascii=False, separators=(",",":"))
+            os.replace(tmp, self.snapshot_path)
+        except Exception as e:
+            log.debug("[kv-json] snapshot write failed: %r", e)
+
+    def report(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out["dirty"] = len(self._dirty)
+        out["lag_ms"] = (time.monotonic() - self._dirty_since) * 1000.0 if self._dirty_since else 0.0
+        out["degraded"] = self._loaded and not self._synced
+        out["msg_id"] = self._msg_id
+        return out
+
+
+_store: Optional[_KVStore] = None
+
+def get_kv_store(bot=None) -> _KVStore:
+    global _store
+    if _store is None:
+        _store = _KVStore(bot)
+        atexit.register(_store._write_snapshot)
+    elif bot is not None:
+        _store.bot = bot
+    return _store
+
+
+class PinnedJSONKV:
+    """
+    Minimal JSON KV store backed by a pinned Discord message.
+    Stores a single JSON object mapping string keys -> scalar/objects.
+    Every instance is a handle on the shared in-memory store; writes are flushed in batches.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self._store = get_kv_store(bot)
+
+    # ---- public ------------------------------------------------------------
+    async def ensure_ready(self) -> Optional[int]:
+        try:
+            await self._store.load()
+            return self._store.message_id
+        except Exception as e:
+            log.warning("[kv-json] ensure_ready failed: %r", e)
             return None
 
-    async def _ensure_message(self):
-        if not self._msg_id:
-            await self._resolve_message_id()
+    async def get_map(self) -> Dict[str, Any]:
+        return await self._store.get_map()
 
-    async def _fetch_message(self):
-        chan_id = KV_CHAN
-        ch = self.bot.get_channel(chan_id)
-        if ch is None:
-            ch = await self.bot.fetch_channel(chan_id)
-        msg = await ch.fetch_message(self._msg_id)
-        return msg
+    def peek_map(self) -> Optional[Dict[str, Any]]:
+        return self._store.peek()
+
+    async def get(self, key: str, default=None):
+        m = await self.get_map()
+        return m.get(key, default)
+
+    async def set_multi(self, updates: Dict[str, Any]) -> bool:
+        return await self._store.set_multi(updates)
+
+    async def incr(self, key: str, delta: int) -> int:
+        return await self._store.incr(key, delta)
+
+    async def compare_and_swap(self, key: str, expected: Any, new: Any) -> bool:
+        return await self._store.compare_and_swap(key, expected, new)
+
+    async def flush(self) -> bool:
+        return await self._store.flush()
+
+    def report(self) -> Dict[str, Any]:
+        return self._store.report()
@@ -6,6 +6,7 @@ import logging
 from typing import Optional, Any
 
 import discord
+from . import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -30,7 +31,9 @@ class EmbedScribe:
         Upsert a single message in a channel with a stable 'marker' to avoid duplicates.
         Returns the message id on success, otherwise None.
         - If message_id given, try to edit that message.
-        - Else: search pinned messages for `marker`, edit first match, otherwise send new.
+        - Else: the message id for (channel, marker) comes from the shared status_registry;
+          pins are searched for `marker` only when it is not indexed yet. Edit without
+          fetch_message, otherwise send new. Rapid upserts collapse to the newest payload.
         - No @mentions, no TTS, safe for Render free.
         """
         try:
@@ -55,56 +58,40 @@ class EmbedScribe:
             except Exception:
                 embed = None
 
+        from .status_registry import get_registry
+        reg = get_registry()
+        key = f"scribe:{cid}:{marker}"
         try:
-            # 1) If message_id provided, edit directly
-            if message_id:
+            # 1) If message_id provided, edit that one (no fetch_message; registry holds a partial)
+            if message_id and reg.message_id(key) != int(message_id) and hasattr(ch, "get_partial_message"):
+                reg.remember(key, ch.get_partial_message(int(message_id)))
+
+            # 2) Not indexed yet: look up the pinned message carrying `marker` (cached pin index)
+            if reg.message_id(key) is None and marker:
                 try:
-                    msg = await ch.fetch_message(int(message_id))
-                    await msg.edit(content=(content or f"{marker}"), embed=embed)
-                    if pin:
-                        try: await msg.pin()
-                        except Exception: pass
-                    return msg.id
+                    target = await pin_index.get_pin_index().find_marker(ch, marker)
+                    if target is not None:
+                        reg.remember(key, target)
                 except Exception:
-                    # fallthrough to search+create
+                    # pins() may require permissions; ignore
                     pass
 
-            # 2) Search existing pinned messages that contain marker
-            target = None
-            try:
-                pins = await ch.pins()
-                for m in pins:
-                    if marker and ((m.content and marker in m.content) or (m.embeds and any(marker in (m.embeds[0].footer.text or "") for _ in [0]))):
-                        target = m
-                        break
-            except Exception:
-                # pins() may require permissions; ignore
-                pass
-
-            if target is not None:
-                try:
-                    await target.edit(content=(content or target.content or f"{marker}"), embed=embed)
-                    if pin:
-                        try: await target.pin()
-                        except Exception: pass
-                    return target.id
-                except Exception as e:
-                    log.warning("[embed_scribe] edit failed: %r", e)
-
-            if edit_only:
-                # Do not create a new message if edit-only
-                return None
+            # 3) Edit in place, else send a new message (edit gagal -> kirim baru, kecuali edit_only)
+            async def _send(c, **kw):
+                return await c.send(silent=True, **kw)
 
-            # 3) Send a new message
             try:
-                msg = await ch.send(content=(content or f"{marker}"), embed=embed, silent=True)
-                if pin:
-                    try: await msg.pin()
-                    except Exception: pass
-                return msg.id
+                msg = await reg.upsert(ch, key, edit_only=edit_only, send=_send,
+                                       content=(content or f"{marker}"), embed=embed)
             except Exception as e:
-                log.warning("[embed_scribe] send failed: %r", e)
+                log.warning("[embed_scribe] upsert failed: %r", e)
+                return None
+            if msg is None:
                 return None
+            if pin:
+                try: await pin_index.ensure_pinned(ch, msg)
+                except Exception: pass
+            return msg.id
 
         except Exception as e:
             log.exception("[embed_scribe] upsert exception: %r", e)
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+"""
+hash_pool.py
+- Hashing service off the event loop: bounded ProcessPoolExecutor + async API.
+- Budget per job: ukuran bytes, jumlah frame, waktu.
+- Recycle tanpa mengganggu pemanggil lain: pool lama "dipensiunkan" (shutdown wait=False,
+  cancel_futures=False) dan pool baru dipakai untuk job berikutnya; job lain di pool lama tetap
+  selesai di sana. Job yang timeout saja yang gagal; worker yang macet di-terminate setelah
+  semua job lain di pool lama selesai. Worker crash (BrokenProcessPool) -> job dikirim ulang
+  sekali ke pool baru, tidak pernah jatuh ke thread in-process.
+- Dedupe by content SHA-256: attachment yang sama (dipost di 10 channel) cuma di-hash sekali;
+  request yang datang bersamaan menunggu future yang sama.
+- Worker recycling: max_tasks_per_child + RSS check di worker (psutil, optional).
+"""
+import os, asyncio, hashlib, logging, threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+HASH_POOL_ENABLED = os.getenv("HASH_POOL_ENABLED", "1").lower() in {"1", "true", "yes"}
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "2"))
+HASH_POOL_MAX_BYTES = int(os.getenv("HASH_POOL_MAX_BYTES", str(8 * 1024 * 1024)))
+HASH_POOL_MAX_FRAMES = int(os.getenv("HASH_POOL_MAX_FRAMES", "6"))
+HASH_POOL_TIMEOUT_SEC = float(os.getenv("HASH_POOL_TIMEOUT_SEC", "10"))
+HASH_POOL_MAX_RSS_MB = int(os.getenv("HASH_POOL_MAX_RSS_MB", "400"))
+HASH_POOL_TASKS_PER_CHILD = int(os.getenv("HASH_POOL_TASKS_PER_CHILD", "200"))
+HASH_POOL_CACHE_SIZE = int(os.getenv("HASH_POOL_CACHE_SIZE", "2048"))
+
+
+# ---------- worker side (top-level, picklable) ----------
+def _worker_rss_mb() -> int:
+    try:
+        import psutil  # type: ignore
+        return int(psutil.Process().memory_info().rss // (1024 * 1024))
+    except Exception:
+        return 0
+
+def _job_phash(data: bytes, kw: dict):
+    from satpambot.bot.modules.discord_bot.helpers.img_hashing import phash_list_from_bytes
+    return phash_list_from_bytes(data, **kw)
+
+def _job_tile(data: bytes, kw: dict):
+    from satpambot.bot.modules.discord_bot.helpers.img_hashing import tile_phash_list_from_bytes
+    return tile_phash_list_from_bytes(data, **kw)
+
+def _job_dhash(data: bytes, kw: dict):
+    from satpambot.bot.modules.discord_bot.helpers.img_hashing import dhash_list_from_bytes
+    return dhash_list_from_bytes(data, **kw)
+
+def _job_ocr_text(data: bytes, kw: dict):
+    from satpambot.bot.modules.discord_bot.helpers.score_utils import extract_text_ocr
+    return extract_text_ocr(data)
+
+_JOBS = {
+    "phash": _job_phash,
+    "tile": _job_tile,
+    "dhash": _job_dhash,
+    "ocr_text": _job_ocr_text,
+}
+
+def _run_job(kind: str, data: bytes, kw: dict) -> Tuple[Any, int]:
+    """Runs inside the worker process; returns (result, worker RSS MB)."""
+    return _JOBS[kind](data, kw), _worker_rss_mb()
+
+
+# ---------- parent side ----------
+class HashJobRejected(Exception):
+    pass
+
+class _Slot:
+    """One ProcessPoolExecutor plus the futures still outstanding on it."""
+    __slots__ = ("pool", "procs", "pending", "stuck", "retired")
+
+    def __init__(self, pool: ProcessPoolExecutor):
+        self.pool = pool
+        self.procs: Dict[int, Any] = {}   # pool._processes, diambil sebelum shutdown() mengosongkannya
+        self.pending: set = set()
+        self.stuck: set = set()   # job timeout yang masih jalan di worker
+        self.retired = False
+
+
+class HashService:
+    def __init__(self, workers: int = HASH_POOL_WORKERS, runner=None):
+        self.workers = max(1, workers)
+        self._runner = runner or _run_job
+        self._slot: Optional[_Slot] = None
+        self._retired: List[_Slot] = []
+        self._pool_lock = threading.RLock()
+        self._inflight: Dict[tuple, List[Any]] = {}
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.stats = {"jobs": 0, "dedup": 0, "cache_hit": 0, "timeouts": 0, "rejected": 0, "recycles": 0,
+                      "killed": 0, "resubmits": 0}
+
+    # -- pool lifecycle --
+    def _get_slot(self) -> Optional[_Slot]:
+        if not HASH_POOL_ENABLED:
+            return None
+        with self._pool_lock:
+            if self._slot is None:
+                try:
+                    kwargs = {"max_workers": self.workers}
+                    if HASH_POOL_TASKS_PER_CHILD > 0:
+                        import multiprocessing as mp
+                        kwargs["mp_context"] = mp.get_context("spawn")
+                        kwargs["max_tasks_per_child"] = HASH_POOL_TASKS_PER_CHILD
+                    self._slot = _Slot(ProcessPoolExecutor(**kwargs))
+                except Exception as e:
+                    log.warning("[hash-pool] process pool unavailable, using threads: %r", e)
+                    return None
+            return self._slot
+
+    @staticmethod
+    def _terminate(slot: _Slot) -> None:
+        for p in list((getattr(slot.pool, "_processes", None) or slot.procs).values()):
+            try:
+                p.terminate()
+            except Exception:
+                pass
+
+    def _reap(self, slot: _Slot) -> None:
+        """Retired pool with only stuck jobs left -> terminate its workers."""
+        with self._pool_lock:
+            if not slot.retired or (slot.pending - slot.stuck):
+                return
+            if slot in self._retired:
+                self._retired.remove(slot)
+            stuck = bool(slot.stuck)
+        if stuck:
+            self.stats["killed"] += 1
+            self._terminate(slot)
+
+    def _retire(self, slot: _Slot) -> None:
+        """Swap in a fresh pool for new jobs; jobs already on `slot` keep running there."""
+        with self._pool_lock:
+            if self._slot is slot:
+                self._slot = None
+            if slot.retired:
+                return
+            slot.retired = True
+            self._retired.append(slot)
+        self.stats["recycles"] += 1
+        slot.procs = getattr(slot.pool, "_processes", None) or {}
+        try:
+            slot.pool.shutdown(wait=False, cancel_futures=False)
+        except Exception:
+            pass
+        self._reap(slot)
+
+    def recycle(self) -> None:
+        with self._pool_lock:
+            slot = self._slot
+        if slot is not None:
+            self._retire(slot)
+
+    def close(self) -> None:
+        with self._pool_lock:
+            slots = [s for s in [self._slot, *self._retired] if s is not None]
+            self._slot, self._retired = None, []
+        for slot in slots:
+            slot.retired = True
+            slot.procs = getattr(slot.pool, "_processes", None) or slot.procs
+            try:
+                slot.pool.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
+            self._terminate(slot)
+
+    def _job_done(self, slot: _Slot, fut) -> None:
+        with self._pool_lock:
+            slot.pending.discard(fut)
+            slot.stuck.discard(fut)
+        self._reap(slot)
+
+    def _submit_to(self, slot: _Slot, kind: str, data: bytes, kw: dict):
+        fut = slot.pool.submit(self._runner, kind, data, kw)
+        with self._pool_lock:
+            slot.pending.add(fut)
+        fut.add_done_callback(lambda f, slot=slot: self._job_done(slot, f))
+        return fut
+
+    # -- jobs --
+    def _key(self, kind: str, data: bytes, kw: dict) -> tuple:
+        return (kind, hashlib.sha256(data).hexdigest(), tuple(sorted(kw.items())))
+
+    def _remember(self, key: tuple, val: Any) -> None:
+        self._cache[key] = val
+        self._cache.move_to_end(key)
+        while len(self._cache) > HASH_POOL_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def run(self, kind: str, data: bytes, timeout: Optional[float] = None, **kw) -> Any:
+        """Run a hashing job; raises HashJobRejected (budget) or asyncio.TimeoutError."""
+        if kind not in _JOBS:
+            raise ValueError(f"unknown hash job: {kind}")
+        if not data:
+            return [] if kind != "ocr_text" else ""
+        if len(data) > HASH_POOL_MAX_BYTES:
+            self.stats["rejected"] += 1
+            raise HashJobRejected(f"{len(data)} bytes > {HASH_POOL_MAX_BYTES}")
+        if "max_frames" in kw or kind in {"phash", "tile", "dhash"}:
+            kw["max_frames"] = min(int(kw.get("max_frames", HASH_POOL_MAX_FRAMES)), HASH_POOL_MAX_FRAMES)
+        key = self._key(kind, data, kw)
+        if key in self._cache:
+            self.stats["cache_hit"] += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        ent = self._inflight.get(key)
+        if ent is None:
+            task = asyncio.ensure_future(self._submit(kind, data, kw, timeout or HASH_POOL_TIMEOUT_SEC))
+            ent = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda t, key=key: self._finish(key, t))
+        else:
+            self.stats["dedup"] += 1
+        ent[1] += 1
+        try:
+            return await asyncio.shield(ent[0])
+        finally:
+            ent[1] -= 1
+            if ent[1] <= 0 and not ent[0].done():
+                ent[0].cancel()  # semua pemanggil batal -> job yang masih antri ikut batal
+
+    def _finish(self, key: tuple, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is None:
+            self._remember(key, task.result())
+
+    async def _submit(self, kind: str, data: bytes, kw: dict, timeout: float) -> Any:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.workers * 2)
+        async with self._sem:
+            self.stats["jobs"] += 1
+            slot = self._get_slot()
+            if slot is None:
+                res, _ = await asyncio.wait_for(asyncio.to_thread(self._runner, kind, data, kw), timeout)
+                return res
+            for attempt in (0, 1):
+                if slot is None:
+                    raise BrokenProcessPool("no process pool available")
+                try:
+                    fut = self._submit_to(slot, kind, data, kw)
+                except RuntimeError as e:   # pool sudah shutdown / broken saat submit
+                    fut = asyncio.get_running_loop().create_future()
+                    fut.set_exception(BrokenProcessPool(str(e)))
+                try:
+                    res, rss = await asyncio.wait_for(asyncio.wrap_future(fut), timeout)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    with self._pool_lock:
+                        running = not fut.cancelled() and not fut.done()
+                        if running:
+                            slot.stuck.add(fut)
+                    if running:
+                        # worker macet di job ini: pool baru untuk job berikutnya, worker lama
+                        # di-terminate setelah job pemanggil lain selesai
+                        log.warning("[hash-pool] %s job timeout (%.1fs, %d bytes) -> retire pool", kind, timeout, len(data))
+                        self._retire(slot)
+                    raise
+                except BrokenProcessPool as e:
+                    # worker crash / pool sudah shutdown: hanya job ini yang dikirim ulang, sekali
+                    self._retire(slot)
+                    if attempt:
+                        raise
+                    log.warning("[hash-pool] pool broken (%r) -> resubmit %s job to a fresh pool", e, kind)
+                    self.stats["resubmits"] += 1
+                    slot = self._get_slot()
+                    continue
+                if HASH_POOL_MAX_RSS_MB and rss > HASH_POOL_MAX_RSS_MB:
+                    log.info("[hash-pool] worker rss=%dMB > %dMB -> recycle", rss, HASH_POOL_MAX_RSS_MB)
+                    self._retire(slot)
+                return res
+
+    async def phash_list(self, data: bytes, **kw):
+        return await self.run("phash", data, **kw)
+
+    async def tile_phash_list(self, data: bytes, **kw):
+        return await self.run("tile", data, **kw)
+
+    async def dhash_list(self, data: bytes, **kw):
+        return await self.run("dhash", data, **kw)
+
+    async def ocr_text(self, data: bytes) -> str:
+        return await self.run("ocr_text", data)
+
+
+_service: Optional[HashService] = None
+
+def get_hash_service() -> HashService:
+    global _service
+    if _service is None:
+        _service = HashService()
+    return _service
@@ -1,6 +1,14 @@
 
-import io
-from typing import List, Iterable, Optional, Set
+import io, hashlib
+from collections import OrderedDict
+from typing import List, Iterable, Optional, Set, Tuple
+
+from satpambot.bot.modules.discord_bot.helpers.phash_index import PhashIndex, TileIndex, get_default_index
+try:
+    from satpambot.bot.modules.discord_bot.helpers.phash_packed import PackedPhashDB, parse_candidates
+except Exception:  # numpy missing
+    class PackedPhashDB:  # type: ignore
+        pass
 try:
     from PIL import Image, ImageSequence, ImageFile, ImageOps, ImageFilter
     ImageFile.LOAD_TRUNCATED_IMAGES = True
@@ -123,6 +131,34 @@ def phash_list_from_bytes(data: bytes, max_frames: int = 6, augment: bool = Fals
     return out
 
 def phash_hit(hashes: Iterable[str], db: Iterable[str], max_distance: int = 0) -> Optional[str]:
+    """Exact hit returns the candidate hash; near hit returns the DB hash.
+
+    `db` may be a PhashIndex (indexed search), a PackedPhashDB (vectorized)
+    or None for the default file-backed index.
+    """
+    if isinstance(db, PackedPhashDB):
+        # same parse as match(): kept[j] pairs with i[j] even if some hashes are dropped
+        kept, cand = parse_candidates(h for h in hashes if h)
+        i, d = db.match(cand, 0)
+        for h, k in zip(kept, i):
+            if k >= 0:
+                return h
+        if max_distance > 0:
+            r = db.best(cand, max_distance)
+            if r is not None:
+                return r[0]
+        return None
+    if db is None or isinstance(db, PhashIndex):
+        idx = db if db is not None else get_default_index()
+        hashes = [h for h in hashes if h]
+        for h in hashes:
+            if h in idx:
+                return h
+        if max_distance > 0:
+            r = idx.best(hashes, max_distance)
+            if r is not None:
+                return r[0]
+        return None
     S = list(db) if not isinstance(db, (set, list, tuple)) else db
     for h in hashes:
         if not h:
@@ -130,14 +166,35 @@ def phash_hit(hashes: Iterable[str], db: Iterable[str], max_distance: int = 0) -
         if h in S:
             return h
     if max_distance > 0:
+        # parse DB once per call instead of once per candidate
+        parsed = []
+        for d in S:
+            try:
+                parsed.append((int(d, 16), d))
+            except Exception:
+                continue
         for h in hashes:
-            for d in S:
-                if _hamming_hex(h, d) <= max_distance:
+            try:
+                q = int(h, 16)
+            except Exception:
+                continue
+            for v, d in parsed:
+                if (v ^ q).bit_count() <= max_distance:
                     return d
     return None
 
+def phash_best(hashes: Iterable[str], db: Optional["PhashIndex"] = None, max_distance: int = 0) -> Optional[Tuple[str, int]]:
+    """Best (db_hash, distance) within max_distance using the index (default index if db is None)."""
+    idx = db if db is not None else get_default_index()
+    return idx.best(hashes, max_distance)
+
 
 # ---------- Tile pHash (grid-based) ----------
+def phash_hex(img) -> str:
+    if not imagehash or not img:
+        return ""
+    return str(imagehash.phash(img))
+
 def tile_phash_from_image(img: Image.Image, grid: int = 3) -> List[str]:
     """Return list of hex pHashes for grid*grid tiles of the image."""
     if not img or not Image:
@@ -190,35 +247,37 @@ def tile_phash_list_from_bytes(data: bytes, grid: int = 3, max_frames: int = 4,
         pass
     return out
 
+_tile_index_cache: "OrderedDict[str, TileIndex]" = OrderedDict()
+_TILE_INDEX_CACHE_MAX = 4
+
+def tile_index_for(db_sigs: Iterable[str]) -> TileIndex:
+    """Return a cached TileIndex for this DB content (rebuilt only when the DB changes)."""
+    if isinstance(db_sigs, TileIndex):
+        return db_sigs
+    # materialize once (generator aman) lalu key = sha1 isi DB, bukan hash() int yang bisa collide
+    sigs = tuple(sorted(db_sigs) if isinstance(db_sigs, (set, frozenset)) else db_sigs)
+    key = hashlib.sha1("\n".join(sigs).encode("utf-8")).hexdigest()
+    idx = _tile_index_cache.get(key)
+    if idx is None:
+        idx = TileIndex(sigs)
+        _tile_index_cache[key] = idx
+        while len(_tile_index_cache) > _TILE_INDEX_CACHE_MAX:
+            _tile_index_cache.popitem(last=False)
+    else:
+        _tile_index_cache.move_to_end(key)
+    return idx
+
 def tile_match_best(candidate_sigs: List[str], db_sigs: Iterable[str], grid: int, min_tiles: int, per_tile_max_distance: int) -> int:
     """
     Return best tile match count between candidate signatures and DB signatures.
     Two tile strings match on a tile if hamming(p,q) <= per_tile_max_distance.
+    `db_sigs` may be a TileIndex; plain lists are indexed once and cached by content.
     """
     if not candidate_sigs or not db_sigs:
         return 0
-    def split_sig(sig: str) -> List[str]:
-        return [x for x in sig.split("|") if x]
-    best = 0
-    DB = list(db_sigs) if not isinstance(db_sigs, (list, set, tuple)) else db_sigs
-    for cand in candidate_sigs:
-        C = split_sig(cand)
-        for db in DB:
-            D = split_sig(db)
-            if len(C) != len(D):
-                continue
-            hit = 0
-            for a, b in zip(C, D):
-                try:
-                    if _hamming_hex(a, b) <= per_tile_max_distance:
-                        hit += 1
-                except Exception:
-                    pass
-            if hit > best:
-                best = hit
-            if best >= min_tiles:
-                return best
-    return best
+    if not isinstance(db_sigs, (list, set, tuple, frozenset, TileIndex)):
+        db_sigs = list(db_sigs)
+    return tile_index_for(db_sigs).best(candidate_sigs, per_tile_max_distance, min_tiles)
 
 
 # ---------- ORB descriptors (optional, requires cv2) ----------
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+"""
+list_snapshot.py
+- Snapshot WL/BL immutable + versioned (domain set, pattern, matcher ter-compile) di memory.
+- Reader: current() -> satu baca referensi, tanpa lock, tanpa disk.
+- Writer: rebuild() baca file list, hitung SHA-256 kontennya; hanya kalau hash berubah
+  snapshot baru dibangun lalu di-swap (assignment referensi = atomic).
+- watch(on_change): task async yang cek mtime tiap LISTS_WATCH_SEC dan rebuild di thread (off the loop);
+  on_change dipanggil di event loop setiap kali versi berganti (broadcast ke cog).
+"""
+import os, json, time, asyncio, hashlib, logging, threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+LISTS_WATCH_SEC = float(os.getenv("LISTS_WATCH_SEC", "10"))
+
+
+@dataclass(frozen=True)
+class ListSnapshot:
+    version: int
+    digest: str
+    wl_domains: FrozenSet[str]
+    bl_domains: FrozenSet[str]
+    wl_patterns: Tuple[str, ...] = ()
+    bl_patterns: Tuple[str, ...] = ()
+    # url_check semantics: WL file (atau default brand list kalau file tidak ada/rusak)
+    check_whitelist: FrozenSet[str] = frozenset()
+    check_blacklist: FrozenSet[str] = frozenset()
+    matcher: Any = None
+    built_at: float = field(default_factory=time.time)
+
+    def as_lists(self) -> Dict[str, Set[str]]:
+        """Mutable copy in lists_loader.load_whitelist_blacklist() shape."""
+        return {"wl_domains": set(self.wl_domains), "wl_patterns": set(self.wl_patterns),
+                "bl_domains": set(self.bl_domains), "bl_patterns": set(self.bl_patterns)}
+
+
+def _paths() -> Dict[str, Path]:
+    from . import lists_loader
+    return {"wl": lists_loader.WL_FILE, "bl": lists_loader.BL_FILE,
+            "url_wl": lists_loader.URL_WL_JSON, "url_bl": lists_loader.URL_BL_JSON}
+
+def _read_bytes(p: Path) -> bytes:
+    try:
+        return p.read_bytes()
+    except OSError:
+        return b""
+
+def _json_or(raw: bytes, default):
+    try:
+        return json.loads(raw.decode("utf-8", errors="ignore")) if raw else default
+    except Exception:
+        return default
+
+def _build(raw: Dict[str, bytes], digest: str, version: int) -> ListSnapshot:
+    from . import lists_loader, url_check, safety_utils, score_utils
+    from .url_matcher import UrlMatcher
+    wl = set(lists_loader.parse_any(raw["wl"])) | set(lists_loader.parse_any(raw["url_wl"]))
+    bl = set(lists_loader.parse_any(raw["bl"])) | set(lists_loader.parse_any(raw["url_bl"]))
+    bl -= wl  # whitelist menang
+    check_wl = _json_or(raw["wl"], None)
+    if not isinstance(check_wl, list):
+        check_wl = url_check.DEFAULT_WHITELIST
+    check_bl = _json_or(raw["bl"], [])
+    if not isinstance(check_bl, list):
+        check_bl = []
+    check_wl = frozenset(str(x) for x in check_wl)
+    check_bl = frozenset(str(x) for x in check_bl)
+    matcher = UrlMatcher(
+        bad_domains=safety_utils.FAST_BAD_DOMAINS, bad_keywords=safety_utils.FAST_BAD_KEYWORDS,
+        flag_puny=safety_utils.FLAG_PUNY, whitelist=check_wl, blacklist=check_bl,
+        brands=url_check.CRITICAL_BRANDS, url_bad_tlds=score_utils.BAD_TLDS, url_keywords=score_utils.SUS_WORDS,
+    )
+    return ListSnapshot(version=version, digest=digest, wl_domains=frozenset(wl), bl_domains=frozenset(bl),
+                        check_whitelist=check_wl, check_blacklist=check_bl, matcher=matcher)
+
+
+_current: Optional[ListSnapshot] = None
+_write_lock = threading.Lock()
+_stat_sig: Optional[tuple] = None
+
+
+def _stat_signature() -> tuple:
+    out = []
+    for p in _paths().values():
+        try:
+            st = os.stat(p)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((0, 0))
+    return tuple(out)
+
+def rebuild(force: bool = False) -> ListSnapshot:
+    """Re-read list files; swap in a new snapshot only if their content hash changed."""
+    global _current, _stat_sig
+    with _write_lock:
+        sig = _stat_signature()
+        raw = {k: _read_bytes(p) for k, p in _paths().items()}
+        h = hashlib.sha256()
+        for k in sorted(raw):
+            h.update(k.encode()); h.update(b"\0"); h.update(raw[k]); h.update(b"\0")
+        digest = h.hexdigest()
+        _stat_sig = sig
+        cur = _current
+        if cur is not None and cur.digest == digest and not force:
+            return cur
+        snap = _build(raw, digest, (cur.version + 1) if cur else 1)
+        _current = snap
+        log.info("[lists] snapshot v%d wl=%d bl=%d", snap.version, len(snap.wl_domains), len(snap.bl_domains))
+        return snap
+
+def current() -> ListSnapshot:
+    """Current snapshot (lock-free); built from disk only on the very first call."""
+    snap = _current
+    if snap is None:
+        snap = rebuild()
+    return snap
+
+def changed_on_disk() -> bool:
+    return _stat_signature() != _stat_sig
+
+async def watch(on_change: Optional[Callable[[ListSnapshot], Any]] = None, interval: float = LISTS_WATCH_SEC) -> None:
+    """File watcher: cheap stat check on the loop, hashing + compile in a worker thread."""
+    while True:
+        try:
+            if _current is None or changed_on_disk():
+                before = _current.version if _current else 0
+                snap = await asyncio.to_thread(rebuild)
+                if on_change is not None and snap.version != before:
+                    on_change(snap)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("[lists] watch rebuild failed")
+        await asyncio.sleep(interval)
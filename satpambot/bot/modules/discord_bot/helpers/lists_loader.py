@@ -31,12 +31,14 @@ def _normalize_host(h: str) -> str:
     h = h.split("/")[0]
     return h if "." in h else ""
 
-def _read_any(path: Path):
+def parse_any(raw) -> list:
+    """Hosts from list-file content (list[str] or {"allow"/"domains": [...]})."""
     try:
-        if not path.exists():
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="ignore")
+        if not raw:
             return []
-        s = path.read_text(encoding="utf-8", errors="ignore")
-        data = json.loads(s)
+        data = json.loads(raw)
         if isinstance(data, list):
             return [_normalize_host(x) for x in data if _normalize_host(x)]
         if isinstance(data, dict):
@@ -50,17 +52,22 @@ def _read_any(path: Path):
     except Exception:
         return []
 
+def _read_any(path: Path):
+    try:
+        if not path.exists():
+            return []
+        return parse_any(path.read_text(encoding="utf-8", errors="ignore"))
+    except Exception:
+        return []
+
 def _write_json(path: Path, data):
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
 def load_whitelist_blacklist() -> Dict[str, Set[str]]:
-    wl = set(_read_any(WL_FILE)) | set(_read_any(URL_WL_JSON))
-    bl = set(_read_any(BL_FILE)) | set(_read_any(URL_BL_JSON))
-    wl_patterns: Set[str] = set()
-    bl_patterns: Set[str] = set()
-    bl -= wl  # whitelist menang
-    return {"wl_domains": wl, "wl_patterns": wl_patterns, "bl_domains": bl, "bl_patterns": bl_patterns}
+    # dari snapshot in-memory (list_snapshot); file hanya dibaca ulang saat kontennya berubah
+    from .list_snapshot import current
+    return current().as_lists()
 
 def save_lists(wl_domains, wl_patterns, bl_domains, bl_patterns) -> bool:
     try:
@@ -71,6 +78,11 @@ def save_lists(wl_domains, wl_patterns, bl_domains, bl_patterns) -> bool:
         _write_json(BL_FILE, bl_sorted)
         _write_json(URL_WL_JSON, {"allow": wl_sorted})
         _write_json(URL_BL_JSON, {"domains": bl_sorted})
+        try:
+            from .list_snapshot import rebuild
+            rebuild()
+        except Exception:
+            pass
         return True
     except Exception:
         return False
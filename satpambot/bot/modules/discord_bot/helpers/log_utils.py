@@ -47,6 +47,7 @@ def _wib_now() -> datetime:
 
 import discord
 from satpambot.bot.modules.discord_bot.utils import sticky_store
+from . import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -272,7 +273,7 @@ async def _pin_if_needed(msg):
 async def _find_existing_status_message(bot, ch):
     marker = _STATUS_MARKER
     try:
-        pins = await ch.pins()
+        pins = await pin_index.pins(ch)
         for m in pins or []:
             if getattr(m, "author", None) and getattr(bot, "user", None) and m.author.id == bot.user.id:
                 body = (m.content or "") + " " + " ".join([(e.footer.text or "") for e in (m.embeds or []) if getattr(e, "footer", None)])
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+"""
+memory_db.py
+- Satu manager koneksi untuk NEUROLITE_MEMORY_DB (memory.sqlite3), dipakai bersama oleh
+  learning_progress, discord_state_checkpoint, sticker/slang learner, mood_state, dst.
+  Tidak ada lagi sqlite3.connect() per panggilan.
+- WAL (lihat sqlite_util.open_db) + busy_timeout; koneksi berumur panjang, jadi statement
+  yang sama memakai ulang prepared statement dari cache sqlite3 (MEMORY_DB_STMT_CACHE).
+- Tulis: satu thread writer + queue. execute()/executemany()/transact() langsung return
+  concurrent Future; writer mengambil semua item yang antre (maks MEMORY_DB_BATCH_MAX,
+  tunggu MEMORY_DB_LINGER_MS) dan commit sebagai SATU transaksi -> satu fsync per batch,
+  dan event loop tidak pernah menunggu fsync. Item gagal di-rollback lewat SAVEPOINT
+  tanpa membatalkan item lain di batch yang sama.
+- Baca: koneksi reader per thread (WAL: reader tidak menunggu writer). fetchone/fetchall/read
+  sinkron, afetchone/afetchall/aread lewat asyncio.to_thread. read() dari thread event loop
+  tidak pernah menunggu writer (migrasi hanya di-antrekan); thread lain menunggu migrasi selesai.
+- Skema: register_schema(name, statements, version) di level modul; migrasi dijalankan
+  sekali per proses oleh writer (di-antrekan saat MemoryDB dibuat / sebelum operasi pertama),
+  versi dicatat di memory_db_schema (CREATE TABLE / seed tidak diulang di setiap _meta_get/_meta_set).
+  Migrasi gagal tidak dicatat -> di-antrekan ulang pada operasi berikutnya.
+"""
+import os, time, queue, atexit, asyncio, sqlite3, logging, threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .sqlite_util import open_db
+
+log = logging.getLogger(__name__)
+
+MEMORY_DB_BATCH_MAX = int(os.getenv("MEMORY_DB_BATCH_MAX", "256"))
+MEMORY_DB_LINGER_MS = float(os.getenv("MEMORY_DB_LINGER_MS", "5"))
+MEMORY_DB_BUSY_MS = int(os.getenv("MEMORY_DB_BUSY_MS", "5000"))
+MEMORY_DB_STMT_CACHE = int(os.getenv("MEMORY_DB_STMT_CACHE", "256"))
+
+Statement = Union[str, Tuple[str, Sequence[Sequence[Any]]]]   # DDL, atau (sql, rows) untuk executemany
+
+# name -> (version, statements); diisi oleh modul pemakai saat import
+_SCHEMAS: Dict[str, Tuple[int, List[Statement]]] = {}
+_STOP = object()
+
+
+def default_path() -> str:
+    return os.getenv("NEUROLITE_MEMORY_DB",
+        os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "data", "memory.sqlite3"))
+
+
+def register_schema(name: str, statements: Sequence[Statement], version: int = 1) -> None:
+    """Declare tables/seeds once; every MemoryDB applies them before its first operation."""
+    _SCHEMAS[name] = (int(version), list(statements))
+
+
+def _on_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class _Op:
+    __slots__ = ("kind", "sql", "params", "fn", "future")
+
+    def __init__(self, kind: str, sql: str = "", params: Any = (), fn: Optional[Callable] = None):
+        self.kind, self.sql, self.params, self.fn = kind, sql, params, fn
+        self.future: Future = Future()
+
+    def run(self, con: sqlite3.Connection) -> Any:
+        if self.kind == "execute":
+            return con.execute(self.sql, self.params).rowcount
+        if self.kind == "many":
+            return con.executemany(self.sql, self.params).rowcount
+        return self.fn(con)
+
+
+class MemoryDB:
+    def __init__(self, path: Optional[str] = None, batch_max: int = MEMORY_DB_BATCH_MAX,
+                 linger_ms: float = MEMORY_DB_LINGER_MS):
+        self.path = os.path.abspath(path or default_path())
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.batch_max = max(1, int(batch_max))
+        self.linger = max(0.0, float(linger_ms)) / 1000.0
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._applied: Dict[str, int] = {}
+        self._queued: set = set()
+        self._schema_fut: Optional[Future] = None
+        self._closed = False
+        self.stats = {"writes": 0, "batches": 0, "max_batch": 0, "errors": 0, "reads": 0,
+                      "commit_ms": 0.0, "migrations": 0}
+        self._writer = threading.Thread(target=self._run, name="memory-db-writer", daemon=True)
+        self._writer.start()
+        self._schema_pending()
+
+    # ---------- connections ----------
+    def _connect(self) -> sqlite3.Connection:
+        con = open_db(self.path, cached_statements=MEMORY_DB_STMT_CACHE)
+        con.execute(f"PRAGMA busy_timeout={MEMORY_DB_BUSY_MS}")
+        con.row_factory = sqlite3.Row
+        return con
+
+    def _reader(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._connect()
+            self._local.con = con
+            with self._lock:
+                self._readers.append(con)
+        return con
+
+    # ---------- schema ----------
+    def _migrate(self, con: sqlite3.Connection, names: List[str]) -> None:
+        con.execute("""CREATE TABLE IF NOT EXISTS memory_db_schema(
+            name TEXT PRIMARY KEY,
+            version INTEGER,
+            applied_ts INTEGER
+        )""")
+        done: Dict[str, int] = {}
+        for name in names:
+            version, stmts = _SCHEMAS[name]
+            row = con.execute("SELECT version FROM memory_db_schema WHERE name=?", (name,)).fetchone()
+            if row is None or int(row["version"] or 0) < version:
+                for st in stmts:
+                    if isinstance(st, str):
+                        con.execute(st)
+                    else:
+                        con.executemany(st[0], st[1])
+                con.execute("INSERT INTO memory_db_schema(name,version,applied_ts) VALUES(?,?,?) "
+                            "ON CONFLICT(name) DO UPDATE SET version=excluded.version, applied_ts=excluded.applied_ts",
+                            (name, version, int(time.time())))
+                self.stats["migrations"] += 1
+            done[name] = version
+        self._applied.update(done)   # hanya setelah semua berhasil (gagal -> SAVEPOINT di-rollback)
+
+    def _schema_pending(self) -> Optional[Future]:
+        """Queue migrations for newly registered schemas; returns the future to wait on (reads)."""
+        if all(self._applied.get(n) == v for n, (v, _) in list(_SCHEMAS.items())):
+            return None
+        with self._lock:
+            names = [n for n, (v, _) in list(_SCHEMAS.items())
+                     if self._applied.get(n) != v and (n, v) not in self._queued]
+            if names:
+                keys = {(n, _SCHEMAS[n][0]) for n in names}
+                self._queued.update(keys)
+                op = _Op("call", fn=lambda con, names=names: self._migrate(con, names))
+                op.future.add_done_callback(lambda f, keys=keys: self._schema_done(f, keys))
+                self._q.put(op)
+                self._schema_fut = op.future
+            return self._schema_fut
+
+    def _schema_done(self, fut: Future, keys: set) -> None:
+        if fut.exception() is None:
+            return
+        log.warning("[memory-db] migration %s failed, will retry: %r", sorted(n for n, _ in keys), fut.exception())
+        with self._lock:
+            self._queued.difference_update(keys)
+            if self._schema_fut is fut:
+                self._schema_fut = None
+
+    def ensure_schema(self, timeout: Optional[float] = None) -> None:
+        fut = self._schema_pending()
+        if fut is not None:
+            fut.result(timeout)
+
+    # ---------- writes ----------
+    def _submit(self, op: _Op) -> Future:
+        if self._closed:
+            raise RuntimeError("memory db is closed")
+        self._schema_pending()   # FIFO: migrasi masuk antrean sebelum op ini
+        self._q.put(op)
+        return op.future
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> Future:
+        """Queue one write; the future resolves to its rowcount after commit."""
+        return self._submit(_Op("execute", sql, tuple(params)))
+
+    def executemany(self, sql: str, rows: Sequence[Sequence[Any]]) -> Future:
+        return self._submit(_Op("many", sql, [tuple(r) for r in rows]))
+
+    def transact(self, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Run fn(con) on the writer (read-modify-write stays atomic); resolves to its return value."""
+        return self._submit(_Op("call", fn=fn))
+
+    async def arun(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.wrap_future(self.transact(fn))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until everything queued so far is committed."""
+        if self._closed:
+            return
+        self.transact(lambda con: None).result(timeout)
+
+    def _run(self) -> None:
+        con = self._connect()
+        try:
+            while True:
+                item = self._q.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                stop = False
+                deadline = time.monotonic() + self.linger
+                while len(batch) < self.batch_max:
+                    try:
+                        wait = deadline - time.monotonic()
+                        nxt = self._q.get(timeout=wait) if wait > 0 else self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is _STOP:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                self._commit(con, batch)
+                if stop:
+                    return
+        finally:
+            try:
+                con.close()
+            except Exception:
+                pass
+
+    def _commit(self, con: sqlite3.Connection, batch: List[_Op]) -> None:
+        t0 = time.perf_counter()
+        results: List[Tuple[_Op, Any, Optional[BaseException]]] = []
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            for op in batch:
+                con.execute("SAVEPOINT op")
+                try:
+                    res = op.run(con)
+                    con.execute("RELEASE op")
+                    results.append((op, res, None))
+                except Exception as e:
+                    con.execute("ROLLBACK TO op")
+                    con.execute("RELEASE op")
+                    results.append((op, None, e))
+            con.execute("COMMIT")
+        except Exception as e:
+            try:
+                con.execute("ROLLBACK")
+            except Exception:
+                pass
+            log.warning("[memory-db] batch of %d rolled back: %r", len(batch), e)
+            self.stats["errors"] += len(batch)
+            for op in batch:
+                if not op.future.done():
+                    op.future.set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(batch)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        self.stats["commit_ms"] += (time.perf_counter() - t0) * 1000.0
+        for op, res, err in results:
+            if err is not None:
+                self.stats["errors"] += 1
+                log.debug("[memory-db] op failed: %r", err)
+                op.future.set_exception(err)
+            else:
+                op.future.set_result(res)
+
+    # ---------- reads ----------
+    def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(con) on this thread's reader connection.
+
+        On the event-loop thread this never waits for the writer: pending migrations are only
+        queued (they run at construction/import time, long before the first loop read).
+        """
+        if threading.current_thread() is not self._writer:
+            if _on_loop():
+                self._schema_pending()
+            else:
+                self.ensure_schema()
+        self.stats["reads"] += 1
+        return fn(self._reader())
+
+    def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        return self.read(lambda con: con.execute(sql, tuple(params)).fetchone())
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return self.read(lambda con: con.execute(sql, tuple(params)).fetchall())
+
+    async def aread(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.to_thread(self.read, fn)
+
+    async def afetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        return await asyncio.to_thread(self.fetchone, sql, params)
+
+    async def afetchall(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(self.fetchall, sql, params)
+
+    # ---------- lifecycle ----------
+    def report(self) -> Dict[str, Any]:
+        out = dict(self.stats)
+        out["pending"] = self._q.qsize()
+        out["readers"] = len(self._readers)
+        out["avg_batch"] = round(out["writes"] / out["batches"], 2) if out["batches"] else 0.0
+        return out
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._q.put(_STOP)
+        self._writer.join(timeout)
+        with self._lock:
+            readers, self._readers = self._readers, []
+        for con in readers:
+            try:
+                con.close()
+            except Exception:
+                pass
+
+
+_dbs: Dict[str, MemoryDB] = {}
+_dbs_lock = threading.Lock()
+
+def get_memory_db(path: Optional[str] = None) -> MemoryDB:
+    key = os.path.abspath(path or default_path())
+    db = _dbs.get(key)
+    if db is None or db._closed:
+        with _dbs_lock:
+            db = _dbs.get(key)
+            if db is None or db._closed:
+                db = _dbs[key] = MemoryDB(key)
+    return db
+
+@atexit.register
+def _close_all() -> None:
+    for db in list(_dbs.values()):
+        try:
+            db.close()
+        except Exception:
+            pass
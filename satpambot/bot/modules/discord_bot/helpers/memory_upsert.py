@@ -1,6 +1,7 @@
 import json
 import logging
 from typing import Any, Dict, Optional
+from . import pin_index
 
 log = logging.getLogger(__name__)
 
@@ -46,55 +47,51 @@ async def upsert_pinned_memory(bot, guild_id: int, channel_id: int, title: str,
                 except Exception:
                     desc = str(payload)[:1900]
 
-        # Find existing bot pin with same title
-        existing = None
-        try:
-            pins = await ch.pins()
-            def _match_title(m):
-                try:
-                    # prefer embed title match
-                    if getattr(m, "embeds", None):
-                        for e in m.embeds:
-                            if getattr(e, "title", None) == title:
-                                return True
-                    # fallback to content startswith
-                    mc = (m.content or "").strip()
-                    if mc.startswith(title) or title in mc:
-                        return True
-                except Exception:
-                    pass
-                return False
-
-            mine = [m for m in pins if getattr(m.author, "id", None) == getattr(bot.user, "id", None) and _match_title(m)]
-            mine.sort(key=lambda m: getattr(m, "created_at", 0), reverse=True)
-            if mine:
-                existing = mine[0]
-                # Unpin extras beyond max_keep; leave existing as first
-                for m in mine[max_keep:]:
+        # Message id per (channel, title) ada di status_registry; scan pins hanya kalau belum ter-index
+        from .status_registry import get_registry
+        reg = get_registry()
+        key = f"pinmem:{channel_id}:{title}"
+        if reg.message_id(key) is None:
+            try:
+                pins = await pin_index.pins(ch)
+                def _match_title(m):
                     try:
-                        await m.unpin()
+                        # prefer embed title match
+                        if getattr(m, "embeds", None):
+                            for e in m.embeds:
+                                if getattr(e, "title", None) == title:
+                                    return True
+                        # fallback to content startswith
+                        mc = (m.content or "").strip()
+                        if mc.startswith(title) or title in mc:
+                            return True
                     except Exception:
                         pass
-        except Exception:
-            existing = None  # non-fatal
+                    return False
 
-        # Edit-or-send
-        if existing is not None:
-            if embed:
-                await existing.edit(embed=embed)
-            else:
-                await existing.edit(content=desc or title)
-            # Make sure it stays pinned
-            try:
-                if not getattr(existing, "pinned", True):
-                    await existing.pin()
+                mine = [m for m in pins if getattr(m.author, "id", None) == getattr(bot.user, "id", None) and _match_title(m)]
+                mine.sort(key=lambda m: getattr(m, "created_at", 0), reverse=True)
+                if mine:
+                    reg.remember(key, mine[0])
+                    # Unpin extras beyond max_keep; leave existing as first
+                    for m in mine[max_keep:]:
+                        try:
+                            await m.unpin()
+                            pin_index.get_pin_index().note_unpinned(m)
+                        except Exception:
+                            pass
             except Exception:
-                pass
-            msg = existing
+                pass  # non-fatal
+
+        # Edit-or-send (edit tanpa fetch; snapshot beruntun digabung, yang identik di-skip)
+        if embed:
+            msg = await reg.upsert(ch, key, embed=embed)
         else:
-            msg = await ch.send(embed=embed) if embed else await ch.send(content=desc or title)
+            msg = await reg.upsert(ch, key, content=desc or title)
+        # Make sure it stays pinned (juga snapshot lama yang sempat di-unpin)
+        if msg is not None:
             try:
-                await msg.pin()
+                await pin_index.ensure_pinned(ch, msg)
             except Exception:
                 pass
 
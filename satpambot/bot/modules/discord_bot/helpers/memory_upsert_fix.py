@@ -9,6 +9,7 @@ import json
 import logging
 from typing import Optional, Dict
 import discord
+from . import pin_index
 
 LOG = logging.getLogger(__name__)
 
@@ -55,7 +56,7 @@ async def ensure_keeper(bot: discord.Client, title: str, thread_name: Optional[s
 
     # locate pinned keeper by embed title
     try:
-        pins = await dest.pins()
+        pins = await pin_index.pins(dest)
         for m in pins:
             if m.embeds:
                 try:
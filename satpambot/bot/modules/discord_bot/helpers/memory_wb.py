@@ -5,6 +5,7 @@ import os, json, io
 from pathlib import Path
 from typing import Iterable, Optional
 import discord
+from . import pin_index
 
 LOG_CHANNEL_NAME = os.getenv('LOG_CHANNEL_NAME', 'log-botphising')
 LOG_CHANNEL_ID_RAW = os.getenv('LOG_CHANNEL_ID', '').strip()
@@ -94,7 +95,7 @@ async def update_memory_wb(bot: discord.Client, whitelist: Iterable[str], blackl
             msg = None
     if msg is None:
         try:
-            pins = await th.pins()
+            pins = await pin_index.pins(th)
         except Exception:
             pins = []
         for p in pins:
@@ -141,7 +142,7 @@ async def update_memory_wb(bot: discord.Client, whitelist: Iterable[str], blackl
 
     # Cleanup duplicates
     try:
-        pins = await th.pins()
+        pins = await pin_index.pins(th)
     except Exception:
         pins = []
     for p in pins:
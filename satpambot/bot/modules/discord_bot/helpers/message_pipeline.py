@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+"""
+message_pipeline.py
+- Satu listener on_message per bot; cog mendaftar sebagai *stage* berurutan (order kecil jalan duluan).
+- Tiap pesan di-parse sekali ke MessageContext (immutable): author/bot, guild/DM/thread,
+  URL + domain, attachment gambar, mention, verdict PublicChatGate.
+- Filter umum (bot, DM, thread, "butuh URL/gambar") dicek pipeline sebelum stage dipanggil.
+- Stage inline boleh return STOP -> stage berikutnya (mis. XP award untuk pesan yang dihapus) di-skip.
+- Stage detach=True (kerja berat: OCR, hashing) dijalankan sebagai task setelah rantai inline.
+- Timing per stage (calls/skip/stop/error, total & max ms) untuk `!pipeline`.
+"""
+import time, asyncio, logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .safety_utils import extract_urls, norm_domain
+
+log = logging.getLogger(__name__)
+
+STOP = object()
+
+ORDER_GUARD = 10      # moderation: bisa hapus pesan -> STOP
+ORDER_FILTER = 50     # gate/filter QnA
+ORDER_XP = 100        # XP awarders
+ORDER_LEARN = 200     # observer / learning
+
+
+def _is_thread(ch) -> bool:
+    try:
+        import discord
+        if isinstance(ch, getattr(discord, "Thread", tuple())):
+            return True
+        ctype = getattr(ch, "type", None)
+        return ctype in {
+            getattr(discord.ChannelType, "public_thread", None),
+            getattr(discord.ChannelType, "private_thread", None),
+            getattr(discord.ChannelType, "news_thread", None),
+        }
+    except Exception:
+        return False
+
+
+@dataclass(frozen=True)
+class MessageContext:
+    message: Any
+    author_id: int
+    author_is_bot: bool
+    guild_id: Optional[int]
+    channel_id: Optional[int]
+    parent_id: Optional[int]
+    is_dm: bool
+    is_thread: bool
+    content: str
+    lowered: str
+    urls: Tuple[str, ...]
+    domains: Tuple[str, ...]
+    attachments: Tuple[Any, ...]
+    images: Tuple[Any, ...]
+    mention_ids: FrozenSet[int]
+    mentions_bot: bool
+    public_allowed: bool
+
+    @classmethod
+    def build(cls, bot, message) -> "MessageContext":
+        author = getattr(message, "author", None)
+        ch = getattr(message, "channel", None)
+        guild = getattr(message, "guild", None)
+        content = getattr(message, "content", None) or ""
+        urls = tuple(extract_urls(content)) if "://" in content else ()
+        domains = []
+        for u in urls:
+            try:
+                h = norm_domain(urlparse(u).hostname or "")
+            except Exception:
+                h = ""
+            if h and h not in domains:
+                domains.append(h)
+        atts = tuple(getattr(message, "attachments", None) or ())
+        images = tuple(a for a in atts if (getattr(a, "content_type", None) or "").startswith("image/"))
+        try:
+            mention_ids = frozenset(getattr(message, "raw_mentions", None) or [m.id for m in getattr(message, "mentions", [])])
+        except Exception:
+            mention_ids = frozenset()
+        me = getattr(getattr(bot, "user", None), "id", None)
+        public_allowed = True
+        if guild is not None:
+            try:
+                gate = bot.get_cog("PublicChatGate")
+                if gate and hasattr(gate, "should_allow_public_reply"):
+                    public_allowed = bool(gate.should_allow_public_reply(message))
+            except Exception:
+                pass
+        return cls(
+            message=message,
+            author_id=int(getattr(author, "id", 0) or 0),
+            author_is_bot=bool(getattr(author, "bot", False)),
+            guild_id=getattr(guild, "id", None),
+            channel_id=getattr(ch, "id", None),
+            parent_id=getattr(ch, "parent_id", None),
+            is_dm=guild is None,
+            is_thread=_is_thread(ch),
+            content=content,
+            lowered=content.lower(),
+            urls=urls,
+            domains=tuple(domains),
+            attachments=atts,
+            images=images,
+            mention_ids=mention_ids,
+            mentions_bot=bool(me and me in mention_ids),
+            public_allowed=public_allowed,
+        )
+
+
+StageFn = Callable[[MessageContext], Awaitable[Any]]
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: StageFn
+    order: int = ORDER_LEARN
+    bots: str = "skip"           # skip | also | only
+    scope: str = "guild"         # guild | dm | any
+    threads: bool = True
+    gated: bool = False          # hormati verdict PublicChatGate
+    needs: Tuple[str, ...] = ()  # atribut context yang harus truthy, mis. ("urls",) / ("images",)
+    channels: Optional[FrozenSet[int]] = None
+    detach: bool = False
+    stats: Dict[str, float] = field(default_factory=lambda: {
+        "calls": 0, "skipped": 0, "stops": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+    def accepts(self, ctx: MessageContext) -> bool:
+        if ctx.author_is_bot:
+            if self.bots == "skip":
+                return False
+        elif self.bots == "only":
+            return False
+        if self.scope == "guild" and ctx.is_dm:
+            return False
+        if self.scope == "dm" and not ctx.is_dm:
+            return False
+        if not self.threads and ctx.is_thread:
+            return False
+        if self.gated and not ctx.public_allowed:
+            return False
+        if self.channels is not None and ctx.channel_id not in self.channels:
+            return False
+        for n in self.needs:
+            if not getattr(ctx, n, None):
+                return False
+        return True
+
+
+class MessagePipeline:
+    def __init__(self, bot):
+        self.bot = bot
+        self._stages: List[Stage] = []
+        self._tasks: set = set()  # strong refs ke detached stage (loop hanya pegang weakref)
+        self.stats = {"messages": 0, "build_ms": 0.0, "stopped": 0}
+
+    def register(self, name: str, fn: StageFn, **opts) -> Stage:
+        """Add (or replace, on cog reload) a stage; opts = Stage fields (order, bots, scope, needs, ...)."""
+        st = Stage(name=name, fn=fn, **opts)
+        self._stages = sorted([s for s in self._stages if s.name != name] + [st], key=lambda s: s.order)
+        return st
+
+    def unregister(self, name: str) -> None:
+        self._stages = [s for s in self._stages if s.name != name]
+
+    def stages(self) -> List[Stage]:
+        return list(self._stages)
+
+    async def _run(self, st: Stage, ctx: MessageContext) -> Any:
+        t0 = time.perf_counter()
+        st.stats["calls"] += 1
+        try:
+            return await st.fn(ctx)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            st.stats["errors"] += 1
+            log.exception("[pipeline] stage %s failed", st.name)
+            return None
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            st.stats["total_ms"] += ms
+            if ms > st.stats["max_ms"]:
+                st.stats["max_ms"] = ms
+
+    async def dispatch(self, message) -> None:
+        stages = self._stages
+        if not stages:
+            return
+        t0 = time.perf_counter()
+        ctx = MessageContext.build(self.bot, message)
+        self.stats["messages"] += 1
+        self.stats["build_ms"] += (time.perf_counter() - t0) * 1000.0
+        detached: List[Stage] = []
+        for st in stages:
+            if not st.accepts(ctx):
+                st.stats["skipped"] += 1
+                continue
+            if st.detach:
+                detached.append(st)
+                continue
+            if await self._run(st, ctx) is STOP:
+                st.stats["stops"] += 1
+                self.stats["stopped"] += 1
+                return
+        for st in detached:
+            t = asyncio.create_task(self._run(st, ctx), name=f"pipeline:{st.name}")
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+
+    def report(self) -> List[Tuple[str, Dict[str, float]]]:
+        return [(s.name, dict(s.stats)) for s in self._stages]
+
+
+def get_pipeline(bot) -> MessagePipeline:
+    """Per-bot pipeline; the first call installs the single on_message listener."""
+    p = getattr(bot, "_message_pipeline", None)
+    if p is None:
+        p = MessagePipeline(bot)
+        bot._message_pipeline = p
+        bot.add_listener(p.dispatch, "on_message")
+    return p
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+"""
+mod_actions.py
+- Antrian aksi moderasi untuk semua guard (link/ocr/spam) supaya raid tidak jadi ratusan
+  request individual yang berebut bucket route Discord yang sama.
+- Delete: dikumpulkan per channel selama MOD_DELETE_WINDOW_MS, lalu satu
+  channel.delete_messages() (bulk, max 100); fallback delete satu-satu kalau bulk gagal
+  (pesan > 14 hari, DM, dll). Message id yang sama -> satu aksi (dedupe).
+- Ban: dikumpulkan per guild, >= 2 user -> guild.bulk_ban() (satu request, max 200);
+  sisanya / fallback ban individual dengan concurrency terbatas per guild.
+  (guild, user) yang sama -> satu aksi; ban yang baru sukses diingat MOD_RECENT_TTL_SEC.
+- Metrik per aksi: jumlah, dedupe, batch, latency enqueue->selesai (total & max).
+"""
+import os, time, asyncio, logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MOD_DELETE_WINDOW_MS = int(os.getenv("MOD_DELETE_WINDOW_MS", "250"))
+MOD_BAN_WINDOW_MS = int(os.getenv("MOD_BAN_WINDOW_MS", "500"))
+MOD_BAN_CONCURRENCY = int(os.getenv("MOD_BAN_CONCURRENCY", "3"))
+MOD_RECENT_TTL_SEC = float(os.getenv("MOD_RECENT_TTL_SEC", "600"))
+BULK_DELETE_MAX = 100
+BULK_BAN_MAX = 200
+BAN_DELETE_SECONDS = 7 * 24 * 3600
+
+
+def _new_metric() -> Dict[str, float]:
+    return {"requested": 0, "done": 0, "failed": 0, "dedup": 0, "batches": 0, "batched": 0,
+            "total_ms": 0.0, "max_ms": 0.0}
+
+
+class _Recent:
+    """Bounded TTL set of recently completed action keys."""
+    def __init__(self, ttl: float, cap: int = 20000):
+        self.ttl, self.cap = ttl, cap
+        self._d: "OrderedDict[Any, float]" = OrderedDict()
+
+    def add(self, key) -> None:
+        self._d[key] = time.monotonic() + self.ttl
+        self._d.move_to_end(key)
+        while len(self._d) > self.cap:
+            self._d.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        exp = self._d.get(key)
+        if exp is None:
+            return False
+        if exp < time.monotonic():
+            self._d.pop(key, None)
+            return False
+        return True
+
+
+class ModerationExecutor:
+    def __init__(self, delete_window_ms: int = MOD_DELETE_WINDOW_MS, ban_window_ms: int = MOD_BAN_WINDOW_MS,
+                 ban_concurrency: int = MOD_BAN_CONCURRENCY):
+        self.delete_window = delete_window_ms / 1000.0
+        self.ban_window = ban_window_ms / 1000.0
+        self.ban_concurrency = max(1, ban_concurrency)
+        self._del_pending: Dict[int, Dict[int, Tuple[Any, asyncio.Future, float]]] = {}
+        self._ban_pending: Dict[int, Dict[int, Tuple[Any, Any, str, asyncio.Future, float]]] = {}
+        self._tasks: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._ban_sems: Dict[int, asyncio.Semaphore] = {}
+        self._deleted = _Recent(MOD_RECENT_TTL_SEC)
+        self._banned = _Recent(MOD_RECENT_TTL_SEC)
+        self.stats = {"delete": _new_metric(), "ban": _new_metric()}
+
+    # ---------- metrics ----------
+    def _finish(self, kind: str, fut: asyncio.Future, t0: float, ok: bool) -> None:
+        m = self.stats[kind]
+        m["done" if ok else "failed"] += 1
+        ms = (time.perf_counter() - t0) * 1000.0
+        m["total_ms"] += ms
+        if ms > m["max_ms"]:
+            m["max_ms"] = ms
+        if not fut.done():
+            fut.set_result(ok)
+
+    def _schedule(self, kind: str, key: int, coro_fn, delay: float) -> None:
+        if (kind, key) in self._tasks:
+            return
+        async def _run():
+            try:
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            finally:
+                if self._tasks.get((kind, key)) is asyncio.current_task():
+                    self._tasks.pop((kind, key), None)
+            await coro_fn(key)
+        self._tasks[(kind, key)] = asyncio.create_task(_run(), name=f"mod:{kind}:{key}")
+
+    # ---------- delete ----------
+    async def delete(self, message) -> bool:
+        """Queue a message deletion; resolves True once the message is gone."""
+        m = self.stats["delete"]
+        m["requested"] += 1
+        mid = int(getattr(message, "id", 0) or 0)
+        if mid and mid in self._deleted:
+            m["dedup"] += 1
+            return True
+        ch = getattr(message, "channel", None)
+        cid = int(getattr(ch, "id", 0) or 0)
+        pend = self._del_pending.setdefault(cid, {})
+        if mid in pend:
+            m["dedup"] += 1
+            return await asyncio.shield(pend[mid][1])
+        fut = asyncio.get_running_loop().create_future()
+        pend[mid] = (message, fut, time.perf_counter())
+        full = len(pend) >= BULK_DELETE_MAX
+        if full:
+            task = self._tasks.pop(("delete", cid), None)
+            if task is not None:
+                task.cancel()
+        self._schedule("delete", cid, self._flush_deletes, 0 if full else self.delete_window)
+        return await asyncio.shield(fut)
+
+    async def _delete_one(self, message) -> bool:
+        import discord
+        try:
+            await message.delete()
+            return True
+        except discord.NotFound:
+            return True
+        except Exception as e:
+            log.debug("[mod] delete %s failed: %r", getattr(message, "id", "?"), e)
+            return False
+
+    async def _flush_deletes(self, cid: int) -> None:
+        batch = self._del_pending.pop(cid, {})
+        if not batch:
+            return
+        items = list(batch.values())
+        m = self.stats["delete"]
+        for i in range(0, len(items), BULK_DELETE_MAX):
+            chunk = items[i:i + BULK_DELETE_MAX]
+            ch = getattr(chunk[0][0], "channel", None)
+            ok_all = False
+            if len(chunk) >= 2 and getattr(ch, "guild", None) is not None and hasattr(ch, "delete_messages"):
+                try:
+                    await ch.delete_messages([msg for msg, _, _ in chunk])
+                    ok_all = True
+                    m["batches"] += 1
+                    m["batched"] += len(chunk)
+                except Exception as e:
+                    log.debug("[mod] bulk delete in %s failed (%r) -> one by one", cid, e)
+            if ok_all:
+                results = [True] * len(chunk)
+            else:
+                results = await asyncio.gather(*[self._delete_one(msg) for msg, _, _ in chunk])
+            for (msg, fut, t0), ok in zip(chunk, results):
+                if ok:
+                    self._deleted.add(int(getattr(msg, "id", 0) or 0))
+                self._finish("delete", fut, t0, ok)
+
+    # ---------- ban ----------
+    async def ban(self, guild, user, reason: str = "SatpamBot: policy violation") -> bool:
+        """Queue a 7-day-history ban; concurrent/repeated bans of one user collapse into one."""
+        m = self.stats["ban"]
+        m["requested"] += 1
+        gid = int(getattr(guild, "id", 0) or 0)
+        uid = int(getattr(user, "id", 0) or 0)
+        if (gid, uid) in self._banned:
+            m["dedup"] += 1
+            return True
+        pend = self._ban_pending.setdefault(gid, {})
+        if uid in pend:
+            m["dedup"] += 1
+            return await asyncio.shield(pend[uid][3])
+        fut = asyncio.get_running_loop().create_future()
+        pend[uid] = (guild, user, reason, fut, time.perf_counter())
+        self._schedule("ban", gid, self._flush_bans, self.ban_window)
+        return await asyncio.shield(fut)
+
+    async def _ban_single(self, guild, user, reason: str) -> bool:
+        from .ban_utils import ban_now
+        gid = int(getattr(guild, "id", 0) or 0)
+        sem = self._ban_sems.get(gid)
+        if sem is None:
+            sem = self._ban_sems[gid] = asyncio.Semaphore(self.ban_concurrency)
+        async with sem:
+            return await ban_now(guild, user, reason)
+
+    async def _flush_bans(self, gid: int) -> None:
+        batch = self._ban_pending.pop(gid, {})
+        if not batch:
+            return
+        items = list(batch.values())
+        guild = items[0][0]
+        m = self.stats["ban"]
+        done: Dict[int, bool] = {}
+        if len(items) >= 2 and hasattr(guild, "bulk_ban"):
+            import discord
+            for i in range(0, len(items), BULK_BAN_MAX):
+                chunk = items[i:i + BULK_BAN_MAX]
+                reason = chunk[0][2] if len(chunk) == 1 else f"{chunk[0][2]} (+{len(chunk) - 1} bulk)"
+                try:
+                    res = await guild.bulk_ban([u for _, u, _, _, _ in chunk], reason=reason[:512],
+                                               delete_message_seconds=BAN_DELETE_SECONDS)
+                    for o in getattr(res, "banned", []) or []:
+                        done[int(o.id)] = True
+                    m["batches"] += 1
+                    m["batched"] += len(getattr(res, "banned", []) or [])
+                except discord.Forbidden:
+                    log.warning("[mod] bulk_ban forbidden in guild %s -> individual bans", gid)
+                except Exception as e:
+                    log.debug("[mod] bulk_ban in %s failed (%r) -> individual bans", gid, e)
+        rest = [it for it in items if not done.get(int(getattr(it[1], "id", 0) or 0))]
+        if rest:
+            results = await asyncio.gather(*[self._ban_single(g, u, r) for g, u, r, _, _ in rest])
+            for it, ok in zip(rest, results):
+                done[int(getattr(it[1], "id", 0) or 0)] = bool(ok)
+        for g, u, _, fut, t0 in items:
+            uid = int(getattr(u, "id", 0) or 0)
+            ok = done.get(uid, False)
+            if ok:
+                self._banned.add((gid, uid))
+            self._finish("ban", fut, t0, ok)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for kind, m in self.stats.items():
+            d = dict(m)
+            n = max(1, int(m["done"] + m["failed"]))
+            d["avg_ms"] = m["total_ms"] / n
+            out[kind] = d
+        return out
+
+
+_executor: Optional[ModerationExecutor] = None
+
+def get_mod_executor() -> ModerationExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ModerationExecutor()
+    return _executor
+
+async def queue_delete(message) -> bool:
+    return await get_mod_executor().delete(message)
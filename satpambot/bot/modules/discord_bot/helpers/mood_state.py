@@ -3,81 +3,58 @@ from __future__ import annotations
 import os, sqlite3, time
 from typing import Optional
 
+from .memory_db import get_memory_db, register_schema
+
 def _db_path() -> str:
     return os.getenv("NEUROLITE_MEMORY_DB",
         os.path.join(os.path.dirname(__file__), "..","..","..","..","data","memory.sqlite3"))
 
-def _open_db():
-    path = _db_path()
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        try: os.makedirs(d, exist_ok=True)
-        except Exception: pass
-    con = sqlite3.connect(path)
-    con.row_factory = sqlite3.Row
-    return con
-
-def _ensure_meta(con: sqlite3.Connection):
-    con.execute("""CREATE TABLE IF NOT EXISTS learning_progress_meta(
+register_schema("learning_progress_meta", [
+    """CREATE TABLE IF NOT EXISTS learning_progress_meta(
         key TEXT PRIMARY KEY,
         value TEXT
-    )""")
-    con.commit()
+    )""",
+])
+
+def _db():
+    return get_memory_db(_db_path())
 
 def meta_get(con: sqlite3.Connection, key: str) -> Optional[str]:
-    _ensure_meta(con)
     row = con.execute("SELECT value FROM learning_progress_meta WHERE key=?", (key,)).fetchone()
     return row["value"] if row else None
 
 def meta_set(con: sqlite3.Connection, key: str, val: str):
-    _ensure_meta(con)
+    """Caller owns the transaction (memory DB writer), no commit here."""
     con.execute("INSERT INTO learning_progress_meta(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, val))
-    con.commit()
 
 def bump_learning(con: Optional[sqlite3.Connection]=None):
-    own = False
     if con is None:
-        con = _open_db(); own = True
-    try:
-        meta_set(con, "last_learning_ts", str(int(time.time())))
-        # optional: set focus mood
-        meta_set(con, "mood", "focused")
-    finally:
-        if own: con.close()
+        return _db().transact(bump_learning)
+    meta_set(con, "last_learning_ts", str(int(time.time())))
+    # optional: set focus mood
+    meta_set(con, "mood", "focused")
 
 def set_mood(mood: str, con: Optional[sqlite3.Connection]=None):
-    own = False
     if con is None:
-        con = _open_db(); own = True
-    try:
-        meta_set(con, "mood", mood)
-        meta_set(con, "mood_ts", str(int(time.time())))
-    finally:
-        if own: con.close()
+        return _db().transact(lambda c: set_mood(mood, c))
+    meta_set(con, "mood", mood)
+    meta_set(con, "mood_ts", str(int(time.time())))
 
 def get_mood(con: Optional[sqlite3.Connection]=None) -> str:
-    own = False
     if con is None:
-        con = _open_db(); own = True
-    try:
-        m = meta_get(con, "mood") or "neutral"
-        ts = int(meta_get(con, "mood_ts") or "0")
-        if ts and time.time() - ts > 600 and m != "neutral":
-            # decay after 10m
-            return "neutral"
-        return m
-    finally:
-        if own: con.close()
+        return _db().read(get_mood)
+    m = meta_get(con, "mood") or "neutral"
+    ts = int(meta_get(con, "mood_ts") or "0")
+    if ts and time.time() - ts > 600 and m != "neutral":
+        # decay after 10m
+        return "neutral"
+    return m
 
 def is_learning_active(window_sec: int=180, con: Optional[sqlite3.Connection]=None) -> bool:
-    own = False
     if con is None:
-        con = _open_db(); own = True
-    try:
-        ts = int(meta_get(con, "last_learning_ts") or "0")
-        return (time.time() - ts) < window_sec if ts else False
-    finally:
-        if own: con.close()
+        return _db().read(lambda c: is_learning_active(window_sec, c))
+    ts = int(meta_get(con, "last_learning_ts") or "0")
+    return (time.time() - ts) < window_sec if ts else False
 
 def counters(con: sqlite3.Connection):
     sent = succ = 0
@@ -105,3 +82,13 @@ def update_from_counters(con: sqlite3.Connection, sent: int, succ: int, lex: int
     if activity:
         bump_learning(con)
     return activity
+
+def tick(con: sqlite3.Connection) -> bool:
+    """One watcher pass (run on the memory DB writer so read + update stay in one transaction)."""
+    sent, succ, lex = counters(con)
+    changed = update_from_counters(con, sent, succ, lex)
+    if not changed:
+        # decay: if no learning > 5 min set neutral
+        if not is_learning_active(300, con):
+            set_mood("neutral", con)
+    return changed
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+"""
+phash_index.py
+- Near-duplicate index for 64-bit pHash values (multi-index hashing, 4 x 16-bit).
+- Pigeonhole: radius per chunk s_i dipilih supaya sum(s_i + 1) > r; kalau hamming(a, b) <= r
+  minimal satu chunk i beda <= s_i bit, jadi cukup probe tetangga tiap chunk lalu verifikasi
+  kandidat dengan popcount.
+- Default index dibangun sekali dari DB JSON (SATPAMBOT_PHASH_DB_V1.json / data/phish/phash.json)
+  dan di-refresh incremental berdasarkan mtime file.
+"""
+import os, json, time, threading, logging
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+_CHUNKS = 4
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+_MAX_PROBE_RADIUS = 4  # > 4 bit per chunk -> probe lebih mahal dari linear scan
+
+DEFAULT_DB_PATHS = (
+    "satpambot/config/SATPAMBOT_PHASH_DB_V1.json",
+    "data/phash/SATPAMBOT_PHASH_DB_V1.json",
+    "data/phish/phash.json",
+)
+REFRESH_SEC = float(os.getenv("PHASH_INDEX_REFRESH_SEC", "15"))
+
+_probe_cache: Dict[int, List[int]] = {}
+
+def _probe_masks(radius: int) -> List[int]:
+    """All 16-bit masks with popcount <= radius (0 first)."""
+    masks = _probe_cache.get(radius)
+    if masks is None:
+        masks = [0]
+        for k in range(1, radius + 1):
+            for bits in combinations(range(_CHUNK_BITS), k):
+                m = 0
+                for b in bits:
+                    m |= 1 << b
+                masks.append(m)
+        _probe_cache[radius] = masks
+    return masks
+
+def _chunk_radii(max_distance: int) -> List[int]:
+    """Per-chunk probe radius with sum(s_i + 1) == max_distance + 1 (-1 = skip chunk)."""
+    q, rem = divmod(max_distance + 1, _CHUNKS)
+    return [q + (1 if i < rem else 0) - 1 for i in range(_CHUNKS)]
+
+def _parse(h) -> Optional[int]:
+    try:
+        v = int(str(h).strip(), 16)
+    except Exception:
+        return None
+    return v if 0 <= v < (1 << 64) else None
+
+class PhashIndex:
+    """Multi-index Hamming search over 64-bit hashes (hex in, hex out)."""
+
+    def __init__(self, hashes: Iterable[str] = ()):
+        self._lock = threading.RLock()
+        self._tables: List[Dict[int, List[int]]] = [dict() for _ in range(_CHUNKS)]
+        self._hex: Dict[int, str] = {}
+        for h in hashes:
+            self.add(h)
+
+    def __len__(self) -> int:
+        return len(self._hex)
+
+    def __contains__(self, h) -> bool:
+        v = _parse(h)
+        return v is not None and v in self._hex
+
+    def hashes(self) -> List[str]:
+        with self._lock:
+            return list(self._hex.values())
+
+    def add(self, h) -> bool:
+        v = _parse(h)
+        if v is None:
+            return False
+        with self._lock:
+            if v in self._hex:
+                return False
+            self._hex[v] = str(h).strip()
+            for i, table in enumerate(self._tables):
+                table.setdefault((v >> (i * _CHUNK_BITS)) & _CHUNK_MASK, []).append(v)
+            return True
+
+    def discard(self, h) -> bool:
+        v = _parse(h)
+        if v is None:
+            return False
+        with self._lock:
+            if self._hex.pop(v, None) is None:
+                return False
+            for i, table in enumerate(self._tables):
+                key = (v >> (i * _CHUNK_BITS)) & _CHUNK_MASK
+                bucket = table.get(key)
+                if bucket:
+                    try:
+                        bucket.remove(v)
+                    except ValueError:
+                        pass
+                    if not bucket:
+                        table.pop(key, None)
+            return True
+
+    def nearest(self, h, max_distance: int = 0) -> Optional[Tuple[str, int]]:
+        """Return (db_hex, distance) of the closest entry within max_distance, else None."""
+        q = _parse(h)
+        if q is None:
+            return None
+        with self._lock:
+            if q in self._hex:
+                return self._hex[q], 0
+            if max_distance <= 0 or not self._hex:
+                return None
+            radii = _chunk_radii(max_distance)
+            best_v, best_d = None, max_distance + 1
+            if radii[0] > _MAX_PROBE_RADIUS:
+                for v in self._hex:
+                    d = (v ^ q).bit_count()
+                    if d < best_d:
+                        best_v, best_d = v, d
+            else:
+                seen: Set[int] = set()
+                for i, table in enumerate(self._tables):
+                    if radii[i] < 0:
+                        continue
+                    c = (q >> (i * _CHUNK_BITS)) & _CHUNK_MASK
+                    for m in _probe_masks(radii[i]):
+                        bucket = table.get(c ^ m)
+                        if not bucket:
+                            continue
+                        for v in bucket:
+                            if v in seen:
+                                continue
+                            seen.add(v)
+                            d = (v ^ q).bit_count()
+                            if d < best_d:
+                                best_v, best_d = v, d
+            if best_v is None:
+                return None
+            return self._hex[best_v], best_d
+
+    def within(self, h, max_distance: int = 0) -> List[Tuple[str, int]]:
+        """All (db_hex, distance) with distance <= max_distance."""
+        q = _parse(h)
+        if q is None:
+            return []
+        with self._lock:
+            if max_distance <= 0:
+                return [(self._hex[q], 0)] if q in self._hex else []
+            radii = _chunk_radii(max_distance)
+            if radii[0] > _MAX_PROBE_RADIUS:
+                cands: Iterable[int] = self._hex
+            else:
+                found: Set[int] = set()
+                for i, table in enumerate(self._tables):
+                    if radii[i] < 0:
+                        continue
+                    c = (q >> (i * _CHUNK_BITS)) & _CHUNK_MASK
+                    for m in _probe_masks(radii[i]):
+                        bucket = table.get(c ^ m)
+                        if bucket:
+                            found.update(bucket)
+                cands = found
+            out = []
+            for v in cands:
+                d = (v ^ q).bit_count()
+                if d <= max_distance:
+                    out.append((self._hex[v], d))
+            return out
+
+    def best(self, hashes: Iterable[str], max_distance: int = 0) -> Optional[Tuple[str, int]]:
+        """Best (db_hex, distance) over several candidate hashes (frames/augment variants)."""
+        out: Optional[Tuple[str, int]] = None
+        for h in hashes:
+            if not h:
+                continue
+            r = self.nearest(h, max_distance if out is None else min(max_distance, out[1] - 1))
+            if r is not None and (out is None or r[1] < out[1]):
+                out = r
+                if out[1] == 0:
+                    break
+        return out
+
+
+class TileIndex:
+    """Inverted index for tile signatures ('h1|h2|...|hN').
+
+    Per (tile count, tile position) a PhashIndex over tile hashes, plus tile hash -> signature ids,
+    so the best tile-match count is found by counting hits instead of comparing every pair.
+    """
+
+    def __init__(self, sigs: Iterable[str] = ()):
+        self._pos: Dict[Tuple[int, int], PhashIndex] = {}
+        self._owners: Dict[Tuple[int, int, int], List[int]] = {}
+        self.sigs: List[str] = []
+        for s in sigs:
+            self.add(s)
+
+    def __len__(self) -> int:
+        return len(self.sigs)
+
+    @staticmethod
+    def split(sig: str) -> List[str]:
+        return [x for x in str(sig).split("|") if x]
+
+    def add(self, sig: str) -> int:
+        tiles = self.split(sig)
+        sid = len(self.sigs)
+        self.sigs.append(sig)
+        n = len(tiles)
+        for p, t in enumerate(tiles):
+            v = _parse(t)
+            if v is None:
+                continue
+            idx = self._pos.get((n, p))
+            if idx is None:
+                idx = self._pos[(n, p)] = PhashIndex()
+            idx.add(t)
+            self._owners.setdefault((n, p, v), []).append(sid)
+        return sid
+
+    def match_counts(self, cand_sig: str, per_tile_max_distance: int) -> Dict[int, int]:
+        """signature id -> number of tiles within per_tile_max_distance."""
+        tiles = self.split(cand_sig)
+        n = len(tiles)
+        counts: Dict[int, int] = {}
+        for p, t in enumerate(tiles):
+            idx = self._pos.get((n, p))
+            if idx is None:
+                continue
+            for hx, _d in idx.within(t, per_tile_max_distance):
+                for sid in self._owners.get((n, p, _parse(hx)), ()):
+                    counts[sid] = counts.get(sid, 0) + 1
+        return counts
+
+    def best(self, candidate_sigs: Iterable[str], per_tile_max_distance: int, min_tiles: int = 0) -> int:
+        best = 0
+        for cand in candidate_sigs:
+            counts = self.match_counts(cand, per_tile_max_distance)
+            if counts:
+                best = max(best, max(counts.values()))
+            if min_tiles and best >= min_tiles:
+                break
+        return best
+
+
+def _hashes_from_json(path: Path) -> Set[str]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8") or "null")
+    except Exception:
+        return set()
+    if isinstance(data, dict):
+        if isinstance(data.get("phash"), list):
+            data = data["phash"]
+        elif isinstance(data.get("items"), list):
+            data = [it.get("phash") for it in data["items"] if isinstance(it, dict)]
+        else:
+            return set()
+    if not isinstance(data, list):
+        return set()
+    return {str(x).strip() for x in data if isinstance(x, (str, int)) and str(x).strip()}
+
+
+class _FileBackedIndex:
+    """PhashIndex + per-file hash sets; reloads only files whose mtime changed."""
+
+    def __init__(self, paths: Iterable[str]):
+        self.index = PhashIndex()
+        self._paths = [Path(p) for p in paths]
+        self._mtimes: Dict[Path, float] = {}
+        self._by_file: Dict[Path, Set[str]] = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_check < REFRESH_SEC:
+            return
+        with self._lock:
+            self._last_check = now
+            for p in self._paths:
+                try:
+                    mt = p.stat().st_mtime
+                except OSError:
+                    mt = None
+                if mt is not None and self._mtimes.get(p) == mt:
+                    continue
+                new = _hashes_from_json(p) if mt is not None else set()
+                old = self._by_file.get(p, set())
+                self._by_file[p] = new
+                if mt is None:
+                    self._mtimes.pop(p, None)
+                else:
+                    self._mtimes[p] = mt
+                keep: Set[str] = set()
+                for q, hs in self._by_file.items():
+                    if q != p:
+                        keep |= hs
+                for h in old - new - keep:
+                    self.index.discard(h)
+                added = sum(1 for h in new - old if self.index.add(h))
+                if added or (old - new):
+                    log.info("[phash-index] %s: +%d -%d (total=%d)", p, added, len(old - new), len(self.index))
+
+
+_default: Optional[_FileBackedIndex] = None
+_default_lock = threading.Lock()
+
+def _db_paths() -> List[str]:
+    env = os.getenv("PHASH_INDEX_PATHS", "").strip()
+    if env:
+        return [s.strip() for s in env.split(os.pathsep) if s.strip()]
+    return list(DEFAULT_DB_PATHS)
+
+def get_default_index() -> PhashIndex:
+    """Process-wide index over the phash DB files (cheap mtime check per call)."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                fb = _FileBackedIndex(_db_paths())
+                fb.refresh(force=True)
+                _default = fb
+    _default.refresh()
+    return _default.index
+
+def note_added(*hashes: str) -> None:
+    """Incremental update hook (e.g. after dashboard add) without waiting for mtime refresh."""
+    if _default is None:
+        return
+    for h in hashes:
+        _default.index.add(h)
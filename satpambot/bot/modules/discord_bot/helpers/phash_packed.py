@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+"""
+phash_packed.py
+- Packed pHash DB: sorted unique uint64 array (no hex re-parse per compare).
+- Sidecar `<db>.u64.npy` next to the JSON DB, loaded memory-mapped (shared page cache, low RSS).
+- Batched matching: XOR + popcount over all candidates x all DB entries in one NumPy pass (blocked).
+"""
+import os, json, logging
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+log = logging.getLogger(__name__)
+
+SIDECAR_SUFFIX = ".u64.npy"
+# max elemen (kandidat x DB) per blok XOR, biar RAM sementara tetap kecil (~8 MB)
+BLOCK_ELEMS = int(os.getenv("PHASH_PACKED_BLOCK_ELEMS", str(1 << 20)))
+
+if np is not None and not hasattr(np, "bitwise_count"):
+    _POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+else:
+    _POP8 = None
+
+def _popcount64(x: "np.ndarray") -> "np.ndarray":
+    if _POP8 is None:
+        return np.bitwise_count(x)
+    b = x.view(np.uint8).reshape(x.shape + (8,))
+    return _POP8[b].sum(axis=-1, dtype=np.uint8)
+
+def _u64(h) -> Optional[int]:
+    """Hex string -> int if it fits in 64 bits, else None (the one parse used everywhere)."""
+    try:
+        v = int(str(h).strip(), 16)
+    except Exception:
+        return None
+    return v if 0 <= v < (1 << 64) else None
+
+def pack_hex(hashes: Iterable) -> "np.ndarray":
+    """Hex strings -> sorted unique uint64 array (invalid / >64-bit entries dropped)."""
+    vals = [v for v in map(_u64, hashes) if v is not None]
+    return np.unique(np.array(vals, dtype=np.uint64))
+
+def unpack_hex(arr: "np.ndarray") -> List[str]:
+    return [f"{int(v):016x}" for v in arr]
+
+def sidecar_path(json_path) -> Path:
+    p = Path(json_path)
+    return p.with_name(p.name + SIDECAR_SUFFIX)
+
+def _hashes_from_json(path: Path) -> list:
+    data = json.loads(path.read_text(encoding="utf-8") or "null")
+    if isinstance(data, dict):
+        if isinstance(data.get("phash"), list):
+            return data["phash"]
+        if isinstance(data.get("items"), list):
+            return [it.get("phash") for it in data["items"] if isinstance(it, dict)]
+        return []
+    return data if isinstance(data, list) else []
+
+def write_sidecar(json_path, hashes: Optional[Iterable] = None) -> Path:
+    """(Re)build the uint64 sidecar for a JSON DB; atomic replace."""
+    src = Path(json_path)
+    arr = pack_hex(hashes if hashes is not None else _hashes_from_json(src))
+    out = sidecar_path(src)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr, allow_pickle=False)
+    os.replace(tmp, out)
+    return out
+
+
+class PackedPhashDB:
+    """Sorted uint64 pHash array with vectorized exact / Hamming matching."""
+
+    def __init__(self, arr: Optional["np.ndarray"] = None):
+        if arr is None:
+            arr = np.zeros(0, dtype=np.uint64)
+        self.arr = arr
+
+    def __len__(self) -> int:
+        return int(self.arr.shape[0])
+
+    @classmethod
+    def from_hex(cls, hashes: Iterable) -> "PackedPhashDB":
+        return cls(pack_hex(hashes))
+
+    @classmethod
+    def load(cls, json_path, mmap: bool = True) -> "PackedPhashDB":
+        """Load sidecar (memory-mapped); rebuild it first if missing or older than the JSON."""
+        src = Path(json_path)
+        side = sidecar_path(src)
+        try:
+            stale = not side.exists() or (src.exists() and src.stat().st_mtime > side.stat().st_mtime)
+            if stale and src.exists():
+                write_sidecar(src)
+            if side.exists():
+                return cls(np.load(side, mmap_mode="r" if mmap else None, allow_pickle=False))
+        except Exception as e:
+            log.warning("[phash-packed] load %s failed: %r", src, e)
+        return cls()
+
+    def contains(self, cand: "np.ndarray") -> "np.ndarray":
+        """Bool mask of exact membership (binary search on the sorted array)."""
+        if not len(self):
+            return np.zeros(cand.shape, dtype=bool)
+        pos = np.searchsorted(self.arr, cand)
+        pos = np.minimum(pos, len(self) - 1)
+        return self.arr[pos] == cand
+
+    def match(self, candidates: Iterable, max_distance: int = 0) -> Tuple["np.ndarray", "np.ndarray"]:
+        """For every candidate: (best DB index or -1, distance or -1), all candidates at once."""
+        cand = candidates if isinstance(candidates, np.ndarray) else pack_hex_keep_order(candidates)
+        n = cand.shape[0]
+        best_i = np.full(n, -1, dtype=np.int64)
+        best_d = np.full(n, -1, dtype=np.int16)
+        if not n or not len(self):
+            return best_i, best_d
+        if max_distance <= 0:
+            pos = np.minimum(np.searchsorted(self.arr, cand), len(self) - 1)
+            hit = self.arr[pos] == cand
+            best_i[hit] = pos[hit]
+            best_d[hit] = 0
+            return best_i, best_d
+        cur_d = np.full(n, 65, dtype=np.uint8)
+        step = max(1, BLOCK_ELEMS // n)
+        col = cand[:, None]
+        for off in range(0, len(self), step):
+            blk = np.asarray(self.arr[off:off + step])
+            d = _popcount64(col ^ blk[None, :])
+            j = d.argmin(axis=1)
+            dj = d[np.arange(n), j]
+            better = dj < cur_d
+            cur_d[better] = dj[better]
+            best_i[better] = off + j[better]
+        ok = cur_d <= max_distance
+        best_d[ok] = cur_d[ok]
+        best_i[~ok] = -1
+        return best_i, best_d
+
+    def best(self, hashes: Iterable, max_distance: int = 0) -> Optional[Tuple[str, int]]:
+        """Best (db_hex, distance) across all candidate hashes, or None."""
+        i, d = self.match(hashes, max_distance)
+        ok = np.flatnonzero(i >= 0)
+        if not ok.size:
+            return None
+        k = ok[d[ok].argmin()]
+        return f"{int(self.arr[i[k]]):016x}", int(d[k])
+
+
+def parse_candidates(hashes: Iterable) -> Tuple[List[str], "np.ndarray"]:
+    """(kept hashes, uint64 array) in candidate order; kept[i] is the string behind arr[i]."""
+    kept, vals = [], []
+    for h in hashes:
+        v = _u64(h)
+        if v is not None:
+            kept.append(h)
+            vals.append(v)
+    return kept, np.array(vals, dtype=np.uint64)
+
+def pack_hex_keep_order(hashes: Iterable) -> "np.ndarray":
+    """Like pack_hex but keeps candidate order/duplicates (invalid -> skipped)."""
+    return parse_candidates(hashes)[1]
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+"""
+pin_index.py
+- Index pinned message per channel di memory, supaya upsert/keeper tidak memanggil
+  channel.pins() (REST) lalu scan linear di setiap update.
+- pins(channel): drop-in pengganti `await channel.pins()`; REST hanya sekali per channel
+  (atau setelah di-invalidate), sisanya dari cache.
+- find_title(channel, title) / find_marker(channel, marker): title -> message id (map) dan
+  marker -> message id (memo, divalidasi ulang tiap lookup), newest-pinned duluan.
+- Update inkremental (lihat cogs/a00_pin_index_overlay.py):
+    on_guild_channel_pins_update -> invalidate (kecuali pin/unpin milik bot sendiri yang sudah
+    dicatat lewat note_pinned/note_unpinned), on_raw_message_edit -> ganti objek message /
+    buang kalau unpinned, on_raw_message_delete/bulk -> buang.
+"""
+import os, time, asyncio, logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+log = logging.getLogger(__name__)
+
+PIN_INDEX_SELF_WINDOW_SEC = float(os.getenv("PIN_INDEX_SELF_WINDOW_SEC", "5"))
+PIN_INDEX_WARM_CHANNELS = os.getenv("PIN_INDEX_WARM_CHANNELS", "")
+PIN_INDEX_MAX_AGE_SEC = float(os.getenv("PIN_INDEX_MAX_AGE_SEC", "21600"))  # URL attachment Discord kedaluwarsa
+
+
+def _title(m) -> str:
+    try:
+        embeds = getattr(m, "embeds", None) or []
+        return (embeds[0].title or "").strip() if embeds else ""
+    except Exception:
+        return ""
+
+def _text(m) -> str:
+    parts = [getattr(m, "content", None) or ""]
+    for e in getattr(m, "embeds", None) or []:
+        try:
+            parts.append(e.title or "")
+            parts.append(getattr(e.footer, "text", None) or "")
+        except Exception:
+            continue
+    return "\n".join(parts)
+
+def _author_id(m) -> Optional[int]:
+    return getattr(getattr(m, "author", None), "id", None)
+
+
+class _ChannelPins:
+    __slots__ = ("messages", "by_title", "markers", "loaded_at")
+
+    def __init__(self, messages: Iterable[Any] = ()):
+        self.loaded_at = time.monotonic()
+        self.messages: "OrderedDict[int, Any]" = OrderedDict()   # newest-pinned first
+        self.by_title: Dict[str, List[int]] = {}
+        self.markers: Dict[str, int] = {}
+        for m in messages:
+            self.messages[int(m.id)] = m
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self.by_title.clear()
+        for mid, m in self.messages.items():
+            t = _title(m)
+            if t:
+                self.by_title.setdefault(t, []).append(mid)
+
+    def put(self, m, front: bool = True) -> None:
+        mid = int(m.id)
+        self.messages[mid] = m
+        if front:
+            self.messages.move_to_end(mid, last=False)
+        self._reindex()
+
+    def drop(self, mid: int) -> bool:
+        if self.messages.pop(int(mid), None) is None:
+            return False
+        self._reindex()
+        for k in [k for k, v in self.markers.items() if v == mid]:
+            self.markers.pop(k, None)
+        return True
+
+
+class PinIndex:
+    def __init__(self, self_window: float = PIN_INDEX_SELF_WINDOW_SEC, max_age: float = PIN_INDEX_MAX_AGE_SEC):
+        self.self_window = self_window
+        self.max_age = max_age
+        self._channels: Dict[int, _ChannelPins] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._expect_self: Dict[int, float] = {}
+        self.stats = {"hits": 0, "loads": 0, "invalidations": 0, "self_updates": 0}
+
+    # ---------- load ----------
+    async def _load(self, channel) -> _ChannelPins:
+        cid = int(channel.id)
+        fut = self._loading.get(cid)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[cid] = fut
+        try:
+            msgs = await channel.pins()
+            cp = _ChannelPins(msgs)
+            self._channels[cid] = cp
+            self.stats["loads"] += 1
+            fut.set_result(cp)
+            return cp
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # jangan log "exception never retrieved" kalau tidak ada yang menunggu
+            raise
+        finally:
+            self._loading.pop(cid, None)
+
+    async def _get(self, channel) -> _ChannelPins:
+        cp = self._channels.get(int(channel.id))
+        if cp is not None and time.monotonic() - cp.loaded_at < self.max_age:
+            self.stats["hits"] += 1
+            return cp
+        return await self._load(channel)
+
+    async def pins(self, channel) -> List[Any]:
+        """Pinned messages of `channel`, newest-pinned first (cached)."""
+        return list((await self._get(channel)).messages.values())
+
+    async def find_title(self, channel, title: str, author_id: Optional[int] = None):
+        cp = await self._get(channel)
+        for mid in cp.by_title.get((title or "").strip(), ()):
+            m = cp.messages.get(mid)
+            if m is not None and (author_id is None or _author_id(m) == author_id):
+                return m
+        return None
+
+    async def find_marker(self, channel, marker: str, author_id: Optional[int] = None):
+        """Pinned message whose content/embed title/footer contains `marker`."""
+        if not marker:
+            return None
+        cp = await self._get(channel)
+        memo_key = f"{author_id}:{marker}"
+        mid = cp.markers.get(memo_key)
+        if mid is not None:
+            m = cp.messages.get(mid)
+            if m is not None and marker in _text(m):
+                return m
+            cp.markers.pop(memo_key, None)
+        for mid, m in cp.messages.items():
+            if (author_id is None or _author_id(m) == author_id) and marker in _text(m):
+                cp.markers[memo_key] = mid
+                return m
+        return None
+
+    # ---------- incremental updates ----------
+    def note_pinned(self, message) -> None:
+        """Bot pinned `message` itself: update in place, skip the follow-up refetch."""
+        ch = getattr(message, "channel", None)
+        cid = int(getattr(ch, "id", 0) or 0)
+        self._expect_self[cid] = time.monotonic() + self.self_window
+        cp = self._channels.get(cid)
+        if cp is not None:
+            cp.put(message)
+            self.stats["self_updates"] += 1
+
+    def note_unpinned(self, message) -> None:
+        ch = getattr(message, "channel", None)
+        cid = int(getattr(ch, "id", 0) or 0)
+        self._expect_self[cid] = time.monotonic() + self.self_window
+        cp = self._channels.get(cid)
+        if cp is not None:
+            cp.drop(int(message.id))
+            self.stats["self_updates"] += 1
+
+    def invalidate(self, channel_id: int) -> None:
+        if self._channels.pop(int(channel_id), None) is not None:
+            self.stats["invalidations"] += 1
+
+    def on_pins_update(self, channel_id: int) -> None:
+        cid = int(channel_id)
+        exp = self._expect_self.pop(cid, 0.0)
+        if exp and exp >= time.monotonic():
+            return  # perubahan pin oleh bot sendiri, index sudah di-update
+        self.invalidate(cid)
+
+    def on_message_edit(self, channel_id: int, message_id: int, message=None, data: Optional[dict] = None) -> None:
+        cp = self._channels.get(int(channel_id))
+        if cp is None or int(message_id) not in cp.messages:
+            return
+        if data is not None and data.get("pinned") is False:
+            cp.drop(int(message_id))
+            return
+        if message is not None:
+            cp.messages[int(message_id)] = message
+            cp._reindex()
+        else:
+            self.invalidate(channel_id)
+
+    def on_message_delete(self, channel_id: int, message_ids: Iterable[int]) -> None:
+        cp = self._channels.get(int(channel_id))
+        if cp is None:
+            return
+        for mid in message_ids:
+            cp.drop(int(mid))
+
+    def warm_channel_ids(self) -> Set[int]:
+        return {int(x) for x in PIN_INDEX_WARM_CHANNELS.replace(";", ",").split(",") if x.strip().isdigit()}
+
+
+_index: Optional[PinIndex] = None
+
+def get_pin_index() -> PinIndex:
+    global _index
+    if _index is None:
+        _index = PinIndex()
+    return _index
+
+async def pins(channel) -> List[Any]:
+    """Drop-in for `await channel.pins()` backed by the shared index."""
+    return await get_pin_index().pins(channel)
+
+async def ensure_pinned(channel, message) -> bool:
+    """Pin `message` unless the (cached) index already lists it as pinned; True if pinned now."""
+    idx = get_pin_index()
+    try:
+        if any(int(m.id) == int(message.id) for m in await idx.pins(channel)):
+            return False
+    except Exception:
+        pass
+    await message.pin()
+    if getattr(message, "embeds", None) is not None:
+        idx.note_pinned(message)
+    else:  # PartialMessage: isi tidak diketahui -> muat ulang dari REST saat lookup berikutnya
+        idx.invalidate(int(getattr(channel, "id", 0) or 0))
+    return True
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+"""
+route_limiter.py
+- Satu subsistem rate-limit untuk SEMUA request REST Discord (patch HTTPClient.request sekali),
+  menggantikan bucket per-channel di rate_limit_guard, retry 429 di http_429_backoff, dan
+  sleep tetap di SendQueue.
+- Model bucket per route (route.key + major parameter) diisi dari header respons
+  (X-RateLimit-Remaining/Reset-After lewat state bucket discord.py, Retry-After/Global saat 429).
+- Bucket global: token bucket RL_GLOBAL_RATE req/detik + blokir global saat 429 global.
+- Kelas prioritas: mod (delete/ban/timeout) > reply (QnA, default) > low (edit status/log, pin).
+  Antrian per kelas dibagi per channel dan dilayani round-robin (fair queuing); kelas low
+  hanya jalan kalau masih ada RL_LOW_RESERVE token global tersisa -> status spam tidak
+  pernah menahan ban/delete.
+- Metrik: kedalaman antrian (sekarang & max), jumlah grant, waktu tunggu (total & max), 429.
+"""
+import os, time, asyncio, logging, contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+log = logging.getLogger(__name__)
+
+RL_GLOBAL_RATE = float(os.getenv("RL_GLOBAL_RATE", "40"))      # Discord: 50 req/detik per bot
+RL_LOW_RESERVE = float(os.getenv("RL_LOW_RESERVE", "10"))      # token global yang tidak boleh dipakai kelas low
+RL_LOW_CHANNELS = os.getenv("RL_LOW_CHANNELS", "")             # id channel log/status tambahan (koma)
+
+PRIO_MOD, PRIO_REPLY, PRIO_LOW = 0, 1, 2
+PRIO_NAMES = ("mod", "reply", "low")
+
+_prio_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("route_priority", default=None)
+
+
+@contextmanager
+def priority(prio: int):
+    """Force the priority class of every Discord request made inside the block."""
+    tok = _prio_var.set(prio)
+    try:
+        yield
+    finally:
+        _prio_var.reset(tok)
+
+
+def _parse_ids(raw: str) -> Set[int]:
+    out = set()
+    for p in (raw or "").replace(";", ",").split(","):
+        p = p.strip()
+        if p.isdigit():
+            out.add(int(p))
+    return out
+
+_low_channels: Set[int] = _parse_ids(RL_LOW_CHANNELS)
+
+def mark_low_channels(ids: Iterable[Optional[int]]) -> None:
+    """Register log/status channels whose traffic always runs in the low class."""
+    for i in ids:
+        if i:
+            _low_channels.add(int(i))
+
+
+_MOD_ROUTES = {
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}"),
+    ("POST", "/channels/{channel_id}/messages/bulk-delete"),
+    ("PUT", "/guilds/{guild_id}/bans/{user_id}"),
+    ("DELETE", "/guilds/{guild_id}/bans/{user_id}"),
+    ("POST", "/guilds/{guild_id}/bulk-ban"),
+    ("DELETE", "/guilds/{guild_id}/members/{user_id}"),
+    ("PATCH", "/guilds/{guild_id}/members/{user_id}"),
+}
+_LOW_ROUTES = {
+    ("PATCH", "/channels/{channel_id}/messages/{message_id}"),
+    ("PUT", "/channels/{channel_id}/pins/{message_id}"),
+    ("DELETE", "/channels/{channel_id}/pins/{message_id}"),
+    ("PUT", "/channels/{channel_id}/messages/pins/{message_id}"),
+    ("DELETE", "/channels/{channel_id}/messages/pins/{message_id}"),
+    ("GET", "/channels/{channel_id}/pins"),
+    ("GET", "/channels/{channel_id}/messages/pins"),
+}
+
+def classify(route) -> int:
+    forced = _prio_var.get()
+    if forced is not None:
+        return forced
+    key = (getattr(route, "method", ""), getattr(route, "path", ""))
+    if key in _MOD_ROUTES:
+        return PRIO_MOD
+    if key in _LOW_ROUTES:
+        return PRIO_LOW
+    cid = getattr(route, "channel_id", None)
+    if cid and int(cid) in _low_channels:
+        return PRIO_LOW
+    return PRIO_REPLY
+
+def route_key(route) -> str:
+    return f"{getattr(route, 'method', '')} {getattr(route, 'path', '')}:{getattr(route, 'major_parameters', '')}"
+
+
+class _RouteState:
+    __slots__ = ("limit", "remaining", "reset_at", "inflight")
+
+    def __init__(self):
+        self.limit = 0          # 0 = belum diketahui
+        self.remaining = 1
+        self.reset_at = 0.0
+        self.inflight = 0
+
+    def blocked(self, now: float) -> bool:
+        if self.reset_at <= now:
+            return False
+        return self.remaining - self.inflight <= 0
+
+
+class _Waiter:
+    __slots__ = ("fut", "rkey", "t0")
+
+    def __init__(self, fut: asyncio.Future, rkey: str):
+        self.fut, self.rkey, self.t0 = fut, rkey, time.perf_counter()
+
+
+def _new_metric() -> Dict[str, float]:
+    return {"depth": 0, "max_depth": 0, "granted": 0, "waited": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+
+
+class RouteLimiter:
+    def __init__(self, global_rate: float = RL_GLOBAL_RATE, low_reserve: float = RL_LOW_RESERVE):
+        self.global_rate = max(1.0, global_rate)
+        self.low_reserve = max(0.0, min(low_reserve, self.global_rate - 1.0))
+        self._tokens = self.global_rate
+        self._stamp = time.monotonic()
+        self._global_until = 0.0
+        self._routes: Dict[str, _RouteState] = {}
+        self._queues: List["OrderedDict[int, Deque[_Waiter]]"] = [OrderedDict() for _ in PRIO_NAMES]
+        self._pump: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.stats = {name: _new_metric() for name in PRIO_NAMES}
+        self.counters = {"429": 0, "global_429": 0}
+
+    # ---------- model ----------
+    def _state(self, rkey: str) -> _RouteState:
+        rs = self._routes.get(rkey)
+        if rs is None:
+            rs = self._routes[rkey] = _RouteState()
+        return rs
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.global_rate, self._tokens + (now - self._stamp) * self.global_rate)
+        self._stamp = now
+
+    def _can_go(self, prio: int, rkey: str, now: float) -> bool:
+        if now < self._global_until:
+            return False
+        need = 1.0 + (self.low_reserve if prio == PRIO_LOW else 0.0)
+        if self._tokens < need:
+            return False
+        return not self._state(rkey).blocked(now)
+
+    def _take(self, prio: int, rkey: str, t0: float, queued: bool) -> None:
+        self._tokens -= 1.0
+        self._state(rkey).inflight += 1
+        m = self.stats[PRIO_NAMES[prio]]
+        m["granted"] += 1
+        if queued:
+            ms = (time.perf_counter() - t0) * 1000.0
+            m["waited"] += 1
+            m["total_wait_ms"] += ms
+            if ms > m["max_wait_ms"]:
+                m["max_wait_ms"] = ms
+
+    def _higher_waiting(self, prio: int) -> bool:
+        return any(self._queues[p] for p in range(prio + 1))
+
+    # ---------- acquire / release ----------
+    async def acquire(self, prio: int, rkey: str, lane: int = 0) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        if not self._higher_waiting(prio) and self._can_go(prio, rkey, now):
+            self._take(prio, rkey, 0.0, False)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        w = _Waiter(fut, rkey)
+        self._queues[prio].setdefault(lane, deque()).append(w)
+        m = self.stats[PRIO_NAMES[prio]]
+        m["depth"] += 1
+        if m["depth"] > m["max_depth"]:
+            m["max_depth"] = m["depth"]
+        self._kick()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._state(rkey).inflight -= 1  # sudah di-grant tapi caller batal
+            else:
+                self._drop(prio, lane, w)
+            raise
+
+    def _drop(self, prio: int, lane: int, w: _Waiter) -> None:
+        q = self._queues[prio].get(lane)
+        if q is not None and w in q:
+            q.remove(w)
+            self.stats[PRIO_NAMES[prio]]["depth"] -= 1
+            if not q:
+                self._queues[prio].pop(lane, None)
+
+    def release(self, rkey: str, *, limit: int = 0, remaining: Optional[int] = None,
+                reset_after: Optional[float] = None, is_global: bool = False) -> None:
+        """Request finished; feed back whatever bucket info the response carried."""
+        now = time.monotonic()
+        rs = self._state(rkey)
+        rs.inflight = max(0, rs.inflight - 1)
+        if is_global and reset_after:
+            self._global_until = max(self._global_until, now + reset_after)
+            self.counters["global_429"] += 1
+        elif remaining is not None and reset_after is not None:
+            rs.limit = limit or rs.limit
+            rs.remaining = remaining
+            rs.reset_at = now + max(0.0, reset_after)
+        self._kick()
+
+    # ---------- scheduler ----------
+    def _kick(self) -> None:
+        if not any(self._queues):
+            return
+        if self._pump is None or self._pump.done():
+            self._wake = asyncio.Event()
+            self._pump = asyncio.create_task(self._run(), name="route-limiter-pump")
+        elif self._wake is not None:
+            self._wake.set()
+
+    def _grant_one(self, now: float) -> bool:
+        for prio, lanes in enumerate(self._queues):
+            for lane in list(lanes.keys()):
+                q = lanes[lane]
+                w = q[0]
+                if w.fut.done():
+                    q.popleft()
+                    self.stats[PRIO_NAMES[prio]]["depth"] -= 1
+                    if not q:
+                        lanes.pop(lane, None)
+                    return True
+                if not self._can_go(prio, w.rkey, now):
+                    continue
+                q.popleft()
+                self.stats[PRIO_NAMES[prio]]["depth"] -= 1
+                if q:
+                    lanes.move_to_end(lane)  # round-robin antar channel
+                else:
+                    lanes.pop(lane, None)
+                self._take(prio, w.rkey, w.t0, True)
+                w.fut.set_result(None)
+                return True
+            if lanes and (self._tokens < 1.0 or now < self._global_until):
+                return False  # kelas lebih tinggi menunggu token global: jangan didahului
+        return False
+
+    def _next_delay(self, now: float) -> float:
+        delays = [max(0.0, self._global_until - now)]
+        delays.append(max(0.0, (1.0 + self.low_reserve - self._tokens) / self.global_rate))
+        for lanes in self._queues:
+            for q in lanes.values():
+                rs = self._routes.get(q[0].rkey)
+                if rs is not None and rs.reset_at > now:
+                    delays.append(rs.reset_at - now)
+        return min(1.0, max(0.005, min(delays)))
+
+    async def _run(self) -> None:
+        while any(self._queues):
+            now = time.monotonic()
+            self._refill(now)
+            if self._grant_one(now):
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._next_delay(now))
+            except asyncio.TimeoutError:
+                pass
+
+    def report(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name, m in self.stats.items():
+            d = dict(m)
+            d["avg_wait_ms"] = m["total_wait_ms"] / max(1, int(m["waited"]))
+            out[name] = d
+        out["routes"] = len(self._routes)
+        out["tokens"] = round(self._tokens, 1)
+        out.update(self.counters)
+        return out
+
+
+_limiter: Optional[RouteLimiter] = None
+
+def get_limiter() -> RouteLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RouteLimiter()
+    return _limiter
+
+
+# ---------- discord.py integration ----------
+def _bucket_info(http, route) -> Dict[str, Any]:
+    """limit/remaining/reset_after from discord.py's header-driven bucket, if known."""
+    try:
+        h = http._bucket_hashes.get(route.key)
+        rl = http._buckets.get(f"{h or route.key}:{route.major_parameters}")
+        if rl is None or rl.expires is None:
+            return {}
+        return {"limit": int(rl.limit), "remaining": int(rl.remaining),
+                "reset_after": max(0.0, rl.expires - asyncio.get_running_loop().time())}
+    except Exception:
+        return {}
+
+def _retry_after(ex) -> tuple:
+    """(seconds, is_global) from a 429 response."""
+    text = str(getattr(ex, "text", "") or "")
+    try:
+        h = ex.response.headers
+        is_global = str(h.get("X-RateLimit-Global", "")).lower() == "true" or \
+            str(h.get("X-RateLimit-Scope", "")).lower() == "global"
+        for key in ("Retry-After", "X-RateLimit-Reset-After"):
+            v = h.get(key)
+            if v:
+                return float(v), is_global
+    except Exception:
+        is_global = False
+    return (30.0 if "1015" in text else 3.0), is_global
+
+_ORIG_REQUEST = None
+
+def install(max_retry: Optional[int] = None) -> None:
+    """Route every HTTPClient.request through the shared limiter (idempotent)."""
+    global _ORIG_REQUEST
+    import discord
+    if _ORIG_REQUEST is not None:
+        return
+    if max_retry is None:
+        from satpambot.bot.modules.discord_bot.config.self_learning_cfg import HTTP_429_MAX_RETRY as max_retry
+    orig = _ORIG_REQUEST = discord.http.HTTPClient.request
+
+    async def _request(self, route, **kwargs):
+        lim = get_limiter()
+        prio = classify(route)
+        rkey = route_key(route)
+        lane = int(getattr(route, "channel_id", None) or getattr(route, "guild_id", None) or 0)
+        tries = 0
+        while True:
+            await lim.acquire(prio, rkey, lane)
+            try:
+                res = await orig(self, route, **kwargs)
+            except discord.HTTPException as ex:
+                if getattr(ex, "status", None) == 429:
+                    lim.counters["429"] += 1
+                    wait, is_global = _retry_after(ex)
+                    lim.release(rkey, remaining=0, reset_after=wait, is_global=is_global)
+                    if tries < max_retry:
+                        tries += 1
+                        log.warning("[route_limiter] 429 on %s (%s) — retry after %.2fs (try %s/%s)",
+                                    getattr(route, "path", route), PRIO_NAMES[prio], wait, tries, max_retry)
+                        continue
+                else:
+                    lim.release(rkey, **_bucket_info(self, route))
+                raise
+            except BaseException:
+                lim.release(rkey)
+                raise
+            lim.release(rkey, **_bucket_info(self, route))
+            return res
+
+    discord.http.HTTPClient.request = _request
+    log.info("[route_limiter] installed (global=%.0f/s low_reserve=%.0f max_retry=%s)",
+             get_limiter().global_rate, get_limiter().low_reserve, max_retry)
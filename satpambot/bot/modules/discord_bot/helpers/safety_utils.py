@@ -40,16 +40,6 @@ def is_suspicious_domain(host: str, allowlist: Iterable[str]) -> bool:
     h = (host or "").lower()
     if not h or h in allowlist:
         return False
-    # explicit denylist wins
-    if h in FAST_BAD_DOMAINS:
-        return True
-    if FLAG_PUNY and 'xn--' in h:
-        return True
-    for kw in FAST_BAD_KEYWORDS:
-        if kw and kw in h:
-            return True
-    # lightweight TLD heuristic based on FAST_BAD_DOMAINS suffixes
-    for d in list(FAST_BAD_DOMAINS):
-        if d.startswith(".") and h.endswith(d):
-            return True
-    return False
+    # denylist (persis + suffix ".tld"), punycode, keyword -> satu matcher ter-compile
+    from .url_matcher import get_matcher
+    return get_matcher().is_suspicious_domain(h)
@@ -24,13 +24,25 @@ def calc_hashes_from_bytes(b: bytes) -> Tuple[Optional[int], Optional[int]]:
     if Image is None or imagehash is None:
         return (None, None)
     try:
-        with Image.open(io.BytesIO(b)) as im:
-            im = im.convert("RGB")
-            ph = imagehash.phash(im, hash_size=8)
-            dh = imagehash.dhash(im, hash_size=8)
-            return (int(str(ph), 16), int(str(dh), 16))
+        from .attachment_cache import get_attachment_cache
+        ent = get_attachment_cache().get(hashlib.sha256(b).hexdigest())
+    except Exception:
+        ent = None
+    if ent is not None and "ph_dh" in ent.hashes:
+        return ent.hashes["ph_dh"]
+    try:
+        im = ent.image() if ent is not None else None
+        if im is None:
+            with Image.open(io.BytesIO(b)) as src:
+                im = src.convert("RGB")
+        ph = imagehash.phash(im, hash_size=8)
+        dh = imagehash.dhash(im, hash_size=8)
+        out = (int(str(ph), 16), int(str(dh), 16))
     except Exception:
         return (None, None)
+    if ent is not None:
+        ent.hashes["ph_dh"] = out
+    return out
 
 def hamming64(a: int, b: int) -> int:
     return (a ^ b).bit_count()
@@ -58,12 +70,8 @@ BAD_TLDS = {".ru",".tk",".gq",".ml",".cf"}
 SUS_WORDS = {"nitro","free","gift","steam","bonus","airdrop"}
 
 def is_bad_url(u: str) -> bool:
-    lu = u.lower()
-    if any(lu.endswith(tld) for tld in BAD_TLDS):
-        return True
-    if any(w in lu for w in SUS_WORDS):
-        return True
-    return False
+    from .url_matcher import get_matcher
+    return get_matcher().is_bad_url(u)
 
 def simple_bytes_hash(b: bytes) -> str:
     return hashlib.sha1(b).hexdigest()
@@ -1,6 +1,25 @@
-import asyncio
-import logging
-from typing import Optional
+from __future__ import annotations
+
+"""
+send_queue.py
+- Outbox persisten (SQLite WAL, data/outbox.db) untuk DurableOutbox: kiriman yang belum
+  terkirim tetap ada setelah restart dan di-replay saat on_ready.
+- Idempotency key (kolom UNIQUE): enqueue dengan key yang sama -> satu kiriman saja.
+- Worker per channel (paralel antar channel, urutan dalam satu channel tetap FIFO);
+  pacing global diserahkan ke route_limiter, tidak ada sleep tetap lagi.
+- Gagal -> retry exponential (OUTBOX_RETRY_BASE * 2^n, max OUTBOX_RETRY_MAX) sampai
+  OUTBOX_MAX_ATTEMPTS; Forbidden/NotFound -> langsung 'dead'.
+- Edit ke pesan yang sama / upsert ke marker yang sama yang masih pending digabung jadi satu
+  (payload terakhir menang). Marker -> message id disimpan di tabel outbox_markers.
+- Payload yang tidak bisa diserialisasi (file, view) tetap dikirim tapi hanya di memory.
+- Semua query SQLite jalan di thread (asyncio.to_thread), tidak di event loop; slot worker
+  (_sem) dilepas selama backoff retry.
+"""
+import os, json, time, uuid, asyncio, logging, threading
+from typing import Any, Dict, Optional, Set
+
+from .sqlite_util import open_db
+from .route_limiter import priority, PRIO_REPLY, PRIO_LOW
 try:
     import discord
 except Exception:
@@ -8,35 +27,318 @@ except Exception:
 
 log = logging.getLogger(__name__)
 
+OUTBOX_DB = os.getenv("OUTBOX_DB", "data/outbox.db")
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "2"))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "300"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_MAX_WORKERS = int(os.getenv("OUTBOX_MAX_WORKERS", "16"))
+OUTBOX_KEEP_DONE_SEC = float(os.getenv("OUTBOX_KEEP_DONE_SEC", "86400"))  # jendela dedupe
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idem TEXT UNIQUE,
+    channel_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,              -- send | edit | upsert
+    target TEXT,                     -- message id (edit) / marker (upsert)
+    payload TEXT NOT NULL,
+    volatile INTEGER DEFAULT 0,
+    prio INTEGER DEFAULT 1,
+    attempts INTEGER DEFAULT 0,
+    next_at REAL DEFAULT 0,
+    status TEXT DEFAULT 'pending',   -- pending | done | dead
+    error TEXT,
+    created_ts REAL,
+    updated_ts REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox(status, channel_id, id);
+CREATE TABLE IF NOT EXISTS outbox_markers(
+    channel_id INTEGER NOT NULL,
+    marker TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY(channel_id, marker)
+);
+"""
+
+
+# ---------- payload (de)serialization ----------
+def _encode(kwargs: Dict[str, Any]) -> tuple:
+    """(json payload, volatile kwargs or None)."""
+    out: Dict[str, Any] = {}
+    volatile: Dict[str, Any] = {}
+    for k, v in kwargs.items():
+        if v is None or isinstance(v, (str, int, float, bool)):
+            out[k] = v
+        elif k == "embed" and hasattr(v, "to_dict"):
+            out["embed"] = v.to_dict()
+        elif k == "embeds" and all(hasattr(e, "to_dict") for e in v):
+            out["embeds"] = [e.to_dict() for e in v]
+        elif k == "reference" and (getattr(v, "message_id", None) or getattr(v, "id", None)) is not None:
+            mid = getattr(v, "message_id", None) or getattr(v, "id", None)
+            ch = getattr(v, "channel_id", None) or getattr(getattr(v, "channel", None), "id", None)
+            out["reference"] = {"message_id": int(mid), "channel_id": ch}
+        elif k == "allowed_mentions" and all(isinstance(getattr(v, a, None), bool)
+                                             for a in ("everyone", "users", "roles", "replied_user")):
+            out["allowed_mentions"] = {a: getattr(v, a) for a in ("everyone", "users", "roles", "replied_user")}
+        else:
+            volatile[k] = v
+    return json.dumps(out, ensure_ascii=False), (volatile or None)
+
+def _decode(payload: str) -> Dict[str, Any]:
+    kw = json.loads(payload)
+    if discord is None:
+        return kw
+    if "embed" in kw:
+        kw["embed"] = discord.Embed.from_dict(kw["embed"])
+    if "embeds" in kw:
+        kw["embeds"] = [discord.Embed.from_dict(e) for e in kw["embeds"]]
+    if "reference" in kw:
+        r = kw["reference"]
+        kw["reference"] = discord.MessageReference(message_id=r["message_id"], channel_id=r.get("channel_id"),
+                                                   fail_if_not_exists=False)
+    if "allowed_mentions" in kw:
+        kw["allowed_mentions"] = discord.AllowedMentions(**kw["allowed_mentions"])
+    return kw
+
+def _permanent(e: BaseException) -> bool:
+    return discord is not None and isinstance(e, (discord.Forbidden, discord.NotFound))
+
+
 class SendQueue:
-    """Durable-ish send queue (in-memory stub)."""
-    def __init__(self, bot, rate_interval: float = 0.9):
+    """Durable outbox: SQLite-backed, per-channel ordered workers, retry + dedupe."""
+    def __init__(self, bot, rate_interval: float = 0.0, path: Optional[str] = None, *,
+                 retry_base: float = OUTBOX_RETRY_BASE, retry_max: float = OUTBOX_RETRY_MAX,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, max_workers: int = OUTBOX_MAX_WORKERS):
         self.bot = bot
-        self.queue: asyncio.Queue = asyncio.Queue()
-        self._worker: Optional[asyncio.Task] = None
         self.rate_interval = rate_interval
+        self.path = path or OUTBOX_DB
+        self.retry_base, self.retry_max, self.max_attempts = retry_base, retry_max, max_attempts
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._sem = asyncio.Semaphore(max(1, max_workers))
+        self._volatile: Dict[int, Dict[str, Any]] = {}
+        self._inflight: Set[int] = set()
+        self._running = False
+        self.stats = {"enqueued": 0, "dedup": 0, "coalesced": 0, "sent": 0, "retried": 0, "dead": 0}
+
+    # ---------- db ----------
+    def _conn(self):
+        if self._db is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._db = open_db(self.path)
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def _exec(self, sql: str, args: tuple = ()):
+        with self._db_lock:
+            return self._conn().execute(sql, args)
+
+    def _query(self, sql: str, args: tuple = ()):
+        with self._db_lock:
+            return self._conn().execute(sql, args).fetchall()
+
+    async def _aexec(self, sql: str, args: tuple = ()) -> None:
+        await asyncio.to_thread(self._exec, sql, args)
+
+    async def _aquery(self, sql: str, args: tuple = ()):
+        return await asyncio.to_thread(self._query, sql, args)
 
+    # ---------- lifecycle ----------
     async def start(self):
-        if self._worker is None:
-            self._worker = asyncio.create_task(self._run(), name="send-queue-worker")
+        self._running = True
+        await self.replay()
 
     async def stop(self):
-        if self._worker:
-            self._worker.cancel()
-            self._worker = None
+        self._running = False
+        for t in list(self._workers.values()):
+            t.cancel()
+        self._workers.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
 
-    async def enqueue(self, channel_id: int, **send_kwargs):
-        await self.queue.put((channel_id, send_kwargs))
+    def _replay_db(self, keep: str) -> tuple:
+        now = time.time()
+        self._exec("DELETE FROM outbox WHERE status != 'pending' AND updated_ts < ?", (now - OUTBOX_KEEP_DONE_SEC,))
+        # payload volatile dari proses sebelumnya sudah hilang -> tidak bisa dikirim ulang utuh
+        lost = self._exec("UPDATE outbox SET status='dead', error='volatile payload lost on restart', updated_ts=? "
+                          "WHERE status='pending' AND volatile=1 AND id NOT IN (%s)" % keep, (now,)).rowcount
+        chans = [r[0] for r in self._query("SELECT DISTINCT channel_id FROM outbox WHERE status='pending'")]
+        return lost, chans
 
-    async def _run(self):
-        while True:
-            channel_id, send_kwargs = await self.queue.get()
+    async def replay(self) -> int:
+        """Start workers for every channel that still has pending rows (after restart/on_ready)."""
+        if not self._running:
+            return 0
+        lost, chans = await asyncio.to_thread(self._replay_db, ",".join(str(i) for i in self._volatile) or "0")
+        if lost:
+            log.warning("send-queue: %d volatile sends lost across restart", lost)
+        for cid in chans:
+            self._kick(int(cid))
+        return len(chans)
+
+    # ---------- enqueue ----------
+    def _insert_db(self, channel_id: int, kind: str, target: Optional[str], prio: int,
+                   key: Optional[str], payload: str, volatile: bool) -> tuple:
+        """(row id or None, coalesced); runs in a thread, atomic with _claim under _db_lock."""
+        now = time.time()
+        with self._db_lock:
+            con = self._conn()
+            if kind in ("edit", "upsert"):
+                row = con.execute("SELECT id FROM outbox WHERE status='pending' AND channel_id=? AND kind=? "
+                                  "AND target=? ORDER BY id DESC LIMIT 1", (channel_id, kind, target)).fetchall()
+                if row and row[0][0] not in self._inflight:
+                    rid = int(row[0][0])
+                    con.execute("UPDATE outbox SET payload=?, volatile=?, updated_ts=? WHERE id=?",
+                                (payload, 1 if volatile else 0, now, rid))
+                    return rid, True
+            cur = con.execute("INSERT OR IGNORE INTO outbox(idem, channel_id, kind, target, payload, volatile, prio, "
+                              "next_at, created_ts, updated_ts) VALUES(?,?,?,?,?,?,?,?,?,?)",
+                              (key or uuid.uuid4().hex, channel_id, kind, target, payload, 1 if volatile else 0,
+                               prio, 0.0, now, now))
+            return (int(cur.lastrowid) if cur.rowcount else None), False
+
+    async def _insert(self, channel_id: int, kind: str, target: Optional[str], prio: int,
+                      key: Optional[str], send_kwargs: Dict[str, Any]) -> bool:
+        payload, volatile = _encode(send_kwargs)
+        rid, coalesced = await asyncio.to_thread(self._insert_db, channel_id, kind, target, prio, key,
+                                                 payload, bool(volatile))
+        if rid is None:
+            self.stats["dedup"] += 1
+            return False
+        if volatile:
+            self._volatile[rid] = volatile
+        else:
+            self._volatile.pop(rid, None)
+        if coalesced:
+            self.stats["coalesced"] += 1
+            return True
+        self.stats["enqueued"] += 1
+        self._kick(channel_id)
+        return True
+
+    async def enqueue(self, channel_id: int, prio: int = PRIO_REPLY, key: Optional[str] = None, **send_kwargs) -> bool:
+        """Queue channel.send(**send_kwargs); False if `key` was already queued/sent."""
+        return await self._insert(int(channel_id), "send", None, prio, key, send_kwargs)
+
+    async def edit(self, channel_id: int, message_id: int, prio: int = PRIO_LOW, **edit_kwargs) -> bool:
+        """Queue message.edit(); pending edits of the same message collapse into the latest one."""
+        return await self._insert(int(channel_id), "edit", str(int(message_id)), prio, None, edit_kwargs)
+
+    async def upsert(self, channel_id: int, marker: str, prio: int = PRIO_LOW, **send_kwargs) -> bool:
+        """Edit the message remembered for `marker` (send + remember it the first time)."""
+        return await self._insert(int(channel_id), "upsert", marker, prio, None, send_kwargs)
+
+    # ---------- workers ----------
+    def _kick(self, channel_id: int) -> None:
+        if not self._running:
+            return
+        t = self._workers.get(channel_id)
+        if t is None or t.done():
+            self._workers[channel_id] = asyncio.create_task(self._run(channel_id), name=f"send-queue:{channel_id}")
+
+    async def _channel(self, channel_id: int):
+        ch = self.bot.get_channel(channel_id)
+        if ch is None:
+            ch = await self.bot.fetch_channel(channel_id)
+        return ch
+
+    async def _deliver(self, ch, row) -> None:
+        rid, kind, target, payload, prio = int(row[0]), row[2], row[3], row[4], int(row[5])
+        kw = _decode(payload)
+        kw.update(self._volatile.get(rid) or {})
+        with priority(prio):
+            if kind == "send":
+                await ch.send(**kw)
+            elif kind == "edit":
+                await ch.get_partial_message(int(target)).edit(**kw)
+            else:
+                m = await self._aquery("SELECT message_id FROM outbox_markers WHERE channel_id=? AND marker=?",
+                                (int(ch.id), target))
+                if m:
+                    try:
+                        await ch.get_partial_message(int(m[0][0])).edit(**kw)
+                        return
+                    except Exception as e:
+                        if discord is None or not isinstance(e, discord.NotFound):
+                            raise
+                msg = await ch.send(**kw)
+                await self._aexec("INSERT OR REPLACE INTO outbox_markers(channel_id, marker, message_id) VALUES(?,?,?)",
+                           (int(ch.id), target, int(msg.id)))
+
+    def _claim(self, channel_id: int) -> tuple:
+        """(head row or None, seconds until due); a due row is marked in-flight under _db_lock."""
+        with self._db_lock:
+            rows = self._conn().execute("SELECT id, channel_id, kind, target, payload, prio, attempts, next_at "
+                                        "FROM outbox WHERE status='pending' AND channel_id=? ORDER BY id LIMIT 1",
+                                        (channel_id,)).fetchall()
+            if not rows:
+                return None, 0.0
+            row = rows[0]
+            wait = float(row[7] or 0) - time.time()
+            if wait <= 0:
+                self._inflight.add(int(row[0]))
+            return row, wait
+
+    def _finish(self, rid: int, sql: str, args: tuple) -> None:
+        with self._db_lock:
             try:
-                ch = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
-                if hasattr(ch, 'send'):
-                    await asyncio.sleep(self.rate_interval)
-                    await ch.send(**send_kwargs)
-            except Exception as e:
-                log.warning("send-queue: send failed: %r", e)
+                self._conn().execute(sql, args)
             finally:
-                self.queue.task_done()
+                self._inflight.discard(rid)
+
+    async def _run(self, channel_id: int):
+        try:
+            while self._running:
+                async with self._sem:
+                    row, wait = await asyncio.to_thread(self._claim, channel_id)
+                    if row is None:
+                        return
+                    if wait <= 0:
+                        await self._attempt(channel_id, row)
+                        continue
+                # head-of-line backoff: urutan channel tetap terjaga, slot worker dilepas selama tidur
+                await asyncio.sleep(wait)
+        finally:
+            if self._workers.get(channel_id) is asyncio.current_task():
+                self._workers.pop(channel_id, None)
+
+    async def _attempt(self, channel_id: int, row) -> None:
+        rid, attempts = int(row[0]), int(row[6])
+        try:
+            if self.rate_interval > 0:
+                await asyncio.sleep(self.rate_interval)
+            ch = await self._channel(channel_id)
+            await self._deliver(ch, row)
+        except asyncio.CancelledError:
+            self._inflight.discard(rid)
+            raise
+        except Exception as e:
+            attempts += 1
+            now = time.time()
+            if _permanent(e) or attempts >= self.max_attempts:
+                await asyncio.to_thread(self._finish, rid,
+                                        "UPDATE outbox SET status='dead', attempts=?, error=?, updated_ts=? WHERE id=?",
+                                        (attempts, repr(e)[:500], now, rid))
+                self._volatile.pop(rid, None)
+                self.stats["dead"] += 1
+                log.warning("send-queue: giving up on #%s to %s after %d tries: %r", rid, channel_id, attempts, e)
+            else:
+                delay = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+                await asyncio.to_thread(self._finish, rid,
+                                        "UPDATE outbox SET attempts=?, next_at=?, error=?, updated_ts=? WHERE id=?",
+                                        (attempts, now + delay, repr(e)[:500], now, rid))
+                self.stats["retried"] += 1
+                log.info("send-queue: #%s to %s failed (%r), retry in %.1fs", rid, channel_id, e, delay)
+        else:
+            await asyncio.to_thread(self._finish, rid, "UPDATE outbox SET status='done', attempts=?, updated_ts=? WHERE id=?",
+                                    (attempts + 1, time.time(), rid))
+            self._volatile.pop(rid, None)
+            self.stats["sent"] += 1
+
+    def pending(self) -> int:
+        return int(self._query("SELECT COUNT(*) FROM outbox WHERE status='pending'")[0][0])
@@ -1,7 +1,9 @@
 
-import os, re, time, sqlite3
+import os, re, time
 from typing import Iterable, Tuple
 
+from .memory_db import get_memory_db, register_schema
+
 DB_PATH = os.getenv("NEUROLITE_MEMORY_DB",
     os.path.join(os.path.dirname(__file__), "..","..","..","..","data","memory.sqlite3"))
 
@@ -27,28 +29,20 @@ NEG_SEED = {
     "gaklucu","galucu","notsmart","nfunny","ngebetein","bete","bt","apalah",
 }
 
-def _ensure_db():
-    d = os.path.dirname(DB_PATH)
-    if d and not os.path.exists(d):
-        os.makedirs(d, exist_ok=True)
-    con = sqlite3.connect(DB_PATH)
-    try:
-        cur = con.cursor()
-        cur.execute("""CREATE TABLE IF NOT EXISTS slang_lexicon (
-            token TEXT PRIMARY KEY,
-            pos INTEGER DEFAULT 0,
-            neg INTEGER DEFAULT 0,
-            updated_ts INTEGER
-        )""")
-        for t in POS_SEED:
-            cur.execute("INSERT OR IGNORE INTO slang_lexicon(token,pos,neg,updated_ts) VALUES (?,?,?,?)",
-                        (t, 1, 0, int(time.time())))
-        for t in NEG_SEED:
-            cur.execute("INSERT OR IGNORE INTO slang_lexicon(token,pos,neg,updated_ts) VALUES (?,?,?,?)",
-                        (t, 0, 1, int(time.time())))
-        con.commit()
-    finally:
-        con.close()
+register_schema("slang_lexicon", [
+    """CREATE TABLE IF NOT EXISTS slang_lexicon (
+        token TEXT PRIMARY KEY,
+        pos INTEGER DEFAULT 0,
+        neg INTEGER DEFAULT 0,
+        updated_ts INTEGER
+    )""",
+    ("INSERT OR IGNORE INTO slang_lexicon(token,pos,neg,updated_ts) VALUES (?,?,?,?)",
+     [(t, 1, 0, int(time.time())) for t in sorted(POS_SEED)]
+     + [(t, 0, 1, int(time.time())) for t in sorted(NEG_SEED)]),
+])
+
+def _db():
+    return get_memory_db(DB_PATH)
 
 def _tokens(text: str) -> Iterable[str]:
     for m in TOKEN_RE.finditer(text.lower()):
@@ -58,46 +52,35 @@ def _tokens(text: str) -> Iterable[str]:
             yield tok
 
 def score_text(text: str) -> Tuple[int, int]:
-    _ensure_db()
     toks = list(_tokens(text))
     if not toks:
         return (0, 0)
     qmarks = ",".join("?" for _ in toks)
-    con = sqlite3.connect(DB_PATH); con.row_factory = sqlite3.Row
-    try:
-        cur = con.cursor()
-        cur.execute(f"SELECT token,pos,neg FROM slang_lexicon WHERE token IN ({qmarks})", toks)
-        pos = neg = 0
-        for r in cur.fetchall():
-            pos += int(r["pos"] > 0)
-            neg += int(r["neg"] > 0)
-        return (pos, neg)
-    finally:
-        con.close()
+    pos = neg = 0
+    for r in _db().fetchall(f"SELECT token,pos,neg FROM slang_lexicon WHERE token IN ({qmarks})", toks):
+        pos += int(r["pos"] > 0)
+        neg += int(r["neg"] > 0)
+    return (pos, neg)
+
+_LEARN_SQL = {
+    True: """INSERT INTO slang_lexicon(token,pos,neg,updated_ts)
+             VALUES (?,1,0,?)
+             ON CONFLICT(token) DO UPDATE SET
+             pos = pos + 1,
+             updated_ts = excluded.updated_ts""",
+    False: """INSERT INTO slang_lexicon(token,pos,neg,updated_ts)
+              VALUES (?,0,1,?)
+              ON CONFLICT(token) DO UPDATE SET
+              neg = neg + 1,
+              updated_ts = excluded.updated_ts""",
+}
 
 def learn_from_text(text: str, is_positive: bool | None):
+    """Queue lexicon updates on the memory DB writer (returns its Future, or None)."""
     if is_positive is None:
-        return
-    _ensure_db()
+        return None
     toks = [t for t in _tokens(text) if 2 <= len(t) <= 14]
     if not toks:
-        return
-    con = sqlite3.connect(DB_PATH)
-    try:
-        cur = con.cursor()
-        for t in toks:
-            if is_positive:
-                cur.execute("""INSERT INTO slang_lexicon(token,pos,neg,updated_ts)
-                               VALUES (?,?,?,?)
-                               ON CONFLICT(token) DO UPDATE SET
-                               pos = pos + 1,
-                               updated_ts = excluded.updated_ts""", (t,1,0,int(time.time())))
-            else:
-                cur.execute("""INSERT INTO slang_lexicon(token,pos,neg,updated_ts)
-                               VALUES (?,?,?,?)
-                               ON CONFLICT(token) DO UPDATE SET
-                               neg = neg + 1,
-                               updated_ts = excluded.updated_ts""", (t,0,1,int(time.time())))
-        con.commit()
-    finally:
-        con.close()
+        return None
+    now = int(time.time())
+    return _db().executemany(_LEARN_SQL[bool(is_positive)], [(t, now) for t in toks])
@@ -12,8 +12,8 @@ def _apply_pragmas(conn: sqlite3.Connection) -> None:
     cur.execute("PRAGMA wal_autocheckpoint=1000;")
     cur.close()
 
-def open_db(path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+def open_db(path: str, **kwargs) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, **kwargs)
     _apply_pragmas(conn)
     return conn
 
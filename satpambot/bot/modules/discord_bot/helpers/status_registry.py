@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+"""
+status_registry.py
+- Registry in-memory key -> message id (+ hash payload, ts) untuk semua pesan status/sticky
+  yang di-edit di tempat: status coalescer, sticky keeper, EmbedScribe.upsert, memory_upsert.
+- Persistensi debounced: perubahan ditandai dirty lalu ditulis sekali (JSON compact, atomic)
+  setelah STATUS_REGISTRY_FLUSH_SEC; juga saat exit. Tidak ada read+write file per status.
+- Cache objek Message: edit memakai message yang tersimpan / channel.get_partial_message(id),
+  tanpa fetch_message.
+- Kebijakan edit: per key paling banyak satu edit in-flight, jarak minimal STATUS_MIN_EDIT_SEC;
+  update yang datang selama menunggu menimpa yang pending (yang di tengah dibuang),
+  payload identik (hash sama) di-skip. Edit gagal (NotFound atau error lain) -> kirim baru.
+- Migrasi sekali dari data/status_coalesce/state.json dan data/runtime/sticky_keeper.json.
+"""
+import os, json, time, atexit, asyncio, hashlib, logging, threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+STATUS_REGISTRY_PATH = os.getenv("STATUS_REGISTRY_PATH", os.path.join("data", "runtime", "status_registry.json"))
+STATUS_REGISTRY_FLUSH_SEC = float(os.getenv("STATUS_REGISTRY_FLUSH_SEC", "5"))
+STATUS_MIN_EDIT_SEC = float(os.getenv("STATUS_MIN_EDIT_SEC", "2"))
+
+_LEGACY = (
+    (os.path.join("data", "status_coalesce", "state.json"), ""),
+    (os.getenv("STICKY_KEEPER_PATH", os.path.join("data", "runtime", "sticky_keeper.json")), "sticky:"),
+)
+
+
+def payload_hash(kwargs: Dict[str, Any]) -> Optional[str]:
+    """Stable hash of message kwargs (embed timestamps ignored); None if not hashable."""
+    try:
+        norm = {}
+        for k, v in kwargs.items():
+            if hasattr(v, "to_dict"):
+                d = v.to_dict()
+                d.pop("timestamp", None)
+                v = d
+            elif isinstance(v, (list, tuple)):
+                v = [x.to_dict() if hasattr(x, "to_dict") else x for x in v]
+            norm[k] = v
+        raw = json.dumps(norm, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+    except Exception:
+        return None
+
+
+@dataclass
+class _Slot:
+    kwargs: Optional[Dict[str, Any]] = None
+    edit_only: bool = False
+    max_age: Optional[float] = None
+    send: Optional[Callable[..., Awaitable[Any]]] = None
+    on_new: Optional[Callable[[Any], Awaitable[Any]]] = None
+    waiters: List[asyncio.Future] = field(default_factory=list)
+    running: bool = False
+    task: Optional[asyncio.Task] = None
+    last_edit: float = 0.0
+
+
+class StatusRegistry:
+    def __init__(self, path: str = STATUS_REGISTRY_PATH, flush_sec: float = STATUS_REGISTRY_FLUSH_SEC,
+                 min_edit_sec: float = STATUS_MIN_EDIT_SEC, legacy: Iterable[Tuple[str, str]] = ()):
+        self.path = path
+        self.flush_sec = flush_sec
+        self.min_edit_sec = min_edit_sec
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._messages: Dict[str, Any] = {}
+        self._slots: Dict[str, _Slot] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.stats = {"edits": 0, "sends": 0, "skipped_same": 0, "dropped": 0, "flushes": 0}
+        self._load(legacy)
+
+    # ---------- persistence ----------
+    def _load(self, legacy) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f) or {}
+            return
+        except FileNotFoundError:
+            pass
+        except Exception:
+            log.warning("[status_registry] %s unreadable, starting empty", self.path)
+            return
+        for p, prefix in legacy:
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    for k, v in (json.load(f) or {}).items():
+                        if isinstance(v, dict) and v.get("id"):
+                            self._entries.setdefault(prefix + k, {"id": int(v["id"]), "hash": v.get("hash"),
+                                                                  "ts": float(v.get("ts") or 0)})
+            except Exception:
+                continue
+        if self._entries:
+            self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        with self._lock:
+            self._dirty = True
+            if self._timer is None and self.flush_sec > 0:
+                self._timer = threading.Timer(self.flush_sec, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.flush_sec <= 0:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            snap = dict(self._entries)
+        try:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snap, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self.stats["flushes"] += 1
+        except Exception as e:
+            log.warning("[status_registry] flush failed: %r", e)
+
+    # ---------- registry ----------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def message_id(self, key: str) -> Optional[int]:
+        ent = self._entries.get(key)
+        return int(ent["id"]) if ent and ent.get("id") else None
+
+    def remember(self, key: str, message, hash: Optional[str] = None) -> None:
+        ent = self._entries.get(key) or {}
+        self._entries[key] = {"id": int(message.id), "hash": hash if hash is not None else ent.get("hash"),
+                              "ts": time.time()}
+        self._messages[key] = message
+        self._mark_dirty()
+
+    def set_hash(self, key: str, value: Optional[str]) -> None:
+        ent = self._entries.get(key)
+        if ent is not None and ent.get("hash") != value:
+            ent["hash"] = value
+            ent["ts"] = time.time()
+            self._mark_dirty()
+
+    def forget(self, key: str) -> None:
+        self._messages.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self._mark_dirty()
+
+    def cached_message(self, channel, key: str):
+        """Cached Message, else a PartialMessage for the stored id (no REST call), else None."""
+        msg = self._messages.get(key)
+        if msg is not None:
+            return msg
+        mid = self.message_id(key)
+        if mid is None:
+            return None
+        if hasattr(channel, "get_partial_message"):
+            return channel.get_partial_message(mid)
+        return None
+
+    # ---------- edit-or-send ----------
+    async def upsert(self, channel, key: str, *, edit_only: bool = False, max_age: Optional[float] = None,
+                     send: Optional[Callable[..., Awaitable[Any]]] = None,
+                     on_new: Optional[Callable[[Any], Awaitable[Any]]] = None, **kwargs):
+        """Edit the message registered under `key` or send (and register) a new one.
+
+        Concurrent/rapid calls for one key collapse: only the newest payload is applied.
+        `send(channel, **kwargs)` overrides channel.send (e.g. an unpatched original).
+        """
+        h = payload_hash(kwargs)
+        ent = self._entries.get(key)
+        slot = self._slots.get(key)
+        if ent and h and ent.get("hash") == h and not (slot and slot.kwargs is not None) and \
+                not (max_age is not None and time.time() - float(ent.get("ts") or 0) >= max_age):
+            self.stats["skipped_same"] += 1
+            return self.cached_message(channel, key)
+        if slot is None:
+            slot = self._slots[key] = _Slot()
+        if slot.kwargs is not None:
+            self.stats["dropped"] += 1
+        slot.kwargs, slot.edit_only, slot.max_age, slot.send, slot.on_new = kwargs, edit_only, max_age, send, on_new
+        fut = asyncio.get_running_loop().create_future()
+        slot.waiters.append(fut)
+        if not slot.running:
+            slot.running = True
+            slot.task = asyncio.create_task(self._drain(channel, key, slot), name=f"status-registry:{key}")
+        return await asyncio.shield(fut)
+
+    async def _drain(self, channel, key: str, slot: _Slot) -> None:
+        try:
+            while slot.kwargs is not None:
+                wait = slot.last_edit + self.min_edit_sec - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                kwargs, waiters = slot.kwargs, slot.waiters
+                slot.kwargs, slot.waiters = None, []
+                try:
+                    res = await self._apply(channel, key, kwargs, slot.edit_only, slot.max_age, slot.send, slot.on_new)
+                except Exception as e:
+                    for f in waiters:
+                        if not f.done():
+                            f.set_exception(e)
+                    continue
+                finally:
+                    slot.last_edit = time.monotonic()
+                for f in waiters:
+                    if not f.done():
+                        f.set_result(res)
+        finally:
+            slot.running = False
+            if slot.kwargs is None and not slot.waiters:
+                self._slots.pop(key, None)
+
+    async def _apply(self, channel, key, kwargs, edit_only, max_age, send, on_new):
+        import discord
+        h = payload_hash(kwargs)
+        ent = self._entries.get(key)
+        fresh = ent is not None and (max_age is None or time.time() - float(ent.get("ts") or 0) < max_age)
+        msg = self.cached_message(channel, key) if fresh else None
+        if msg is not None:
+            try:
+                edited = await msg.edit(**kwargs)
+                self.stats["edits"] += 1
+                self.remember(key, edited if getattr(edited, "id", None) else msg, h)
+                return self._messages[key]
+            except Exception as e:
+                # pesan hilang / edit gagal -> kirim baru (seperti fallback lama)
+                if not isinstance(e, discord.NotFound):
+                    log.warning("[status_registry] edit %s failed (%r), sending a new message", key, e)
+                self.forget(key)
+        if edit_only:
+            return None
+        msg = await (send(channel, **kwargs) if send is not None else channel.send(**kwargs))
+        self.stats["sends"] += 1
+        if msg is not None and getattr(msg, "id", None):
+            self.remember(key, msg, h)
+            if on_new is not None:
+                try:
+                    await on_new(msg)
+                except Exception:
+                    log.debug("[status_registry] on_new for %s failed", key, exc_info=True)
+        return msg
+
+
+_registry: Optional[StatusRegistry] = None
+
+def get_registry() -> StatusRegistry:
+    global _registry
+    if _registry is None:
+        _registry = StatusRegistry(legacy=_LEGACY)
+        atexit.register(_registry.flush)
+    return _registry
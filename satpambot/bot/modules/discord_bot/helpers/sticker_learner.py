@@ -1,65 +1,65 @@
-import os, sqlite3, time, random
+import os, sqlite3, time, random, asyncio
 from typing import Dict, Any, Optional
 
+from .memory_db import get_memory_db, register_schema
+
 DEFAULT_DB = os.getenv("NEUROLITE_MEMORY_DB",
     os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "data", "memory.sqlite3"))
 
-def _ensure_dir(path: str):
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        os.makedirs(d, exist_ok=True)
+register_schema("sticker", [
+    """CREATE TABLE IF NOT EXISTS sticker_events (
+        user_id INTEGER,
+        ts INTEGER,
+        emotion TEXT,
+        used INTEGER,
+        success INTEGER,
+        guild_id INTEGER,
+        dm INTEGER,
+        has_user_sticker INTEGER,
+        exclam INTEGER,
+        laugh_www INTEGER,
+        laugh_wkwk INTEGER,
+        laugh_lol INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS sticker_stats (
+        emotion TEXT PRIMARY KEY,
+        sent_count INTEGER,
+        success_count INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS sticker_catalog (
+        sticker_id INTEGER PRIMARY KEY,
+        name TEXT,
+        guild_id INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS sticker_sent (
+        msg_id INTEGER PRIMARY KEY,
+        sticker_id INTEGER,
+        guild_id INTEGER,
+        channel_id INTEGER,
+        emotion TEXT,
+        ts INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS sticker_feedback (
+        msg_id INTEGER PRIMARY KEY,
+        pos INTEGER DEFAULT 0,
+        neg INTEGER DEFAULT 0,
+        credited INTEGER DEFAULT 0
+    )""",
+])
+
+def credit_success(cur: sqlite3.Connection, emotion: str):
+    cur.execute("""INSERT INTO sticker_stats(emotion, sent_count, success_count)
+                   VALUES (?,0,1)
+                   ON CONFLICT(emotion) DO UPDATE SET
+                   success_count=success_count+1""",
+                (str(emotion),))
 
 class StickerLearner:
+    """Reads go through the shared reader connection; writes are queued on the memory DB writer
+    (methods that write return its Future, callers on the event loop need not wait)."""
     def __init__(self, db_path: str = DEFAULT_DB):
         self.db_path = os.path.abspath(db_path)
-        _ensure_dir(self.db_path)
-        self._init_db()
-
-    def _init_db(self):
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
-            cur.execute("""CREATE TABLE IF NOT EXISTS sticker_events (
-                user_id INTEGER,
-                ts INTEGER,
-                emotion TEXT,
-                used INTEGER,
-                success INTEGER,
-                guild_id INTEGER,
-                dm INTEGER,
-                has_user_sticker INTEGER,
-                exclam INTEGER,
-                laugh_www INTEGER,
-                laugh_wkwk INTEGER,
-                laugh_lol INTEGER
-            )""")
-            cur.execute("""CREATE TABLE IF NOT EXISTS sticker_stats (
-                emotion TEXT PRIMARY KEY,
-                sent_count INTEGER,
-                success_count INTEGER
-            )""")
-            cur.execute("""CREATE TABLE IF NOT EXISTS sticker_catalog (
-                sticker_id INTEGER PRIMARY KEY,
-                name TEXT,
-                guild_id INTEGER
-            )""")
-            cur.execute("""CREATE TABLE IF NOT EXISTS sticker_sent (
-                msg_id INTEGER PRIMARY KEY,
-                sticker_id INTEGER,
-                guild_id INTEGER,
-                channel_id INTEGER,
-                emotion TEXT,
-                ts INTEGER
-            )""")
-            cur.execute("""CREATE TABLE IF NOT EXISTS sticker_feedback (
-                msg_id INTEGER PRIMARY KEY,
-                pos INTEGER DEFAULT 0,
-                neg INTEGER DEFAULT 0,
-                credited INTEGER DEFAULT 0
-            )""")
-            con.commit()
-        finally:
-            con.close()
+        self.db = get_memory_db(self.db_path)
 
     # Catalog
     def update_catalog_from_bot(self, bot):
@@ -75,15 +75,7 @@ class StickerLearner:
             except Exception:
                 continue
         if not items: return 0
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
-            for sid, name, gid in items:
-                cur.execute("INSERT OR REPLACE INTO sticker_catalog(sticker_id, name, guild_id) VALUES (?,?,?)",
-                            (sid, name, gid))
-            con.commit()
-        finally:
-            con.close()
+        self.db.executemany("INSERT OR REPLACE INTO sticker_catalog(sticker_id, name, guild_id) VALUES (?,?,?)", items)
         return len(items)
 
     # Recommendation
@@ -97,50 +89,36 @@ class StickerLearner:
         laugh_sum = (style_summary.get("www",0) or 0) + (style_summary.get("wkwk",0) or 0) + (style_summary.get("lol",0) or 0)
         if laugh_sum >= 1:
             rate += float(os.getenv("STICKER_BOOST_LAUGH", 0.10))
-        con = sqlite3.connect(self.db_path); con.row_factory = sqlite3.Row
-        try:
-            cur = con.cursor()
-            cur.execute("SELECT sent_count, success_count FROM sticker_stats WHERE emotion=?", (emotion,))
-            row = cur.fetchone()
-            if row and (row["sent_count"] or 0) > 5:
-                succ = (row["success_count"] or 0) / max(1, row["sent_count"])
-                rate = 0.6*rate + 0.4*succ
-        finally:
-            con.close()
+        row = self.db.fetchone("SELECT sent_count, success_count FROM sticker_stats WHERE emotion=?", (emotion,))
+        if row and (row["sent_count"] or 0) > 5:
+            succ = (row["success_count"] or 0) / max(1, row["sent_count"])
+            rate = 0.6*rate + 0.4*succ
         rate = max(min_rate, min(max_rate, rate))
         return rate
 
     def pick_sticker(self, bot, guild_id: int | None, emotion: str):
-        con = sqlite3.connect(self.db_path); con.row_factory = sqlite3.Row
-        try:
-            cur = con.cursor()
-            if guild_id:
-                cur.execute("SELECT sticker_id FROM sticker_catalog WHERE guild_id=?", (int(guild_id),))
-                rows = [r["sticker_id"] for r in cur.fetchall()]
-                if rows: return int(random.choice(rows))
-            cur.execute("SELECT sticker_id FROM sticker_catalog")
-            rows = [r["sticker_id"] for r in cur.fetchall()]
+        if guild_id:
+            rows = [r["sticker_id"] for r in self.db.fetchall("SELECT sticker_id FROM sticker_catalog WHERE guild_id=?", (int(guild_id),))]
             if rows: return int(random.choice(rows))
-        finally:
-            con.close()
+        rows = [r["sticker_id"] for r in self.db.fetchall("SELECT sticker_id FROM sticker_catalog")]
+        if rows: return int(random.choice(rows))
         return None
 
     # Logging
     def log_event(self, user_id: int, emotion: str, used: bool, success: bool,
                   guild_id: int | None, dm: bool, has_user_sticker: bool, style_summary: Dict[str,int]):
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
+        event = (
+            int(user_id), int(time.time()), str(emotion or "neutral"), int(bool(used)), int(bool(success)),
+            int(guild_id or 0), int(bool(dm)), int(bool(has_user_sticker)),
+            int(style_summary.get("exclam",0) or 0),
+            int(style_summary.get("www",0) or 0),
+            int(style_summary.get("wkwk",0) or 0),
+            int(style_summary.get("lol",0) or 0),
+        )
+        def _write(cur):
             cur.execute("""INSERT INTO sticker_events
                 (user_id, ts, emotion, used, success, guild_id, dm, has_user_sticker, exclam, laugh_www, laugh_wkwk, laugh_lol)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""", (
-                    int(user_id), int(time.time()), str(emotion or "neutral"), int(bool(used)), int(bool(success)),
-                    int(guild_id or 0), int(bool(dm)), int(bool(has_user_sticker)),
-                    int(style_summary.get("exclam",0) or 0),
-                    int(style_summary.get("www",0) or 0),
-                    int(style_summary.get("wkwk",0) or 0),
-                    int(style_summary.get("lol",0) or 0),
-                ))
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""", event)
             if used:
                 cur.execute("""INSERT INTO sticker_stats(emotion, sent_count, success_count)
                                VALUES (?,1,?)
@@ -148,70 +126,55 @@ class StickerLearner:
                                sent_count=sent_count+1,
                                success_count=success_count+excluded.success_count""",
                             (str(emotion or "neutral"), int(bool(success))))
-            con.commit()
-        finally:
-            con.close()
+        return self.db.transact(_write)
 
     # Message mapping & feedback
     def record_sent_message(self, msg_id: int, sticker_id: int, guild_id: int | None, channel_id: int | None, emotion: str):
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
+        row = (int(msg_id), int(sticker_id), int(guild_id or 0), int(channel_id or 0), emotion, int(time.time()))
+        def _write(cur):
             cur.execute("""INSERT OR REPLACE INTO sticker_sent(msg_id, sticker_id, guild_id, channel_id, emotion, ts)
-                           VALUES (?,?,?,?,?,?)""", (int(msg_id), int(sticker_id), int(guild_id or 0), int(channel_id or 0), emotion, int(time.time())))
+                           VALUES (?,?,?,?,?,?)""", row)
             cur.execute("INSERT OR IGNORE INTO sticker_feedback(msg_id, pos, neg, credited) VALUES (?,0,0,0)", (int(msg_id),))
-            con.commit()
-        finally:
-            con.close()
+        return self.db.transact(_write)
 
     def get_sent_emotion(self, msg_id: int) -> Optional[str]:
-        con = sqlite3.connect(self.db_path); con.row_factory = sqlite3.Row
-        try:
-            cur = con.cursor()
-            cur.execute("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),))
-            row = cur.fetchone()
-            return row["emotion"] if row else None
-        finally:
-            con.close()
+        row = self.db.fetchone("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),))
+        return row["emotion"] if row else None
+
+    async def aget_sent_emotion(self, msg_id: int) -> Optional[str]:
+        row = await self.db.afetchone("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),))
+        return row["emotion"] if row else None
 
     def record_reaction(self, msg_id: int, is_positive: bool, delta: int = 1):
         delta = int(delta)
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
+        def _write(cur):
             if is_positive:
-                cur.execute("UPDATE sticker_feedback SET pos = MAX(0, pos + ?) WHERE msg_id=?", (delta, int(msg_id)))
+                n = cur.execute("UPDATE sticker_feedback SET pos = MAX(0, pos + ?) WHERE msg_id=?", (delta, int(msg_id))).rowcount
             else:
-                cur.execute("UPDATE sticker_feedback SET neg = MAX(0, neg + ?) WHERE msg_id=?", (delta, int(msg_id)))
-            if cur.rowcount == 0:
+                n = cur.execute("UPDATE sticker_feedback SET neg = MAX(0, neg + ?) WHERE msg_id=?", (delta, int(msg_id))).rowcount
+            if n == 0:
                 cur.execute("INSERT OR IGNORE INTO sticker_feedback(msg_id, pos, neg, credited) VALUES (?, ?, ?, 0)",
                             (int(msg_id), max(0,delta) if is_positive else 0, 0 if is_positive else max(0,delta)))
-            con.commit()
-        finally:
-            con.close()
+        return self.db.transact(_write)
 
-    def maybe_credit_success_from_feedback(self, msg_id: int, pos_threshold: int, neg_threshold: int) -> bool:
-        con = sqlite3.connect(self.db_path); con.row_factory = sqlite3.Row
-        credited = False
-        try:
-            cur = con.cursor()
-            cur.execute("SELECT pos, neg, credited FROM sticker_feedback WHERE msg_id=?", (int(msg_id),))
-            row = cur.fetchone()
+    def _credit_from_feedback(self, msg_id: int, pos_threshold: int, neg_threshold: int):
+        def _run(cur) -> bool:
+            row = cur.execute("SELECT pos, neg, credited FROM sticker_feedback WHERE msg_id=?", (int(msg_id),)).fetchone()
             if not row: return False
             pos, neg, done = int(row["pos"]), int(row["neg"]), int(row["credited"])
             if done: return False
             if pos >= int(pos_threshold) and neg < int(neg_threshold):
-                cur.execute("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),))
-                r2 = cur.fetchone()
-                emo = (r2["emotion"] if r2 else "neutral")
-                cur.execute("""INSERT INTO sticker_stats(emotion, sent_count, success_count)
-                               VALUES (?,0,1)
-                               ON CONFLICT(emotion) DO UPDATE SET
-                               success_count=success_count+1""",
-                            (str(emo),))
+                r2 = cur.execute("SELECT emotion FROM sticker_sent WHERE msg_id=?", (int(msg_id),)).fetchone()
+                credit_success(cur, r2["emotion"] if r2 else "neutral")
                 cur.execute("UPDATE sticker_feedback SET credited=1 WHERE msg_id=?", (int(msg_id),))
-                con.commit()
-                credited = True
-        finally:
-            con.close()
-        return credited
+                return True
+            return False
+        return self.db.transact(_run)
+
+    def maybe_credit_success_from_feedback(self, msg_id: int, pos_threshold: int, neg_threshold: int) -> bool:
+        """Sync variant for worker threads/scripts: blocks until the writer commits.
+        Never call it from the event loop (cogs use amaybe_credit_success_from_feedback)."""
+        return bool(self._credit_from_feedback(msg_id, pos_threshold, neg_threshold).result())
+
+    async def amaybe_credit_success_from_feedback(self, msg_id: int, pos_threshold: int, neg_threshold: int) -> bool:
+        return bool(await asyncio.wrap_future(self._credit_from_feedback(msg_id, pos_threshold, neg_threshold)))
@@ -3,77 +3,38 @@
 """Sticky Keeper helper
 Persist and recover sticky message IDs per (channel, marker).
 """
-import os, json, asyncio, contextlib, hashlib, time
+import contextlib
 from typing import Optional
-from discord import NotFound
-from discord.abc import Messageable
-from discord import TextChannel, Thread
 
-_INDEX_PATH = os.getenv("STICKY_KEEPER_PATH", os.path.join("data", "runtime", "sticky_keeper.json"))
-os.makedirs(os.path.dirname(_INDEX_PATH), exist_ok=True)
+from .status_registry import get_registry
+from . import pin_index
 
-_lock = asyncio.Lock()
-_index = {}  # key -> {'id': int, 'hash': str, 'ts': float}
+# index (channel, marker) -> message id hidup di status_registry bersama (debounced, tanpa fetch)
 
 def _key(channel, marker: str) -> str:
     cid = getattr(channel, "id", None)
-    return f"{cid}:{marker}"
+    return f"sticky:{cid}:{marker}"
 
-def _load():
-    global _index
-    if os.path.exists(_INDEX_PATH):
-        try:
-            with open(_INDEX_PATH, "r", encoding="utf-8") as f:
-                _index = json.load(f)
-        except Exception:
-            _index = {}
-
-def _save():
-    tmp = _INDEX_PATH + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(_index, f, ensure_ascii=False, indent=2, sort_keys=True)
-    os.replace(tmp, _INDEX_PATH)
-
-_load()
+def key(channel, marker: str) -> str:
+    return _key(channel, marker)
 
 async def index(channel, marker: str, message):
-    async with _lock:
-        _index[_key(channel, marker)] = {"id": message.id, "hash": _index.get(_key(channel, marker), {}).get("hash"), "ts": time.time()}
-        _save()
+    get_registry().remember(_key(channel, marker), message)
 
 def get_cached_hash(channel, marker: str) -> Optional[str]:
-    return _index.get(_key(channel, marker), {}).get("hash")
+    return (get_registry().get(_key(channel, marker)) or {}).get("hash")
 
 def set_cached_hash(channel, marker: str, value: Optional[str]):
-    async def _set():
-        async with _lock:
-            ent = _index.get(_key(channel, marker)) or {}
-            ent["hash"] = value
-            ent["ts"] = time.time()
-            _index[_key(channel, marker)] = ent
-            _save()
-    # fire and forget
-    try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(_set())
-    except Exception:
-        pass
+    get_registry().set_hash(_key(channel, marker), value)
 
 async def fetch_indexed(channel, marker: str):
-    ent = _index.get(_key(channel, marker))
-    if not ent:
-        return None
-    try:
-        return await channel.fetch_message(ent["id"])
-    except NotFound:
-        return None
-    except Exception:
-        return None
+    """Indexed sticky message (cached / partial, no REST round-trip) or None."""
+    return get_registry().cached_message(channel, _key(channel, marker))
 
 async def find_existing(channel, *, title: str, marker: str, search_limit: int = 200):
     # 1) scan pins
     try:
-        pins = await channel.pins()
+        pins = await pin_index.pins(channel)
         for m in pins:
             if m.author and getattr(m.author, "bot", False) and m.embeds:
                 e0 = m.embeds[0]
@@ -1,60 +1,50 @@
-import os, sqlite3, time
+import os, time, asyncio
+
+from .memory_db import get_memory_db, register_schema
+
 DEFAULT_DB = os.getenv("NEUROLITE_MEMORY_DB",
     os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "data", "memory.sqlite3"))
 
-def _ensure_dir(path: str):
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        os.makedirs(d, exist_ok=True)
+register_schema("upgrades", [
+    """CREATE TABLE IF NOT EXISTS upgrades(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        guild_id INTEGER,
+        channel_id INTEGER,
+        msg_id INTEGER,
+        module TEXT,
+        reason TEXT,
+        status TEXT,
+        ts INTEGER
+    )""",
+])
 
 class UpgradeStore:
     def __init__(self, db_path: str = DEFAULT_DB):
         self.db_path = os.path.abspath(db_path)
-        _ensure_dir(self.db_path); self._init()
-
-    def _init(self):
-        con = sqlite3.connect(self.db_path)
-        try:
-            con.execute("""CREATE TABLE IF NOT EXISTS upgrades(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                guild_id INTEGER,
-                channel_id INTEGER,
-                msg_id INTEGER,
-                module TEXT,
-                reason TEXT,
-                status TEXT,
-                ts INTEGER
-            )""")
-            con.commit()
-        finally:
-            con.close()
+        self.db = get_memory_db(self.db_path)
 
-    def create(self, user_id: int, guild_id: int, channel_id: int, msg_id: int, module: str, reason: str) -> int:
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
-            cur.execute("INSERT INTO upgrades(user_id,guild_id,channel_id,msg_id,module,reason,status,ts) VALUES (?,?,?,?,?,?,?,?)",
-                        (int(user_id), int(guild_id), int(channel_id), int(msg_id), module, reason, "pending", int(time.time())))
-            con.commit()
+    def _create(self, user_id: int, guild_id: int, channel_id: int, msg_id: int, module: str, reason: str):
+        row = (int(user_id), int(guild_id), int(channel_id), int(msg_id), module, reason, "pending", int(time.time()))
+        def _insert(con) -> int:
+            cur = con.execute("INSERT INTO upgrades(user_id,guild_id,channel_id,msg_id,module,reason,status,ts) VALUES (?,?,?,?,?,?,?,?)", row)
             return int(cur.lastrowid or 0)
-        finally:
-            con.close()
+        return self.db.transact(_insert)
+
+    def create(self, user_id: int, guild_id: int, channel_id: int, msg_id: int, module: str, reason: str) -> int:
+        """Blocks until the writer commits; from async code use acreate()."""
+        return self._create(user_id, guild_id, channel_id, msg_id, module, reason).result()
+
+    async def acreate(self, user_id: int, guild_id: int, channel_id: int, msg_id: int, module: str, reason: str) -> int:
+        return await asyncio.wrap_future(self._create(user_id, guild_id, channel_id, msg_id, module, reason))
 
     def latest_pending(self):
-        con = sqlite3.connect(self.db_path); con.row_factory = sqlite3.Row
-        try:
-            cur = con.cursor()
-            cur.execute("SELECT * FROM upgrades WHERE status='pending' ORDER BY id DESC LIMIT 1")
-            row = cur.fetchone()
-            return dict(row) if row else None
-        finally:
-            con.close()
+        row = self.db.fetchone("SELECT * FROM upgrades WHERE status='pending' ORDER BY id DESC LIMIT 1")
+        return dict(row) if row else None
+
+    async def alatest_pending(self):
+        row = await self.db.afetchone("SELECT * FROM upgrades WHERE status='pending' ORDER BY id DESC LIMIT 1")
+        return dict(row) if row else None
 
     def set_status(self, upg_id: int, status: str):
-        con = sqlite3.connect(self.db_path)
-        try:
-            con.execute("UPDATE upgrades SET status=? WHERE id=?", (status, int(upg_id)))
-            con.commit()
-        finally:
-            con.close()
+        return self.db.execute("UPDATE upgrades SET status=? WHERE id=?", (status, int(upg_id)))
@@ -3,6 +3,8 @@ from __future__ import annotations
 import os, asyncio, logging
 from typing import Optional
 
+from .upstash_pool import UpstashError, get_upstash, path_to_cmd
+
 log = logging.getLogger(__name__)
 
 def _cfg(key: str, default: str = "") -> str:
@@ -26,57 +28,26 @@ class UpstashClient:
         self.url = url.rstrip("/") if url else ""
         self.token = tok
         self.enabled = bool(self.url and self.token)
-        self._httpx = None
-        try:
-            import httpx  # type: ignore
-            self._httpx = httpx
-        except Exception:
-            self._httpx = None
         log.info("[upstash-client] enabled=%s url=%s", self.enabled, ("..." + self.url[-24:] if self.url else ""))
 
-    async def _aget(self, path: str):
+    async def _apath(self, method: str, path: str):
         # Shutdown guard
         if os.getenv('LEINA_SHUTTING_DOWN') == '1':
-            log.warning('[upstash-client] skip (shutting down) GET %s', path)
+            log.warning('[upstash-client] skip (shutting down) %s %s', method, path)
             return None
         if not self.enabled:
             return None
-        target = f"{self.url}{path}"
-        headers = {"Authorization": f"Bearer {self.token}"}
-        if self._httpx:
-            async with self._httpx.AsyncClient(timeout=20) as cli:
-                r = await cli.get(target, headers=headers)
-                r.raise_for_status()
-                return r.json()
-        else:
-            import requests  # type: ignore
-            def _do():
-                rr = requests.get(target, headers=headers, timeout=20)
-                rr.raise_for_status()
-                return rr.json()
-            return await asyncio.to_thread(_do)
+        # shared keep-alive pool; auto-batched into /pipeline with same-tick commands
+        try:
+            return {"result": await get_upstash().call(*path_to_cmd(path))}
+        except UpstashError as e:
+            return {"error": str(e)}
+
+    async def _aget(self, path: str):
+        return await self._apath("GET", path)
 
     async def _apost(self, path: str):
-        # Shutdown guard
-        if os.getenv('LEINA_SHUTTING_DOWN') == '1':
-            log.warning('[upstash-client] skip (shutting down) POST %s', path)
-            return None
-        if not self.enabled:
-            return None
-        target = f"{self.url}{path}"
-        headers = {"Authorization": f"Bearer {self.token}"}
-        if self._httpx:
-            async with self._httpx.AsyncClient(timeout=20) as cli:
-                r = await cli.post(target, headers=headers)
-                r.raise_for_status()
-                return r.json()
-        else:
-            import requests  # type: ignore
-            def _do():
-                rr = requests.post(target, headers=headers, timeout=20)
-                rr.raise_for_status()
-                return rr.json()
-            return await asyncio.to_thread(_do)
+        return await self._apath("POST", path)
 
     async def get_raw(self, key: str):
         try:
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+"""
+upstash_pool.py
+- Satu client Upstash REST per-process (keep-alive pool), dipakai semua caller KV.
+- Auto-batch: command yang di-issue di tick event loop yang sama dikirim sekali via /pipeline.
+- Explicit /pipeline dan /multi-exec (atomic) juga tersedia.
+- Timeout per command + circuit breaker (gagal beruntun -> fail fast selama cooldown).
+- Sync path (httpx.Client keep-alive) untuk caller lama yang belum async.
+"""
+import os, time, asyncio, logging, threading
+from typing import Any, List, Optional, Sequence
+from urllib.parse import unquote, urlsplit, parse_qsl
+
+try:
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
+log = logging.getLogger(__name__)
+
+UPSTASH_TIMEOUT_SEC = float(os.getenv("UPSTASH_TIMEOUT", "5"))
+UPSTASH_MAX_BATCH = int(os.getenv("UPSTASH_MAX_BATCH", "64"))
+UPSTASH_POOL_SIZE = int(os.getenv("UPSTASH_POOL_SIZE", "8"))
+UPSTASH_BREAKER_FAILS = int(os.getenv("UPSTASH_BREAKER_FAILS", "5"))
+UPSTASH_BREAKER_COOLDOWN_SEC = float(os.getenv("UPSTASH_BREAKER_COOLDOWN_SEC", "30"))
+
+
+def _cfg(key: str, default: str = "") -> str:
+    try:
+        from satpambot.config.auto_defaults import cfg_str as _cs
+        return _cs(key, default)
+    except Exception:
+        return os.getenv(key, default)
+
+def _first_nonempty(*names: str, default: str = "") -> str:
+    for n in names:
+        v = (_cfg(n, "") or "").strip()
+        if v:
+            return v
+    return default
+
+
+class UpstashError(Exception):
+    """Redis-level error returned by Upstash (bad command, wrong type, ...)."""
+
+class UpstashUnavailable(Exception):
+    """Transport failure, timeout, disabled client or open circuit breaker."""
+
+
+def path_to_cmd(path: str) -> List[str]:
+    """Legacy REST path ('/set/key/val?EX=10') -> command list ['set','key','val','EX','10']."""
+    parts = urlsplit(path)
+    cmd = [unquote(p) for p in parts.path.split("/") if p != ""]
+    for k, v in parse_qsl(parts.query, keep_blank_values=True):
+        cmd.append(k)
+        if v != "":
+            cmd.append(v)
+    return cmd
+
+
+class _Breaker:
+    def __init__(self, fails: int, cooldown: float):
+        self.fails_max = max(1, fails)
+        self.cooldown = cooldown
+        self.fails = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            return time.monotonic() >= self.open_until  # half-open setelah cooldown
+
+    def ok(self) -> None:
+        with self._lock:
+            self.fails = 0
+            self.open_until = 0.0
+
+    def fail(self) -> None:
+        with self._lock:
+            self.fails += 1
+            if self.fails >= self.fails_max:
+                self.open_until = time.monotonic() + self.cooldown
+                log.warning("[upstash-pool] circuit open for %.0fs after %d failures", self.cooldown, self.fails)
+
+
+class UpstashPool:
+    def __init__(self, url: Optional[str] = None, token: Optional[str] = None):
+        url = url if url is not None else _first_nonempty("UPSTASH_REDIS_REST_URL", "REDIS_REST_URL", "UPSTASH_URL")
+        token = token if token is not None else _first_nonempty("UPSTASH_REDIS_REST_TOKEN", "REDIS_REST_TOKEN", "UPSTASH_TOKEN")
+        self.url = (url or "").rstrip("/")
+        self.token = token or ""
+        self.enabled = bool(self.url and self.token and httpx is not None)
+        self.timeout = UPSTASH_TIMEOUT_SEC
+        self.breaker = _Breaker(UPSTASH_BREAKER_FAILS, UPSTASH_BREAKER_COOLDOWN_SEC)
+        self._aclient = None
+        self._aclient_loop = None
+        self._sclient = None
+        self._slock = threading.Lock()
+        self._pending: list = []
+        self._flush_scheduled = False
+        self._tasks: set = set()  # strong refs: loop hanya menyimpan weakref ke task
+        self.stats = {"commands": 0, "requests": 0, "batched": 0, "errors": 0, "fast_fail": 0}
+
+    @property
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def _check(self) -> None:
+        if os.getenv("LEINA_SHUTTING_DOWN") == "1":
+            raise UpstashUnavailable("shutting down")
+        if not self.enabled:
+            raise UpstashUnavailable("upstash disabled")
+        if not self.breaker.allow():
+            self.stats["fast_fail"] += 1
+            raise UpstashUnavailable("circuit open")
+
+    # ---------- async ----------
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop or self._aclient.is_closed:
+            self._aclient = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=UPSTASH_POOL_SIZE, max_keepalive_connections=UPSTASH_POOL_SIZE),
+            )
+            self._aclient_loop = loop
+        return self._aclient
+
+    async def _post(self, path: str, body: Any, timeout: Optional[float]) -> Any:
+        self.stats["requests"] += 1
+        try:
+            r = await self._client().post(self.url + path, headers=self._headers, json=body,
+                                          timeout=timeout or self.timeout)
+        except Exception as e:
+            self.breaker.fail()
+            self.stats["errors"] += 1
+            raise UpstashUnavailable(repr(e)) from e
+        if r.status_code >= 500 or r.status_code in (401, 403, 429):
+            self.breaker.fail()
+            self.stats["errors"] += 1
+            raise UpstashUnavailable(f"http {r.status_code}")
+        self.breaker.ok()
+        try:
+            return r.json()
+        except Exception as e:
+            raise UpstashError(f"bad response: {r.text[:120]!r}") from e
+
+    async def call(self, *args: Any, timeout: Optional[float] = None) -> Any:
+        """One Redis command; auto-batched with other commands issued in the same loop tick."""
+        self._check()
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())  # caller may have timed out
+        self._pending.append(([str(a) for a in args], fut, timeout))
+        self.stats["commands"] += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), (timeout or self.timeout) + 0.5)
+        except asyncio.TimeoutError as e:
+            raise UpstashUnavailable(f"timeout {args[0] if args else ''}") from e
+
+    async def try_call(self, *args: Any, default: Any = None, timeout: Optional[float] = None) -> Any:
+        try:
+            return await self.call(*args, timeout=timeout)
+        except (UpstashError, UpstashUnavailable) as e:
+            log.debug("[upstash-pool] %s failed: %r", args[0] if args else "?", e)
+            return default
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        batch, self._pending = self._pending, []
+        for i in range(0, len(batch), UPSTASH_MAX_BATCH):
+            t = asyncio.ensure_future(self._send_batch(batch[i:i + UPSTASH_MAX_BATCH]))
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: list) -> None:
+        timeout = max((t or self.timeout) for _, _, t in batch)
+        try:
+            if len(batch) == 1:
+                res = [await self._post("", batch[0][0], timeout)]
+            else:
+                self.stats["batched"] += len(batch)
+                res = await self._post("/pipeline", [c for c, _, _ in batch], timeout)
+        except Exception as e:
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e if isinstance(e, (UpstashError, UpstashUnavailable)) else UpstashUnavailable(repr(e)))
+            return
+        for (cmd, fut, _), item in zip(batch, res if isinstance(res, list) else [res] * len(batch)):
+            if fut.done():
+                continue
+            if isinstance(item, dict) and "error" in item:
+                fut.set_exception(UpstashError(str(item["error"])))
+            else:
+                fut.set_result(item.get("result") if isinstance(item, dict) else item)
+
+    async def _multi(self, path: str, cmds: Sequence[Sequence[Any]], timeout: Optional[float]) -> List[Any]:
+        self._check()
+        if not cmds:
+            return []
+        res = await self._post(path, [[str(a) for a in c] for c in cmds], timeout)
+        if isinstance(res, dict) and "error" in res:
+            raise UpstashError(str(res["error"]))
+        out = []
+        for item in res if isinstance(res, list) else []:
+            if isinstance(item, dict) and "error" in item:
+                out.append(UpstashError(str(item["error"])))
+            else:
+                out.append(item.get("result") if isinstance(item, dict) else item)
+        return out
+
+    async def pipeline(self, cmds: Sequence[Sequence[Any]], timeout: Optional[float] = None) -> List[Any]:
+        """Explicit /pipeline (non-atomic); per-command errors come back as UpstashError values."""
+        return await self._multi("/pipeline", cmds, timeout)
+
+    async def multi_exec(self, cmds: Sequence[Sequence[Any]], timeout: Optional[float] = None) -> List[Any]:
+        """Atomic /multi-exec transaction."""
+        return await self._multi("/multi-exec", cmds, timeout)
+
+    # convenience
+    async def get(self, key: str) -> Any:
+        return await self.try_call("GET", key)
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        args = ["SET", key, value] + (["EX", int(ex)] if ex else [])
+        return str(await self.try_call(*args, default="")).upper() == "OK"
+
+    async def incrby(self, key: str, n: int) -> Optional[int]:
+        v = await self.try_call("INCRBY", key, int(n))
+        try:
+            return int(v) if v is not None else None
+        except Exception:
+            return None
+
+    async def aclose(self) -> None:
+        if self._aclient is not None:
+            try:
+                await self._aclient.aclose()
+            except Exception:
+                pass
+            self._aclient = None
+
+    # ---------- sync (legacy callers) ----------
+    def _sync_client(self):
+        with self._slock:
+            if self._sclient is None:
+                self._sclient = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=UPSTASH_POOL_SIZE, max_keepalive_connections=UPSTASH_POOL_SIZE),
+                )
+            return self._sclient
+
+    def _post_sync(self, path: str, body: Any, timeout: Optional[float] = None) -> Any:
+        self._check()
+        self.stats["requests"] += 1
+        try:
+            r = self._sync_client().post(self.url + path, headers=self._headers, json=body, timeout=timeout or self.timeout)
+        except Exception as e:
+            self.breaker.fail()
+            self.stats["errors"] += 1
+            raise UpstashUnavailable(repr(e)) from e
+        if r.status_code >= 500 or r.status_code in (401, 403, 429):
+            self.breaker.fail()
+            self.stats["errors"] += 1
+            raise UpstashUnavailable(f"http {r.status_code}")
+        self.breaker.ok()
+        return r.json()
+
+    def call_sync(self, *args: Any, timeout: Optional[float] = None) -> Any:
+        self.stats["commands"] += 1
+        d = self._post_sync("", [str(a) for a in args], timeout)
+        if isinstance(d, dict) and "error" in d:
+            raise UpstashError(str(d["error"]))
+        return d.get("result") if isinstance(d, dict) else d
+
+    def pipeline_sync(self, cmds: Sequence[Sequence[Any]], timeout: Optional[float] = None) -> List[Any]:
+        if not cmds:
+            return []
+        self.stats["commands"] += len(cmds)
+        res = self._post_sync("/pipeline", [[str(a) for a in c] for c in cmds], timeout)
+        return [(UpstashError(str(i["error"])) if isinstance(i, dict) and "error" in i
+                 else (i.get("result") if isinstance(i, dict) else i)) for i in (res if isinstance(res, list) else [])]
+
+
+_pool: Optional[UpstashPool] = None
+_pool_lock = threading.Lock()
+
+def get_upstash() -> UpstashPool:
+    """Process-wide Upstash client."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = UpstashPool()
+    return _pool
@@ -1,17 +1,25 @@
 # -*- coding: utf-8 -*-
-import os, httpx, json
+import os, json
+
+from .upstash_pool import UpstashError, get_upstash
 
 URL = os.getenv("UPSTASH_REDIS_REST_URL")
 TOK = os.getenv("UPSTASH_REDIS_REST_TOKEN")
-HDR = {"Authorization": f"Bearer {TOK}", "Content-Type":"application/json"}
 
 def cmd(*arr):
     if not URL or not TOK:
         raise RuntimeError("Upstash env missing")
-    with httpx.Client(timeout=10.0) as x:
-        r = x.post(URL, headers=HDR, json=list(arr))
-        r.raise_for_status()
-        return r.json()
+    # shared keep-alive client (+ circuit breaker); raises UpstashUnavailable on transport errors
+    try:
+        return {"result": get_upstash().call_sync(*arr, timeout=10.0)}
+    except UpstashError as e:
+        return {"error": str(e)}
+
+def pipeline(cmds):
+    """Several commands in one round trip -> list of results (UpstashError for failed ones)."""
+    if not URL or not TOK:
+        raise RuntimeError("Upstash env missing")
+    return get_upstash().pipeline_sync(cmds, timeout=10.0)
 
 def get(key:str):
     return cmd("GET", key)
@@ -1,5 +1,5 @@
 # Smart URL reputation helper (auto)
-import os, json, re, socket
+import os, re, socket
 from urllib.parse import urlparse
 import idna
 
@@ -13,20 +13,18 @@ SHORTENERS = set([
     "bit.ly","tinyurl.com","t.co","goo.gl","is.gd","s.id","cutt.ly","shorturl.at","ow.ly","rebrand.ly","rb.gy","buff.ly","adf.ly"
 ])
 
-def _load_list(path, default):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return list(default)
+DEFAULT_WHITELIST = CRITICAL_BRANDS + [
+    "reddit.com","bilibili.com","github.com","gitlab.com","wikipedia.org","stackoverflow.com","medium.com","t.me","telegram.me","discordapp.com","googleusercontent.com","gstatic.com"
+]
 
 def load_whitelist():
-    return set(_load_list(WL_FILE, CRITICAL_BRANDS + [
-        "reddit.com","bilibili.com","github.com","gitlab.com","wikipedia.org","stackoverflow.com","medium.com","t.me","telegram.me","discordapp.com","googleusercontent.com","gstatic.com"
-    ]))
+    # snapshot in-memory; tidak baca disk per panggilan
+    from .list_snapshot import current
+    return set(current().check_whitelist)
 
 def load_blacklist():
-    return set(_load_list(BL_FILE, []))
+    from .list_snapshot import current
+    return set(current().check_blacklist)
 
 def extract_urls(text: str):
     if not text: return []
@@ -77,15 +75,6 @@ def is_shortener(domain: str) -> bool:
     return reg_domain(domain) in SHORTENERS
 
 def check_domain_reputation(domain: str):
-    d = normalize_domain(domain)
-    wl = load_whitelist()
-    bl = load_blacklist()
-    regd = reg_domain(d)
-    if d in bl or regd in bl:
-        return "black"
-    if any(looks_typosquat(regd, legit) for legit in CRITICAL_BRANDS):
-        if not (regd in wl or d in wl):
-            return "sus"
-    if d in wl or regd in wl:
-        return "white"
-    return "unknown"
+    # list & brand index di-compile sekali (url_matcher), rebuild otomatis saat file list berubah
+    from .url_matcher import get_matcher
+    return get_matcher().reputation(normalize_domain(domain))
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+"""
+url_matcher.py
+- Satu matcher ter-compile untuk semua cek URL/domain (safety_utils, score_utils, url_check).
+- DomainTrie: trie label terbalik (com -> discord -> www) untuk rule domain persis,
+  domain+subdomain, dan suffix/TLD (".ru"). Lookup O(jumlah label).
+- AhoCorasick: semua keyword substring dicek dalam satu scan O(len(teks)).
+- BrandIndex: index deletion-neighbourhood (symmetric delete) atas brand kritikal;
+  typosquat jarak-edit <= 1 = beberapa lookup dict, bukan levenshtein per brand.
+- Matcher di-compile sekali per versi list_snapshot; get_matcher() = current().matcher.
+"""
+import time, logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+# typosquat normalisasi (sama dengan url_check.looks_typosquat)
+_LEET = str.maketrans("01357", "oelst")
+_REG_SLD = ("co", "com", "net", "org", "ac", "id", "uk", "jp", "kr", "au")
+
+
+def reg_domain(host: str) -> str:
+    parts = host.split(".")
+    if len(parts) >= 3 and parts[-2] in _REG_SLD:
+        return ".".join(parts[-3:])
+    return ".".join(parts[-2:]) if len(parts) >= 2 else host
+
+
+# ---------- reversed-label suffix trie ----------
+EXACT = 1      # host persis
+SUBTREE = 2    # host + semua subdomain
+BELOW = 4      # hanya subdomain (rule suffix ".ru", ".evil.com")
+
+class DomainTrie:
+    __slots__ = ("_root", "size")
+
+    def __init__(self, rules: Iterable[str] = (), mode: int = EXACT):
+        self._root: dict = {}
+        self.size = 0
+        for r in rules:
+            self.add(r, mode)
+
+    def add(self, rule: str, mode: int = EXACT) -> None:
+        rule = (rule or "").strip().lower()
+        if not rule:
+            return
+        if rule.startswith("."):
+            rule, mode = rule.lstrip("."), BELOW
+        node = self._root
+        for label in reversed(rule.split(".")):
+            node = node.setdefault(label, {})
+        node[""] = node.get("", 0) | mode
+        self.size += 1
+
+    def match(self, host: str) -> bool:
+        node = self._root
+        labels = host.split(".")
+        last = len(labels) - 1
+        for i, label in enumerate(reversed(labels)):
+            node = node.get(label)
+            if node is None:
+                return False
+            flags = node.get("", 0)
+            if flags:
+                if i == last:
+                    if flags & (EXACT | SUBTREE):
+                        return True
+                elif flags & (SUBTREE | BELOW):
+                    return True
+        return False
+
+    def __contains__(self, host: str) -> bool:
+        return self.match(host)
+
+
+# ---------- Aho–Corasick ----------
+class AhoCorasick:
+    __slots__ = ("_goto", "_fail", "_out", "size")
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[str, ...]] = [()]
+        words = sorted({w for w in (x.strip().lower() for x in words) if w})
+        self.size = len(words)
+        for w in words:
+            s = 0
+            for ch in w:
+                nxt = self._goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[s][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                s = nxt
+            self._out[s] = self._out[s] + (w,)
+        self._fail = [0] * len(self._goto)
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, t in self._goto[s].items():
+                q.append(t)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                nf = self._goto[f].get(ch, 0)
+                self._fail[t] = nf if nf != t else 0
+                self._out[t] = self._out[t] + self._out[self._fail[t]]
+
+    def _scan(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                yield out[s]
+
+    def search(self, text: str) -> Optional[str]:
+        """First keyword found in text (lowercased by caller), or None."""
+        if not self.size or not text:
+            return None
+        for hit in self._scan(text):
+            return hit[0]
+        return None
+
+    def findall(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if self.size and text:
+            for hit in self._scan(text):
+                found.update(hit)
+        return found
+
+
+# ---------- typosquat (edit distance <= 1) ----------
+def _within1(a: str, b: str) -> bool:
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+def _deletes(s: str) -> Set[str]:
+    return {s[:i] + s[i + 1:] for i in range(len(s))}
+
+class BrandIndex:
+    """Brand registered-domains indexed by themselves and all 1-deletions."""
+    __slots__ = ("_brands", "_regs", "_index")
+
+    def __init__(self, brands: Iterable[str] = ()):
+        self._brands: Dict[str, str] = {}      # normalized reg domain -> brand
+        self._index: Dict[str, Set[str]] = {}  # variant -> normalized brands
+        self._regs: Set[str] = set()
+        for b in brands:
+            reg = reg_domain((b or "").strip().lower())
+            if not reg:
+                continue
+            n = reg.translate(_LEET)
+            self._brands[n] = reg
+            self._regs.add(reg)
+            for v in {n} | _deletes(n):
+                self._index.setdefault(v, set()).add(n)
+
+    def match(self, domain: str) -> Optional[str]:
+        """Brand the (registered) domain imitates, or None; the brand itself never matches."""
+        d = (domain or "").strip(".").lower()
+        d = reg_domain(d[4:] if d.startswith("www.") else d)
+        if not d or d in self._regs:
+            return None
+        d2 = d.translate(_LEET)
+        if "-" in d2 and d2.replace("-", "") in self._brands:
+            return self._brands[d2.replace("-", "")]
+        for v in {d2} | _deletes(d2):
+            for n in self._index.get(v, ()):
+                if _within1(d2, n):
+                    return self._brands[n]
+        return None
+
+
+# ---------- compiled matcher ----------
+class UrlMatcher:
+    def __init__(self, *, bad_domains: Iterable[str] = (), bad_keywords: Iterable[str] = (),
+                 whitelist: Iterable[str] = (), blacklist: Iterable[str] = (), brands: Iterable[str] = (),
+                 url_bad_tlds: Iterable[str] = (), url_keywords: Iterable[str] = (), flag_puny: bool = True):
+        self.bad_domains = DomainTrie(bad_domains, EXACT)      # safety_utils: persis + rule ".suffix"
+        self.bad_keywords = AhoCorasick(bad_keywords)
+        self.whitelist = DomainTrie(whitelist, SUBTREE)        # url_check: host atau reg-domain
+        self.blacklist = DomainTrie(blacklist, SUBTREE)
+        self.brands = BrandIndex(brands)
+        self.url_tlds = tuple(sorted({t.lower() for t in url_bad_tlds if t}))
+        self.url_keywords = AhoCorasick(url_keywords)
+        self.flag_puny = flag_puny
+        self.built_at = time.time()
+
+    def is_suspicious_domain(self, host: str) -> bool:
+        h = (host or "").lower()
+        if not h:
+            return False
+        if self.bad_domains.match(h):
+            return True
+        if self.flag_puny and "xn--" in h:
+            return True
+        return self.bad_keywords.search(h) is not None
+
+    def is_bad_url(self, url: str) -> bool:
+        lu = (url or "").lower()
+        if self.url_tlds and lu.endswith(self.url_tlds):
+            return True
+        return self.url_keywords.search(lu) is not None
+
+    def typosquat_of(self, domain: str) -> Optional[str]:
+        return self.brands.match(domain)
+
+    def reputation(self, domain: str) -> str:
+        """'black' | 'sus' | 'white' | 'unknown' (url_check.check_domain_reputation semantics)."""
+        if self.blacklist.match(domain) or self.blacklist.match(reg_domain(domain)):
+            return "black"
+        white = self.whitelist.match(domain) or self.whitelist.match(reg_domain(domain))
+        if self.brands.match(domain) is not None and not white:
+            return "sus"
+        return "white" if white else "unknown"
+
+
+def invalidate() -> None:
+    """Rebuild the list snapshot (and its matcher) from disk now."""
+    from .list_snapshot import rebuild
+    rebuild()
+
+def get_matcher() -> UrlMatcher:
+    """Matcher of the current list snapshot (swapped atomically when lists change)."""
+    from .list_snapshot import current
+    return current().matcher
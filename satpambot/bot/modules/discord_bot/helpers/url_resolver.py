@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+"""
+url_resolver.py
+- Ekspansi short-link (HEAD tanpa auto-redirect, satu hop per request) untuk LinkGuard.
+- Satu aiohttp.ClientSession keep-alive dipakai bareng (bukan session baru per hop).
+- Cache per hop, key = URL ter-normalisasi: positif (redirect / jawaban final) TTL panjang,
+  negatif (error/timeout) TTL pendek. LRU dibatasi jumlah entry.
+- Coalescing: lookup bersamaan untuk URL yang sama menunggu satu request in-flight.
+- Batas global (semaphore) + rate limit per host (token bucket) supaya raid tidak
+  membuat bot membanjiri shortener.
+"""
+import os, time, asyncio, logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+try:
+    import aiohttp
+except Exception:  # pragma: no cover
+    aiohttp = None  # type: ignore
+
+log = logging.getLogger(__name__)
+
+RESOLVE_TIMEOUT_SEC = float(os.getenv("HEAD_TIMEOUT", "3.0"))
+RESOLVE_MAX_HOPS = int(os.getenv("MAX_REDIRECTS", "2"))
+RESOLVE_CONCURRENCY = int(os.getenv("URL_RESOLVE_CONCURRENCY", "8"))
+RESOLVE_HOST_RATE = float(os.getenv("URL_RESOLVE_HOST_RATE", "5"))     # request/detik per host
+RESOLVE_HOST_BURST = float(os.getenv("URL_RESOLVE_HOST_BURST", "10"))
+RESOLVE_POS_TTL_SEC = float(os.getenv("URL_RESOLVE_POS_TTL_SEC", "3600"))
+RESOLVE_NEG_TTL_SEC = float(os.getenv("URL_RESOLVE_NEG_TTL_SEC", "120"))
+RESOLVE_CACHE_SIZE = int(os.getenv("URL_RESOLVE_CACHE_SIZE", "10000"))
+
+_REDIRECTS = {301, 302, 303, 307, 308}
+
+
+def normalize_url(url: str) -> str:
+    """Cache key: lowercase scheme/host, default port and fragment dropped."""
+    try:
+        p = urlsplit((url or "").strip())
+    except ValueError:
+        return url or ""
+    host = (p.hostname or "").lower().strip(".")
+    port = p.port if p.port and not ((p.scheme == "http" and p.port == 80) or (p.scheme == "https" and p.port == 443)) else None
+    netloc = f"{host}:{port}" if port else host
+    return urlunsplit((p.scheme.lower(), netloc, p.path or "/", p.query, ""))
+
+
+class _HostBucket:
+    __slots__ = ("tokens", "stamp")
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+
+class UrlResolver:
+    def __init__(self, only_hosts: Optional[Iterable[str]] = None, *, max_hops: int = RESOLVE_MAX_HOPS,
+                 timeout: float = RESOLVE_TIMEOUT_SEC, concurrency: int = RESOLVE_CONCURRENCY,
+                 host_rate: float = RESOLVE_HOST_RATE, host_burst: float = RESOLVE_HOST_BURST,
+                 pos_ttl: float = RESOLVE_POS_TTL_SEC, neg_ttl: float = RESOLVE_NEG_TTL_SEC,
+                 cache_size: int = RESOLVE_CACHE_SIZE):
+        self.only_hosts = {h.lower() for h in only_hosts} if only_hosts is not None else None
+        self.max_hops = max_hops
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.host_rate = host_rate
+        self.host_burst = max(1.0, host_burst)
+        self.pos_ttl = pos_ttl
+        self.neg_ttl = neg_ttl
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[float, Optional[str], bool]]" = OrderedDict()  # key -> (expires, next|None, ok)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._session = None
+        self._session_loop = None
+        self.stats = {"hit": 0, "neg_hit": 0, "miss": 0, "coalesced": 0, "requests": 0, "errors": 0, "rate_limited": 0}
+
+    # ---------- plumbing ----------
+    async def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._session_loop = loop
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _cache_get(self, key: str):
+        ent = self._cache.get(key)
+        if ent is None:
+            return None
+        if ent[0] < time.monotonic():
+            self._cache.pop(key, None)
+            return None
+        self._cache.move_to_end(key)
+        return ent
+
+    def _cache_put(self, key: str, nxt: Optional[str], ok: bool) -> None:
+        ttl = self.pos_ttl if ok else self.neg_ttl
+        self._cache[key] = (time.monotonic() + ttl, nxt, ok)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _take_token(self, host: str) -> bool:
+        """Per-host token bucket; waits up to `timeout` for a token."""
+        if self.host_rate <= 0:
+            return True
+        deadline = time.monotonic() + self.timeout
+        while True:
+            b = self._buckets.get(host)
+            now = time.monotonic()
+            if b is None:
+                b = self._buckets[host] = _HostBucket(self.host_burst)
+            b.tokens = min(self.host_burst, b.tokens + (now - b.stamp) * self.host_rate)
+            b.stamp = now
+            if b.tokens >= 1.0:
+                b.tokens -= 1.0
+                return True
+            wait = (1.0 - b.tokens) / self.host_rate
+            if now + wait > deadline:
+                self.stats["rate_limited"] += 1
+                return False
+            await asyncio.sleep(wait)
+
+    # ---------- resolution ----------
+    def _eligible(self, url: str) -> bool:
+        if aiohttp is None or not url.startswith("http"):
+            return False
+        if self.only_hosts is None:
+            return True
+        host = (urlsplit(url).hostname or "").lower().strip(".")
+        return host in self.only_hosts
+
+    async def _fetch_hop(self, url: str) -> Tuple[Optional[str], Optional[bool]]:
+        """(next url or None, ok) -- ok=None: not cacheable."""
+        host = urlsplit(url).hostname or ""
+        if not await self._take_token(host):
+            return None, None  # rate-limited: jangan di-cache
+        sess = await self._get_session()
+        async with self._sem:
+            self.stats["requests"] += 1
+            try:
+                async with sess.head(url, allow_redirects=False) as resp:
+                    loc = resp.headers.get("Location")
+                    if resp.status in _REDIRECTS and loc:
+                        nxt = urljoin(url, loc)
+                        return (nxt if nxt.startswith("http") else None), True
+                    return None, resp.status < 500
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.debug("[url-resolver] HEAD %s failed: %r", url, e)
+                return None, False
+
+    async def hop(self, url: str) -> str:
+        """One redirect hop (cached + coalesced); returns url itself if there is none."""
+        if not self._eligible(url):
+            return url
+        key = normalize_url(url)
+        ent = self._cache_get(key)
+        if ent is not None:
+            self.stats["hit" if ent[2] else "neg_hit"] += 1
+            return ent[1] or url
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            return (await asyncio.shield(fut)) or url
+        self.stats["miss"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        nxt = None
+        try:
+            nxt, ok = await self._fetch_hop(url)
+            if ok is not None:
+                self._cache_put(key, nxt, ok)
+        finally:
+            self._inflight.pop(key, None)
+            if not fut.done():
+                fut.set_result(nxt)
+        return nxt or url
+
+    async def expand(self, url: str, max_hops: Optional[int] = None) -> str:
+        out = url
+        for _ in range(self.max_hops if max_hops is None else max_hops):
+            nxt = await self.hop(out)
+            if nxt == out:
+                break
+            out = nxt
+        return out
+
+
+_resolver: Optional[UrlResolver] = None
+
+def get_resolver() -> UrlResolver:
+    """Shared resolver limited to known shortener hosts."""
+    global _resolver
+    if _resolver is None:
+        from .safety_utils import SHORTENERS
+        _resolver = UrlResolver(only_hosts=SHORTENERS)
+    return _resolver
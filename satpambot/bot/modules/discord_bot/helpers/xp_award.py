@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json, urllib.request
+import json
 from typing import Dict, Any, Tuple
 
 # === injected helper: KULIAH/MAGANG payload from pinned ===
@@ -7,9 +7,9 @@ def __kuliah_payload_from_pinned(__bot):
     try:
         from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import PinnedJSONKV
         kv = PinnedJSONKV(__bot)
-        m = kv.get_map()
-        if hasattr(m, "__await__"):
-            # async version: caller must build asynchronously; skip here
+        m = kv.peek_map()
+        if m is None:
+            # shared map not loaded yet (no I/O from sync code); skip here
             return None
         def _to_int(v, d=0):
             try: return int(v)
@@ -36,48 +36,26 @@ def __kuliah_payload_from_pinned(__bot):
         return None
 # === end helper ===
 
-from satpambot.bot.modules.discord_bot.helpers.confreader import cfg_secret, cfg_str
+from satpambot.bot.modules.discord_bot.helpers.confreader import cfg_str
 from satpambot.bot.modules.discord_bot.helpers.xp_total_resolver import stage_from_total
-
-def _hdr() -> Dict[str,str]:
-    tok = cfg_secret("UPSTASH_REDIS_REST_TOKEN", None)
-    if not tok:
-        raise RuntimeError("UPSTASH_REDIS_REST_TOKEN missing (ENV)")
-    return {"Authorization": f"Bearer {tok}"}
-
-def _base() -> str:
-    base = cfg_secret("UPSTASH_REDIS_REST_URL", None)
-    if not base:
-        raise RuntimeError("UPSTASH_REDIS_REST_URL missing (ENV)")
-    return base
+from satpambot.bot.modules.discord_bot.helpers.upstash_pool import UpstashError, get_upstash
 
 def _total_key() -> str:
     return cfg_str("XP_TOTAL_KEY", "xp:bot:senior_total") or "xp:bot:senior_total"
 
 def award_xp_sync(delta: int) -> Tuple[int, Dict[str, Any]]:
-    base = _base()
-    hdr = _hdr()
-
-    pipeline = [["INCRBY", _total_key(), str(int(delta))],
-                ["GET", _total_key()]]
-    req = urllib.request.Request(f"{base}/pipeline", method="POST",
-                                 data=json.dumps(pipeline).encode("utf-8"))
-    req.add_header("Content-Type","application/json")
-    for k,v in hdr.items(): req.add_header(k,v)
-    with urllib.request.urlopen(req, timeout=4.0) as r:
-        resp = json.loads(r.read().decode("utf-8","ignore"))
-    new_total = int(resp[1]["result"])
+    # shared keep-alive pool (sync path), bukan urlopen baru per award
+    up = get_upstash()
+    resp = up.pipeline_sync([["INCRBY", _total_key(), str(int(delta))],
+                             ["GET", _total_key()]], timeout=4.0)
+    if len(resp) < 2 or isinstance(resp[1], UpstashError):
+        raise UpstashError(f"award_xp pipeline failed: {resp!r}")
+    new_total = int(resp[1])
 
     label, pct, meta = stage_from_total(new_total)
     remaining = max(0, int(meta.get("required",0)) - int(meta.get("current",0)))
     status_json = json.dumps({"label":label,"percent":pct,"remaining":remaining,"senior_total":new_total,"stage":meta}, separators=(",",":"))
-    pipe2 = [["SET","learning:status",(_status if _status is not None else (_status if _status is not None else (_status if _status is not None else f"{label} ({pct}%)")))],
-             ["SET","learning:status_json",(_status_json if _status_json is not None else (_status_json if _status_json is not None else (_status_json if _status_json is not None else status_json)))]]
-    req2 = urllib.request.Request(f"{base}/pipeline", method="POST",
-                                  data=json.dumps(pipe2).encode("utf-8"))
-    req2.add_header("Content-Type","application/json")
-    for k,v in hdr.items(): req2.add_header(k,v)
-    with urllib.request.urlopen(req2, timeout=4.0) as r2:
-        _ = r2.read()
+    up.pipeline_sync([["SET", "learning:status", f"{label} ({pct}%)"],
+                      ["SET", "learning:status_json", status_json]], timeout=4.0)
 
-    return new_total, meta
\ No newline at end of file
+    return new_total, meta
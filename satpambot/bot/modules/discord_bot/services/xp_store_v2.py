@@ -2,11 +2,16 @@
 import os
 import json
 import time
+import atexit
 import threading
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 DEFAULT_STORE_PATH = os.environ.get("XP_STORE_FILE", "satpambot/bot/data/xp_store.json")
 DEFAULT_AWARDED_IDS_PATH = os.environ.get("XP_AWARDED_IDS_FILE", "satpambot/bot/data/xp_awarded_ids.json")
+XP_GROUP_COMMIT_MS = int(os.environ.get("XP_GROUP_COMMIT_MS", "250"))  # 0 = tulis tiap award
+XP_COMPACT_SEC = float(os.environ.get("XP_COMPACT_SEC", "300"))
+XP_LOG_ROTATE_BYTES = int(os.environ.get("XP_LOG_ROTATE_BYTES", str(32 * 1024 * 1024)))
+XP_LOG_FSYNC = str(os.environ.get("XP_LOG_FSYNC", "")).lower() in ("1", "true", "yes", "on")
 
 def _ensure_dirs(path: str) -> None:
     d = os.path.dirname(path)
@@ -40,18 +45,21 @@ class _UpstashReplicator:
     def _call(self, path: str, method: str = "POST", allow_get: bool = False):
         if not self.enabled:
             return None
+        if method != "POST" and not (allow_get and method == "GET"):
+            return None
         try:
-            import requests
+            from ..helpers.upstash_pool import get_upstash, path_to_cmd
+            return get_upstash().call_sync(*path_to_cmd(path), timeout=self.timeout)
         except Exception:
             return None
-        try:
-            url = self.base.rstrip("/") + path
-            headers = {"Authorization": f"Bearer {self.token}"}
-            if method == "POST":
-                return requests.post(url, headers=headers, timeout=self.timeout)
-            if allow_get and method == "GET":
-                return requests.get(url, headers=headers, timeout=self.timeout)
+
+    def pipeline(self, cmds):
+        """All replication commands of one flush in a single round trip."""
+        if not self.enabled or not cmds:
             return None
+        try:
+            from ..helpers.upstash_pool import get_upstash
+            return get_upstash().pipeline_sync(cmds, timeout=self.timeout)
         except Exception:
             return None
 
@@ -87,42 +95,80 @@ class _UpstashReplicator:
 
 class XPStoreV2:
     """
-    File-backed XP store (atomic JSON) + optional Upstash replication.
-    Structure:
+    Write-behind XP store: append-only award log (JSONL) + compacted user-totals snapshot.
+
+    - add_xp() updates in-memory totals and queues one log line; a background flusher
+      appends all queued lines in one write every XP_GROUP_COMMIT_MS (group commit).
+    - Every XP_COMPACT_SEC the snapshot (users/stats, no award history) is rewritten atomically
+      together with the log offset it covers; on load the log tail after that offset is replayed.
+    - Upstash replication is coalesced per flush and sent as one pipeline from the flusher thread.
+
+    Snapshot structure:
     {
-      "version": 2,
+      "version": 3,
       "users": { "<user_id>": {"total": int, "updated_at": ts, "by_reason": {...}} },
-      "awards": [{"ts": ts, "user_id": str, "amount": int, "reason": str|None, "ctx": dict}],
       "stats": {"total_awards": int, "total_users": int},
+      "log_pos": int,   # bytes of the award log already folded into this snapshot
       "updated_at": ts
     }
+    Log line: {"ts": ts, "user_id": str, "amount": int, "reason": str|None, "ctx": dict, "k": award_key?}
     """
-    def __init__(self, store_path: Optional[str] = None, awarded_ids_path: Optional[str] = None):
+    def __init__(self, store_path: Optional[str] = None, awarded_ids_path: Optional[str] = None,
+                 commit_window_ms: Optional[int] = None, compact_sec: Optional[float] = None):
         self.store_path = store_path or DEFAULT_STORE_PATH
         self.awarded_ids_path = awarded_ids_path or DEFAULT_AWARDED_IDS_PATH
+        self.log_path = f"{self.store_path}.awards.jsonl"
+        self.commit_window = (XP_GROUP_COMMIT_MS if commit_window_ms is None else commit_window_ms) / 1000.0
+        self.compact_sec = XP_COMPACT_SEC if compact_sec is None else compact_sec
         self._lock = threading.RLock()
+        self._cond = threading.Condition(self._lock)
+        self._pending: List[str] = []
+        self._dirty = False
+        self._last_compact = time.monotonic()
+        self._rep_totals: Dict[str, Dict[str, Any]] = {}
+        self._rep_reasons: Dict[Tuple[str, str], int] = {}
+        self._closed = False
         self._data = self._load_or_init()
         self._awarded_ids = self._load_awarded_ids()
+        self._replay_log()
         self._upstash = _UpstashReplicator()
+        self._flusher: Optional[threading.Thread] = None
+        if self.commit_window > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="xp-store-flusher", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
 
     # ---------- load/save ----------
+    def _empty(self) -> Dict[str, Any]:
+        return {"version": 3, "users": {}, "stats": {"total_awards": 0, "total_users": 0},
+                "log_pos": 0, "updated_at": int(time.time())}
+
     def _load_or_init(self) -> Dict[str, Any]:
         if not os.path.exists(self.store_path):
-            now = int(time.time())
-            d = {"version": 2, "users": {}, "awards": [], "stats": {"total_awards": 0, "total_users": 0}, "updated_at": now}
+            d = self._empty()
             _atomic_write(self.store_path, json.dumps(d, ensure_ascii=False, indent=2))
             return d
         try:
             with open(self.store_path, "r", encoding="utf-8") as f:
                 d = json.load(f)
-            if "version" not in d:
-                d["version"] = 2
             if "users" not in d: d["users"] = {}
-            if "awards" not in d: d["awards"] = []
             if "stats" not in d: d["stats"] = {}
-            if "total_awards" not in d["stats"]: d["stats"]["total_awards"] = len(d.get("awards", []))
+            legacy = d.pop("awards", None) or []
+            if "total_awards" not in d["stats"]: d["stats"]["total_awards"] = len(legacy)
             if "total_users" not in d["stats"]: d["stats"]["total_users"] = len(d.get("users", {}))
             if "updated_at" not in d: d["updated_at"] = int(time.time())
+            d.setdefault("log_pos", 0)
+            if legacy:
+                # v2 kept the award history inside the snapshot; move it to the log once,
+                # already folded into the totals -> log_pos skips it on replay
+                _ensure_dirs(self.log_path)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    for a in legacy:
+                        f.write(json.dumps(a, ensure_ascii=False, separators=(",", ":")) + "\n")
+                d["log_pos"] = os.path.getsize(self.log_path)
+                d["version"] = 3
+                _atomic_write(self.store_path, json.dumps(d, ensure_ascii=False, indent=2))
+            d["version"] = 3
             return d
         except Exception:
             # rotate corrupted json
@@ -131,7 +177,7 @@ class XPStoreV2:
                 os.replace(self.store_path, broken)
             except Exception:
                 pass
-            return {"version": 2, "users": {}, "awards": [], "stats": {"total_awards": 0, "total_users": 0}, "updated_at": int(time.time())}
+            return self._empty()
 
     def _load_awarded_ids(self):
         if not os.path.exists(self.awarded_ids_path):
@@ -144,15 +190,143 @@ class XPStoreV2:
         except Exception:
             return set()
 
-    def _save_awarded_ids(self):
+    def _replay_log(self) -> None:
+        """Apply log lines written after the last compaction (crash recovery)."""
+        pos = int(self._data.get("log_pos", 0) or 0)
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return
+        if size < pos:  # log rotated/truncated outside of compaction
+            pos = 0
+        n = 0
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            f.seek(pos)
+            for line in f:
+                try:
+                    a = json.loads(line)
+                except Exception:
+                    continue
+                if a.get("k"):
+                    self._awarded_ids.add(a["k"])
+                if a.get("op") == "mark":
+                    continue
+                self._apply(str(a.get("user_id")), int(a.get("amount", 0)), a.get("reason"), int(a.get("ts") or time.time()))
+                n += 1
+        if n:
+            self._dirty = True
+
+    def _apply(self, uid: str, amount: int, reason: Optional[str], now: int) -> Dict[str, Any]:
+        users = self._data.setdefault("users", {})
+        u = users.setdefault(uid, {"total": 0, "updated_at": now, "by_reason": {}})
+        u["total"] = int(u.get("total", 0)) + int(amount)
+        u["updated_at"] = now
+        if reason:
+            br = u.setdefault("by_reason", {})
+            br[reason] = int(br.get(reason, 0)) + int(amount)
+        st = self._data.setdefault("stats", {})
+        st["total_awards"] = int(st.get("total_awards", 0)) + 1
+        st["total_users"] = len(users)
+        self._data["updated_at"] = now
+        return u
+
+    # ---------- group commit / compaction ----------
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._pending.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._dirty = True
+        if self.commit_window <= 0:
+            self._write_pending()
+        else:
+            self._cond.notify()
+
+    def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        _ensure_dirs(self.log_path)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+            f.flush()
+            if XP_LOG_FSYNC:
+                os.fsync(f.fileno())
+
+    def _compact(self) -> None:
+        """Fold the log into the snapshot; rotate the log when it gets large."""
+        self._write_pending()
+        try:
+            pos = os.path.getsize(self.log_path)
+        except OSError:
+            pos = 0
+        if pos > XP_LOG_ROTATE_BYTES:
+            try:
+                os.replace(self.log_path, f"{self.log_path}.1")
+                pos = 0
+            except Exception:
+                pass
+        self._data["log_pos"] = pos
+        self._data["stats"]["total_users"] = len(self._data.get("users", {}))
+        _atomic_write(self.store_path, json.dumps(self._data, ensure_ascii=False, indent=2))
         try:
             _atomic_write(self.awarded_ids_path, json.dumps({"ids": sorted(self._awarded_ids)}, ensure_ascii=False, indent=2))
         except Exception:
             pass
+        self._dirty = False
+        self._last_compact = time.monotonic()
 
-    def _save(self):
-        self._data["stats"]["total_users"] = len(self._data.get("users", {}))
-        _atomic_write(self.store_path, json.dumps(self._data, ensure_ascii=False, indent=2))
+    def _take_replication(self):
+        if not (self._rep_totals or self._rep_reasons):
+            return None
+        cmds = []
+        for uid, u in self._rep_totals.items():
+            cmds.append(["SET", f"xp:total:{uid}", str(u["total"])])
+            cmds.append(["SET", f"xp:user:{uid}", json.dumps(u, ensure_ascii=False, separators=(",", ":"))])
+        for (uid, reason), n in self._rep_reasons.items():
+            cmds.append(["INCRBY", f"xp:by_reason:{uid}:{reason}", str(int(n))])
+        cmds += [
+            ["SET", "xp:stats:total_awards", str(self._data["stats"]["total_awards"])],
+            ["SET", "xp:stats:total_users", str(self._data["stats"]["total_users"])],
+            ["SET", "xp:updated_at", str(self._data["updated_at"])],
+        ]
+        self._rep_totals, self._rep_reasons = {}, {}
+        return cmds
+
+    def flush(self, compact: bool = False) -> None:
+        """Write queued awards now (and optionally compact); replication is sent outside the lock."""
+        with self._lock:
+            self._write_pending()
+            if compact or (self._dirty and time.monotonic() - self._last_compact >= self.compact_sec):
+                self._compact()
+            cmds = self._take_replication()
+        if cmds:
+            try:
+                self._upstash.pipeline(cmds)
+            except Exception:
+                pass
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._rep_totals and not self._closed and not (
+                        self._dirty and time.monotonic() - self._last_compact >= self.compact_sec):
+                    self._cond.wait(timeout=max(self.commit_window, 1.0))
+                if self._closed:
+                    return
+            time.sleep(self.commit_window)  # group window: awards yang masuk sekarang ikut batch ini
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        try:
+            self.flush(compact=True)
+        except Exception:
+            pass
 
     # ---------- public API ----------
     def has_awarded(self, award_key: Optional[str]) -> bool:
@@ -165,8 +339,10 @@ class XPStoreV2:
         if not award_key:
             return
         with self._lock:
+            if award_key in self._awarded_ids:
+                return
             self._awarded_ids.add(award_key)
-            self._save_awarded_ids()
+            self._append({"op": "mark", "k": award_key, "ts": int(time.time())})
 
     def get_total(self, user_id: int) -> int:
         with self._lock:
@@ -178,53 +354,24 @@ class XPStoreV2:
         """
         Tambah XP dan kembalikan total baru.
         award_key (mis. message_id) dipakai buat idempotency agar gak dobel.
+        Cost konstan: update memory + antri 1 baris log; disk & Upstash di-flush oleh flusher.
         """
         now = int(time.time())
+        uid = str(user_id)
         with self._lock:
             if award_key and award_key in self._awarded_ids:
                 return self.get_total(user_id)
-
-            users = self._data.setdefault("users", {})
-            u = users.setdefault(str(user_id), {"total": 0, "updated_at": now, "by_reason": {}})
-            u["total"] = int(u.get("total", 0)) + int(amount)
-            u["updated_at"] = now
-            if reason:
-                u["by_reason"][reason] = int(u["by_reason"].get(reason, 0)) + int(amount)
-
-            self._data.setdefault("awards", []).append({
-                "ts": now,
-                "user_id": str(user_id),
-                "amount": int(amount),
-                "reason": reason,
-                "ctx": context or {},
-            })
-            self._data.setdefault("stats", {}).setdefault("total_awards", 0)
-            self._data["stats"]["total_awards"] += 1
-            self._data["updated_at"] = now
-
+            u = self._apply(uid, int(amount), reason, now)
+            entry = {"ts": now, "user_id": uid, "amount": int(amount), "reason": reason, "ctx": context or {}}
             if award_key:
                 self._awarded_ids.add(award_key)
-
-            # persist locally first
-            self._save()
-            self._save_awarded_ids()
-
-            # best-effort replicate to Upstash
-            try:
-                if self._upstash.enabled:
-                    # total per user
-                    self._upstash.set_str(f"xp:total:{user_id}", str(u["total"]))
-                    # by_reason counts
-                    if reason:
-                        self._upstash.incrby(f"xp:by_reason:{user_id}:{reason}", int(amount))
-                    # global stats & last updated
-                    self._upstash.set_str("xp:stats:total_awards", str(self._data["stats"]["total_awards"]))
-                    self._upstash.set_str("xp:stats:total_users", str(self._data["stats"]["total_users"]))
-                    self._upstash.set_str("xp:updated_at", str(self._data["updated_at"]))
-                    # whole user object (optional)
-                    self._upstash.set_json(f"xp:user:{user_id}", u)
-            except Exception:
-                # never block or raise
-                pass
-
-            return u["total"]
+                entry["k"] = award_key
+            self._append(entry)
+            if self._upstash.enabled:
+                self._rep_totals[uid] = dict(u)
+                if reason:
+                    self._rep_reasons[(uid, reason)] = self._rep_reasons.get((uid, reason), 0) + int(amount)
+            total = u["total"]
+        if self.commit_window <= 0:
+            self.flush()
+        return total
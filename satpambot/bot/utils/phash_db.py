@@ -39,6 +39,11 @@ def load_db(path: str = DEFAULT_PATH) -> dict:
 
 def save_db(db: dict, path: str = DEFAULT_PATH):
     _atomic_write(Path(path), db)
+    try:
+        from satpambot.bot.modules.discord_bot.helpers.phash_packed import write_sidecar
+        write_sidecar(path, [it.get("phash") for it in db.get("items", []) if isinstance(it, dict)])
+    except Exception:
+        pass
 
 def _compute_sha256(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
@@ -38,6 +38,12 @@ def _save(lst: list[str]) -> None:
             _store_path.write_text(json.dumps({"phash": lst}, ensure_ascii=False, indent=2), encoding="utf-8")
         except Exception:
             pass
+        try:
+            # keep packed uint64 sidecar (mmap'd by the bot) in sync with the JSON
+            from satpambot.bot.modules.discord_bot.helpers.phash_packed import write_sidecar  # type: ignore
+            write_sidecar(_store_path, lst)
+        except Exception:
+            pass
 
 def get_phash() -> list[str]:
     return _load()
@@ -57,6 +63,12 @@ def add_phash(v: str) -> list[str]:
 def _notify_bot_phash_updated(cur: list[str]) -> None:
     """Best-effort notify running bot process (optional)."""
     # Strategy: write to shared file (done), and attempt to call optional hook if loaded
+    try:
+        from satpambot.bot.modules.discord_bot.helpers.phash_index import note_added  # type: ignore
+        if cur:
+            note_added(cur[-1])
+    except Exception:
+        pass
     try:
         # If bot exposes a hook (you can implement this), call it
         from satpambot.bot.modules.discord_bot.web_api import on_phash_updated  # type: ignore
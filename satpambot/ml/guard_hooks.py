@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os, asyncio
 
 
 
@@ -22,7 +23,8 @@ from .state_store_discord import MLState
 
 
 
-from .feature_extractor import extract_tokens, dhash64, sha1k
+from .feature_extractor import extract_tokens, sha1k
+from .image_features import hash_many
 
 
 
@@ -38,6 +40,10 @@ from .feature_extractor import extract_tokens, dhash64, sha1k
 
 
 
+# 0 = exact dhash64 match, sama seperti whitelist lama (set membership); >0 melonggarkan whitelist
+WL_DHASH_MAX_DIST = int(os.getenv("WL_DHASH_MAX_DIST", "0"))
+
+
 class GuardAdvisor:
 
 
@@ -231,154 +237,25 @@ class GuardAdvisor:
 
 
     async def any_image_whitelisted_async(self, message: discord.Message) -> bool:
-
-
-
-
-
-
-
         await self._ensure_loaded()
-
-
-
-
-
-
-
-        wl = self._state.combined.whitelist
-
-
-
-
-
-
-
-        if not wl:
-
-
-
-
-
-
-
+        if not self._state.combined.whitelist:
             return False
-
-
-
-
-
-
-
-        for a in message.attachments[:
-
-
-
-
-
-
-
-            3]:
-
-
-
-
-
-
-
+        blobs = []
+        for a in message.attachments[:3]:
             if a.content_type and a.content_type.startswith("image/"):
-
-
-
-
-
-
-
                 try:
-
-
-
-
-
-
-
-                    b = await a.read()
-
-
-
-
-
-
-
+                    blobs.append(await a.read())
                 except Exception:
-
-
-
-
-
-
-
                     continue
-
-
-
-
-
-
-
-                h1 = dhash64(b)
-
-
-
-
-
-
-
-                if h1 and h1 in set(wl.get("dhash64", [])):
-
-
-
-
-
-
-
-                    return True
-
-
-
-
-
-
-
-                if sha1k(b) in set(wl.get("sha1k", [])):
-
-
-
-
-
-
-
-                    return True
-
-
-
-
-
-
-
-        return False
-
-
-
-
-
-
-
-
-
-
-
-
+        if not blobs:
+            return False
+        db, sha = self._state.combined.whitelist_index()
+        if sha and any(sha1k(b) in sha for b in blobs):
+            return True
+        if not len(db):
+            return False
+        hashes = [h.dhash for h in await asyncio.to_thread(hash_many, blobs) if h]
+        return bool(hashes) and db.best(hashes, WL_DHASH_MAX_DIST) is not None
 
 
 
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+"""
+image_features.py
+- dHash / aHash / pHash (+ sha1k) dari SATU decode gambar; semua bit dibangun dengan
+  operasi array NumPy + np.packbits, tanpa loop Python per pixel.
+- Decode grayscale resolusi penuh (convert("L")), TANPA draft()/reduce(): downscale awal
+  menggeser bit dHash (beberapa bit pada sebagian gambar) sehingga whitelist lama tidak cocok lagi.
+- Konvensi bit:
+    dhash -> identik dengan feature_extractor.dhash64 lama (convert("L").resize((9,8)),
+             kiri > kanan, resample default), jadi whitelist "dhash64" yang sudah ada tetap cocok.
+    ahash/phash -> kompatibel dengan imagehash.average_hash / imagehash.phash (LANCZOS, DCT 32x32,
+             median 8x8 low-freq).
+- hash_many(blobs): batch API; decode per gambar lalu DCT pHash untuk semua gambar sekaligus
+  (matmul pada stack N x 32 x 32).
+"""
+import io, hashlib
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+try:
+    from PIL import Image, ImageFile
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+    _LANCZOS = Image.Resampling.LANCZOS
+except Exception:
+    Image = None
+    _LANCZOS = None
+
+SHA1K_BYTES = 12288
+_PHASH_N = 32
+_N = np.arange(_PHASH_N)
+# DCT-II basis (tanpa normalisasi; skala seragam tidak mengubah perbandingan dengan median)
+_DCT = np.cos(np.pi * (2 * _N[None, :] + 1) * _N[:, None] / (2 * _PHASH_N))[:8]
+
+
+class ImageHashes(NamedTuple):
+    dhash: str
+    ahash: str
+    phash: str
+    sha1k: str
+
+
+def sha1k(b: bytes, k: int = SHA1K_BYTES) -> str:
+    return hashlib.sha1(b[:k]).hexdigest()
+
+
+def decode_gray(b: bytes):
+    """Decode `b` to a full-resolution 'L' image (same input the legacy dhash64 resized)."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(b)) as im:
+            return im.convert("L")
+    except Exception:
+        return None
+
+
+def _hex(bits: np.ndarray) -> List[str]:
+    """(N, 64) bool -> 16-char hex strings, MSB first (row-major)."""
+    return [bytes(r).hex() for r in np.packbits(bits, axis=1)]
+
+
+def _planes(g):
+    d = np.asarray(g.resize((9, 8)), dtype=np.int16)
+    a = np.asarray(g.resize((8, 8), _LANCZOS), dtype=np.float64)
+    p = np.asarray(g.resize((_PHASH_N, _PHASH_N), _LANCZOS), dtype=np.float64)
+    return d, a, p
+
+
+def hash_many(blobs: Sequence[bytes]) -> List[Optional[ImageHashes]]:
+    """ImageHashes for every blob (None where the bytes are not a decodable image)."""
+    out: List[Optional[ImageHashes]] = [None] * len(blobs)
+    ok, ds, as_, ps = [], [], [], []
+    for i, b in enumerate(blobs):
+        g = decode_gray(b) if b else None
+        if g is None:
+            continue
+        try:
+            d, a, p = _planes(g)
+        except Exception:
+            continue
+        ok.append(i)
+        ds.append(d)
+        as_.append(a)
+        ps.append(p)
+    if not ok:
+        return out
+    d = np.stack(ds)
+    a = np.stack(as_).reshape(len(ok), 64)
+    low = _DCT @ np.stack(ps) @ _DCT.T              # (N, 8, 8) low-frequency DCT
+    low = low.reshape(len(ok), 64)
+    dh = _hex((d[:, :, :-1] > d[:, :, 1:]).reshape(len(ok), 64))
+    ah = _hex(a > a.mean(axis=1, keepdims=True))
+    ph = _hex(low > np.median(low, axis=1, keepdims=True))
+    for j, i in enumerate(ok):
+        out[i] = ImageHashes(dh[j], ah[j], ph[j], sha1k(blobs[i]))
+    return out
+
+
+def hash_one(b: bytes) -> Optional[ImageHashes]:
+    return hash_many([b])[0]
+
+
+def dhash64(b: bytes) -> Optional[str]:
+    h = hash_one(b)
+    return h.dhash if h else None
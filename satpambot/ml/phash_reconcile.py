@@ -1,536 +1,254 @@
 from __future__ import annotations
 
-
-
-
-
-
-
-import json, re
-
-
-
-
-
-
-
-from typing import Set, Tuple, Optional
-
-
-
-
-
-
+"""
+phash_reconcile.py
+- Rekonsiliasi hash log (SATPAMBOT_PHASH_DB_V1) vs hash gambar di thread phish: TP kalau ada
+  hash phish dalam jarak ham_thr, selain itu FP.
+- split_false_positives memakai PhashIndex (multi-index hashing 4 x 16-bit) untuk hash 64-bit;
+  hash yang lebih panjang di-parse sekali lalu dibandingkan sebagai int (tanpa parse hex per pasangan).
+- Reconciler: inkremental. Cursor (message id terakhir) per channel/thread + hash phish + verdict
+  per hash log disimpan di PHASH_RECONCILE_STATE; tiap run hanya membaca pesan baru, hanya
+  hash log baru yang diklasifikasi penuh, dan FP lama hanya dicek ulang terhadap hash phish baru.
+  Hasilnya ReconcileReport berbasis diff (TP/FP baru, FP yang jadi TP).
+"""
+import os, re, json, time, asyncio, logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import discord
 
+from satpambot.bot.modules.discord_bot.helpers.phash_index import PhashIndex
+from .image_features import hash_many
 
-
-
-
-
-
-from .feature_extractor import dhash64
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+log = logging.getLogger(__name__)
 
 PAT_MAGIC = "SATPAMBOT_PHASH_DB_V1"
-
-
-
-
-
-
-
-
-
-
-
-
-
+PHASH_RECONCILE_STATE = os.getenv("PHASH_RECONCILE_STATE", os.path.join("data", "runtime", "phash_reconcile.json"))
 
 
 def _hex_ok(s: str) -> bool:
-
-
-
-
-
-
-
     if not s:
-
-
-
-
-
-
-
         return False
-
-
-
-
-
-
-
     s = s.strip().lower()
-
-
-
-
-
-
-
     return re.fullmatch(r"[0-9a-f]{16,64}", s) is not None
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
 def hamming_hex(a: str, b: str) -> Optional[int]:
-
-
-
-
-
-
-
     try:
-
-
-
-
-
-
-
         xa = int(a, 16)
-
-
-
-
-
-
-
         xb = int(b, 16)
-
-
-
-
-
-
-
         return (xa ^ xb).bit_count()
-
-
-
-
-
-
-
     except Exception:
-
-
-
-
-
-
-
         return None
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-async def collect_phash_from_log(channel: discord.TextChannel, limit_msgs: int = 400) -> Set[str]:
-
-
-
-
-
-
-
+def _hashes_in_text(text: str) -> Set[str]:
     found: Set[str] = set()
+    if PAT_MAGIC not in text:
+        return found
+    blocks = re.findall(r"```(?:json)?\s*(\{.*?\})\s*```", text, flags=re.S) or re.findall(r"(\{.*\})", text, flags=re.S)  # noqa: E501
+    for blob in blocks:
+        try:
+            d = json.loads(blob)
+        except Exception:
+            continue
+        arr = d.get("dhash") or d.get("phash") or []
+        if isinstance(arr, list):
+            for it in arr:
+                if isinstance(it, str) and _hex_ok(it):
+                    found.add(it.lower())
+    return found
 
 
+def _history(channel, limit: Optional[int], after: Optional[int], oldest_first: bool):
+    if after:
+        return channel.history(limit=limit, after=discord.Object(id=int(after)), oldest_first=True)
+    return channel.history(limit=limit, oldest_first=oldest_first)
 
 
-
-
-
-    async for msg in channel.history(limit=limit_msgs, oldest_first=False):
-
-
-
-
-
-
-
-        text = (msg.content or "")
-
-
-
-
-
-
-
-        if PAT_MAGIC in text:
-
-
-
-
-
-
-
-            blocks = re.findall(r"```(?:json)?\s*(\{.*?\})\s*```", text, flags=re.S) or re.findall(r"(\{.*\})", text, flags=re.S)  # noqa: E501
-
-
-
-
-
-
-
-            for blob in blocks:
-
-
-
-
-
-
-
+async def _scan_log(channel, limit_msgs: int, after: Optional[int] = None) -> Tuple[Set[str], Optional[int], int]:
+    found: Set[str] = set()
+    last, n = after, 0
+    async for msg in _history(channel, limit_msgs, after, oldest_first=False):
+        n += 1
+        last = max(int(msg.id), int(last or 0))
+        found |= _hashes_in_text(msg.content or "")
+    return found, last, n
+
+
+async def _scan_thread(th, limit_msgs: int, after: Optional[int] = None) -> Tuple[Set[str], Optional[int], int]:
+    """Cursor berhenti sebelum pesan pertama yang download-nya gagal -> di-scan ulang run berikutnya."""
+    blobs: List[bytes] = []
+    last, n = after, 0
+    held = False
+    async for msg in _history(th, limit_msgs, after, oldest_first=True):
+        n += 1
+        for a in msg.attachments[:2]:
+            if a.content_type and a.content_type.startswith("image/"):
                 try:
-
-
-
-
-
-
-
-                    d = json.loads(blob)
-
-
-
-
-
-
-
+                    blobs.append(await a.read())
                 except Exception:
-
-
-
-
-
-
-
+                    held = True
                     continue
-
-
-
-
-
-
-
-                arr = d.get("dhash") or d.get("phash") or []
-
-
-
-
-
-
-
-                if isinstance(arr, list):
-
-
-
-
-
-
-
-                    for it in arr:
-
-
-
-
-
-
-
-                        if isinstance(it, str) and _hex_ok(it):
-
-
-
-
-
-
-
-                            found.add(it.lower())
-
-
-
-
-
-
-
-    return found
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-async def collect_image_hashes_from_thread(th: discord.Thread, limit_msgs: int = 250) -> Set[str]:
-
-
-
-
-
-
-
+        if not held:
+            last = max(int(msg.id), int(last or 0))
     seen: Set[str] = set()
+    if blobs:
+        for h in await asyncio.to_thread(hash_many, blobs):
+            if h:
+                seen.add(h.dhash.lower())
+    return seen, last, n
 
 
+async def collect_phash_from_log(channel: discord.TextChannel, limit_msgs: int = 400, after: Optional[int] = None) -> Set[str]:  # noqa: E501
+    return (await _scan_log(channel, limit_msgs, after))[0]
 
 
+async def collect_image_hashes_from_thread(th: discord.Thread, limit_msgs: int = 250, after: Optional[int] = None) -> Set[str]:  # noqa: E501
+    return (await _scan_thread(th, limit_msgs, after))[0]
 
 
+class _PhishMatcher:
+    """Hamming lookup over phish hashes: PhashIndex for 64-bit, pre-parsed ints for longer ones."""
 
-    async for msg in th.history(limit=limit_msgs, oldest_first=True):
-
-
-
-
-
-
-
-        for a in msg.attachments[:
-
-
-
-
-
-
-
-            2]:
-
-
-
-
-
-
-
-            if a.content_type and a.content_type.startswith("image/"):
-
-
-
-
-
-
+    def __init__(self, hashes: Iterable[str] = ()):
+        self.index = PhashIndex()
+        self.wide: List[int] = []
+        self.add(hashes)
 
+    def add(self, hashes: Iterable[str]) -> None:
+        for h in hashes:
+            if len(h.strip()) <= 16:
+                self.index.add(h)
+            else:
                 try:
-
-
-
-
-
-
-
-                    b = await a.read()
-
-
-
-
-
-
-
-                except Exception:
-
-
-
-
-
-
-
+                    self.wide.append(int(h, 16))
+                except ValueError:
                     continue
 
+    def __len__(self) -> int:
+        return len(self.index) + len(self.wide)
 
+    def match(self, h: str, ham_thr: int) -> bool:
+        if len(h.strip()) <= 16:
+            return self.index.nearest(h, ham_thr) is not None
+        try:
+            q = int(h, 16)
+        except ValueError:
+            return False
+        return any((q ^ v).bit_count() <= ham_thr for v in self.wide)
 
 
-
-
-
-                h = dhash64(b)
-
-
-
-
-
-
-
-                if h:
-
-
-
-
-
-
-
-                    seen.add(h.lower())
-
-
-
-
-
-
-
-    return seen
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-def split_false_positives(log_hashes: Set[str], phish_hashes: Set[str], ham_thr: int = 6) -> Tuple[Set[str], Set[str]]:
-
-
-
-
-
-
-
+def split_false_positives(log_hashes: Set[str], phish_hashes: Set[str], ham_thr: int = 6) -> Tuple[Set[str], Set[str]]:  # noqa: E501
     tps: Set[str] = set()
-
-
-
-
-
-
-
     fps: Set[str] = set()
-
-
-
-
-
-
-
+    matcher = _PhishMatcher(phish_hashes)
     for h in log_hashes:
-
-
-
-
-
-
-
-        matched = False
-
-
-
-
-
-
-
-        for p in phish_hashes:
-
-
-
-
-
-
-
-            dv = hamming_hex(h, p)
-
-
-
-
-
-
-
-            if dv is not None and dv <= ham_thr:
-
-
-
-
-
-
-
-                matched = True
-
-
-
-
-
-
-
-                break
-
-
-
-
-
-
-
-        (tps if matched else fps).add(h)
-
-
-
-
-
-
-
+        (tps if matcher.match(h, ham_thr) else fps).add(h)
     return tps, fps
 
 
-
-
-
-
-
+@dataclass
+class ReconcileReport:
+    new_tps: Set[str] = field(default_factory=set)
+    new_fps: Set[str] = field(default_factory=set)
+    promoted: Set[str] = field(default_factory=set)   # FP lama yang sekarang punya pasangan phish
+    new_phish: int = 0
+    scanned_msgs: int = 0
+    totals: Dict[str, int] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.new_tps or self.new_fps or self.promoted)
+
+
+class Reconciler:
+    def __init__(self, path: str = PHASH_RECONCILE_STATE, ham_thr: int = 6):
+        self.path = path
+        self.ham_thr = ham_thr
+        self.cursors: Dict[str, int] = {}
+        self.phish: Set[str] = set()
+        self.verdicts: Dict[str, str] = {}   # log hash -> "tp" | "fp"
+        self._load()
+        self._matcher = _PhishMatcher(self.phish)
+
+    # ---------- persistence ----------
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                d = json.load(f) or {}
+        except FileNotFoundError:
+            return
+        except Exception:
+            log.warning("[phash-reconcile] %s unreadable, starting fresh", self.path)
+            return
+        if int(d.get("ham_thr", self.ham_thr)) != self.ham_thr:
+            return  # threshold berubah -> verdict lama tidak berlaku, scan ulang
+        self.cursors = {str(k): int(v) for k, v in (d.get("cursors") or {}).items()}
+        self.phish = set(d.get("phish") or [])
+        self.verdicts = dict(d.get("verdicts") or {})
+
+    def save(self) -> None:
+        try:
+            dname = os.path.dirname(self.path)
+            if dname:
+                os.makedirs(dname, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"ham_thr": self.ham_thr, "cursors": self.cursors, "phish": sorted(self.phish),
+                           "verdicts": self.verdicts}, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            log.warning("[phash-reconcile] save failed: %r", e)
+
+    # ---------- reconcile ----------
+    def apply(self, log_hashes: Iterable[str], phish_hashes: Iterable[str]) -> ReconcileReport:
+        """Fold newly seen hashes into the state and return what changed."""
+        rep = ReconcileReport()
+        fresh_phish = {h for h in phish_hashes if h not in self.phish}
+        rep.new_phish = len(fresh_phish)
+        if fresh_phish:
+            self.phish |= fresh_phish
+            self._matcher.add(fresh_phish)
+            delta = _PhishMatcher(fresh_phish)
+            for h, v in self.verdicts.items():
+                if v == "fp" and delta.match(h, self.ham_thr):
+                    rep.promoted.add(h)
+            for h in rep.promoted:
+                self.verdicts[h] = "tp"
+        for h in log_hashes:
+            if h in self.verdicts:
+                continue
+            tp = self._matcher.match(h, self.ham_thr)
+            self.verdicts[h] = "tp" if tp else "fp"
+            (rep.new_tps if tp else rep.new_fps).add(h)
+        n_tp = sum(1 for v in self.verdicts.values() if v == "tp")
+        rep.totals = {"tp": n_tp, "fp": len(self.verdicts) - n_tp, "phish": len(self.phish)}
+        return rep
+
+    async def run(self, log_channel, phish_threads: Iterable, log_limit: int = 400,
+                  thread_limit: int = 250) -> ReconcileReport:
+        """Scan only messages after the stored cursors, reconcile, persist."""
+        t0 = time.perf_counter()
+        scanned = 0
+        phish: Set[str] = set()
+        for th in phish_threads:
+            key = str(th.id)
+            seen, last, n = await _scan_thread(th, thread_limit, self.cursors.get(key))
+            phish |= seen
+            scanned += n
+            if last:
+                self.cursors[key] = last
+        logs: Set[str] = set()
+        if log_channel is not None:
+            key = str(log_channel.id)
+            logs, last, n = await _scan_log(log_channel, log_limit, self.cursors.get(key))
+            scanned += n
+            if last:
+                self.cursors[key] = last
+        rep = self.apply(logs, phish)
+        rep.scanned_msgs = scanned
+        self.save()
+        rep.elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        return rep
@@ -1,1160 +1,361 @@
 from __future__ import annotations
 
-
-
-
-
-
-
-import asyncio, io, gzip, json, datetime
-
-
-
-
-
-
-
-from typing import Optional, Dict, Any, List
-
-
-
-
-
-
+"""
+state_store_discord.py
+- State ML (model NB + whitelist + exempt) disimpan di thread "ml-state" sebagai rantai chunk:
+  satu BASE (state penuh) lalu DELTA append-only; tiap chunk = gzip(header JSON + "\\n" + model SNB1).
+- Delta hanya berisi yang berubah: bucket model yang di-learn sejak chunk terakhir
+  (OnlineNB.delta_bytes) dan list whitelist/exempt sebagai "append" kalau list lama adalah prefix,
+  selain itu "set" penuh. List dengan content hash (sha1) sama dengan chunk terakhir di-skip;
+  kalau tidak ada yang berubah, tidak ada upload sama sekali.
+- Re-base tiap SNAPSHOT_REBASE_EVERY delta, atau kalau total delta > SNAPSHOT_REBASE_RATIO x base.
+- load_latest: baca mundur sampai BASE, terapkan delta berurutan (seq harus nyambung);
+  snapshot lama (mlsnap_*.json.gz, v4/v5) tetap dibaca sebagai base.
+- Discovery channel log / thread di-cache per id (bot.get_channel); nama channel/thread di-scan
+  ulang hanya kalau id tidak resolve atau cache lebih tua dari ML_DISCOVERY_TTL_SEC.
+"""
+import io, os, gzip, json, time, hashlib, datetime, logging
+from typing import Optional, Dict, Any, List, Tuple
 
 import discord
 
-
-
-
-
-
-
-
-
-
-
-
-
-
+log = logging.getLogger(__name__)
 
 SNAPSHOT_PREFIX = "mlsnap_"
-
-
-
-
-
-
-
 MAX_MESSAGES_SCAN = 250
-
-
-
-
-
-
-
 MAX_ATTACH_PER_MSG = 2
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-CHAN_CANDIDATES = ["log-botphising","log-botphishing","log-satpam","log-satpam-bot"]
-
-
-
-
-
-
-
-THREAD_PHISH = ["imagephising","image-phising","imagephishing","image-phishing"]
-
-
-
-
-
-
-
-THREAD_WL = ["whitelist","white-list","wl-"]
-
-
-
-
-
-
-
-THREAD_BANLOG = ["ban-log","log-ban","banlog"]
-
-
-
-
-
-
-
-THREAD_BLACKLIST = ["blacklist","black-list"]
-
-
-
-
-
-
-
+SNAPSHOT_REBASE_EVERY = int(os.getenv("SNAPSHOT_REBASE_EVERY", "24"))
+SNAPSHOT_REBASE_RATIO = float(os.getenv("SNAPSHOT_REBASE_RATIO", "0.5"))
+ML_DISCOVERY_TTL_SEC = float(os.getenv("ML_DISCOVERY_TTL_SEC", "600"))
+CHUNK_VERSION = 6
+
+CHAN_CANDIDATES = ["log-botphising", "log-botphishing", "log-satpam", "log-satpam-bot"]
+THREAD_PHISH = ["imagephising", "image-phising", "imagephishing", "image-phishing"]
+THREAD_WL = ["whitelist", "white-list", "wl-"]
+THREAD_BANLOG = ["ban-log", "log-ban", "banlog"]
+THREAD_BLACKLIST = ["blacklist", "black-list"]
 THREAD_STATE = ["ml-state"]
+_THREAD_KINDS = (THREAD_PHISH, THREAD_WL, THREAD_BANLOG, THREAD_BLACKLIST, THREAD_STATE)
+_SECTIONS = ("whitelist", "exempt")
 
 
+def _digest(items: List[Any]) -> str:
+    return hashlib.sha1(json.dumps(items, separators=(",", ":")).encode("utf-8")).hexdigest()
 
 
+def encode_chunk(head: Dict[str, Any], model: bytes = b"") -> bytes:
+    return gzip.compress(json.dumps(head, separators=(",", ":")).encode("utf-8") + b"\n" + model)
 
 
-
-
-
-
-
-
-
+def decode_chunk(b: bytes) -> Tuple[Dict[str, Any], bytes]:
+    raw = gzip.decompress(b)
+    head, _, model = raw.partition(b"\n")
+    return json.loads(head.decode("utf-8")), model
 
 
 class CombinedState:
-
-
-
-
-
-
-
     def __init__(self):
-
-
-
-
-
-
-
         self.model_dict: Dict[str, Any] = {}
-
-
-
-
-
-
-
+        self._wl_version = 0
         self.whitelist = {"dhash64": [], "sha1k": []}
-
-
-
-
-
-
-
         self.exempt = {"threads": [], "channels": []}
+        self._wl_key = None
+        self._wl_index = None
 
+    @property
+    def whitelist(self) -> Dict[str, List[Any]]:
+        return self._whitelist
 
+    @whitelist.setter
+    def whitelist(self, value: Dict[str, List[Any]]) -> None:
+        self._whitelist = value
+        self._wl_version += 1
 
-
-
-
-
-
-
-
-
-
-
-
+    def touch_whitelist(self) -> None:
+        """Call after editing whitelist lists in place (invalidates whitelist_index)."""
+        self._wl_version += 1
 
     def to_json_bytes(self) -> bytes:
-
-
-
-
-
-
-
-        data = {"version": 4, "model": self.model_dict, "whitelist": self.whitelist, "exempt": self.exempt}
-
-
-
-
-
-
-
+        data = {"version": 5, "model": self.model_dict, "whitelist": self.whitelist, "exempt": self.exempt}
         js = json.dumps(data).encode("utf-8")
-
-
-
-
-
-
-
         return gzip.compress(js)
 
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def whitelist_index(self):
+        """(packed dhash64 DB, sha1k frozenset), rebuilt only when the whitelist version changes."""
+        wl = self.whitelist or {}
+        dh, sk = wl.get("dhash64") or [], wl.get("sha1k") or []
+        key = (self._wl_version, len(dh), len(sk))
+        if self._wl_key != key:
+            from satpambot.bot.modules.discord_bot.helpers.phash_packed import PackedPhashDB
+            self._wl_index = (PackedPhashDB.from_hex(dh), frozenset(sk))
+            self._wl_key = key
+        return self._wl_index
+
+    def section(self, name: str) -> Dict[str, List[Any]]:
+        return self.whitelist if name == "whitelist" else self.exempt
+
+    def apply_parts(self, parts: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        for name, lists in (parts or {}).items():
+            if name not in _SECTIONS:
+                continue
+            sec = self.section(name)
+            if name == "whitelist":
+                self.touch_whitelist()
+            for key, op in lists.items():
+                items = list(op.get("items") or [])
+                if op.get("op") == "append":
+                    sec[key] = list(sec.get(key) or []) + items
+                else:
+                    sec[key] = items
 
     @classmethod
-
-
-
-
-
-
-
     def from_json_bytes(cls, b: bytes) -> "CombinedState":
-
-
-
-
-
-
-
         d = json.loads(gzip.decompress(b).decode("utf-8"))
-
-
-
-
-
-
-
         cs = cls()
-
-
-
-
-
-
-
         cs.model_dict = d.get("model", {})
-
-
-
-
-
-
-
         cs.whitelist = d.get("whitelist", {"dhash64": [], "sha1k": []})
-
-
-
-
-
-
-
         cs.exempt = d.get("exempt", {"threads": [], "channels": []})
-
-
-
-
-
-
-
         return cs
 
 
+class MLState:
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.parent_channel_id: Optional[int] = None
+        self.thread_id: Optional[int] = None
+        self.combined = CombinedState()
+        self.model = None  # OnlineNB
+        self._thread_ids: Optional[List[List[int]]] = None
+        self._threads_at = 0.0
+        # posisi rantai terakhir yang sudah ter-upload / ter-load
+        self._chain: Optional[Dict[str, Any]] = None
+        self._sent_lists: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self.stats = {"bases": 0, "deltas": 0, "skipped": 0, "upload_bytes": 0, "last_upload_bytes": 0,
+                      "last_upload_ms": 0.0, "load_chunks": 0, "load_bytes": 0, "last_load_ms": 0.0}
+
+    # ---------- discovery ----------
+    def _name_has_any(self, name: str, keys: List[str]) -> bool:
+        n = (name or "").lower()
+        return any(k in n for k in keys)
 
+    def find_log_channel(self) -> Optional[discord.TextChannel]:
+        if self.parent_channel_id:
+            ch = self.bot.get_channel(self.parent_channel_id)
+            if isinstance(ch, discord.TextChannel):
+                return ch
+        for ch in self.bot.get_all_channels():
+            if isinstance(ch, discord.TextChannel):
+                if self._name_has_any(ch.name, CHAN_CANDIDATES):
+                    self.parent_channel_id = ch.id
+                    return ch
+        return None
 
+    def all_active_threads(self) -> List[discord.Thread]:
+        ths = []
+        for ch in self.bot.get_all_channels():
+            if isinstance(ch, discord.TextChannel):
+                try:
+                    ths.extend(getattr(ch, "threads", []))
+                except Exception:
+                    pass
+        return ths
 
+    def invalidate_discovery(self) -> None:
+        self._thread_ids = None
 
-
-
-
-
-
-
-
-
-
-class MLState:
-
-
-
-
-
-
-
-    def __init__(self, bot: discord.Client):
-
-
-
-
-
-
-
-        self.bot = bot
-
-
-
-
-
-
-
-        self.parent_channel_id: Optional[int] = None
-
-
-
-
-
-
-
-        self.thread_id: Optional[int] = None
-
-
-
-
-
-
-
-        self.combined = CombinedState()
-
-
-
-
-
-
-
-        self.model = None  # OnlineNB
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    def _name_has_any(self, name: str, keys: List[str]) -> bool:
-
-
-
-
-
-
-
-        n = (name or "").lower()
-
-
-
-
-
-
-
-        return any(k in n for k in keys)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    def find_log_channel(self) -> Optional[discord.TextChannel]:
-
-
-
-
-
-
-
-        for ch in self.bot.get_all_channels():
-
-
-
-
-
-
-
-            if isinstance(ch, discord.TextChannel):
-
-
-
-
-
-
-
-                if self._name_has_any(ch.name, CHAN_CANDIDATES):
-
-
-
-
-
-
-
-                    return ch
-
-
-
-
-
-
-
-        return None
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    def all_active_threads(self) -> List[discord.Thread]:
-
-
-
-
-
-
-
-        ths = []
-
-
-
-
-
-
-
-        for ch in self.bot.get_all_channels():
-
-
-
-
-
-
-
-            if isinstance(ch, discord.TextChannel):
-
-
-
-
-
-
-
-                try:
-
-
-
-
-
-
-
-                    ths.extend(getattr(ch, "threads", []))
-
-
-
-
-
-
-
-                except Exception:
-
-
-
-
-
-
-
-                    pass
-
-
-
-
-
-
-
-        return ths
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def _cached_threads(self) -> Optional[List[List[discord.Thread]]]:
+        if self._thread_ids is None or time.monotonic() - self._threads_at > ML_DISCOVERY_TTL_SEC:
+            return None
+        out = []
+        for ids in self._thread_ids:
+            group = []
+            for tid in ids:
+                th = self.bot.get_channel(tid)
+                if not isinstance(th, discord.Thread):
+                    return None  # thread hilang / diarsip -> scan ulang
+                group.append(th)
+            out.append(group)
+        return out
 
     def classify_threads(self):
-
-
-
-
-
-
-
-        phish = []
-
-
-
-
-
-
-
-        wl = []
-
-
-
-
-
-
-
-        banlog = []
-
-
-
-
-
-
-
-        bl = []
-
-
-
-
-
-
-
-        state = []
-
-
-
-
-
-
-
+        cached = self._cached_threads()
+        if cached is not None:
+            return tuple(cached)
+        groups: List[List[discord.Thread]] = [[] for _ in _THREAD_KINDS]
         for th in self.all_active_threads():
-
-
-
-
-
-
-
             n = (th.name or "").lower()
+            for group, keys in zip(groups, _THREAD_KINDS):
+                if self._name_has_any(n, keys):
+                    group.append(th)
+        self._thread_ids = [[th.id for th in g] for g in groups]
+        self._threads_at = time.monotonic()
+        phish, wl, banlog, bl, state = groups
+        return phish, wl, banlog, bl, state
 
+    async def _ensure_thread(self) -> Optional[discord.Thread]:
+        if self.thread_id:
+            t = self.bot.get_channel(self.thread_id)
+            if isinstance(t, discord.Thread):
+                return t
+        parent = self.find_log_channel()
+        if parent is None:
+            return None
+        for th in getattr(parent, "threads", []):
+            if (th.name or "").lower() == "ml-state":
+                self.thread_id = th.id
+                return th
+        try:
+            th = await parent.create_thread(name="ml-state", type=discord.ChannelType.public_thread)
+            self.thread_id = th.id
+            return th
+        except Exception:
+            return None
 
-
-
-
-
-
-            if self._name_has_any(n, THREAD_STATE):
-
-
-
-
-
-
-
-                state.append(th)
-
-
-
-
-
-
-
-            if self._name_has_any(n, THREAD_PHISH):
-
-
-
-
-
-
-
-                phish.append(th)
-
-
-
-
-
-
-
-            if self._name_has_any(n, THREAD_WL):
-
-
-
-
-
-
-
-                wl.append(th)
-
-
-
-
-
-
-
-            if self._name_has_any(n, THREAD_BANLOG):
-
-
-
-
-
-
-
-                banlog.append(th)
-
-
-
-
-
-
-
-            if self._name_has_any(n, THREAD_BLACKLIST):
-
-
-
-
-
-
-
-                bl.append(th)
-
-
-
-
-
-
-
-        return phish, wl, banlog, bl, state
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    async def _ensure_thread(self) -> Optional[discord.Thread]:
-
-
-
-
-
-
-
-        parent = None
-
-
-
-
-
-
-
-        if self.parent_channel_id:
-
-
-
-
-
-
-
-            ch = self.bot.get_channel(self.parent_channel_id)
-
-
-
-
-
-
-
-            if isinstance(ch, discord.TextChannel):
-
-
-
-
-
-
-
-                parent = ch
-
-
-
-
-
-
-
-        if parent is None:
-
-
-
-
-
-
-
-            parent = self.find_log_channel()
-
-
-
-
-
-
-
-        if parent is None:
-
-
-
-
-
-
-
-            return None
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-        if self.thread_id:
-
-
-
-
-
-
-
-            t = self.bot.get_channel(self.thread_id)
-
-
-
-
-
-
-
-            if isinstance(t, discord.Thread):
-
-
-
-
-
-
-
-                return t
-
-
-
-
-
-
-
-        for th in getattr(parent, "threads", []):
-
-
-
-
-
-
-
-            if (th.name or "").lower() == "ml-state":
-
-
-
-
-
-
-
-                self.thread_id = th.id
-
-
-
-
-
-
-
-                return th
-
-
-
-
-
-
-
-        try:
-
-
-
-
-
-
-
-            th = await parent.create_thread(name="ml-state", type=discord.ChannelType.public_thread)
-
-
-
-
-
-
-
-            self.thread_id = th.id
-
-
-
-
-
-
-
-            return th
-
-
-
-
-
-
-
-        except Exception:
-
-
-
-
-
-
-
-            return None
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    async def load_latest(self) -> bool:
-
-
-
-
-
-
-
+    # ---------- load ----------
+    async def _model_from(self, msg, model_dict: Dict[str, Any]):
+        """OnlineNB from a legacy snapshot message: .nb.gz attachment (v5) or JSON dict (v4)."""
         from .online_nb import OnlineNB
+        if model_dict.get("format") == "snb1":
+            for a in msg.attachments:
+                if a.filename == model_dict.get("file"):
+                    return OnlineNB.from_bytes(gzip.decompress(await a.read()))
+            return OnlineNB()
+        return OnlineNB.from_dict(model_dict) if model_dict else OnlineNB()
+
+    def _remember_lists(self) -> None:
+        self._sent_lists = {}
+        for name in _SECTIONS:
+            for key, items in self.combined.section(name).items():
+                items = list(items or [])
+                self._sent_lists[(name, key)] = (len(items), _digest(items))
 
-
-
-
-
-
-
+    async def load_latest(self) -> bool:
+        from .online_nb import OnlineNB
+        t0 = time.perf_counter()
         th = await self._ensure_thread()
-
-
-
-
-
-
-
         if th is None:
-
-
-
-
-
-
-
             self.model = OnlineNB()
-
-
-
-
-
-
-
             return False
-
-
-
-
-
-
-
+        deltas: List[Tuple[Dict[str, Any], bytes, int]] = []
         try:
-
-
-
-
-
-
-
-            async for msg in th.history(limit=50, oldest_first=False):
-
-
-
-
-
-
-
+            async for msg in th.history(limit=MAX_MESSAGES_SCAN, oldest_first=False):
                 for a in msg.attachments:
-
-
-
-
-
-
-
-                    if a.filename.startswith(SNAPSHOT_PREFIX) and a.filename.endswith(".json.gz"):
-
-
-
-
-
-
-
+                    fn = a.filename
+                    if not fn.startswith(SNAPSHOT_PREFIX):
+                        continue
+                    if fn.endswith(".delta.gz") or fn.endswith(".base.gz"):
                         b = await a.read()
-
-
-
-
-
-
-
-                        cs = CombinedState.from_json_bytes(b)
-
-
-
-
-
-
-
+                        self.stats["load_chunks"] += 1
+                        self.stats["load_bytes"] += len(b)
+                        head, model = decode_chunk(b)
+                        if head.get("kind") != "base":
+                            deltas.append((head, model, len(b)))
+                            continue
+                        self._load_chain(fn, head, model, len(b), deltas[::-1])
+                        self.stats["last_load_ms"] = (time.perf_counter() - t0) * 1000.0
+                        return True
+                    if fn.endswith(".json.gz"):  # snapshot lama; delta v6 tanpa base tidak bisa dipakai
+                        cs = CombinedState.from_json_bytes(await a.read())
                         self.combined = cs
-
-
-
-
-
-
-
-                        self.model = OnlineNB.from_dict(cs.model_dict) if cs.model_dict else OnlineNB()
-
-
-
-
-
-
-
+                        self.model = await self._model_from(msg, cs.model_dict)
+                        self.model.mark_clean()
+                        self._chain = None  # snapshot berikutnya = base v6 baru
                         return True
-
-
-
-
-
-
-
-        except Exception:
-
-
-
-
-
-
-
-            pass
-
-
-
-
-
-
-
+        except Exception as e:
+            log.warning("[ml-state] load failed: %r", e)
         self.model = OnlineNB()
-
-
-
-
-
-
-
         return False
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    async def save_snapshot(self) -> bool:
-
-
-
-
-
-
-
+    def _load_chain(self, base_name: str, head: Dict[str, Any], model: bytes, size: int,
+                    deltas: List[Tuple[Dict[str, Any], bytes, int]]) -> None:
+        from .online_nb import OnlineNB
+        cs = CombinedState()
+        cs.apply_parts(head.get("parts") or {})
+        nb = OnlineNB.from_bytes(model) if model else OnlineNB()
+        seq = 0
+        delta_bytes = 0
+        for dh, dm, dsize in deltas:
+            if dh.get("base") != base_name or int(dh.get("seq", -1)) != seq + 1:
+                log.warning("[ml-state] delta chain broken after seq %s (base %s)", seq, base_name)
+                break
+            cs.apply_parts(dh.get("parts") or {})
+            if dm:
+                nb.apply_bytes(dm)
+            seq += 1
+            delta_bytes += dsize
+        self.combined = cs
+        self.model = nb
+        self._chain = {"base": base_name, "seq": seq, "base_bytes": size,
+                       "delta_bytes": delta_bytes}
+        self._remember_lists()
+
+    # ---------- save ----------
+    def _list_parts(self, full: bool):
+        """(parts to send, {(section, key): (len, digest)} of the lists as sent)."""
+        parts: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        sent: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        for name in _SECTIONS:
+            for key, items in self.combined.section(name).items():
+                items = list(items or [])
+                cur = (len(items), _digest(items))
+                prev = None if full else self._sent_lists.get((name, key))
+                if prev == cur:
+                    continue  # content hash sama -> tidak dikirim
+                sent[(name, key)] = cur
+                if prev is not None and len(items) > prev[0] and _digest(items[:prev[0]]) == prev[1]:
+                    op = {"op": "append", "items": items[prev[0]:]}
+                else:
+                    op = {"op": "set", "items": items}
+                parts.setdefault(name, {})[key] = op
+        return parts, sent
+
+    def _want_rebase(self) -> bool:
+        c = self._chain
+        if c is None or c["seq"] >= SNAPSHOT_REBASE_EVERY:
+            return True
+        return c["base_bytes"] > 0 and c["delta_bytes"] > SNAPSHOT_REBASE_RATIO * c["base_bytes"]
+
+    async def save_snapshot(self, force_base: bool = False) -> bool:
+        """Upload a delta chunk with only what changed (or a new base when due)."""
         if self.model is None:
-
-
-
-
-
-
-
             return False
-
-
-
-
-
-
-
-        from .online_nb import OnlineNB
-
-
-
-
-
-
-
-        self.combined.model_dict = self.model.to_dict()
-
-
-
-
-
-
-
         th = await self._ensure_thread()
-
-
-
-
-
-
-
         if th is None:
-
-
-
-
-
-
-
             return False
-
-
-
-
-
-
-
+        t0 = time.perf_counter()
+        rebase = force_base or self._want_rebase()
+        parts, sent = self._list_parts(full=rebase)
+        if rebase:
+            model_b = self.model.to_bytes()
+        else:
+            model_b = self.model.delta_bytes() if self.model.dirty_count else b""
+            if not parts and not model_b:
+                self.stats["skipped"] += 1
+                return True
+        prev_dirty = self.model.mark_clean()
+        seq = 0 if rebase else self._chain["seq"] + 1
         ts = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-
-
-
-
-
-
-
-        fname = f"{SNAPSHOT_PREFIX}{ts}.json.gz"
-
-
-
-
-
-
-
-        b = self.combined.to_json_bytes()
-
-
-
-
-
-
-
-        file = discord.File(io.BytesIO(b), filename=fname)
-
-
-
-
-
-
-
-        await th.send(content="ML combined snapshot", file=file)
-
-
-
-
-
-
-
+        kind = "base" if rebase else "delta"
+        fname = f"{SNAPSHOT_PREFIX}{ts}_{seq}.{kind}.gz"
+        head = {"version": CHUNK_VERSION, "kind": kind, "base": fname if rebase else self._chain["base"],
+                "seq": seq, "parts": parts}
+        blob = encode_chunk(head, model_b)
+        try:
+            await th.send(content=f"ML state {kind} #{seq}", file=discord.File(io.BytesIO(blob), filename=fname))
+        except Exception as e:
+            self.model.mark_dirty(prev_dirty)
+            log.warning("[ml-state] snapshot upload failed: %r", e)
+            return False
+        if rebase:
+            self._chain = {"base": fname, "seq": 0, "base_bytes": len(blob), "delta_bytes": 0}
+            self._sent_lists = {}
+            self.stats["bases"] += 1
+        else:
+            self._chain["seq"] = seq
+            self._chain["delta_bytes"] += len(blob)
+            self.stats["deltas"] += 1
+        self._sent_lists.update(sent)
+        self.stats["upload_bytes"] += len(blob)
+        self.stats["last_upload_bytes"] = len(blob)
+        self.stats["last_upload_ms"] = (time.perf_counter() - t0) * 1000.0
         return True
-
-
-
-
-
-
-
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+satpambot/tools/phash_pack.py
+
+Gunanya:
+- Konversi DB pHash JSON (list hex) ke sidecar uint64 `<file>.u64.npy` (sorted, unique)
+  yang bisa di-mmap oleh helpers/phash_packed.PackedPhashDB.
+
+Format JSON yang didukung:
+  {"phash": [...]}, {"items": [{"phash": ...}, ...]}, atau list hex langsung.
+
+Contoh:
+  python -m satpambot.tools.phash_pack
+  python -m satpambot.tools.phash_pack data/phish/phash.json --check
+"""
+import sys, argparse
+from pathlib import Path
+
+DEFAULT_SOURCES = [
+    "satpambot/config/SATPAMBOT_PHASH_DB_V1.json",
+    "data/phash/SATPAMBOT_PHASH_DB_V1.json",
+    "data/phish/phash.json",
+    "data/phish_phash.json",
+]
+
+def main(argv=None) -> int:
+    from satpambot.bot.modules.discord_bot.helpers import phash_packed as pp
+    ap = argparse.ArgumentParser(description="Pack pHash JSON DBs into uint64 .npy sidecars")
+    ap.add_argument("paths", nargs="*", help="JSON DB files (default: known phash DBs)")
+    ap.add_argument("--check", action="store_true", help="verify sidecar round-trips the JSON")
+    args = ap.parse_args(argv)
+    paths = args.paths or [p for p in DEFAULT_SOURCES if Path(p).exists()]
+    if not paths:
+        print("[WARN] tidak ada DB pHash yang ditemukan", file=sys.stderr)
+        return 1
+    rc = 0
+    for p in paths:
+        src = Path(p)
+        if not src.exists():
+            print(f"[SKIP] {src} (tidak ada)")
+            continue
+        try:
+            out = pp.write_sidecar(src)
+            db = pp.PackedPhashDB.load(src)
+            line = f"[OK] {src} -> {out} ({len(db)} hash, {out.stat().st_size} bytes; json {src.stat().st_size} bytes)"
+            if args.check:
+                want = pp.pack_hex(pp._hashes_from_json(src))
+                same = len(want) == len(db) and bool((want == db.arr).all())
+                line += " check=" + ("ok" if same else "MISMATCH")
+                rc = rc or (0 if same else 3)
+            print(line)
+        except Exception as e:
+            print(f"[ERR] {src}: {e!r}", file=sys.stderr)
+            rc = 2
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main())
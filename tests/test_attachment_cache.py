@@ -0,0 +1,100 @@
+import asyncio
+import io
+
+from PIL import Image
+
+from satpambot.bot.modules.discord_bot.helpers.attachment_cache import AttachmentCache
+
+
+def _png(color=(200, 10, 10), size=(32, 32)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class _Att:
+    def __init__(self, aid, data, ctype="image/png"):
+        self.id, self._data, self.content_type = aid, data, ctype
+        self.size = len(data)
+        self.url = None
+        self.reads = 0
+
+    async def read(self):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        return self._data
+
+
+def test_concurrent_fetches_share_one_download():
+    cache = AttachmentCache()
+    att = _Att(1, _png())
+
+    async def go():
+        return await asyncio.gather(*(cache.fetch(att) for _ in range(5)))
+
+    out = asyncio.run(go())
+    assert att.reads == 1 and all(e is out[0] for e in out)
+    assert asyncio.run(cache.fetch(att)) is out[0] and att.reads == 1
+
+
+def test_same_bytes_under_other_attachment_ids_dedupe():
+    cache = AttachmentCache()
+    data = _png()
+    a = asyncio.run(cache.fetch(_Att(1, data)))
+    b = asyncio.run(cache.fetch(_Att(2, data)))
+    assert a is b and len(cache) == 1
+    assert cache.get_by_attachment(2) is a
+
+
+def test_frames_decode_once_and_budget_evicts_lru():
+    data = [_png((i, 0, 0)) for i in range(3)]
+    cache = AttachmentCache(max_bytes=sum(len(d) for d in data[:2]) + 1)
+    e0 = cache.put_bytes(data[0], 10)
+    assert e0.frames() is e0.frames() and e0.image().size == (32, 32)
+    e0.drop_frames()
+    cache.put_bytes(data[1], 11)
+    cache.put_bytes(data[2], 12)
+    assert cache.get(e0.sha256) is None and cache.get_by_attachment(10) is None
+    assert cache.get_by_attachment(12) is not None and cache.stats["evict"] >= 1
+
+
+def test_non_image_payload_is_rejected():
+    cache = AttachmentCache()
+    assert asyncio.run(cache.fetch(_Att(3, b"MZ\x90\x00 not an image at all"))) is None
+    assert len(cache) == 0
+
+
+def _big_png() -> bytes:
+    # ~2MB: larger than the 1.5MB OCR cap
+    return _png(size=(1, 1)) + b"\x00" * (2 * 1024 * 1024)
+
+
+def test_default_fetch_uses_generous_cap_and_ocr_cap_is_explicit():
+    from satpambot.bot.modules.discord_bot.helpers.attachment_fetch import IMAGE_MAX_BYTES, MAX_BYTES
+
+    cache = AttachmentCache()
+    big = _Att(20, _big_png())
+    assert big.size > MAX_BYTES
+    assert asyncio.run(cache.fetch(big, max_bytes=MAX_BYTES)) is None
+    ent = asyncio.run(cache.fetch(big))
+    assert ent is not None and ent.size == big.size
+    # cached oversized entry is still hidden from the capped (OCR) caller
+    assert asyncio.run(cache.fetch(big, max_bytes=MAX_BYTES)) is None
+    assert asyncio.run(cache.fetch(big)) is ent
+    # non-OCR callers are capped too, just generously
+    huge = _Att(22, b"\x89PNG\r\n\x1a\n")
+    huge.size = IMAGE_MAX_BYTES + 1
+    assert asyncio.run(cache.fetch(huge)) is None and huge.reads == 0
+
+
+def test_capped_and_uncapped_fetches_do_not_share_inflight():
+    from satpambot.bot.modules.discord_bot.helpers.attachment_fetch import MAX_BYTES
+
+    cache = AttachmentCache()
+    big = _Att(21, _big_png())
+
+    async def go():
+        return await asyncio.gather(cache.fetch(big, max_bytes=MAX_BYTES), cache.fetch(big))
+
+    capped, full = asyncio.run(go())
+    assert capped is None and full is not None
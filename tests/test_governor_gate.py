@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from satpambot.bot.modules.discord_bot.cogs import a00_governor_gate_neurosama_overlay as gov
+
+LEARN, PUB, OTHER = 1, 2, 3
+
+
+class _KV:
+    def __init__(self, **vals):
+        self.vals = {f"governor:{k}": v for k, v in vals.items()}
+        self.down = False
+        self.mgets = 0
+        self.sets = []
+
+    async def mget(self, keys):
+        self.mgets += 1
+        return None if self.down else [self.vals.get(k) for k in keys]
+
+    async def get(self, key):
+        return None if self.down else self.vals.get(key)
+
+    async def set(self, key, value):
+        self.sets.append((key, value))
+        if self.down:
+            return False
+        self.vals[key] = value
+        return True
+
+
+def _gate(monkeypatch, kv, ttl=30):
+    monkeypatch.setenv("LEARN_CHANNEL_ID", str(LEARN))
+    monkeypatch.setenv("PUBLIC_CHANNEL_ID", str(PUB))
+    monkeypatch.setenv("GOVERNOR_GATE_TTL_SEC", str(ttl))
+    monkeypatch.setenv("GOVERNOR_GATE_REFRESH_SEC", "3600")
+    monkeypatch.setattr(gov, "_Upstash", lambda: kv)
+    return gov.GovernorGate(None)
+
+
+def _run(gate, coro):
+    async def go():
+        try:
+            return await coro
+        finally:
+            gate.cog_unload()
+    return asyncio.run(go())
+
+
+def test_send_guard_serves_from_cache(monkeypatch):
+    kv = _KV(gate_locked="0", public_channels_json=json.dumps([PUB]))
+    gate = _gate(monkeypatch, kv)
+
+    async def go():
+        out = [await gate._send_guard(ch, "hi") for ch in (PUB, OTHER, LEARN) * 50]
+        await asyncio.sleep(0)
+        return out
+
+    out = _run(gate, go())
+    assert out[:3] == [True, False, True]
+    assert kv.mgets <= 2   # cold fetch (+ the background refresher's first pass), not one per send
+
+
+def test_stale_state_is_kept_when_upstash_goes_down(monkeypatch):
+    kv = _KV(gate_locked="0", public_channels_json=json.dumps([PUB]))
+    gate = _gate(monkeypatch, kv, ttl=0)
+
+    async def go():
+        assert (await gate.get_state())[0] is False
+        kv.down = True
+        assert await gate.refresh() is False
+        return await gate.get_state(), await gate._send_guard(PUB, "x")
+
+    state, allowed = _run(gate, go())
+    assert state[0] is False and state[4] == [PUB] and allowed
+
+
+def test_cold_start_with_upstash_down_stays_locked(monkeypatch):
+    kv = _KV()
+    kv.down = True
+    gate = _gate(monkeypatch, kv)
+
+    async def go():
+        return [await gate._send_guard(PUB, "x"), await gate._send_guard(LEARN, "x")]
+
+    assert _run(gate, go()) == [False, True]
+
+
+def test_writes_apply_locally_and_invalidate(monkeypatch):
+    kv = _KV(gate_locked="1", public_channels_json=json.dumps([PUB]))
+    gate = _gate(monkeypatch, kv)
+
+    async def go():
+        assert await gate._send_guard(PUB, "x") is False
+        kv.down = True
+        await gate.set_gate_locked(False)   # Upstash write fails, local decision still applies
+        assert await gate._send_guard(PUB, "x") is True
+        kv.down = False
+        await gate.add_public_channel(OTHER)
+        return await gate._send_guard(OTHER, "x")
+
+    assert _run(gate, go()) is False   # add_public_channel refetched: Upstash still says locked
+    assert gate._fetched_at == 0 and OTHER in gate._pubs_set   # write-through + invalidated
+    assert json.loads(kv.vals["governor:public_channels_json"]) == [PUB, OTHER]
+
+
+def test_empty_public_list_is_seeded(monkeypatch):
+    kv = _KV(gate_locked="0")
+    gate = _gate(monkeypatch, kv)
+    state = _run(gate, gate.get_state())
+    assert state[4] == [PUB]
+    assert ("governor:public_channels_json", json.dumps([PUB])) in kv.sets
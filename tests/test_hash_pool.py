@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from satpambot.bot.modules.discord_bot.helpers import hash_pool
+from satpambot.bot.modules.discord_bot.helpers.hash_pool import HashService
+
+
+def _fake_job(kind, data, kw):
+    """Worker-side stand-in for _run_job: b"sleep:<sec>", b"fat" (huge RSS) or anything else."""
+    text = data.decode()
+    if text.startswith("sleep:"):
+        time.sleep(float(text.split(":", 1)[1]))
+    return (text, os.getpid()), (10 ** 6 if text == "fat" else 1)
+
+
+@pytest.fixture
+def svc():
+    s = HashService(workers=2, runner=_fake_job)
+    yield s
+    s.close()
+
+
+def test_timeout_fails_only_that_job(svc):
+    old = []
+
+    async def go():
+        slow = asyncio.ensure_future(svc.run("phash", b"sleep:1.5", timeout=20))
+        await asyncio.sleep(0.05)
+        old.append(svc._slot)
+        with pytest.raises(asyncio.TimeoutError):
+            await svc.run("phash", b"sleep:60", timeout=0.5)
+        assert svc.stats["recycles"] == 1
+        # the other caller's job keeps running on the retired pool and still succeeds
+        assert (await slow)[0] == "sleep:1.5"
+        after = await svc.run("phash", b"after", timeout=20)
+        return after
+
+    assert asyncio.run(go())[0] == "after"
+    deadline = time.time() + 5
+    while svc.stats["killed"] < 1 and time.time() < deadline:
+        time.sleep(0.05)
+    assert svc.stats["killed"] == 1 and svc.stats["resubmits"] == 0
+    time.sleep(0.5)
+    assert old[0].procs and not any(p.is_alive() for p in old[0].procs.values())
+
+
+def test_recycle_keeps_inflight_jobs(svc):
+    async def go():
+        jobs = [asyncio.ensure_future(svc.run("phash", f"sleep:0.{i}".encode(), timeout=20)) for i in range(1, 4)]
+        await asyncio.sleep(0.05)
+        svc.recycle()
+        return await asyncio.gather(*jobs)
+
+    out = asyncio.run(go())
+    assert [r[0] for r in out] == ["sleep:0.1", "sleep:0.2", "sleep:0.3"]
+    assert svc.stats["recycles"] == 1 and svc.stats["killed"] == 0
+
+
+def test_rss_threshold_retires_pool_without_cancelling(monkeypatch):
+    monkeypatch.setattr(hash_pool, "HASH_POOL_MAX_RSS_MB", 100)
+    svc = HashService(workers=1, runner=_fake_job)
+    try:
+        async def go():
+            fat = asyncio.ensure_future(svc.run("phash", b"fat", timeout=20))
+            queued = asyncio.ensure_future(svc.run("phash", b"sleep:0.2", timeout=20))
+            return await asyncio.gather(fat, queued)
+
+        (fat, queued) = asyncio.run(go())
+        assert fat[0] == "fat" and queued[0] == "sleep:0.2"
+        assert svc.stats["recycles"] >= 1 and svc.stats["timeouts"] == 0
+    finally:
+        svc.close()
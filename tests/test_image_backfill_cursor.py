@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from satpambot.bot.modules.discord_bot.cogs import anti_image_scored_guard as guard
+from satpambot.bot.modules.discord_bot.helpers import attachment_fetch
+from satpambot.bot.modules.discord_bot.helpers.attachment_fetch import FetchFailed, FetchRejected
+
+
+class _Att:
+    content_type = "image/png"
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _Msg:
+    def __init__(self, mid, *datas):
+        self.id = mid
+        self.attachments = [_Att(d) for d in datas]
+
+
+class _Thread:
+    id = 77
+
+    def __init__(self, msgs):
+        self.msgs = msgs
+        self.afters = []
+
+    async def history(self, limit, after=None, oldest_first=True):
+        self.afters.append(after.id if after else None)
+        for m in self.msgs:
+            if after is None or m.id > after.id:
+                yield m
+
+
+@pytest.fixture
+def cog(tmp_path, monkeypatch):
+    monkeypatch.setattr(guard, "CURSOR_FILE", tmp_path / "cursor.json")
+    monkeypatch.setattr(guard, "WL_FILE", tmp_path / "wl.json")
+    failing = set()
+
+    async def fake_read(a, max_bytes=None):
+        assert max_bytes == guard.IMAGE_MAX_BYTES
+        if a.data in failing:
+            raise OSError("transient")
+        if a.data == b"429":
+            raise FetchFailed(429)
+        if a.data == b"notimg":
+            raise FetchRejected("not an image (magic bytes)")
+        return a.data
+
+    monkeypatch.setattr(guard, "read_image_bounded", fake_read)
+    c = guard.AntiImageScoredGuard.__new__(guard.AntiImageScoredGuard)
+    c.cfg = dict(guard.DEFAULT_CFG)
+    c.wl = {"images": [], "channels": []}
+    c._wl_images = set()
+    c._cursors = {}
+    c.failing = failing
+    return c
+
+
+def test_cursor_holds_before_failed_download_and_retries(cog):
+    th = _Thread([_Msg(1, b"a"), _Msg(2, b"b"), _Msg(3, b"c"), _Msg(4, b"notimg")])
+    cog.failing.add(b"b")
+    asyncio.run(cog._scan_thread_to_whitelist(th))
+    assert cog._cursors["77"] == 1
+    assert guard.load_cursors() == {"77": 1}
+    assert {guard.simple_bytes_hash(x) for x in (b"a", b"c")} <= cog._wl_images
+
+    cog.failing.clear()
+    asyncio.run(cog._scan_thread_to_whitelist(th))
+    assert th.afters == [None, 1]
+    assert guard.simple_bytes_hash(b"b") in cog._wl_images
+    # FetchRejected is permanent: it does not hold the cursor back
+    assert cog._cursors["77"] == 4
+
+
+def test_incremental_scan_only_reads_after_cursor(cog):
+    th = _Thread([_Msg(1, b"a"), _Msg(2, b"b")])
+    asyncio.run(cog._scan_thread_to_whitelist(th))
+    th.msgs.append(_Msg(3, b"c"))
+    asyncio.run(cog._scan_thread_to_whitelist(th))
+    assert th.afters == [None, 2] and cog._cursors["77"] == 3
+    assert len(guard.load_wl()["images"]) == 3
+
+
+def test_rate_limited_download_holds_cursor(cog):
+    th = _Thread([_Msg(1, b"a"), _Msg(2, b"429"), _Msg(3, b"c")])
+    asyncio.run(cog._scan_thread_to_whitelist(th))
+    assert cog._cursors["77"] == 1
+
+
+class _Resp:
+    content_length = None
+
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.parametrize("status,exc", [(429, FetchFailed), (503, FetchFailed),
+                                        (404, FetchRejected), (403, FetchRejected)])
+def test_http_status_is_classified_transient_or_permanent(monkeypatch, status, exc):
+    class _Sess:
+        def get(self, url):
+            return _Resp(status)
+
+    async def fake_session():
+        return _Sess()
+
+    monkeypatch.setattr(attachment_fetch, "get_session", fake_session)
+    with pytest.raises(exc):
+        asyncio.run(attachment_fetch.fetch_url_bounded("https://cdn.example/x.png"))
@@ -0,0 +1,78 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from satpambot.ml.image_features import hash_many, hash_one
+from satpambot.ml.state_store_discord import CombinedState
+
+
+def _png(seed, size=96):
+    rng = np.random.default_rng(seed)
+    arr = rng.integers(0, 255, (size // 8, size // 8, 3), dtype=np.uint8).repeat(8, 0).repeat(8, 1)
+    b = io.BytesIO()
+    Image.fromarray(arr).save(b, "PNG")
+    return b.getvalue()
+
+
+def _legacy_dhash64(b):
+    with Image.open(io.BytesIO(b)) as im:
+        px = list(im.convert("L").resize((9, 8)).getdata())
+    bits = 0
+    for r in range(8):
+        for c in range(8):
+            bits = (bits << 1) | (1 if px[r * 9 + c] > px[r * 9 + c + 1] else 0)
+    return f"{bits:016x}"
+
+
+def test_hashes_match_legacy_and_imagehash_and_batch_equals_single():
+    blobs = [_png(i) for i in range(4)] + [b"not an image"]
+    out = hash_many(blobs)
+    assert out[-1] is None
+    for b, h in zip(blobs[:-1], out):
+        assert h == hash_one(b)
+        assert h.dhash == _legacy_dhash64(b)
+    try:
+        import imagehash
+    except ImportError:
+        return
+    g = Image.open(io.BytesIO(blobs[0]))
+    assert out[0].phash == str(imagehash.phash(g))
+    assert out[0].ahash == str(imagehash.average_hash(g))
+
+
+def _photo(seed, size, fmt):
+    """Smooth gradients + noise at camera-ish size (big enough that draft/reduce would kick in)."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([(x * rng.uniform(0.1, 0.5) + y * rng.uniform(0.1, 0.5)) % 256,
+                     (np.sin(x / rng.uniform(20, 90)) + np.cos(y / rng.uniform(20, 90))) * 60 + 128,
+                     (x ^ y) % 256], axis=-1)
+    arr = np.clip(base + rng.normal(0, 25, base.shape), 0, 255).astype(np.uint8)
+    b = io.BytesIO()
+    Image.fromarray(arr).save(b, fmt, **({"quality": 85} if fmt == "JPEG" else {"compress_level": 1}))
+    return b.getvalue()
+
+
+def test_dhash_matches_legacy_on_large_jpeg_and_png():
+    sizes = [(1024, 768), (777, 1003), (640, 480)]
+    blobs = [_photo(i, sizes[i % len(sizes)], fmt) for i in range(8) for fmt in ("JPEG", "PNG")]
+    for b, h in zip(blobs, hash_many(blobs)):
+        assert h.dhash == _legacy_dhash64(b)
+
+
+def test_whitelist_index_is_cached_until_lists_change():
+    cs = CombinedState()
+    cs.whitelist = {"dhash64": ["00000000000000ff"], "sha1k": ["abc"]}
+    db, sha = cs.whitelist_index()
+    assert cs.whitelist_index()[0] is db and "abc" in sha
+    assert db.best(["00000000000000fe"], 2) is not None
+    cs.whitelist["dhash64"].append("ffffffffffffffff")
+    assert len(cs.whitelist_index()[0]) == 2
+    # same-length in-place edit: invisible to a len-based key, caught by the version counter
+    cs.whitelist["dhash64"][0] = "0f0f0f0f0f0f0f0f"
+    cs.touch_whitelist()
+    assert cs.whitelist_index()[0].best(["00000000000000fe"], 2) is None
+    cs.apply_parts({"whitelist": {"dhash64": {"op": "set", "items": ["00000000000000ff", "1111111111111111"]}}})
+    assert cs.whitelist_index()[0].best(["00000000000000fe"], 2) is not None
@@ -0,0 +1,22 @@
+import json
+
+from satpambot.bot.modules.discord_bot.helpers import list_snapshot, lists_loader
+
+
+def test_snapshot_swaps_only_on_content_change(tmp_path, monkeypatch):
+    for name in ("WL_FILE", "BL_FILE", "URL_WL_JSON", "URL_BL_JSON"):
+        monkeypatch.setattr(lists_loader, name, tmp_path / f"{name}.json")
+    monkeypatch.setattr(list_snapshot, "_current", None)
+
+    assert lists_loader.save_lists({"good.com"}, set(), {"evil.com", "good.com"}, set())
+    snap = list_snapshot.current()
+    assert snap.bl_domains == {"evil.com"} and snap.matcher.reputation("a.evil.com") == "black"
+
+    lists_loader.save_lists({"good.com"}, set(), {"evil.com"}, set())  # same content
+    assert list_snapshot.current() is snap
+
+    (tmp_path / "BL_FILE.json").write_text(json.dumps(["evil.com", "x.org"]), encoding="utf-8")
+    assert list_snapshot.changed_on_disk()
+    new = list_snapshot.rebuild()
+    assert new.version == snap.version + 1 and "x.org" in new.bl_domains
+    assert snap.bl_domains == {"evil.com"}  # old readers keep their immutable view
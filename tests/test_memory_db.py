@@ -0,0 +1,143 @@
+import asyncio
+import threading
+
+from satpambot.bot.modules.discord_bot.helpers import memory_db
+from satpambot.bot.modules.discord_bot.helpers.memory_db import MemoryDB, register_schema
+
+
+def _db(tmp_path, **kw):
+    register_schema("test_kv", ["CREATE TABLE IF NOT EXISTS test_kv(k TEXT PRIMARY KEY, n INTEGER)"])
+    return MemoryDB(str(tmp_path / "memory.sqlite3"), **kw)
+
+
+def test_schema_runs_once_and_wal(tmp_path):
+    db = _db(tmp_path)
+    try:
+        assert db.fetchall("SELECT * FROM test_kv") == []
+        db.execute("INSERT INTO test_kv VALUES('a', 1)").result(5)
+        assert db.fetchone("PRAGMA journal_mode")[0] == "wal"
+        migrations = db.stats["migrations"]
+        db.fetchall("SELECT * FROM test_kv")
+        assert db.stats["migrations"] == migrations
+    finally:
+        db.close()
+    db2 = _db(tmp_path)
+    try:
+        db2.ensure_schema(5)
+        assert db2.stats["migrations"] == 0   # versi sudah tercatat di memory_db_schema
+    finally:
+        db2.close()
+
+
+def test_writes_are_batched_and_isolated(tmp_path):
+    db = _db(tmp_path, linger_ms=50)
+    try:
+        db.ensure_schema(5)
+        futs = [db.execute("INSERT INTO test_kv VALUES(?, ?)", (f"k{i}", i)) for i in range(50)]
+        bad = db.execute("INSERT INTO test_kv VALUES('k0', 0)")       # PK conflict
+        futs.append(db.execute("UPDATE test_kv SET n = n + 100 WHERE k='k1'"))
+        for f in futs:
+            f.result(5)
+        assert isinstance(bad.exception(5), Exception)
+        assert db.fetchone("SELECT COUNT(1) AS c FROM test_kv")["c"] == 50
+        assert db.fetchone("SELECT n FROM test_kv WHERE k='k1'")["n"] == 101
+        rep = db.report()
+        assert rep["batches"] < rep["writes"] and rep["errors"] == 1
+    finally:
+        db.close()
+
+
+def test_transact_and_async_reads(tmp_path):
+    db = _db(tmp_path)
+
+    def bump(con):
+        row = con.execute("SELECT n FROM test_kv WHERE k='x'").fetchone()
+        n = (row["n"] if row else 0) + 1
+        con.execute("INSERT OR REPLACE INTO test_kv VALUES('x', ?)", (n,))
+        return n
+
+    async def go():
+        results = await asyncio.gather(*(db.arun(bump) for _ in range(20)))
+        row = await db.afetchone("SELECT n FROM test_kv WHERE k='x'")
+        return sorted(results), row["n"]
+
+    try:
+        results, n = asyncio.run(go())
+        assert results == list(range(1, 21)) and n == 20
+    finally:
+        db.close()
+
+
+def test_get_memory_db_shares_instance(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    seen = []
+    ts = [threading.Thread(target=lambda: seen.append(memory_db.get_memory_db(path))) for _ in range(4)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    try:
+        assert len({id(x) for x in seen}) == 1
+    finally:
+        seen[0].close()
+
+
+def test_failed_migration_is_retried(tmp_path):
+    db = _db(tmp_path)
+    register_schema("test_seed", [("INSERT INTO test_seed_target VALUES(?)", [(1,)])])
+    try:
+        try:
+            db.ensure_schema(5)
+        except Exception as e:
+            assert "test_seed_target" in str(e)
+        else:
+            raise AssertionError("migration should fail while the target table is missing")
+        assert "test_seed" not in db._applied
+        db.execute("CREATE TABLE test_seed_target(n INTEGER)").result(5)
+        db.ensure_schema(5)   # re-queued, not the cached failed future
+        assert db.fetchall("SELECT n FROM test_seed_target")[0]["n"] == 1
+    finally:
+        memory_db._SCHEMAS.pop("test_seed", None)
+        db.close()
+
+
+def test_read_on_event_loop_does_not_wait_for_writer(tmp_path):
+    import time
+    db = _db(tmp_path)
+    db.ensure_schema(5)
+    gate = threading.Event()
+    busy = db.transact(lambda con: gate.wait(5))
+    register_schema("test_late", ["CREATE TABLE IF NOT EXISTS test_late(x)"])
+
+    async def go():
+        t0 = time.monotonic()
+        rows = db.fetchall("SELECT COUNT(1) AS c FROM test_kv")
+        return time.monotonic() - t0, rows[0]["c"]
+
+    try:
+        took, n = asyncio.run(go())
+        assert took < 1 and n == 0
+        gate.set()
+        busy.result(5)
+        db.ensure_schema(5)
+        assert db.fetchall("SELECT * FROM test_late") == []
+    finally:
+        gate.set()
+        memory_db._SCHEMAS.pop("test_late", None)
+        db.close()
+
+
+def test_upgrade_store_async_create(tmp_path):
+    from satpambot.bot.modules.discord_bot.helpers.upgrade_store import UpgradeStore
+    store = UpgradeStore(str(tmp_path / "up.sqlite3"))
+
+    async def go():
+        a = await store.acreate(1, 2, 3, 4, "mod_a", "why")
+        b = await store.acreate(1, 2, 3, 5, "mod_b", "why")
+        return a, b, await store.alatest_pending()
+
+    try:
+        a, b, latest = asyncio.run(go())
+        assert b == a + 1 and latest["module"] == "mod_b"
+    finally:
+        store.db.close()
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace as NS
+
+from satpambot.bot.modules.discord_bot.helpers.message_pipeline import MessagePipeline, STOP
+
+
+class _Bot:
+    user = NS(id=99)
+
+    def get_cog(self, name):
+        return None
+
+
+def _msg(content="", bot=False, guild=True, atts=()):
+    return NS(author=NS(id=1, bot=bot), guild=NS(id=5) if guild else None, channel=NS(id=7),
+              content=content, attachments=list(atts), raw_mentions=[99])
+
+
+def test_context_and_stage_filters_and_stop():
+    p = MessagePipeline(_Bot())
+    seen = []
+
+    async def guard(ctx):
+        seen.append(("guard", ctx.domains))
+        return STOP if "evil" in ctx.lowered else None
+
+    async def xp(ctx):
+        seen.append(("xp", ctx.mentions_bot))
+
+    async def img(ctx):
+        seen.append(("img", len(ctx.images)))
+
+    p.register("xp", xp, order=100)
+    p.register("guard", guard, order=10, needs=("urls",))
+    p.register("img", img, order=20, needs=("images",))
+
+    async def run():
+        await p.dispatch(_msg("hi https://Example.com/x"))
+        await p.dispatch(_msg("https://evil.test/"))
+        await p.dispatch(_msg("hi", bot=True))
+        await p.dispatch(_msg("pic", atts=[NS(content_type="image/png"), NS(content_type="text/plain")]))
+
+    asyncio.run(run())
+    assert seen == [("guard", ("example.com",)), ("xp", True), ("guard", ("evil.test",)),
+                    ("img", 1), ("xp", True)]
+    stats = dict(p.report())
+    assert stats["guard"]["stops"] == 1 and stats["xp"]["calls"] == 2
+
+
+def test_detached_stage_runs_after_inline_and_is_referenced():
+    p = MessagePipeline(_Bot())
+    seen = []
+    gate = asyncio.Event()
+
+    async def slow(ctx):
+        await gate.wait()
+        seen.append("slow")
+
+    async def inline(ctx):
+        seen.append("inline")
+
+    p.register("slow", slow, order=1, detach=True)
+    p.register("inline", inline, order=2)
+
+    async def run():
+        await p.dispatch(_msg("hi"))
+        assert seen == ["inline"] and len(p._tasks) == 1
+        gate.set()
+        await asyncio.gather(*p._tasks)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert seen == ["inline", "slow"] and not p._tasks
@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+
+from satpambot.ml import state_store_discord as ssd
+from satpambot.ml.state_store_discord import MLState
+
+
+class _Att:
+    def __init__(self, filename, data):
+        self.filename, self._data = filename, data
+
+    async def read(self):
+        return self._data
+
+
+class _Msg:
+    def __init__(self, mid, attachments):
+        self.id, self.attachments = mid, attachments
+
+
+class _Thread:
+    def __init__(self):
+        self.msgs = []
+
+    async def send(self, content=None, file=None):
+        self.msgs.append(_Msg(len(self.msgs) + 1, [_Att(file.filename, file.fp.read())]))
+
+    def history(self, limit=None, oldest_first=False):
+        ms = list(reversed(self.msgs))[:limit]
+
+        async def gen():
+            for m in ms:
+                yield m
+        return gen()
+
+
+def _state(th):
+    st = MLState(bot=None)
+
+    async def ensure():
+        return th
+    st._ensure_thread = ensure
+    return st
+
+
+def test_deltas_carry_only_changes_and_reload_matches(monkeypatch):
+    monkeypatch.setattr(ssd, "SNAPSHOT_REBASE_EVERY", 3)
+    from satpambot.ml.online_nb import OnlineNB
+
+    async def run():
+        th = _Thread()
+        st = _state(th)
+        st.model = OnlineNB()
+        for i in range(2000):
+            st.model.learn([f"tok{i}", f"tok{i + 1}"], "phish" if i % 3 else "safe")
+        st.combined.whitelist["dhash64"] = [f"{i:016x}" for i in range(500)]
+        assert await st.save_snapshot()
+        base_size = len(th.msgs[-1].attachments[0]._data)
+
+        assert await st.save_snapshot()          # nothing changed -> no upload
+        assert len(th.msgs) == 1 and st.stats["skipped"] == 1
+
+        st.model.learn(["nitro", "free"], "phish")
+        st.combined.whitelist["dhash64"].append("ffffffffffffffff")
+        assert await st.save_snapshot()
+        f = th.msgs[-1].attachments[0]
+        assert f.filename.endswith("_1.delta.gz") and len(f._data) < base_size / 10
+        head, _ = ssd.decode_chunk(f._data)
+        assert head["parts"] == {"whitelist": {"dhash64": {"op": "append", "items": ["ffffffffffffffff"]}}}
+
+        st.combined.exempt["channels"] = [42]
+        assert await st.save_snapshot()
+
+        other = _state(th)
+        assert await other.load_latest()
+        assert other.combined.whitelist == st.combined.whitelist and other.combined.exempt["channels"] == [42]
+        assert np.array_equal(other.model.counts, st.model.counts) and other.model.totals == st.model.totals
+        assert other._chain["seq"] == 2
+
+        # chain continues from the loaded position, then re-bases at SNAPSHOT_REBASE_EVERY
+        other.model.learn(["x"], "safe")
+        assert await other.save_snapshot()
+        assert th.msgs[-1].attachments[0].filename.endswith("_3.delta.gz")
+        other.model.learn(["y"], "safe")
+        assert await other.save_snapshot()
+        assert th.msgs[-1].attachments[0].filename.endswith("_0.base.gz")
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+import asyncio
+
+from satpambot.bot.modules.discord_bot.helpers.mod_actions import ModerationExecutor
+
+
+class _Guild:
+    def __init__(self, gid=1):
+        self.id = gid
+        self.bulk_calls = []
+        self.single_bans = []
+
+    async def bulk_ban(self, users, reason=None, delete_message_seconds=0):
+        self.bulk_calls.append(list(users))
+        return type("R", (), {"banned": list(users), "failed": []})()
+
+    async def ban(self, user, reason=None, delete_message_days=0):
+        self.single_bans.append(user.id)
+
+
+class _Channel:
+    def __init__(self, cid=10):
+        self.id = cid
+        self.guild = _Guild()
+        self.bulk_calls = []
+
+    async def delete_messages(self, msgs):
+        self.bulk_calls.append([m.id for m in msgs])
+
+
+class _Msg:
+    def __init__(self, mid, ch):
+        self.id, self.channel = mid, ch
+        self.deleted = 0
+
+    async def delete(self):
+        self.deleted += 1
+
+
+class _User:
+    def __init__(self, uid):
+        self.id = uid
+
+
+def test_deletes_coalesce_per_channel_and_dedupe():
+    async def run():
+        ex = ModerationExecutor(delete_window_ms=20)
+        ch = _Channel()
+        msgs = [_Msg(i + 1, ch) for i in range(50)]
+        res = await asyncio.gather(*[ex.delete(m) for m in msgs], ex.delete(msgs[0]))
+        assert all(res)
+        assert len(ch.bulk_calls) == 1 and len(ch.bulk_calls[0]) == 50
+        assert ex.stats["delete"]["dedup"] == 1
+        assert await ex.delete(msgs[1]) is True  # recently deleted -> no new request
+        assert len(ch.bulk_calls) == 1 and not any(m.deleted for m in msgs)
+    asyncio.run(run())
+
+
+def test_single_delete_uses_message_delete():
+    async def run():
+        ex = ModerationExecutor(delete_window_ms=1)
+        m = _Msg(7, _Channel())
+        assert await ex.delete(m) is True
+        assert m.deleted == 1 and not m.channel.bulk_calls
+    asyncio.run(run())
+
+
+def test_raid_bans_use_one_bulk_ban():
+    async def run():
+        ex = ModerationExecutor(ban_window_ms=20)
+        g = _Guild()
+        users = [_User(100 + i) for i in range(50)]
+        res = await asyncio.gather(*[ex.ban(g, u) for u in users], ex.ban(g, users[3]))
+        assert all(res)
+        assert len(g.bulk_calls) == 1 and len(g.bulk_calls[0]) == 50
+        assert not g.single_bans
+        assert ex.report()["ban"]["done"] == 50
+    asyncio.run(run())
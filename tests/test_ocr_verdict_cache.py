@@ -0,0 +1,78 @@
+import asyncio
+import io
+from types import SimpleNamespace as NS
+
+from PIL import Image
+
+from satpambot.bot.modules.discord_bot.cogs import ocr_guard
+from satpambot.bot.modules.discord_bot.helpers.attachment_cache import AttachmentCache
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class _Att:
+    content_type = "image/png"
+    url = None
+
+    def __init__(self, aid, data):
+        self.id, self._data, self.size, self.filename = aid, data, len(data), f"{aid}.png"
+
+    async def read(self):
+        return self._data
+
+
+def _setup(monkeypatch, text_by_bytes):
+    cache = AttachmentCache()
+    calls, deleted = [], []
+
+    async def fake_ocr(data, filename=None):
+        calls.append(filename)
+        await asyncio.sleep(0.01)
+        return text_by_bytes[data]
+
+    async def fake_delete(message):
+        deleted.append(message.id)
+
+    monkeypatch.setattr(ocr_guard, "smart_ocr", fake_ocr)
+    monkeypatch.setattr(ocr_guard, "queue_delete", fake_delete)
+    monkeypatch.setattr(ocr_guard, "get_attachment_cache", lambda: cache)
+    monkeypatch.setattr(ocr_guard, "OCR_ACTION", "delete")
+    monkeypatch.setattr(ocr_guard, "_last_user", {})
+    guard = ocr_guard.OCRGuard.__new__(ocr_guard.OCRGuard)
+    guard.enabled = True
+    return guard, calls, deleted
+
+
+def _ctx(mid, author, att):
+    return NS(message=NS(id=mid, author=NS(id=author), guild=None), images=[att])
+
+
+def test_repost_of_phishing_image_is_actioned_from_cached_verdict(monkeypatch):
+    phish, clean = _png((255, 0, 0)), _png((0, 255, 0))
+    guard, calls, deleted = _setup(monkeypatch, {phish: "claim free nitro now", clean: "hello"})
+
+    async def go():
+        # raid: same image posted by different accounts, two copies concurrently
+        await asyncio.gather(guard.on_message_ctx(_ctx(1, 10, _Att(100, phish))),
+                             guard.on_message_ctx(_ctx(2, 11, _Att(101, phish))))
+        await guard.on_message_ctx(_ctx(3, 12, _Att(102, phish)))
+        await guard.on_message_ctx(_ctx(4, 13, _Att(103, clean)))
+        await guard.on_message_ctx(_ctx(5, 14, _Att(104, clean)))
+
+    asyncio.run(go())
+    assert sorted(deleted) == [1, 2, 3]
+    assert len(calls) == 2          # one OCR per distinct image
+    assert ocr_guard.get_attachment_cache().get_by_attachment(102).verdicts["ocr"] == "risky"
+
+
+def test_classify_matches_policy_order(monkeypatch):
+    guard, _, _ = _setup(monkeypatch, {})
+    assert guard._classify("", set()) == "clean"
+    assert guard._classify("join discord.gg/abc nitro", set()) == "invite"
+    assert guard._classify("nsfw 18+ art", set()) == "soft"
+    assert guard._classify("free wallet airdrop", set()) == "risky"
+    assert guard._classify("nice cat picture", set()) == "clean"
@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+
+from satpambot.ml.online_nb import OnlineNB
+
+
+def _legacy_phish(pos, neg, tokens, a=1.0):
+    """Reference: the original dict-based multinomial NB (one doc per class)."""
+    vocab = set(pos) | set(neg)
+    lp = []
+    for counts in (pos, neg):
+        total = sum(counts.values())
+        s = math.log(0.5)
+        for t in tokens:
+            s += math.log((counts.get(t, 0) + a) / (total + a * len(vocab)))
+        lp.append(s)
+    m = max(lp)
+    e = [math.exp(x - m) for x in lp]
+    return e[0] / sum(e)
+
+
+def test_matches_legacy_scores_and_batch_equals_single():
+    nb = OnlineNB()
+    pos = {"free": 2, "nitro": 1, "claim": 1}
+    neg = {"hello": 1, "meeting": 1, "free": 1}
+    nb.learn(["free", "free", "nitro", "claim"], "phish")
+    nb.learn(["hello", "meeting", "free"], "safe")
+    docs = [["free", "nitro"], ["hello"], [], ["unseen", "claim"]]
+    batch = nb.predict_proba_batch(docs)
+    for d, p in zip(docs, batch):
+        assert abs(nb.predict_proba(d)["phish"] - p) < 1e-12
+        ref = 0.5 if not d else _legacy_phish(pos, neg, d)
+        assert abs(p - ref) < 1e-9
+
+
+def test_binary_roundtrip_mmap_and_legacy_dict(tmp_path):
+    nb = OnlineNB()
+    nb.learn(["gift", "steam", "gift"], "phish")
+    nb.learn(["jadwal", "kuliah"], "safe")
+    path = str(tmp_path / "nb.snb")
+    nb.save(path)
+    blob = nb.to_bytes()
+    assert len(blob) < 200  # sparse: proportional to used buckets, not 2**bits
+    for other in (OnlineNB.from_bytes(blob), OnlineNB.load(path, mmap=True)):
+        assert other.nnz == nb.nnz and other.totals == nb.totals and other.docs == nb.docs
+        assert np.allclose(other.predict_proba_batch([["gift"], ["kuliah"]]),
+                           nb.predict_proba_batch([["gift"], ["kuliah"]]))
+    old = OnlineNB.from_dict({"pos_counts": {"gift": 2, "steam": 1}, "neg_counts": {"jadwal": 1, "kuliah": 1},
+                              "pos_total": 3, "neg_total": 2, "pos_docs": 1, "neg_docs": 1})
+    assert abs(old.predict_proba(["gift"])["phish"] - nb.predict_proba(["gift"])["phish"]) < 1e-12
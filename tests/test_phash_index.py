@@ -0,0 +1,88 @@
+import random
+
+from satpambot.bot.modules.discord_bot.helpers.phash_index import PhashIndex
+from satpambot.bot.modules.discord_bot.helpers.img_hashing import phash_hit
+
+
+def _brute(db, q, r):
+    best = None
+    for h in db:
+        d = (int(h, 16) ^ int(q, 16)).bit_count()
+        if d <= r and (best is None or d < best[1]):
+            best = (h, d)
+    return best
+
+
+def test_nearest_matches_brute_force():
+    rnd = random.Random(7)
+    db = [f"{rnd.getrandbits(64):016x}" for _ in range(3000)]
+    idx = PhashIndex(db)
+    for _ in range(200):
+        base = int(rnd.choice(db), 16)
+        for b in rnd.sample(range(64), rnd.randint(0, 12)):
+            base ^= 1 << b
+        q = f"{base:016x}"
+        for r in (0, 4, 8, 12):
+            got = idx.nearest(q, r)
+            exp = _brute(db, q, r)
+            assert (got[1] if got else None) == (exp[1] if exp else None)
+
+
+def test_phash_hit_index_and_list_agree():
+    db = ["904d6a6d96c9c597", "95956a6a879d9991"]
+    idx = PhashIndex(db)
+    q = f"{int(db[1], 16) ^ 0b101:016x}"
+    assert phash_hit([q], idx, 2) == db[1]
+    assert phash_hit([q], db, 2) == db[1]
+    assert phash_hit([q], idx, 1) is None
+    idx.discard(db[1])
+    assert phash_hit([q], idx, 2) is None
+
+
+def test_packed_db_agrees_with_index():
+    from satpambot.bot.modules.discord_bot.helpers.phash_packed import PackedPhashDB
+
+    rnd = random.Random(11)
+    db = [f"{rnd.getrandbits(64):016x}" for _ in range(2000)]
+    packed, idx = PackedPhashDB.from_hex(db), PhashIndex(db)
+    qs = [f"{int(rnd.choice(db), 16) ^ (1 << rnd.randrange(64)):016x}" for _ in range(20)]
+    qs += [f"{rnd.getrandbits(64):016x}" for _ in range(20)]
+    _, dist = packed.match(qs, 8)
+    for q, d in zip(qs, dist):
+        n = idx.nearest(q, 8)
+        assert (n[1] if n else -1) == int(d)
+    assert phash_hit([db[5]], packed, 0) == db[5]
+
+
+def test_packed_phash_hit_skips_unparseable_candidates():
+    from satpambot.bot.modules.discord_bot.helpers.phash_packed import PackedPhashDB
+
+    db = ["00000000000000ff", "0f0f0f0f0f0f0f0f"]
+    packed = PackedPhashDB.from_hex(db)
+    # 80-bit / non-hex candidates are dropped by the packer; the hit must still map to its own string
+    cands = ["1" * 20, "zz", "0000000000000001", db[1]]
+    assert phash_hit(cands, packed, 0) == db[1]
+
+
+def test_tile_match_best_matches_pairwise():
+    from satpambot.bot.modules.discord_bot.helpers.img_hashing import tile_match_best
+
+    rnd = random.Random(3)
+    db = ["|".join(f"{rnd.getrandbits(64):016x}" for _ in range(9)) for _ in range(300)]
+    src = db[42].split("|")
+    cand = "|".join(t if i % 3 else f"{rnd.getrandbits(64):016x}" for i, t in enumerate(src))
+    flipped = "|".join(f"{int(t, 16) ^ 0b11:016x}" for t in cand.split("|"))
+    assert tile_match_best([cand], db, 3, 9, 0) == 6
+    assert tile_match_best([flipped], db, 3, 9, 2) == 6
+    assert tile_match_best([flipped], db, 3, 9, 1) == 0
+    assert tile_match_best([flipped], db, 3, 5, 2) >= 5
+
+
+def test_tile_index_for_accepts_generators_and_keys_on_content():
+    from satpambot.bot.modules.discord_bot.helpers.img_hashing import tile_index_for, tile_match_best
+
+    db = ["|".join(f"{i * 9 + j:016x}" for j in range(9)) for i in range(5)]
+    assert tile_match_best([db[2]], (s for s in db), 3, 9, 0) == 9
+    assert tile_index_for(iter(db)) is tile_index_for(list(db))
+    assert tile_index_for(set(db)) is tile_index_for(frozenset(db))
+    assert tile_index_for(db[:4]) is not tile_index_for(db)
@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+from satpambot.ml.phash_reconcile import PAT_MAGIC, Reconciler, split_false_positives
+
+P1, P2 = "00000000000000ff", "ffff000000000000"
+NEAR_P1 = "00000000000000fe"   # 1 bit from P1
+NEAR_P2 = "ffff000000000001"   # 1 bit from P2
+FAR = "0f0f0f0f0f0f0f0f"
+
+
+class _Msg:
+    def __init__(self, mid, content="", attachments=()):
+        self.id, self.content, self.attachments = mid, content, list(attachments)
+
+
+class _Chan:
+    def __init__(self, cid, msgs):
+        self.id, self.msgs, self.calls = cid, msgs, []
+
+    def history(self, limit=None, after=None, oldest_first=False):
+        self.calls.append(getattr(after, "id", None))
+        ms = [m for m in self.msgs if after is None or m.id > after.id]
+        ms = sorted(ms, key=lambda m: m.id, reverse=not oldest_first)[:limit]
+
+        async def gen():
+            for m in ms:
+                yield m
+        return gen()
+
+
+def _log_msg(mid, hashes):
+    return _Msg(mid, f"{PAT_MAGIC}\n```json\n{json.dumps({'dhash': hashes})}\n```")
+
+
+def test_split_false_positives_uses_hamming_threshold():
+    tps, fps = split_false_positives({NEAR_P1, FAR, "ab" * 16}, {P1, "ab" * 16}, ham_thr=2)
+    assert tps == {NEAR_P1, "ab" * 16} and fps == {FAR}
+
+
+def test_reconciler_is_incremental_and_reports_diffs(tmp_path, monkeypatch):
+    from satpambot.ml import phash_reconcile as pr
+
+    async def fake_thread_scan(th, limit, after):
+        new = [m for m in th.msgs if after is None or m.id > after]
+        return {m.content for m in new}, max([m.id for m in new], default=after), len(new)
+    monkeypatch.setattr(pr, "_scan_thread", fake_thread_scan)
+
+    async def run():
+        path = str(tmp_path / "state.json")
+        th = _Chan(10, [_Msg(1, P1)])
+        logc = _Chan(20, [_log_msg(5, [NEAR_P1, NEAR_P2, FAR])])
+        rep = await Reconciler(path, ham_thr=2).run(logc, [th])
+        assert rep.new_tps == {NEAR_P1} and rep.new_fps == {NEAR_P2, FAR}
+
+        # restart: nothing new -> empty diff, log read only after the stored cursor
+        rec = Reconciler(path, ham_thr=2)
+        rep = await rec.run(logc, [th])
+        assert not rep.changed and logc.calls[-1] == 5
+
+        # new phish image promotes an old FP; new log hash classified once
+        th.msgs.append(_Msg(2, P2))
+        logc.msgs.append(_log_msg(6, [FAR, "1234123412341234"]))
+        rep = await rec.run(logc, [th])
+        assert rep.promoted == {NEAR_P2} and rep.new_fps == {"1234123412341234"} and not rep.new_tps
+        assert rep.totals == {"tp": 2, "fp": 2, "phish": 2}
+    asyncio.run(run())
+
+
+class _Img:
+    content_type = "image/png"
+
+    def __init__(self, data, fail=False):
+        self.data, self.fail = data, fail
+
+    async def read(self):
+        if self.fail:
+            raise OSError("transient")
+        return self.data
+
+
+def test_thread_cursor_holds_at_first_failed_download(monkeypatch):
+    from types import SimpleNamespace as NS
+
+    from satpambot.ml import phash_reconcile as pr
+
+    monkeypatch.setattr(pr, "hash_many", lambda blobs: [NS(dhash=b.decode()) for b in blobs])
+    flaky = _Img(b"BB", fail=True)
+    th = _Chan(10, [_Msg(1, attachments=[_Img(b"AA")]), _Msg(2, attachments=[flaky]),
+                    _Msg(3, attachments=[_Img(b"CC")])])
+
+    seen, last, n = asyncio.run(pr._scan_thread(th, 50, None))
+    assert seen == {"aa", "cc"} and last == 1 and n == 3
+
+    flaky.fail = False
+    seen, last, _ = asyncio.run(pr._scan_thread(th, 50, last))
+    assert th.calls[-1] == 1 and seen == {"bb", "cc"} and last == 3
@@ -0,0 +1,63 @@
+import asyncio
+
+from satpambot.bot.modules.discord_bot.helpers.pin_index import PinIndex
+
+
+class _Embed:
+    def __init__(self, title, footer=""):
+        self.title = title
+        self.footer = type("F", (), {"text": footer})()
+
+
+class _Msg:
+    def __init__(self, mid, ch, content="", title=None, footer="", author=1):
+        self.id, self.channel, self.content = mid, ch, content
+        self.embeds = [_Embed(title, footer)] if title else []
+        self.author = type("A", (), {"id": author})()
+
+
+class _Channel:
+    def __init__(self, cid, msgs=()):
+        self.id = cid
+        self.calls = 0
+        self._pins = list(msgs)
+
+    async def pins(self):
+        self.calls += 1
+        return list(self._pins)
+
+
+def test_lookups_hit_cache_after_first_load():
+    async def run():
+        ch = _Channel(1)
+        ch._pins = [_Msg(11, ch, title="Periodic Status", footer="sticky:status:v1"),
+                    _Msg(12, ch, content="[XP_KV] {}", author=2)]
+        idx = PinIndex()
+        assert (await idx.find_title(ch, "Periodic Status")).id == 11
+        assert (await idx.find_marker(ch, "sticky:status")).id == 11
+        assert (await idx.find_marker(ch, "[XP_KV]", author_id=2)).id == 12
+        assert await idx.find_marker(ch, "[XP_KV]", author_id=1) is None
+        assert len(await idx.pins(ch)) == 2
+        assert ch.calls == 1
+    asyncio.run(run())
+
+
+def test_incremental_updates():
+    async def run():
+        ch = _Channel(1)
+        ch._pins = [_Msg(11, ch, title="A")]
+        idx = PinIndex()
+        await idx.pins(ch)
+        new = _Msg(13, ch, title="B")
+        idx.note_pinned(new)
+        idx.on_pins_update(1)  # our own pin -> no refetch
+        assert [m.id for m in await idx.pins(ch)] == [13, 11]
+        idx.on_message_edit(1, 11, message=_Msg(11, ch, title="A2"))
+        assert (await idx.find_title(ch, "A2")).id == 11
+        idx.on_message_delete(1, [13])
+        assert await idx.find_title(ch, "B") is None
+        assert ch.calls == 1
+        idx.on_pins_update(1)  # someone else pinned -> reload lazily
+        await idx.pins(ch)
+        assert ch.calls == 2
+    asyncio.run(run())
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import discord
+
+from satpambot.bot.modules.discord_bot.helpers import discord_pinned_kv as kvmod
+from satpambot.bot.modules.discord_bot.helpers.discord_pinned_kv import _KVStore, _render
+
+
+class _Msg:
+    def __init__(self, ch, mid, content=""):
+        self.channel, self.id, self.content, self.pinned = ch, mid, content, True
+
+    async def edit(self, content=None, **kw):
+        if self.channel.down:
+            raise discord.HTTPException(type("R", (), {"status": 503, "reason": "down"})(), "down")
+        self.channel.edits.append(content)
+        self.channel.content = content
+        return self
+
+
+class _Channel:
+    def __init__(self, content):
+        self.id = kvmod.KV_CHAN
+        self.content = content
+        self.edits = []
+        self.fetches = 0
+        self.down = False
+
+    async def fetch_message(self, mid):
+        self.fetches += 1
+        if self.down:
+            raise discord.HTTPException(type("R", (), {"status": 503, "reason": "down"})(), "down")
+        return _Msg(self, mid, self.content)
+
+    def get_partial_message(self, mid):
+        return _Msg(self, mid)
+
+
+class _Bot:
+    def __init__(self, ch):
+        self.ch = ch
+
+    def get_channel(self, cid):
+        return self.ch
+
+
+def _remote(ch):
+    return json.loads(ch.content.split("```json", 1)[1].rsplit("```", 1)[0])
+
+
+def test_sets_coalesce_into_one_edit_and_reads_are_cached(tmp_path):
+    async def run():
+        ch = _Channel(_render({"a": 1}))
+        kv = _KVStore(_Bot(ch), flush_sec=0.05, min_edit_sec=0, snapshot_path=str(tmp_path / "kv.json"))
+        assert (await kv.get_map()) == {"a": 1}
+        for i in range(20):
+            await kv.set_multi({"n": i})
+        assert await kv.incr("a", 2) == 3
+        assert await kv.compare_and_swap("a", 3, 10)
+        assert not await kv.compare_and_swap("a", 3, 11)
+        await kv.get_map()
+        assert ch.fetches == 1 and ch.edits == []
+        await asyncio.sleep(0.15)
+        assert len(ch.edits) == 1 and _remote(ch) == {"a": 10, "n": 19}
+        r = kv.report()
+        assert r["flushes"] == 1 and r["coalesced"] == 21 and r["dirty"] == 0 and r["cas_conflicts"] == 1
+    asyncio.run(run())
+
+
+def test_snapshot_fallback_and_retry_when_discord_down(tmp_path):
+    async def run():
+        snap = tmp_path / "kv.json"
+        snap.write_text(json.dumps({"xp:bot:senior_total": 42}))
+        ch = _Channel(_render({"xp:bot:senior_total": 40}))
+        ch.down = True
+        kv = _KVStore(_Bot(ch), flush_sec=60, min_edit_sec=0, snapshot_path=str(snap))
+        assert (await kv.get_map())["xp:bot:senior_total"] == 42
+        assert kv.report()["degraded"]
+        await kv.set_multi({"learning:status": "KULIAH-S1 (1%)"})
+        assert not await kv.flush() and kv.report()["dirty"] == 1
+        assert json.loads(snap.read_text())["learning:status"] == "KULIAH-S1 (1%)"
+        ch.down = False
+        assert await kv.flush()
+        # remote wins for clean keys, local dirty keys are kept
+        assert _remote(ch) == {"xp:bot:senior_total": 40, "learning:status": "KULIAH-S1 (1%)"}
+        assert not kv.report()["degraded"]
+    asyncio.run(run())
@@ -0,0 +1,52 @@
+import asyncio
+
+from satpambot.bot.modules.discord_bot.helpers.route_limiter import (
+    RouteLimiter, PRIO_MOD, PRIO_REPLY, PRIO_LOW, classify, priority,
+)
+
+
+class _Route:
+    def __init__(self, method, path, channel_id=None):
+        self.method, self.path, self.channel_id = method, path, channel_id
+
+
+def test_classify_routes_and_override():
+    assert classify(_Route("POST", "/guilds/{guild_id}/bulk-ban")) == PRIO_MOD
+    assert classify(_Route("PATCH", "/channels/{channel_id}/messages/{message_id}")) == PRIO_LOW
+    assert classify(_Route("POST", "/channels/{channel_id}/messages")) == PRIO_REPLY
+    with priority(PRIO_LOW):
+        assert classify(_Route("POST", "/channels/{channel_id}/messages")) == PRIO_LOW
+
+
+def test_moderation_jumps_ahead_of_low_priority_backlog():
+    async def run():
+        lim = RouteLimiter(global_rate=20, low_reserve=5)
+        order = []
+
+        async def req(prio, tag, lane):
+            await lim.acquire(prio, f"r{tag}", lane)
+            order.append(tag)
+            lim.release(f"r{tag}")
+
+        low = [asyncio.create_task(req(PRIO_LOW, f"low{i}", i % 3)) for i in range(40)]
+        await asyncio.sleep(0.05)
+        ban = asyncio.create_task(req(PRIO_MOD, "ban", 99))
+        await asyncio.gather(ban, *low)
+        assert order.index("ban") < 25  # not stuck behind the status backlog
+        r = lim.report()
+        assert r["mod"]["granted"] == 1 and r["low"]["granted"] == 40
+        assert r["low"]["max_depth"] > 0 and r["low"]["depth"] == 0
+    asyncio.run(run())
+
+
+def test_route_bucket_blocks_until_reset():
+    async def run():
+        lim = RouteLimiter(global_rate=50, low_reserve=0)
+        await lim.acquire(PRIO_REPLY, "send:1")
+        lim.release("send:1", limit=5, remaining=0, reset_after=0.1)
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        await lim.acquire(PRIO_REPLY, "send:1")
+        assert loop.time() - t0 >= 0.08
+        await lim.acquire(PRIO_REPLY, "other:2")  # other routes are unaffected
+    asyncio.run(run())
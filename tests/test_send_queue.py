@@ -0,0 +1,115 @@
+import asyncio
+
+from satpambot.bot.modules.discord_bot.helpers.send_queue import SendQueue
+
+
+class _Msg:
+    def __init__(self, ch, mid):
+        self.channel, self.id = ch, mid
+        self.edits = []
+
+    async def edit(self, **kw):
+        self.channel.log.append(("edit", self.id, kw.get("content")))
+
+
+class _Channel:
+    def __init__(self, cid, fail_first=0):
+        self.id = cid
+        self.log = []
+        self.fail_first = fail_first
+
+    async def send(self, **kw):
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RuntimeError("boom")
+        await asyncio.sleep(0)
+        self.log.append(("send", kw.get("content")))
+        return _Msg(self, 1000 + len(self.log))
+
+    def get_partial_message(self, mid):
+        return _Msg(self, mid)
+
+
+class _Bot:
+    def __init__(self, *channels):
+        self.channels = {c.id: c for c in channels}
+
+    def get_channel(self, cid):
+        return self.channels.get(cid)
+
+
+async def _drain(q):
+    for _ in range(200):
+        if not q.pending():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_ordering_dedupe_and_retry(tmp_path):
+    async def run():
+        a, b = _Channel(1, fail_first=1), _Channel(2)
+        q = SendQueue(_Bot(a, b), path=str(tmp_path / "outbox.db"), retry_base=0.01)
+        await q.start()
+        for i in range(5):
+            await q.enqueue(1, content=f"a{i}")
+            await q.enqueue(2, content=f"b{i}")
+        assert await q.enqueue(2, key="once", content="x") is True
+        assert await q.enqueue(2, key="once", content="x") is False
+        await _drain(q)
+        assert [c for _, c in a.log] == [f"a{i}" for i in range(5)]  # retried head kept its place
+        assert [c for _, c in b.log] == [f"b{i}" for i in range(5)] + ["x"]
+        assert q.stats["retried"] == 1 and q.stats["dedup"] == 1
+        await q.stop()
+    asyncio.run(run())
+
+
+def test_pending_sends_survive_restart(tmp_path):
+    async def run():
+        path = str(tmp_path / "outbox.db")
+        ch = _Channel(5)
+        q1 = SendQueue(_Bot(ch), path=path)  # never started: simulates a crash before delivery
+        await q1.enqueue(5, content="hello")
+        await q1.stop()
+        q2 = SendQueue(_Bot(ch), path=path)
+        await q2.start()
+        await _drain(q2)
+        assert ch.log == [("send", "hello")]
+        await q2.stop()
+    asyncio.run(run())
+
+
+def test_upserts_to_same_marker_coalesce(tmp_path):
+    async def run():
+        ch = _Channel(9)
+        q = SendQueue(_Bot(ch), path=str(tmp_path / "outbox.db"))
+        for i in range(5):
+            await q.upsert(9, "status", content=f"s{i}")
+        await q.start()
+        await _drain(q)
+        assert ch.log == [("send", "s4")]
+        await q.upsert(9, "status", content="s5")
+        await _drain(q)
+        assert ch.log[-1] == ("edit", 1001, "s5")
+        assert q.stats["coalesced"] == 4
+        await q.stop()
+    asyncio.run(run())
+
+
+def test_backoff_releases_worker_slot_and_still_coalesces(tmp_path):
+    async def run():
+        a, b = _Channel(1, fail_first=1), _Channel(2)
+        q = SendQueue(_Bot(a, b), path=str(tmp_path / "outbox.db"), retry_base=0.3, max_workers=1)
+        await q.start()
+        await q.upsert(1, "status", content="s0")
+        await asyncio.sleep(0.1)            # a's head failed once and is now backing off
+        await q.enqueue(2, content="b0")
+        await q.upsert(1, "status", content="s1")
+        for _ in range(20):
+            if b.log:
+                break
+            await asyncio.sleep(0.01)
+        assert b.log == [("send", "b0")] and not a.log   # b was not blocked behind a's backoff
+        await _drain(q)
+        assert a.log == [("send", "s1")] and q.stats["coalesced"] == 1
+        await q.stop()
+    asyncio.run(run())
@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+from satpambot.bot.modules.discord_bot.helpers.status_registry import StatusRegistry
+
+
+class _Msg:
+    def __init__(self, ch, mid):
+        self.channel, self.id = ch, mid
+
+    async def edit(self, **kw):
+        await asyncio.sleep(0.01)
+        self.channel.log.append(("edit", self.id, kw.get("content")))
+        return self
+
+
+class _Channel:
+    def __init__(self, cid=1):
+        self.id = cid
+        self.log = []
+        self.fetches = 0
+
+    async def send(self, **kw):
+        self.log.append(("send", kw.get("content")))
+        return _Msg(self, 500 + len(self.log))
+
+    def get_partial_message(self, mid):
+        return _Msg(self, mid)
+
+    async def fetch_message(self, mid):
+        self.fetches += 1
+        return _Msg(self, mid)
+
+
+def test_rapid_updates_collapse_and_skip_identical(tmp_path):
+    async def run():
+        reg = StatusRegistry(path=str(tmp_path / "reg.json"), flush_sec=0, min_edit_sec=0.05)
+        ch = _Channel()
+        await reg.upsert(ch, "k", content="v0")
+        await asyncio.gather(*[reg.upsert(ch, "k", content=f"v{i}") for i in range(1, 10)])
+        edits = [e for e in ch.log if e[0] == "edit"]
+        assert ch.log[0] == ("send", "v0")
+        assert edits[-1][2] == "v9" and len(edits) <= 2  # intermediates dropped
+        n = len(ch.log)
+        await reg.upsert(ch, "k", content="v9")  # identical payload -> no request
+        assert len(ch.log) == n and ch.fetches == 0
+        assert reg.stats["dropped"] >= 7 and reg.stats["skipped_same"] == 1
+    asyncio.run(run())
+
+
+def test_debounced_persistence_and_restart(tmp_path):
+    async def run():
+        path = tmp_path / "reg.json"
+        reg = StatusRegistry(path=str(path), flush_sec=60)
+        ch = _Channel()
+        for i in range(5):
+            await reg.upsert(ch, f"k{i}", content="x")
+        assert not path.exists()  # nothing written per update
+        reg.flush()
+        assert set(json.loads(path.read_text())) == {f"k{i}" for i in range(5)}
+        reg2 = StatusRegistry(path=str(path), flush_sec=0)
+        await reg2.upsert(ch, "k3", content="y")
+        assert ch.log[-1] == ("edit", reg.message_id("k3"), "y") and ch.fetches == 0
+    asyncio.run(run())
+
+
+def test_failed_edit_falls_back_to_fresh_send(tmp_path):
+    class _Broken(_Msg):
+        async def edit(self, **kw):
+            raise RuntimeError("500 internal error")
+
+    async def run():
+        reg = StatusRegistry(path=str(tmp_path / "reg.json"), flush_sec=0, min_edit_sec=0)
+        ch = _Channel()
+        first = await reg.upsert(ch, "k", content="a")
+        reg._messages["k"] = _Broken(ch, first.id)
+        again = await reg.upsert(ch, "k", content="b")
+        assert ch.log[-1] == ("send", "b") and again.id != first.id
+        assert reg.message_id("k") == again.id
+    asyncio.run(run())
+
+
+class _PinMsg(_Msg):
+    def __init__(self, ch, mid, content=None, embed=None):
+        super().__init__(ch, mid)
+        self.content, self.embeds, self.author = content, [embed] if embed else [], ch.me
+
+    async def pin(self):
+        self.channel.pinned.append(self)
+
+    async def unpin(self):
+        self.channel.pinned.remove(self)
+
+
+class _PinChannel(_Channel):
+    def __init__(self, cid=1):
+        super().__init__(cid)
+        self.me = type("U", (), {"id": 42})()
+        self.pinned = []
+        self.pin_calls = 0
+
+    async def send(self, content=None, embed=None, **kw):
+        self.log.append(("send", content))
+        return _PinMsg(self, 500 + len(self.log), content, embed)
+
+    def get_partial_message(self, mid):
+        return _PinMsg(self, mid)
+
+    async def pins(self):
+        self.pin_calls += 1
+        return list(self.pinned)
+
+
+def _fresh_globals(tmp_path, monkeypatch):
+    from satpambot.bot.modules.discord_bot.helpers import pin_index, status_registry
+    monkeypatch.setattr(status_registry, "_registry",
+                        StatusRegistry(path=str(tmp_path / "reg.json"), flush_sec=0, min_edit_sec=0))
+    monkeypatch.setattr(pin_index, "_index", pin_index.PinIndex())
+    return status_registry._registry, pin_index._index
+
+
+def test_embed_scribe_upsert_goes_through_registry(tmp_path, monkeypatch):
+    from satpambot.bot.modules.discord_bot.helpers.embed_scribe import EmbedScribe
+    reg, _ = _fresh_globals(tmp_path, monkeypatch)
+    ch = _PinChannel(7)
+    old = _PinMsg(ch, 99, content="[status_embed] old")
+    ch.pinned.append(old)
+    bot = type("B", (), {"get_channel": lambda self, cid: ch if cid == 7 else None})()
+
+    async def run():
+        mid = await EmbedScribe.upsert(bot, 7, "[status_embed] v1")
+        assert mid == 99 and ch.log == [("edit", 99, "[status_embed] v1")]
+        mid2 = await EmbedScribe.upsert(bot, 7, "[status_embed] v2")
+        assert mid2 == 99 and ch.log[-1] == ("edit", 99, "[status_embed] v2")
+        assert ch.pin_calls == 1 and ch.fetches == 0 and ch.pinned == [old]
+        assert await EmbedScribe.upsert(bot, 7, "x", marker="[other]", edit_only=True) is None
+        new_id = await EmbedScribe.upsert(bot, 7, "y", marker="[other]")
+        assert ch.log[-1] == ("send", "y") and reg.message_id("scribe:7:[other]") == new_id
+        assert [m.id for m in ch.pinned] == [99, new_id]
+    asyncio.run(run())
+
+
+def test_memory_upsert_repins_unpinned_snapshot(tmp_path, monkeypatch):
+    from satpambot.bot.modules.discord_bot.helpers.memory_upsert import upsert_pinned_memory
+    _, idx = _fresh_globals(tmp_path, monkeypatch)
+    ch = _PinChannel(8)
+    bot = type("B", (), {"get_channel": lambda self, cid: ch, "user": ch.me})()
+
+    async def run():
+        assert await upsert_pinned_memory(bot, 1, 8, "Memory", {"v": 1})
+        snap = ch.pinned[0]
+        await snap.unpin()
+        idx.invalidate(8)                    # pins-update event from the manual unpin
+        assert await upsert_pinned_memory(bot, 1, 8, "Memory", {"v": 2})
+        assert [m.id for m in ch.pinned] == [snap.id]
+        assert [e[0] for e in ch.log] == ["send", "edit"]
+    asyncio.run(run())
@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from satpambot.bot.modules.discord_bot.helpers.upstash_pool import (
+    UpstashError, UpstashPool, UpstashUnavailable, path_to_cmd,
+)
+
+
+def _pool(handler):
+    pool = UpstashPool(url="https://kv.test", token="t")
+    pool.breaker.fails_max = 2
+    seen = []
+
+    def wrapped(req):
+        seen.append((req.url.path, json.loads(req.content)))
+        return handler(req)
+
+    client = {}
+
+    def _client():
+        if "c" not in client:
+            client["c"] = httpx.AsyncClient(transport=httpx.MockTransport(wrapped))
+        return client["c"]
+
+    pool._client = _client
+    return pool, seen
+
+
+def _redis(req):
+    body = json.loads(req.content)
+    if req.url.path == "/pipeline":
+        return httpx.Response(200, json=[{"error": "ERR wrong type"} if c[0] == "BAD" else {"result": c[-1]} for c in body])
+    return httpx.Response(200, json={"result": body[-1]})
+
+
+def test_same_tick_commands_share_one_pipeline_request():
+    pool, seen = _pool(_redis)
+
+    async def go():
+        return await asyncio.gather(pool.call("GET", "a"), pool.call("GET", "b"),
+                                    pool.call("BAD", "x"), return_exceptions=True)
+
+    a, b, bad = asyncio.run(go())
+    assert (a, b) == ("a", "b") and isinstance(bad, UpstashError)
+    assert [p for p, _ in seen] == ["/pipeline"] and pool.stats["batched"] == 3
+    assert not pool._tasks   # send tasks are referenced until done, then dropped
+
+
+def test_single_command_uses_plain_endpoint():
+    pool, seen = _pool(_redis)
+    assert asyncio.run(pool.call("GET", "k")) == "k"
+    assert seen == [("/", ["GET", "k"])] and pool.stats["batched"] == 0
+
+
+def test_breaker_opens_after_failures_and_fast_fails():
+    pool, seen = _pool(lambda req: httpx.Response(503))
+
+    async def go():
+        for _ in range(2):
+            with pytest.raises(UpstashUnavailable):
+                await pool.call("GET", "a")
+        with pytest.raises(UpstashUnavailable):
+            await pool.call("GET", "a")
+        assert await pool.try_call("GET", "a", default="dflt") == "dflt"
+
+    asyncio.run(go())
+    assert len(seen) == 2 and pool.stats["fast_fail"] == 2
+
+
+def test_path_to_cmd_keeps_query_args():
+    assert path_to_cmd("/set/my%20key/val?EX=10") == ["set", "my key", "val", "EX", "10"]
+
+
+def _kv_pool(monkeypatch):
+    """Shared pool backed by an in-memory dict; both async and sync paths go through it."""
+    from satpambot.bot.modules.discord_bot.helpers import upstash_pool
+
+    store, seen = {}, []
+
+    def handler(req):
+        body = json.loads(req.content)
+        seen.append(req.url.path)
+        cmds = body if req.url.path == "/pipeline" else [body]
+        out = []
+        for c in cmds:
+            op = c[0].upper()
+            if op == "SET":
+                store[c[1]] = c[2]; out.append({"result": "OK"})
+            elif op == "GET":
+                out.append({"result": store.get(c[1])})
+            elif op == "INCRBY":
+                store[c[1]] = str(int(store.get(c[1], "0")) + int(c[2])); out.append({"result": int(store[c[1]])})
+        return httpx.Response(200, json=out if req.url.path == "/pipeline" else out[0])
+
+    pool = UpstashPool(url="https://kv.test", token="t")
+    transport = httpx.MockTransport(handler)
+    aclient = {}
+    pool._client = lambda: aclient.setdefault("c", httpx.AsyncClient(transport=transport))
+    sclient = httpx.Client(transport=transport)
+    pool._sync_client = lambda: sclient
+    monkeypatch.setattr(upstash_pool, "_pool", pool)
+    return store, seen
+
+
+def test_award_xp_sync_goes_through_shared_pool(monkeypatch):
+    from satpambot.bot.modules.discord_bot.helpers import xp_award
+
+    store, seen = _kv_pool(monkeypatch)
+    store["xp:bot:senior_total"] = "10"
+    total, _ = xp_award.award_xp_sync(5)
+    assert total == 15 and store["xp:bot:senior_total"] == "15"
+    assert json.loads(store["learning:status_json"])["senior_total"] == 15
+    assert seen == ["/pipeline", "/pipeline"]
+
+
+def test_gate_toggle_uses_shared_pool(monkeypatch):
+    from satpambot.bot.modules.discord_bot.cogs import a00_gate_control_overlay as gate
+
+    store, _ = _kv_pool(monkeypatch)
+
+    async def go():
+        assert await gate._upstash_set(gate.GATE_KEY, "1") is True
+        return await gate._upstash_get(gate.GATE_KEY)
+
+    assert asyncio.run(go()) == "1" and store[gate.GATE_KEY] == "1"
@@ -0,0 +1,41 @@
+import random
+import string
+
+from satpambot.bot.modules.discord_bot.helpers.url_matcher import AhoCorasick, DomainTrie, UrlMatcher
+from satpambot.bot.modules.discord_bot.helpers.url_check import CRITICAL_BRANDS, looks_typosquat, reg_domain
+
+
+def test_domain_trie_rules():
+    t = DomainTrie(["evil.com", ".ru", ".bad.net"])
+    assert t.match("evil.com") and not t.match("a.evil.com")
+    assert t.match("x.ru") and t.match("a.b.ru") and not t.match("ru")
+    assert t.match("a.bad.net") and not t.match("bad.net") and not t.match("notbad.net")
+
+
+def test_aho_corasick_matches_substring_scan():
+    rnd = random.Random(5)
+    words = {"".join(rnd.choice("abc") for _ in range(rnd.randint(1, 4))) for _ in range(30)}
+    ac = AhoCorasick(words)
+    for _ in range(300):
+        text = "".join(rnd.choice("abcd") for _ in range(rnd.randint(0, 20)))
+        assert ac.findall(text) == {w for w in words if w in text}
+
+
+def test_typosquat_index_agrees_with_levenshtein():
+    m = UrlMatcher(brands=CRITICAL_BRANDS)
+    rnd = random.Random(9)
+    alphabet = string.ascii_lowercase + "01357-"
+    samples = ["disc0rd.com", "dlscord.com", "steamcommunlty.com", "rob1ox.com", "you-tube.com", "discord.com"]
+    for _ in range(400):
+        b = list(reg_domain(rnd.choice(CRITICAL_BRANDS)))
+        op, i = rnd.randrange(3), rnd.randrange(len(b))
+        if op == 0:
+            b[i] = rnd.choice(alphabet)
+        elif op == 1:
+            b.insert(i, rnd.choice(alphabet))
+        else:
+            b.pop(i)
+        samples.append("".join(b))
+    for d in samples:
+        exp = any(looks_typosquat(d, legit) for legit in CRITICAL_BRANDS)
+        assert (m.typosquat_of(d) is not None) == exp, d
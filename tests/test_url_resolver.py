@@ -0,0 +1,59 @@
+import asyncio
+
+from aiohttp import web
+
+from satpambot.bot.modules.discord_bot.helpers.url_resolver import UrlResolver, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Bit.LY:80/AbC#frag") == "http://bit.ly/AbC"
+
+
+def test_expand_caches_coalesces_and_rate_limits():
+    hits = {}
+
+    async def handler(request):
+        name = request.match_info["name"]
+        hits[name] = hits.get(name, 0) + 1
+        await asyncio.sleep(0.05)
+        if name == "a":
+            raise web.HTTPFound("/s/b")
+        if name == "b":
+            raise web.HTTPFound("/s/end")
+        if name == "boom":
+            raise web.HTTPInternalServerError()
+        return web.Response(text="ok")
+
+    async def run():
+        app = web.Application()
+        app.router.add_route("*", "/s/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base = f"http://127.0.0.1:{port}/s/"
+        r = UrlResolver(only_hosts={"127.0.0.1"}, max_hops=5, concurrency=4, host_rate=1000, host_burst=1000)
+        try:
+            outs = await asyncio.gather(*[r.expand(base + "a") for _ in range(50)])
+            assert set(outs) == {base + "end"}
+            assert hits == {"a": 1, "b": 1, "end": 1}
+            assert r.stats["coalesced"] > 0
+
+            assert await r.expand(base + "a") == base + "end"
+            assert hits["a"] == 1  # served from cache
+
+            assert await r.expand(base + "boom") == base + "boom"
+            assert await r.expand(base + "boom") == base + "boom"
+            assert hits["boom"] == 1 and r.stats["neg_hit"] == 1
+
+            slow = UrlResolver(only_hosts={"127.0.0.1"}, host_rate=1, host_burst=1, timeout=0.2)
+            assert await slow.hop(base + "x1") == base + "x1"
+            assert await slow.hop(base + "x2") == base + "x2"  # no token within timeout
+            assert slow.stats["rate_limited"] == 1 and "x2" not in hits
+            await slow.close()
+        finally:
+            await r.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+import json
+import time
+
+from satpambot.bot.modules.discord_bot.services.xp_store_v2 import XPStoreV2
+
+
+def _store(tmp_path, **kw):
+    kw.setdefault("compact_sec", 1e9)
+    return XPStoreV2(str(tmp_path / "xp.json"), str(tmp_path / "ids.json"), **kw)
+
+
+def _crash(store):
+    # simulate a hard exit: no close() -> no final compaction
+    with store._lock:
+        store._closed = True
+        store._cond.notify_all()
+
+
+def _log_lines(store):
+    with open(store.log_path, encoding="utf-8") as f:
+        return [json.loads(x) for x in f]
+
+
+def test_awards_are_group_committed(tmp_path):
+    s = _store(tmp_path, commit_window_ms=100)
+    try:
+        for i in range(20):
+            assert s.add_xp(1, 2, reason="chat", award_key=f"m{i}") == 2 * (i + 1)
+        assert s.get_total(1) == 40
+        deadline = time.time() + 3
+        while len(s._pending) and time.time() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.05)
+        assert len(_log_lines(s)) == 20
+    finally:
+        s.close()
+
+
+def test_award_key_is_idempotent_across_restart(tmp_path):
+    s = _store(tmp_path, commit_window_ms=0)
+    s.add_xp(7, 5, award_key="msg-1")
+    assert s.add_xp(7, 5, award_key="msg-1") == 5
+    s.mark_awarded("msg-2")
+    _crash(s)
+    s2 = _store(tmp_path, commit_window_ms=0)
+    try:
+        assert s2.get_total(7) == 5
+        assert s2.has_awarded("msg-1") and s2.has_awarded("msg-2")
+        assert s2.add_xp(7, 5, award_key="msg-2") == 5
+    finally:
+        s2.close()
+
+
+def test_log_tail_replayed_once_after_compaction(tmp_path):
+    s = _store(tmp_path, commit_window_ms=0)
+    s.add_xp(1, 10, reason="a")
+    s.flush(compact=True)
+    s.add_xp(1, 3, reason="b")
+    _crash(s)
+
+    snap = json.loads((tmp_path / "xp.json").read_text(encoding="utf-8"))
+    assert snap["users"]["1"]["total"] == 10 and snap["log_pos"] > 0
+
+    s2 = _store(tmp_path, commit_window_ms=0)
+    assert s2.get_total(1) == 13
+    s2.close()                       # compacts: replayed tail is folded in
+    s3 = _store(tmp_path, commit_window_ms=0)
+    try:
+        assert s3.get_total(1) == 13
+        assert s3._data["users"]["1"]["by_reason"] == {"a": 10, "b": 3}
+    finally:
+        s3.close()
+
+
+def test_legacy_awards_move_to_log_without_double_count(tmp_path):
+    legacy = {"users": {"9": {"total": 4, "by_reason": {}}},
+              "awards": [{"ts": 1, "user_id": "9", "amount": 4, "reason": None}]}
+    (tmp_path / "xp.json").write_text(json.dumps(legacy), encoding="utf-8")
+    s = _store(tmp_path, commit_window_ms=0)
+    try:
+        assert s.get_total(9) == 4 and "awards" not in s._data
+        assert len(_log_lines(s)) == 1 and s._data["stats"]["total_awards"] == 1
+    finally:
+        s.close()
+
+
+def test_replication_is_coalesced_per_flush(tmp_path):
+    s = _store(tmp_path, commit_window_ms=1000)
+    sent = []
+
+    class _Rep:
+        enabled = True
+
+        def pipeline(self, cmds):
+            sent.append(cmds)
+
+    s._upstash = _Rep()
+    try:
+        for _ in range(5):
+            s.add_xp(3, 1, reason="chat")
+        s.flush()
+        assert len(sent) == 1
+        cmds = sent[0]
+        assert ["SET", "xp:total:3", "5"] in cmds
+        assert ["INCRBY", "xp:by_reason:3:chat", "5"] in cmds
+        s.flush()
+        assert len(sent) == 1
+    finally:
+        s.close()